@@ -0,0 +1,35 @@
+"""
+Fixtures comunes de las pruebas de WABUN.
+
+Los núcleos usan `EmbeddingHashing` (de wabun_bench), que no descarga
+ningún modelo, así que las pruebas corren sin red.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wabun_bench.corpus import GeneradorCorpus
+from wabun_bench.embeddings import EmbeddingHashing
+from wabun_core import WabunCore
+
+
+@pytest.fixture
+def crear_core(tmp_path):
+    """Fábrica de núcleos en subdirectorios de `tmp_path`"""
+    def crear(nombre: str = "db", **opciones) -> WabunCore:
+        opciones.setdefault("embedding_function", EmbeddingHashing())
+        return WabunCore(persist_directory=str(tmp_path / nombre), **opciones)
+    return crear
+
+
+@pytest.fixture
+def corpus():
+    """Interacciones sintéticas reproducibles"""
+    def generar(n: int, **opciones):
+        opciones.setdefault("interacciones_por_ciclo", 15)
+        return list(GeneradorCorpus(**opciones).interacciones(n))
+    return generar
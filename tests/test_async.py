@@ -0,0 +1,69 @@
+"""Pruebas de la interfaz asíncrona (corrutinas, timeout y cierre)"""
+
+import asyncio
+import time
+
+import pytest
+
+from wabun_async import AsyncWabunCore, AsyncWabunQueries
+from wabun_bench.embeddings import EmbeddingHashing
+from wabun_core import WabunCore
+
+
+def test_llamadas_concurrentes_equivalen_a_las_sincronas(crear_core, corpus):
+    core = crear_core()
+    interacciones = corpus(8)
+    
+    async def escenario():
+        async with AsyncWabunCore(core, max_concurrencia=4) as wabun:
+            await asyncio.gather(*(
+                wabun.registrar_interaccion(**interaccion) for interaccion in interacciones
+            ))
+            queries = AsyncWabunQueries(wabun)
+            resultados = await asyncio.gather(
+                wabun.buscar_contexto_reciente("decisión del proyecto", n_results=5),
+                queries.buscar_relevante("decisión del proyecto", n_results=5)
+            )
+            paginas = [pagina async for pagina in wabun.escanear("interactions", tamano_pagina=3)]
+            return resultados, paginas
+    
+    (reciente, relevante), paginas = asyncio.run(escenario())
+    
+    assert reciente == core.buscar_contexto_reciente("decisión del proyecto", n_results=5)
+    assert relevante["ids"][0]
+    assert sum(len(pagina["ids"]) for pagina in paginas) == core.interactions.count()
+    assert all(len(pagina["ids"]) <= 3 for pagina in paginas)
+
+
+def test_timeout_por_defecto_y_por_llamada(crear_core):
+    core = crear_core()
+    core.estadisticas = lambda: time.sleep(0.5) or {}
+    
+    async def escenario():
+        wabun = AsyncWabunCore(core, timeout=0.05)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await wabun.estadisticas()
+            # timeout=None espera indefinidamente
+            return await wabun.estadisticas(timeout=None)
+        finally:
+            wabun.cerrar()
+    
+    assert asyncio.run(escenario()) == {}
+
+
+def test_cerrar_solo_cierra_el_nucleo_propio(crear_core, tmp_path, monkeypatch):
+    cerrados = []
+    monkeypatch.setattr(WabunCore, "cerrar", lambda self: cerrados.append(self))
+    
+    ajeno = crear_core()
+    AsyncWabunCore(ajeno).cerrar()
+    assert cerrados == []
+    
+    propio = AsyncWabunCore(
+        persist_directory=str(tmp_path / "propio"), embedding_function=EmbeddingHashing()
+    )
+    propio.cerrar()
+    assert cerrados == [propio.wabun]
+    with pytest.raises(RuntimeError):
+        propio._executor.submit(lambda: None)
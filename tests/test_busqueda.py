@@ -0,0 +1,73 @@
+"""Pruebas de la búsqueda léxica (BM25) e híbrida"""
+
+import pytest
+
+from wabun_core import FACTOR_CANDIDATOS
+
+
+def _registrar_decretos(core):
+    for decreto_id, tema in [
+        ("DEC-RITMO-72H-V1", "el ritmo de setenta y dos horas entre ciclos"),
+        ("DEC-CUSTODIOS-V2", "las responsabilidades de cada custodio"),
+        ("DEC-MEMORIA-V1", "la conservación de la memoria compartida")
+    ]:
+        core.registrar_decreto(
+            titulo_documento=f"Decreto {decreto_id}",
+            contenido=f"Este decreto regula {tema}.",
+            decreto_id=decreto_id,
+            custodios_implicados=["LIANG"]
+        )
+
+
+def test_identificadores_se_resuelven_sin_embeber_la_consulta(crear_core, monkeypatch):
+    core = crear_core()
+    _registrar_decretos(core)
+    
+    def sin_embeddings(*args, **kwargs):
+        raise AssertionError("la consulta no debería embeberse")
+    
+    monkeypatch.setattr(core, "_embeber_consultas", sin_embeddings)
+    resultado = core.buscar_en_decretos("DEC-RITMO-72H-V1", n_results=2, modo="hibrido")
+    assert resultado["metadatas"][0][0]["decreto_id"] == "DEC-RITMO-72H-V1"
+
+
+def test_hibrido_fusiona_rankings_vectorial_y_lexico(crear_core, corpus):
+    core = crear_core()
+    core.registrar_interacciones_lote(corpus(20))
+    objetivo = core.registrar_interaccion(
+        prompt_fundador="¿Qué hacemos con el protocolo zafirino?",
+        respuesta_ia="El protocolo zafirino queda aplazado hasta el próximo ciclo.",
+        custodio_invocado="LIANG",
+        motor_ia_usado="Claude"
+    )
+    
+    lexico = core.buscar_contexto_reciente("protocolo zafirino", n_results=5, modo="lexico")
+    assert lexico["metadatas"][0][0]["interaction_id"] == objetivo
+    assert len(lexico["puntuaciones"][0]) == len(lexico["ids"][0])
+    
+    # La fusión solo elige entre los candidatos de ambos rankings
+    hibrido = core.buscar_contexto_reciente("protocolo zafirino", n_results=5, modo="hibrido")
+    assert objetivo in {metadata["interaction_id"] for metadata in hibrido["metadatas"][0]}
+    candidatos = {
+        chunk_id
+        for modo in ("vectorial", "lexico")
+        for chunk_id in core.buscar_contexto_reciente(
+            "protocolo zafirino", n_results=5 * FACTOR_CANDIDATOS, modo=modo
+        )["ids"][0]
+    }
+    assert set(hibrido["ids"][0]) <= candidatos
+    
+    with pytest.raises(ValueError):
+        core.buscar_contexto_reciente("protocolo zafirino", modo="difuso")
+
+
+def test_reconstruir_indice_lexico(crear_core):
+    core = crear_core()
+    _registrar_decretos(core)
+    
+    core.indice_lexico.vaciar()
+    assert not core.buscar_en_decretos("custodio", modo="lexico")["ids"][0]
+    
+    assert core.reconstruir_indice_lexico()["decretos"] == core.decretos.count()
+    resultado = core.buscar_en_decretos("custodio", modo="lexico")
+    assert resultado["metadatas"][0][0]["decreto_id"] == "DEC-CUSTODIOS-V2"
@@ -0,0 +1,105 @@
+"""Pruebas del registro y la actualización incremental de decretos"""
+
+
+PARRAFOS = [
+    f"Artículo {i}. El custodio {i} vela por el ritmo de setenta y dos horas "
+    f"y registra cada decisión del ciclo {i} en la memoria compartida."
+    for i in range(6)
+]
+
+
+def _registrar(core, parrafos, decreto_id="decreto_prueba"):
+    core.registrar_decreto(
+        titulo_documento="Decreto de prueba",
+        contenido="\n\n".join(parrafos),
+        decreto_id=decreto_id,
+        custodios_implicados=["LIANG"]
+    )
+    return decreto_id
+
+
+def test_reetiquetados_no_cuentan_como_eliminados(crear_core):
+    core = crear_core(tokens_chunk_decreto=40)
+    decreto_id = _registrar(core, PARRAFOS)
+    
+    # Decreto con ids por posición, como los de versiones anteriores
+    guardados = core.decretos.get(
+        where={"decreto_id": decreto_id}, include=["documents", "metadatas", "embeddings"]
+    )
+    orden = sorted(range(len(guardados["ids"])), key=lambda i: guardados["metadatas"][i]["chunk_index"])
+    core.decretos.delete(ids=guardados["ids"])
+    core.decretos.add(
+        ids=[f"{decreto_id}_chunk_{posicion}" for posicion in range(len(orden))],
+        documents=[guardados["documents"][i] for i in orden],
+        metadatas=[guardados["metadatas"][i] for i in orden],
+        embeddings=[guardados["embeddings"][i] for i in orden]
+    )
+    
+    resultado = core.actualizar_decreto(decreto_id, "\n\n".join(PARRAFOS[:-1]))
+    assert resultado["reetiquetados"] == len(orden) - 1
+    assert resultado["eliminados"] == 1
+    assert resultado["nuevos"] == 0
+    assert core.decretos.count() == len(orden) - 1
+
+
+def test_actualizar_decreto_solo_reembebe_lo_que_cambia(crear_core):
+    from wabun_bench.embeddings import EmbeddingHashing
+    
+    class EmbeddingContado(EmbeddingHashing):
+        def __init__(self):
+            super().__init__()
+            self.textos = []
+        
+        def __call__(self, input):
+            self.textos.extend(input)
+            return super().__call__(input)
+    
+    embedding = EmbeddingContado()
+    core = crear_core(embedding_function=embedding, cache_embeddings=False, tokens_chunk_decreto=40)
+    decreto_id = _registrar(core, PARRAFOS)
+    total = core.decretos.count()
+    assert total == len(PARRAFOS)
+    
+    modificados = list(PARRAFOS)
+    modificados[2] = "Artículo 2. Texto nuevo que sustituye al segundo artículo del decreto."
+    modificados.insert(0, "Preámbulo añadido al principio del decreto.")
+    embedding.textos.clear()
+    resultado = core.actualizar_decreto(decreto_id, "\n\n".join(modificados))
+    
+    assert embedding.textos == [modificados[0], modificados[3]]
+    assert resultado["nuevos"] == 2
+    assert resultado["conservados"] == len(PARRAFOS) - 1
+    assert resultado["eliminados"] == 1
+    assert resultado["version"] == 2.0
+    
+    guardados = core.decretos.get(where={"decreto_id": decreto_id}, include=["documents", "metadatas"])
+    por_indice = sorted(zip(guardados["metadatas"], guardados["documents"]), key=lambda par: par[0]["chunk_index"])
+    assert [documento for _, documento in por_indice] == modificados
+    assert {metadata["version"] for metadata, _ in por_indice} == {2.0}
+
+
+def test_lote_de_decretos_actualiza_los_existentes(crear_core):
+    core = crear_core(tokens_chunk_decreto=40)
+    
+    def decreto(parrafos, decreto_id="decreto_prueba"):
+        return {
+            "titulo_documento": "Decreto de prueba",
+            "contenido": "\n\n".join(parrafos),
+            "decreto_id": decreto_id,
+            "custodios_implicados": ["LIANG"]
+        }
+    
+    core.registrar_decretos_lote([decreto(PARRAFOS)])
+    nueva_version = PARRAFOS[:-1] + ["Artículo final. La nueva versión sustituye a la anterior."]
+    ids = core.registrar_decretos_lote([
+        decreto(nueva_version),
+        decreto(PARRAFOS[:2], "decreto_nuevo"),
+        decreto(PARRAFOS[:3], "decreto_nuevo")
+    ])
+    assert ids == ["decreto_prueba", "decreto_nuevo", "decreto_nuevo"]
+    
+    # Solo quedan los chunks de la última versión de cada decreto
+    for decreto_id, parrafos in (("decreto_prueba", nueva_version), ("decreto_nuevo", PARRAFOS[:3])):
+        guardados = core.decretos.get(where={"decreto_id": decreto_id}, include=["documents", "metadatas"])
+        orden = sorted(range(len(guardados["ids"])), key=lambda i: guardados["metadatas"][i]["chunk_index"])
+        assert "\n\n".join(guardados["documents"][i].strip() for i in orden) == "\n\n".join(parrafos)
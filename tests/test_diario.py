@@ -0,0 +1,93 @@
+"""Pruebas de la escritura diferida con diario (wabun_diario)"""
+
+import json
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+from wabun_diario import EscritorDiferido
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Proceso que anota interacciones y muere sin volcarlas
+_CAIDA = textwrap.dedent("""
+    import json, os, sys
+    sys.path.insert(0, sys.argv[2])
+    from wabun_bench.corpus import GeneradorCorpus
+    from wabun_bench.embeddings import EmbeddingHashing
+    from wabun_core import WabunCore
+    from wabun_diario import EscritorDiferido
+    
+    core = WabunCore(persist_directory=sys.argv[1], embedding_function=EmbeddingHashing())
+    escritor = EscritorDiferido(core, max_pendientes=10 ** 6, intervalo_segundos=3600)
+    ids = [
+        escritor.registrar_interaccion(**interaccion)
+        for interaccion in GeneradorCorpus(interacciones_por_ciclo=15).interacciones(6)
+    ]
+    print(json.dumps(ids))
+    sys.stdout.flush()
+    os._exit(1)
+""")
+
+
+def test_reproduce_el_diario_tras_una_caida(crear_core, corpus, tmp_path):
+    directorio = tmp_path / "db"
+    proceso = subprocess.run(
+        [sys.executable, "-c", _CAIDA, str(directorio), str(RAIZ)],
+        capture_output=True, text=True, timeout=120
+    )
+    assert proceso.returncode == 1, proceso.stderr
+    ids = json.loads(proceso.stdout.strip().splitlines()[-1])
+    
+    core = crear_core("db")
+    assert core.interactions.count() == 0
+    with EscritorDiferido(core) as escritor:
+        assert escritor.reproducidas == len(ids)
+        assert escritor.estadisticas()["pendientes"] == 0
+    
+    encontrados = core.obtener_por_filtro(core.interactions, {"interaction_id": {"$in": ids}})
+    assert {m["interaction_id"] for m in encontrados["metadatas"]} == set(ids)
+    total = core.interactions.count()
+    
+    # Reproducir anotaciones ya volcadas (caída entre la escritura y la
+    # confirmación) no duplica chunks
+    repetida = corpus(6)[0]
+    with EscritorDiferido(core, max_pendientes=10 ** 6, intervalo_segundos=3600) as escritor:
+        escritor.diario.anotar(ids[0], repetida)
+    assert core.interactions.count() == total
+    assert (directorio / "wabun_diario.sqlite3").exists()
+
+
+def test_volcado_por_tamano_y_errores_conservan_el_diario(crear_core, corpus, monkeypatch):
+    core = crear_core()
+    campos = {clave: valor for clave, valor in corpus(1)[0].items() if clave != "interaction_id"}
+    
+    with EscritorDiferido(core, max_pendientes=4, intervalo_segundos=3600) as escritor:
+        # Alcanzar max_pendientes despierta al hilo de volcado
+        ids = [escritor.registrar_interaccion(**campos) for _ in range(4)]
+        limite = time.monotonic() + 30
+        while escritor.estadisticas()["pendientes"] and time.monotonic() < limite:
+            time.sleep(0.05)
+        assert escritor.volcadas == 4
+        
+        # Si ChromaDB falla, las anotaciones siguen en el diario y flush() propaga el error
+        original = core.registrar_interacciones_lote
+        
+        def fallar(*args, **kwargs):
+            raise RuntimeError("ChromaDB no disponible")
+        
+        monkeypatch.setattr(core, "registrar_interacciones_lote", fallar)
+        ids.append(escritor.registrar_interaccion(**campos))
+        with pytest.raises(RuntimeError):
+            escritor.flush()
+        assert escritor.estadisticas()["pendientes"] == 1
+        
+        monkeypatch.setattr(core, "registrar_interacciones_lote", original)
+        assert escritor.flush() == 1
+    
+    encontrados = core.obtener_por_filtro(core.interactions, {"interaction_id": {"$in": ids}})
+    assert {m["interaction_id"] for m in encontrados["metadatas"]} == set(ids)
@@ -0,0 +1,146 @@
+"""Pruebas de la deduplicación de chunks en la ingesta (wabun_duplicados)"""
+
+import json
+
+
+def _con_respuestas_repetidas(interacciones):
+    """Copia las respuestas de las primeras interacciones en las siguientes"""
+    mitad = len(interacciones) // 2
+    for original, copia in zip(interacciones[:mitad], interacciones[mitad:]):
+        copia["respuesta_ia"] = original["respuesta_ia"]
+        copia["custodio_invocado"] = original["custodio_invocado"]
+    return interacciones
+
+
+def _chunks_por_interaccion(core, interaction_ids):
+    chunks = {}
+    for pagina in core._paginas_interacciones(interaction_ids, ["documents", "metadatas"]):
+        for documento, metadata in zip(pagina["documents"], pagina["metadatas"]):
+            chunks.setdefault(metadata["interaction_id"], set()).add((metadata["rol"], documento))
+    return chunks
+
+
+def test_ingesta_guarda_referencias(crear_core, corpus):
+    core = crear_core(deduplicar=True)
+    interacciones = _con_respuestas_repetidas(corpus(20))
+    resultado = core.registrar_interacciones_lote(interacciones)
+    
+    stats = core.estadisticas()["deduplicacion"]
+    assert stats["referencias"] > 0
+    assert stats["exactos"] == stats["referencias"]
+    assert stats["bytes_texto_evitados"] > 0
+    # Cada interacción conserva todos sus chunks, aunque no estén en la colección
+    chunks = _chunks_por_interaccion(core, resultado)
+    for original, copia in zip(resultado[:10], resultado[10:]):
+        respuestas_original = {d for rol, d in chunks[original] if rol == "Motor_IA"}
+        respuestas_copia = {d for rol, d in chunks[copia] if rol == "Motor_IA"}
+        assert respuestas_original and respuestas_original == respuestas_copia
+
+
+def test_exportar_importar_conserva_referencias(crear_core, corpus, tmp_path):
+    origen = crear_core("origen", deduplicar=True)
+    ids = origen.registrar_interacciones_lote(_con_respuestas_repetidas(corpus(20)))
+    stats_origen = origen.estadisticas()["deduplicacion"]
+    chunks_origen = _chunks_por_interaccion(origen, ids)
+    
+    archivo = tmp_path / "memoria.jsonl"
+    conteos = origen.exportar_memoria(str(archivo))
+    assert conteos["referencias"] == stats_origen["referencias"]
+    tipos = [json.loads(linea)["tipo"] for linea in archivo.read_text(encoding="utf-8").splitlines()]
+    assert tipos.count("referencia") == stats_origen["referencias"]
+    
+    destino = crear_core("destino", deduplicar=True)
+    importados = destino.importar_memoria(str(archivo))
+    assert importados["referencias"] == stats_origen["referencias"]
+    
+    stats_destino = destino.estadisticas()["deduplicacion"]
+    for clave in ("referencias", "exactos", "similares", "bytes_texto_evitados", "huellas"):
+        assert stats_destino[clave] == stats_origen[clave]
+    assert destino.estadisticas()["total_interacciones"] == origen.estadisticas()["total_interacciones"]
+    assert _chunks_por_interaccion(destino, ids) == chunks_origen
+    
+    # El linaje sigue disponible en las búsquedas
+    resultado = destino.buscar_contexto_reciente(
+        "", filtros={"interaction_id": ids[0]}, n_results=20
+    )
+    linajes = [m.get("interacciones_duplicadas") for m in resultado["metadatas"][0]]
+    assert any(linaje == [ids[10]] for linaje in linajes)
+    
+    # Y la ingesta posterior sigue deduplicando contra las huellas importadas
+    repetida = dict(corpus(1)[0], respuesta_ia=corpus(20)[0]["respuesta_ia"])
+    repetida["custodio_invocado"] = corpus(20)[0]["custodio_invocado"]
+    destino.registrar_interacciones_lote([repetida])
+    assert destino.estadisticas()["deduplicacion"]["referencias"] > stats_origen["referencias"]
+
+
+def test_busqueda_federada_une_linaje(crear_core, corpus):
+    core = crear_core(deduplicar=True)
+    interacciones = _con_respuestas_repetidas(corpus(4))
+    ids = core.registrar_interacciones_lote(interacciones)
+    
+    resultado = core.busqueda_federada(
+        interacciones[0]["respuesta_ia"], colecciones=["interactions"], n_results=10
+    )
+    linajes = {
+        r["metadata"]["interaction_id"]: r["metadata"].get("interacciones_duplicadas")
+        for r in resultado["resultados"] if r["metadata"]["rol"] == "Motor_IA"
+    }
+    assert linajes[ids[0]] == [ids[2]]
+
+
+def test_busqueda_lexica_encuentra_texto_de_copias_similares(crear_core, corpus):
+    core = crear_core(deduplicar=True, tokens_chunk_interaccion=2000)
+    interacciones = corpus(2)
+    palabras = " ".join(corpus(12)[i]["respuesta_ia"] for i in range(12)).split()[:120]
+    interacciones[0]["respuesta_ia"] = " ".join(palabras)
+    palabras[60] = "zanahoriazul"
+    interacciones[1]["respuesta_ia"] = " ".join(palabras)
+    interacciones[1]["custodio_invocado"] = interacciones[0]["custodio_invocado"]
+    ids = core.registrar_interacciones_lote(interacciones)
+    assert core.estadisticas()["deduplicacion"]["similares"] == 1
+    
+    resultado = core.buscar_contexto_reciente("zanahoriazul", n_results=5, modo="lexico")
+    assert len(resultado["ids"][0]) == 1
+    metadata = resultado["metadatas"][0][0]
+    assert metadata["interaction_id"] == ids[0]
+    assert metadata["interacciones_duplicadas"] == [ids[1]]
+    
+    # La reconstrucción del índice conserva el texto de la copia
+    core.reconstruir_indice_lexico()
+    resultado = core.buscar_contexto_reciente("zanahoriazul", n_results=5, modo="lexico")
+    assert [m["interaction_id"] for m in resultado["metadatas"][0]] == [ids[0]]
+
+
+def test_filtros_encuentran_chunks_deduplicados(crear_core):
+    from wabun_queries import WabunQueries
+    
+    core = crear_core(deduplicar=True, tokens_chunk_interaccion=2000)
+    respuesta = "El protocolo de custodia exige revisar cada decreto antes de la fase de equilibrio."
+    ids = [
+        core.registrar_interaccion(
+            f"Pregunta del Fundador sobre {proyecto}", respuesta, "LIANG", "claude",
+            proyecto_asociado=proyecto
+        )
+        for proyecto in ("ALFA", "BETA")
+    ]
+    assert core.estadisticas()["deduplicacion"]["exactos"] == 1
+    
+    filtros = {"proyecto_asociado": "BETA"}
+    for modo in ("vectorial", "lexico", "hibrido"):
+        resultado = core.buscar_contexto_reciente(respuesta, 5, filtros, modo=modo)
+        respuestas = [
+            (documento, metadata["interaction_id"])
+            for documento, metadata in zip(resultado["documents"][0], resultado["metadatas"][0])
+            if metadata["rol"] == "Motor_IA"
+        ]
+        assert respuestas == [(respuesta, ids[1])], modo
+    
+    # Sin consulta se recorre la colección y también las referencias
+    resultado = core.buscar_contexto_reciente("", 5, filtros)
+    assert respuesta in resultado["documents"][0]
+    # Los filtros que sí cumple el canónico no repiten su texto
+    resultado = core.buscar_contexto_reciente(respuesta, 5, {"custodio_invocado": "LIANG"})
+    assert resultado["documents"][0].count(respuesta) == 1
+    
+    with WabunQueries(core) as queries:
+        assert respuesta in queries.recuperar_contexto_para_motor("LIANG", proyecto="BETA")
@@ -0,0 +1,60 @@
+"""Pruebas de la caché de embeddings (wabun_embeddings)"""
+
+import warnings
+
+import numpy as np
+
+from wabun_bench.embeddings import EmbeddingHashing
+from wabun_embeddings import EmbeddingCache
+
+
+class _EmbeddingContado(EmbeddingHashing):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.textos = []
+    
+    def __call__(self, input):
+        self.textos.extend(input)
+        return super().__call__(input)
+
+
+def test_cache_evita_reembeber_y_cuenta_por_texto(tmp_path):
+    modelo = _EmbeddingContado()
+    cache = EmbeddingCache(modelo, ruta_disco=str(tmp_path / "cache.sqlite3"))
+    
+    primeros = cache(["alfa", "beta", "alfa"])
+    assert modelo.textos == ["alfa", "beta"]
+    assert cache.estadisticas()["misses"] == 3
+    segundos = cache(["beta", "alfa", "gamma"])
+    assert modelo.textos == ["alfa", "beta", "gamma"]
+    assert np.allclose(segundos[1], primeros[0])
+    estadisticas = cache.estadisticas()
+    assert estadisticas["hits_memoria"] == 2
+    assert estadisticas["hits_memoria"] + estadisticas["hits_disco"] + estadisticas["misses"] == 6
+    cache.cerrar()
+    
+    # El nivel en disco sobrevive a un reinicio
+    modelo = _EmbeddingContado()
+    cache = EmbeddingCache(modelo, ruta_disco=str(tmp_path / "cache.sqlite3"))
+    cache(["alfa", "gamma"])
+    assert modelo.textos == []
+    assert cache.estadisticas()["hits_disco"] == 2
+    cache.cerrar()
+
+
+def test_cache_declara_la_funcion_envuelta_a_chromadb(crear_core):
+    modelo = EmbeddingHashing(dimension=64)
+    cache = EmbeddingCache(modelo)
+    assert not cache.is_legacy()
+    assert cache.name() == type(cache).name() == modelo.name()
+    assert cache.get_config() == modelo.get_config()
+    assert isinstance(type(cache).build_from_config(cache.get_config()), EmbeddingHashing)
+    
+    # Las colecciones se crean sin configuración legada y se reabren sin
+    # conflicto aunque ya no se use la caché
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        core = crear_core(embedding_function=modelo)
+        core.registrar_interaccion("Prompt", "Respuesta", "LIANG", "claude")
+        reabierto = crear_core(embedding_function=modelo, cache_embeddings=False)
+        assert reabierto.interactions.count() == core.interactions.count() > 0
@@ -0,0 +1,73 @@
+"""Pruebas de la exportación e importación en flujo de la memoria"""
+
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+
+def _contenido(core, nombre):
+    pagina = core._resolver_coleccion(nombre).get(include=["documents", "metadatas", "embeddings"])
+    return {
+        chunk_id: (documento, metadata, np.asarray(embedding))
+        for chunk_id, documento, metadata, embedding in zip(
+            pagina["ids"], pagina["documents"], pagina["metadatas"], pagina["embeddings"]
+        )
+    }
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".jsonl.gz"])
+def test_exportar_importar_conserva_las_colecciones(crear_core, corpus, tmp_path, extension):
+    origen = crear_core("origen")
+    origen.registrar_interacciones_lote(corpus(12))
+    origen.registrar_decreto(
+        titulo_documento="Decreto de prueba",
+        contenido="Artículo uno.\n\nArtículo dos.",
+        decreto_id="decreto_prueba",
+        custodios_implicados=["LIANG"]
+    )
+    origen.registrar_acta("ciclo_prueba", "Resumen del ciclo", logros=["Uno"], lecciones=["Dos"])
+    
+    archivo = tmp_path / f"memoria{extension}"
+    exportados = origen.exportar_memoria(str(archivo), tamano_pagina=5)
+    assert exportados["interactions"] == origen.interactions.count()
+    
+    destino = crear_core("destino")
+    importados = destino.importar_memoria(str(archivo), batch_size=7)
+    assert importados == exportados
+    
+    for nombre in ("interactions", "decretos", "actas"):
+        esperado = _contenido(origen, nombre)
+        obtenido = _contenido(destino, nombre)
+        assert obtenido.keys() == esperado.keys()
+        for chunk_id, (documento, metadata, embedding) in esperado.items():
+            assert obtenido[chunk_id][0] == documento
+            assert obtenido[chunk_id][1] == metadata
+            np.testing.assert_allclose(obtenido[chunk_id][2], embedding, rtol=1e-6)
+    
+    # Las cabeceras de las interacciones viajan con sus chunks
+    assert destino.estadisticas()["total_cabeceras"] == origen.estadisticas()["total_cabeceras"]
+    
+    # Importar dos veces no duplica registros
+    destino.importar_memoria(str(archivo))
+    assert destino.interactions.count() == origen.interactions.count()
+
+
+def test_exportacion_escribe_un_registro_por_linea(crear_core, corpus, tmp_path):
+    origen = crear_core("origen")
+    origen.registrar_interacciones_lote(corpus(6))
+    
+    # La compresión explícita manda sobre la extensión
+    archivo = tmp_path / "memoria.dat"
+    conteos = origen.exportar_memoria(str(archivo), compresion="gzip", tamano_pagina=2)
+    with gzip.open(archivo, "rt", encoding="utf-8") as f:
+        lineas = [json.loads(linea) for linea in f]
+    
+    assert lineas[0]["tipo"] == "cabecera"
+    registros = [linea for linea in lineas if linea["tipo"] == "registro"]
+    assert len(registros) == sum(conteos.values())
+    assert all(registro["embedding"] for registro in registros)
+    
+    destino = crear_core("destino")
+    assert destino.importar_memoria(str(archivo), compresion="gzip") == conteos
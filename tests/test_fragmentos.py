@@ -0,0 +1,94 @@
+"""Pruebas de la fragmentación por tokens (wabun_fragmentos y wabun_tokens)"""
+
+from wabun_fragmentos import Fragmentador
+from wabun_tokens import ContadorTokens
+
+
+class _ContadorInstrumentado(ContadorTokens):
+    """Cuenta cuántas veces se tokeniza cada texto"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tokenizados = []
+    
+    def _piezas(self, texto):
+        self.tokenizados.append(texto)
+        return super()._piezas(texto)
+    
+    def contar(self, texto):
+        self.tokenizados.append(texto)
+        return super().contar(texto)
+
+
+def _texto():
+    frase_larga = " ".join(f"palabra{i}" for i in range(300)) + "."
+    frases = " ".join(f"Frase número {i} del párrafo largo." for i in range(40))
+    return "\n\n".join(["Párrafo corto inicial.", frases, frase_larga, "Cierre."])
+
+
+def test_ningun_chunk_supera_el_maximo():
+    contador = ContadorTokens()
+    texto = _texto()
+    chunks = list(Fragmentador(contador, max_tokens=50).fragmentar(texto))
+    assert len(chunks) > 5
+    assert all(contador.contar(chunk) <= 50 for chunk in chunks)
+    # Los chunks cubren el texto en orden
+    assert "".join(chunks).replace(" ", "").replace("\n", "") == texto.replace(" ", "").replace("\n", "")
+
+
+def test_cada_parrafo_se_tokeniza_una_vez():
+    contador = _ContadorInstrumentado()
+    texto = _texto()
+    list(Fragmentador(contador, max_tokens=50).tramos(texto))
+    parrafos = [p.strip() for p in texto.split("\n\n")]
+    assert sorted(contador.tokenizados) == sorted(parrafos)
+
+
+def test_tokenizador_del_modelo(tmp_path):
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+    
+    vocabulario = {"[UNK]": 0, "hola": 1, "mundo": 2, ".": 3}
+    tokenizer = Tokenizer(WordLevel(vocabulario, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    carpeta = tmp_path / "modelo"
+    carpeta.mkdir()
+    tokenizer.save(str(carpeta / "tokenizer.json"))
+    
+    class ModeloONNX:
+        DOWNLOAD_PATH = str(tmp_path)
+        EXTRACTED_FOLDER_NAME = "modelo"
+    
+    contador = ContadorTokens.del_modelo(ModeloONNX())
+    assert contador.metodo == "tokenizer"
+    assert contador.contar("hola mundo. hola desconocido") == 5
+    assert contador.fines("hola mundo.") == [4, 10, 11]
+    
+    # Sin descarga del modelo no se descarga nada: se aproxima
+    ModeloONNX.EXTRACTED_FOLDER_NAME = "ausente"
+    assert ContadorTokens.del_modelo(ModeloONNX()).metodo == "aproximado"
+    assert ContadorTokens().metodo == "aproximado"
+
+
+def test_tokenizer_guardado_sin_truncado_ni_relleno(tmp_path):
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    
+    palabras = [f"palabra{i}" for i in range(30)]
+    tokenizer = Tokenizer(models.WordLevel({"[UNK]": 0, "[PAD]": 1, "hola": 2, **{
+        palabra: i + 3 for i, palabra in enumerate(palabras)
+    }}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.enable_truncation(8)
+    tokenizer.enable_padding(length=8, pad_id=1, pad_token="[PAD]")
+    ruta = tmp_path / "tokenizer.json"
+    tokenizer.save(str(ruta))
+    
+    contador = ContadorTokens(ruta_tokenizer=str(ruta))
+    assert contador.metodo == "tokenizer"
+    assert contador.contar("hola") == 1
+    texto = " ".join(palabras)
+    assert contador.contar(texto) == 30
+    chunks = list(Fragmentador(contador, max_tokens=5).fragmentar(texto))
+    assert len(chunks) == 6
+    assert all(contador.contar(chunk) <= 5 for chunk in chunks)
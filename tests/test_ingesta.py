@@ -0,0 +1,80 @@
+"""Pruebas de la ingesta por lotes de interacciones y decretos"""
+
+import pytest
+
+
+def test_lote_escribe_los_mismos_chunks_que_la_ingesta_individual(crear_core, corpus):
+    interacciones = corpus(25)
+    
+    individual = crear_core("individual")
+    for interaccion in interacciones:
+        individual.registrar_interaccion(**interaccion)
+    
+    lote = crear_core("lote")
+    ids = lote.registrar_interacciones_lote(interacciones, batch_size=7, max_chunks_por_add=11)
+    
+    assert len(ids) == len(set(ids)) == len(interacciones)
+    assert lote.metricas_ultimo_lote["documentos"] == len(interacciones)
+    assert lote.metricas_ultimo_lote["chunks"] == individual.interactions.count()
+    assert lote.interactions.count() == individual.interactions.count()
+    assert lote.metricas_ultimo_lote["chunks_por_segundo"] > 0
+    # Cada interacción conserva sus chunks (prompt y respuesta)
+    roles = lote.obtener_por_filtro(lote.interactions, {"interaction_id": ids[3]})
+    assert {m["rol"] for m in roles["metadatas"]} == {"Fundador", "Motor_IA"}
+
+
+def test_lote_con_reemplazar_no_duplica(crear_core, corpus):
+    core = crear_core()
+    interacciones = corpus(10)
+    ids = core.registrar_interacciones_lote(interacciones)
+    total = core.interactions.count()
+    
+    repetidas = [dict(interaccion, interaction_id=i) for interaccion, i in zip(interacciones, ids)]
+    assert core.registrar_interacciones_lote(repetidas, reemplazar=True) == ids
+    assert core.interactions.count() == total
+
+
+def test_lote_de_decretos(crear_core):
+    core = crear_core()
+    decretos = [
+        {
+            "titulo_documento": f"Decreto {i}",
+            "contenido": "\n\n".join(f"Artículo {j} del decreto {i}." for j in range(3)),
+            "decreto_id": f"decreto_{i}",
+            "custodios_implicados": ["LIANG"]
+        }
+        for i in range(5)
+    ]
+    assert core.registrar_decretos_lote(decretos, batch_size=2) == [d["decreto_id"] for d in decretos]
+    assert core.metricas_ultimo_lote["documentos"] == 5
+    assert core.decretos.count() == core.metricas_ultimo_lote["chunks"]
+
+
+def test_filtros_por_campos_de_cabecera(crear_core, corpus):
+    core = crear_core()
+    interacciones = corpus(20)
+    ids = core.registrar_interacciones_lote(interacciones)
+    
+    def interacciones_de(resultado):
+        return {m["interaction_id"] for m in resultado["metadatas"][0]}
+    
+    motor = interacciones[0]["motor_ia_usado"]
+    esperadas = {i for i, x in zip(ids, interacciones) if x["motor_ia_usado"] == motor}
+    filtros = {"motor_ia_usado": motor}
+    assert interacciones_de(core.buscar_contexto_reciente("", 100, filtros)) == esperadas
+    encontradas = interacciones_de(core.buscar_contexto_reciente("decreto", 100, filtros))
+    assert encontradas and encontradas <= esperadas
+    
+    # Combinados con campos de los chunks y con operadores
+    filtros = {"motor_ia_usado": {"$ne": motor}, "rol": "Fundador"}
+    resultado = core.obtener_por_filtro(core.interactions, filtros)
+    assert {m["interaction_id"] for m in resultado["metadatas"]} == set(ids) - esperadas
+    palabra = interacciones[1]["palabras_clave"][0]
+    esperadas = {i for i, x in zip(ids, interacciones) if palabra in x["palabras_clave"]}
+    resultado = core.obtener_por_filtro(core.interactions, {"palabras_clave": palabra})
+    assert {m["interaction_id"] for m in resultado["metadatas"]} == esperadas
+    
+    # Sin interacciones que cumplan el filtro, el resultado está vacío
+    assert core.buscar_contexto_reciente("decreto", 5, {"motor_ia_usado": "inexistente"})["ids"] == [[]]
+    with pytest.raises(ValueError):
+        core.buscar_contexto_reciente("decreto", 5, {"$or": [{"motor_ia_usado": motor}, {"rol": "Fundador"}]})
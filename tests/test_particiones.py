@@ -0,0 +1,53 @@
+"""Pruebas del particionado de interacciones (poda, cierre y compactación)"""
+
+import numpy as np
+import pytest
+
+
+def test_particionado_da_los_mismos_resultados(crear_core, corpus):
+    # 12 ciclos de 72h desde el 1 de enero: enero y febrero
+    interacciones = corpus(60, interacciones_por_ciclo=5)
+    simple = crear_core("simple")
+    particionado = crear_core("particionado", particiones="mes")
+    for core in (simple, particionado):
+        core.registrar_interacciones_lote(interacciones)
+    
+    assert [p["nombre"] for p in particionado.describir_particiones()] == [
+        "interactions_2025_01", "interactions_2025_02"
+    ]
+    assert particionado.interactions.count() == simple.interactions.count()
+    
+    esperado = simple.buscar_contexto_reciente("decisión del ciclo", n_results=8)
+    obtenido = particionado.buscar_contexto_reciente("decisión del ciclo", n_results=8)
+    assert obtenido["documents"] == esperado["documents"]
+    np.testing.assert_allclose(obtenido["distances"], esperado["distances"], rtol=1e-5)
+    
+    # Un filtro por fecha solo abre las particiones de su rango
+    febrero = {"timestamp_utc": {"$gte": interacciones[-1]["timestamp_utc"]}}
+    assert [c.name for c in particionado.interactions.particiones(febrero)] == ["interactions_2025_02"]
+    assert sorted(particionado.obtener_por_filtro("interactions", febrero)["documents"]) == sorted(
+        simple.obtener_por_filtro("interactions", febrero)["documents"]
+    )
+
+
+def test_cerrar_y_compactar_particiones(crear_core, corpus):
+    core = crear_core(particiones="ciclo")
+    interacciones = corpus(12, interacciones_por_ciclo=4)
+    core.registrar_interacciones_lote(interacciones)
+    antigua = core.describir_particiones()[0]["nombre"]
+    
+    resultado = core.cerrar_particiones(conservar_abiertas=1)
+    assert antigua in resultado["cerradas"]
+    assert resultado["compactadas"] == {}
+    
+    # Una partición cerrada no admite chunks nuevos, pero sí borrados
+    with pytest.raises(ValueError, match="solo lectura"):
+        core.registrar_interaccion(**dict(interacciones[0], interaction_id="nueva"))
+    borrados = core.interactions.particiones()[0].get(limit=2, include=[])["ids"]
+    core.interactions.delete(ids=borrados)
+    
+    resultado = core.cerrar_particiones(conservar_abiertas=1)
+    particion = core.describir_particiones()[0]
+    assert particion["nombre"] == antigua
+    assert resultado["compactadas"] == {antigua: particion["chunks"]}
+    assert particion["borrados"] == 0 and particion["solo_lectura"]
@@ -0,0 +1,79 @@
+"""Pruebas del contexto para motores de IA (wabun_queries)"""
+
+import pytest
+
+from wabun_queries import WabunQueries
+
+
+def _espiar(core):
+    """Registra las sub-consultas que llegan al núcleo"""
+    llamadas = []
+    for nombre in ("buscar_en_decretos", "buscar_contexto_reciente"):
+        original = getattr(core, nombre)
+        
+        def espia(*args, _original=original, _nombre=nombre, **kwargs):
+            llamadas.append(_nombre)
+            return _original(*args, **kwargs)
+        setattr(core, nombre, espia)
+    return llamadas
+
+
+def test_contexto_con_presupuesto_consulta_todas_las_secciones(crear_core, corpus):
+    core = crear_core()
+    core.registrar_interacciones_lote(corpus(10))
+    llamadas = _espiar(core)
+    with WabunQueries(core) as queries:
+        contexto = queries.recuperar_contexto_para_motor("LIANG", proyecto="WABUN_Digital", max_tokens_aprox=2000)
+        informe = queries.ultimo_informe_contexto
+    assert "## PROTOCOLO DE LIANG" in contexto
+    assert sorted(llamadas) == ["buscar_contexto_reciente", "buscar_contexto_reciente", "buscar_en_decretos"]
+    assert set(informe["latencias_ms"]) == {"protocolo", "recientes", "decisiones"}
+    assert informe["tokens_totales"] <= 2000
+
+
+def test_contexto_sin_presupuesto_no_consulta_secciones(crear_core):
+    core = crear_core()
+    llamadas = _espiar(core)
+    with WabunQueries(core) as queries:
+        contexto = queries.recuperar_contexto_para_motor("LIANG", proyecto="WABUN_Digital", max_tokens_aprox=30)
+    assert "## PROTOCOLO" not in contexto
+    assert llamadas == []
+
+
+def test_cerrar_libera_el_pool(crear_core):
+    queries = WabunQueries(crear_core())
+    queries.cerrar()
+    with pytest.raises(RuntimeError):
+        queries._executor.submit(lambda: None)
+
+
+def test_fecha_e_importancia_devuelven_el_conjunto_completo(crear_core, corpus):
+    from datetime import datetime, timezone
+    
+    core = crear_core()
+    interacciones = corpus(90)
+    core.registrar_interacciones_lote(interacciones)
+    
+    with WabunQueries(core) as queries:
+        inicio = datetime.fromtimestamp(interacciones[0]["timestamp_utc"], timezone.utc)
+        resultado = queries.buscar_por_fecha(inicio)
+        assert len(resultado["ids"][0]) == core.interactions.count() > 50
+        instantes = [m["timestamp_utc"] for m in resultado["metadatas"][0]]
+        assert instantes == sorted(instantes, reverse=True)
+        
+        resultado = queries.buscar_por_importancia(4)
+        importantes = core.obtener_por_filtro(core.interactions, {"importancia": {"$gte": 4}}, include=[])
+        assert sorted(resultado["ids"][0]) == sorted(importantes["ids"])
+        assert len(resultado["ids"][0]) > 30
+        assert resultado["distances"] is None
+
+
+def test_contexto_sin_proyecto_usa_todo_el_presupuesto(crear_core, corpus):
+    core = crear_core()
+    core.registrar_interacciones_lote(corpus(30))
+    with WabunQueries(core) as queries:
+        queries.recuperar_contexto_para_motor("LIANG", max_tokens_aprox=300)
+        informe = queries.ultimo_informe_contexto
+    # La última sección presente ("recientes") recibe lo que queda
+    assert set(informe["tokens_por_seccion"]) == {"protocolo", "recientes"}
+    assert 0.9 * 300 <= informe["tokens_totales"] <= 300
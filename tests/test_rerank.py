@@ -0,0 +1,58 @@
+"""Pruebas del reordenamiento por relevancia, recencia, importancia y diversidad"""
+
+import numpy as np
+import pytest
+
+from wabun_rerank import reordenar
+
+AHORA = 1_750_000_000
+DIA = 86400
+
+SOLO_RELEVANCIA = {"recencia": 0.0, "importancia": 0.0, "diversidad": 0.0}
+
+
+def test_cada_senal_cambia_el_orden():
+    # El candidato 0 es el más cercano; el 1, reciente e importante
+    distancias = [0.2, 0.4, 0.5]
+    metadatas = [
+        {"timestamp_utc": AHORA - 200 * DIA, "importancia": 1},
+        {"timestamp_utc": AHORA, "importancia": 5},
+        {"timestamp_utc": AHORA - 200 * DIA, "importancia": 1}
+    ]
+    embeddings = np.eye(3, dtype=np.float32)
+    
+    orden, _, _ = reordenar(distancias, metadatas, embeddings, 3, SOLO_RELEVANCIA, ahora=AHORA)
+    assert list(orden) == [0, 1, 2]
+    for senal in ("recencia", "importancia"):
+        orden, _, componentes = reordenar(
+            distancias, metadatas, embeddings, 3, {**SOLO_RELEVANCIA, senal: 1.0}, ahora=AHORA
+        )
+        assert list(orden) == [1, 0, 2]
+        assert componentes[senal][0] == pytest.approx(1.0, abs=1e-3)
+    
+    # La diversidad evita elegir un duplicado del primer resultado
+    duplicados = np.array([[1, 0], [1, 0], [0, 1]], dtype=np.float32)
+    pesos = {**SOLO_RELEVANCIA, "diversidad": 1.0}
+    orden, _, componentes = reordenar(distancias, metadatas, duplicados, 2, pesos, ahora=AHORA)
+    assert list(orden) == [0, 2]
+    assert list(componentes["redundancia"]) == [0.0, 0.0]
+    
+    with pytest.raises(ValueError):
+        reordenar(distancias, metadatas, embeddings, 3, {"novedad": 1.0})
+
+
+def test_priorizado_sin_senales_extra_equivale_a_la_vectorial(crear_core, corpus):
+    core = crear_core()
+    core.registrar_interacciones_lote(corpus(30))
+    
+    vectorial = core.buscar_contexto_reciente("decisión del ciclo", n_results=6)
+    priorizado = core.buscar_contexto_priorizado("decisión del ciclo", n_results=6, pesos=SOLO_RELEVANCIA)
+    assert priorizado["ids"] == vectorial["ids"]
+    
+    completo = core.buscar_contexto_priorizado("decisión del ciclo", n_results=6)
+    assert len(completo["ids"][0]) == 6
+    assert set(completo["componentes"][0][0]) == {"relevancia", "recencia", "importancia", "redundancia"}
+    assert completo["puntuaciones"][0] == sorted(completo["puntuaciones"][0], reverse=True)
+    
+    with pytest.raises(ValueError):
+        core.buscar_contexto_priorizado("  ")
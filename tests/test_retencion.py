@@ -0,0 +1,42 @@
+"""Pruebas de la política de retención (actas de compactación y archivo frío)"""
+
+from wabun_retencion import IMPORTANCIA_PROTEGIDA, WabunRetencion
+
+
+def test_compactar_archiva_resume_y_protege_decisiones(crear_core, corpus):
+    core = crear_core()
+    core.registrar_interacciones_lote(corpus(40, interacciones_por_ciclo=5))
+    cabeceras_antes = core.cabeceras.obtener({
+        metadata["interaction_id"]
+        for metadata in core.obtener_por_filtro("interactions", include=["metadatas"])["metadatas"]
+    })
+    retencion = WabunRetencion(core, ciclos_vivos=2)
+    
+    simulado = retencion.compactar(simular=True)
+    assert simulado["interacciones"] > 0
+    assert core.cabeceras.contar() == len(cabeceras_antes)
+    
+    informe = retencion.compactar()
+    assert informe["interacciones"] == simulado["interacciones"]
+    assert core.cabeceras.contar() == len(cabeceras_antes) - informe["interacciones"]
+    actas = core.obtener_por_filtro("actas", {"tipo_acta": "compactacion"}, include=["metadatas"])
+    assert {metadata["acta_id"] for metadata in actas["metadatas"]} == {
+        ciclo["acta_id"] for ciclo in informe["ciclos"].values()
+    }
+    
+    # Los ciclos vivos y las decisiones protegidas siguen en la memoria viva
+    recientes = {ciclo_id for ciclo_id, _ in core.cabeceras.ciclos()[:2]}
+    restantes = core.cabeceras.obtener(cabeceras_antes)
+    for interaction_id, cabecera in cabeceras_antes.items():
+        if (
+            cabecera["ciclo_id"] in recientes
+            or cabecera["estado_decision"] == "Validada"
+            or cabecera["importancia"] >= IMPORTANCIA_PROTEGIDA
+        ):
+            assert interaction_id in restantes
+    
+    # El archivo frío se restaura sin re-embeber
+    restaurado = crear_core("restaurado")
+    for ciclo in informe["ciclos"].values():
+        restaurado.importar_memoria(ciclo["archivo"])
+    assert restaurado.interactions.count() == informe["chunks"]
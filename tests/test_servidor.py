@@ -0,0 +1,90 @@
+"""Pruebas del servidor local de WABUN (token, cabeceras y métodos con rutas)"""
+
+import http.client
+import json
+import os
+import stat
+
+import pytest
+
+from wabun_cliente import ARCHIVO_TOKEN, ClienteWabun, ErrorRemotoWabun
+from wabun_servidor import ServidorWabun
+
+
+@pytest.fixture
+def servidor(crear_core):
+    core = crear_core()
+    with ServidorWabun(wabun_core=core, puerto=0, precargar=False) as servidor:
+        servidor.iniciar()
+        yield servidor
+
+
+def _peticion(servidor, cabeceras, cuerpo=b'{"llamadas": []}'):
+    conexion = http.client.HTTPConnection("127.0.0.1", servidor._http.server_address[1], timeout=10)
+    try:
+        conexion.request("POST", "/llamadas", body=cuerpo, headers=cabeceras)
+        respuesta = conexion.getresponse()
+        return respuesta.status, json.loads(respuesta.read())
+    finally:
+        conexion.close()
+
+
+def test_token_en_archivo_privado(servidor):
+    ruta = servidor.archivo_token
+    assert ruta.name == ARCHIVO_TOKEN
+    assert stat.S_IMODE(os.stat(ruta).st_mode) == 0o600
+    assert ruta.read_text(encoding="utf-8").strip() == servidor.token
+
+
+def test_cliente_con_token(servidor):
+    with ClienteWabun(servidor.direccion, persist_directory=str(servidor.wabun.persist_directory)) as cliente:
+        assert cliente.salud()["estado"] == "ok"
+        assert cliente.core.estadisticas()["total_interacciones"] == 0
+    with ClienteWabun(servidor.direccion) as cliente:
+        with pytest.raises(ErrorRemotoWabun, match="HTTP 401"):
+            cliente.salud()
+
+
+def test_rechaza_peticiones_sin_token_tipo_o_host_local(servidor):
+    validas = {"Authorization": f"Bearer {servidor.token}", "Content-Type": "application/json"}
+    assert _peticion(servidor, validas)[0] == 200
+    assert _peticion(servidor, {**validas, "Authorization": "Bearer otro"})[0] == 401
+    assert _peticion(servidor, {**validas, "Content-Type": "text/plain"})[0] == 415
+    assert _peticion(servidor, {**validas, "Host": "wabun.example.com"})[0] == 403
+
+
+def test_metodos_con_rutas_requieren_permiso(servidor, tmp_path):
+    with ClienteWabun(servidor.direccion, token=servidor.token) as cliente:
+        with pytest.raises(PermissionError):
+            cliente.core.exportar_memoria(str(tmp_path / "memoria.jsonl"))
+        servidor.permitir_rutas = True
+        assert "interactions" in cliente.core.exportar_memoria(str(tmp_path / "memoria.jsonl"))
+
+
+def test_metodos_de_ciclo_de_vida_no_son_remotos(servidor):
+    with ClienteWabun(servidor.direccion, token=servidor.token) as cliente:
+        for objetivo in (cliente.core, cliente.queries):
+            for metodo in ("cerrar", "warmup"):
+                with pytest.raises(AttributeError):
+                    getattr(objetivo, metodo)()
+        # El servidor sigue atendiendo consultas
+        assert cliente.queries.buscar_decisiones_pendientes() == []
+
+
+def test_detener_cierra_el_nucleo_propio(tmp_path):
+    import sqlite3
+    
+    from wabun_bench.embeddings import EmbeddingHashing
+    
+    servidor = ServidorWabun(
+        puerto=0, precargar=False, persist_directory=str(tmp_path / "db"),
+        embedding_function=EmbeddingHashing(), backend="numpy", particiones="mes"
+    )
+    core = servidor.wabun
+    pool_particiones = core.interactions._executor
+    servidor.detener()
+    for pool in (core._executor_busquedas, pool_particiones, servidor.queries._executor):
+        with pytest.raises(RuntimeError):
+            pool.submit(lambda: None)
+    with pytest.raises(sqlite3.ProgrammingError):
+        core.cabeceras.contar()
@@ -0,0 +1,36 @@
+"""Pruebas de los snapshots inmutables para workers de consulta (wabun_snapshots)"""
+
+import sqlite3
+
+import pytest
+
+
+def test_lector_refresca_y_cierra_generaciones_retiradas(crear_core, corpus):
+    escritor = crear_core()
+    interacciones = corpus(30)
+    escritor.registrar_interacciones_lote(interacciones[:10])
+    escritor.crear_snapshot()
+    
+    lector = crear_core(solo_lectura=True)
+    assert lector.interactions.count() == escritor.interactions.count()
+    assert lector.buscar_contexto_reciente(interacciones[0]["prompt_fundador"], 3)["ids"][0]
+    assert not lector.refrescar_snapshot()
+    with pytest.raises(ValueError):
+        lector.registrar_interaccion("Prompt", "Respuesta", "LIANG", "claude")
+    
+    generaciones = [lector.cabeceras]
+    for inicio in (10, 20):
+        escritor.registrar_interacciones_lote(interacciones[inicio:inicio + 10])
+        escritor.crear_snapshot()
+        assert lector.refrescar_snapshot()
+        assert lector.interactions.count() == escritor.interactions.count()
+        generaciones.append(lector.cabeceras)
+    
+    # La generación anterior sigue abierta para las consultas en curso; la
+    # de dos refrescos atrás ya está cerrada
+    with pytest.raises(sqlite3.ProgrammingError):
+        generaciones[0].contar()
+    assert generaciones[1].contar() == 20
+    lector.cerrar()
+    with pytest.raises(sqlite3.ProgrammingError):
+        generaciones[1].contar()
@@ -0,0 +1,110 @@
+"""Pruebas del backend vectorial NumPy frente a ChromaDB (wabun_vectores)"""
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.config import Settings
+
+from wabun_vectores import ClienteNumpy
+
+FILTROS = [
+    {"custodio": "LIANG"},
+    {"custodio": {"$ne": "LIANG"}},
+    {"importancia": {"$gte": 4}},
+    {"importancia": {"$lt": 2}},
+    {"peso": {"$gt": 0.5}},
+    {"custodio": {"$in": ["ARESK", "HECATE"]}},
+    {"custodio": {"$nin": ["ARESK", "HECATE"]}},
+    {"$and": [{"custodio": "LIANG"}, {"importancia": {"$lte": 3}}]},
+    {"$or": [{"custodio": "ARESK"}, {"validada": True}]},
+    {"$and": [
+        {"$or": [{"importancia": 5}, {"importancia": 1}]},
+        {"proyecto": {"$ne": "WABUN_Digital"}}
+    ]},
+    {"proyecto": "WABUN_Digital"},
+    {"proyecto": {"$nin": ["WABUN_Digital"]}}
+]
+
+
+@pytest.fixture(scope="module")
+def colecciones(tmp_path_factory):
+    rng = np.random.default_rng(1207)
+    n = 200
+    ids = [f"chunk_{i}" for i in range(n)]
+    embeddings = rng.normal(size=(n, 16)).astype(np.float32)
+    metadatas = []
+    for i in range(n):
+        metadata = {
+            "custodio": ["LIANG", "ARESK", "HECATE", "WABUN"][i % 4],
+            "importancia": int(rng.integers(1, 6)),
+            "peso": float(rng.random()),
+            "validada": bool(i % 3 == 0)
+        }
+        if i % 5:
+            # Campo ausente en algunos chunks
+            metadata["proyecto"] = ["WABUN_Digital", "CAELION"][i % 2]
+        metadatas.append(metadata)
+    documentos = [f"Documento {i}" for i in range(n)]
+    
+    ruta = tmp_path_factory.mktemp("vectores")
+    chroma = chromadb.PersistentClient(path=str(ruta / "chroma"), settings=Settings(anonymized_telemetry=False))
+    numpy_ = ClienteNumpy(str(ruta / "numpy"), cuantizacion="float16")
+    resultado = []
+    for cliente in (chroma, numpy_):
+        coleccion = cliente.create_collection("prueba", embedding_function=None)
+        coleccion.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documentos)
+        resultado.append(coleccion)
+    return resultado, embeddings
+
+
+@pytest.mark.parametrize("where", FILTROS, ids=[str(i) for i in range(len(FILTROS))])
+def test_get_con_filtro_coincide_con_chroma(colecciones, where):
+    (chroma, numpy_), _ = colecciones
+    esperados = set(chroma.get(where=where, include=[])["ids"])
+    assert esperados, "el filtro debería seleccionar algún chunk"
+    assert set(numpy_.get(where=where, include=[])["ids"]) == esperados
+
+
+@pytest.mark.parametrize("where", FILTROS, ids=[str(i) for i in range(len(FILTROS))])
+def test_query_con_filtro_coincide_con_chroma(colecciones, where):
+    (chroma, numpy_), embeddings = colecciones
+    consulta = embeddings[:3] + 0.1
+    esperados = chroma.query(query_embeddings=consulta, n_results=5, where=where, include=["distances"])
+    obtenidos = numpy_.query(query_embeddings=consulta, n_results=5, where=where, include=["distances"])
+    for ids_chroma, ids_numpy, distancias_chroma, distancias_numpy in zip(
+        esperados["ids"], obtenidos["ids"], esperados["distances"], obtenidos["distances"]
+    ):
+        # Con tan pocos vectores HNSW es exacto: mismos vecinos y distancias
+        assert set(ids_numpy) == set(ids_chroma)
+        np.testing.assert_allclose(sorted(distancias_numpy), sorted(distancias_chroma), rtol=1e-2, atol=1e-3)
+
+
+def test_int8_con_reescalado_compacta_y_persiste(tmp_path):
+    rng = np.random.default_rng(72)
+    embeddings = rng.normal(size=(300, 32)).astype(np.float32)
+    ids = [f"chunk_{i}" for i in range(len(embeddings))]
+    consultas = embeddings[:5] + rng.normal(scale=0.1, size=(5, 32)).astype(np.float32)
+    
+    def exactos(vivos):
+        distancias = ((consultas[:, None, :] - embeddings[None, vivos, :]) ** 2).sum(axis=2)
+        return [[ids[vivos[j]] for j in np.argsort(fila)[:10]] for fila in distancias]
+    
+    cliente = ClienteNumpy(str(tmp_path), cuantizacion="int8", reescalar=True)
+    coleccion = cliente.create_collection("prueba", embedding_function=None)
+    coleccion.add(ids=ids, embeddings=embeddings)
+    
+    # El reescalado en float32 recupera el orden exacto de los vecinos
+    assert coleccion.query(query_embeddings=consultas, n_results=10, include=[])["ids"] == exactos(
+        np.arange(len(ids))
+    )
+    
+    # Borrar deja huecos que compactar() elimina sin cambiar los resultados
+    coleccion.delete(ids=ids[::2])
+    assert coleccion.compactar() == len(ids) // 2
+    vivos = np.arange(1, len(ids), 2)
+    assert coleccion.query(query_embeddings=consultas, n_results=10, include=[])["ids"] == exactos(vivos)
+    cliente.cerrar()
+    
+    reabierta = ClienteNumpy(str(tmp_path), cuantizacion="int8", reescalar=True).get_collection("prueba")
+    assert reabierta.count() == len(vivos)
+    assert reabierta.query(query_embeddings=consultas, n_results=10, include=[])["ids"] == exactos(vivos)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+WABUN Async - Interfaz Asíncrona para Orquestadores asyncio
+Expone WabunCore y WabunQueries como corrutinas sin bloquear el event loop
+
+Autor: Manus AI (bajo la guía de WABUN y ARESK)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Any, AsyncIterator, Callable
+import asyncio
+import functools
+
+from wabun_core import WabunCore
+from wabun_queries import WabunQueries
+
+
+# Marca para distinguir "timeout no indicado" de "sin timeout" (None)
+_POR_DEFECTO = object()
+
+
+class _EnvoltorioAsincrono:
+    """
+    Convierte los métodos públicos de un objeto síncrono en corrutinas.
+    
+    Cada llamada se ejecuta en un ThreadPoolExecutor acotado, de modo que
+    el embedding y las operaciones de ChromaDB no bloquean el event loop y
+    las peticiones de varias sesiones se solapan hasta `max_concurrencia`.
+    """
+    
+    def __init__(
+        self,
+        objetivo: Any,
+        executor: ThreadPoolExecutor,
+        timeout: Optional[float]
+    ):
+        self._objetivo = objetivo
+        self._executor = executor
+        self.timeout = timeout
+    
+    async def _ejecutar(
+        self,
+        funcion: Callable,
+        *args,
+        timeout: Any = _POR_DEFECTO,
+        **kwargs
+    ) -> Any:
+        """
+        Ejecuta una función síncrona en el executor.
+        
+        Si la corrutina se cancela o vence el timeout, las llamadas que aún
+        esperan turno en el executor se descartan; una llamada que ya está
+        en curso termina en su hilo, pero su resultado se ignora.
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.run_in_executor(
+            self._executor, functools.partial(funcion, *args, **kwargs)
+        )
+        limite = self.timeout if timeout is _POR_DEFECTO else timeout
+        if limite is None:
+            return await futuro
+        return await asyncio.wait_for(futuro, limite)
+    
+    def __getattr__(self, nombre: str) -> Any:
+        if nombre == "_objetivo":
+            raise AttributeError(nombre)
+        atributo = getattr(self._objetivo, nombre)
+        if nombre.startswith("_") or not callable(atributo):
+            return atributo
+        
+        @functools.wraps(atributo)
+        async def metodo(*args, timeout: Any = _POR_DEFECTO, **kwargs):
+            return await self._ejecutar(atributo, *args, timeout=timeout, **kwargs)
+        
+        return metodo
+
+
+class AsyncWabunCore(_EnvoltorioAsincrono):
+    """
+    Versión asíncrona de WabunCore.
+    
+    Todos los métodos públicos de WabunCore están disponibles como
+    corrutinas con la misma firma y un argumento adicional `timeout`
+    (segundos; None para esperar indefinidamente):
+        
+        wabun = AsyncWabunCore(persist_directory="./wabun_db", max_concurrencia=8)
+        interaction_id = await wabun.registrar_interaccion(..., timeout=5)
+        stats = await wabun.estadisticas()
+    
+    Los atributos no invocables (ciclo_actual, fase_actual, ...) se leen
+    directamente del núcleo síncrono.
+    """
+    
+    def __init__(
+        self,
+        wabun_core: Optional[WabunCore] = None,
+        max_concurrencia: int = 4,
+        timeout: Optional[float] = None,
+        **kwargs_core
+    ):
+        """
+        Inicializa el núcleo asíncrono.
+        
+        Args:
+            wabun_core: Instancia de WabunCore (si no se da, se crea con kwargs_core)
+            max_concurrencia: Máximo de llamadas ejecutándose a la vez
+            timeout: Timeout por defecto de cada llamada en segundos (opcional)
+            **kwargs_core: Argumentos para crear WabunCore
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrencia),
+            thread_name_prefix="wabun"
+        )
+        # Un núcleo recibido lo cierra quien lo creó
+        self._core_propio = wabun_core is None
+        super().__init__(wabun_core or WabunCore(**kwargs_core), executor, timeout)
+    
+    @property
+    def wabun(self) -> WabunCore:
+        """Núcleo síncrono subyacente"""
+        return self._objetivo
+    
+    async def escanear(
+        self,
+        coleccion: Any,
+        filtros: Optional[Dict[str, Any]] = None,
+        include: Optional[list] = None,
+        tamano_pagina: Optional[int] = None,
+        timeout: Any = _POR_DEFECTO
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Versión asíncrona de `WabunCore.escanear`.
+        
+        Cada página se lee en el executor; el timeout se aplica por página.
+        
+        Yields:
+            Páginas con la forma de `get` (ids, documents, metadatas)
+        """
+        paginas = self.wabun.escanear(coleccion, filtros, include, tamano_pagina)
+        fin = object()
+        while True:
+            pagina = await self._ejecutar(next, paginas, fin, timeout=timeout)
+            if pagina is fin:
+                break
+            yield pagina
+    
+    def cerrar(self, esperar: bool = True):
+        """
+        Libera el executor y, si lo creó este objeto, el núcleo (ver `WabunCore.cerrar`).
+        
+        Args:
+            esperar: Si esperar a que terminen las llamadas en curso
+        """
+        self._executor.shutdown(wait=esperar, cancel_futures=True)
+        if self._core_propio:
+            self.wabun.cerrar()
+    
+    async def __aenter__(self) -> "AsyncWabunCore":
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.cerrar)
+
+
+class AsyncWabunQueries(_EnvoltorioAsincrono):
+    """
+    Versión asíncrona de WabunQueries.
+    
+    Comparte el executor (y por tanto el límite de concurrencia y el
+    timeout por defecto) del AsyncWabunCore del que depende:
+        
+        queries = AsyncWabunQueries(wabun)
+        contexto = await queries.recuperar_contexto_para_motor("LIANG", timeout=2)
+    """
+    
+    def __init__(self, async_core: AsyncWabunCore):
+        """
+        Inicializa el módulo de consultas asíncrono.
+        
+        Args:
+            async_core: Instancia de AsyncWabunCore
+        """
+        super().__init__(
+            WabunQueries(async_core.wabun),
+            async_core._executor,
+            async_core.timeout
+        )
+    
+    @property
+    def queries(self) -> WabunQueries:
+        """Módulo de consultas síncrono subyacente"""
+        return self._objetivo
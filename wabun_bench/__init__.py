@@ -0,0 +1,27 @@
+"""
+WABUN Bench - Benchmarks Offline de la Memoria de CAELION
+Mide ingesta, latencia de consultas, memoria y disco sobre corpus sintéticos
+
+Uso:
+    python -m wabun_bench ejecutar --escala 10k --salida resultados.json
+    python -m wabun_bench comparar base.json nuevo.json
+    python -m wabun_bench backends --escala 10k --salida backends.json
+
+Autor: Manus AI (bajo la guía de ARGOS y WABUN)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from wabun_bench.embeddings import EmbeddingHashing
+from wabun_bench.corpus import GeneradorCorpus, ESCALAS
+from wabun_bench.ejecutar import ejecutar_benchmark, comparar_resultados
+from wabun_bench.backends import comparar_backends
+
+__all__ = [
+    "EmbeddingHashing",
+    "GeneradorCorpus",
+    "ESCALAS",
+    "ejecutar_benchmark",
+    "comparar_resultados",
+    "comparar_backends",
+]
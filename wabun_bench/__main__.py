@@ -0,0 +1,86 @@
+"""
+Punto de entrada: python -m wabun_bench {ejecutar,backends,comparar} ...
+"""
+
+import argparse
+import json
+
+from wabun_bench.backends import comparar_backends
+from wabun_bench.corpus import ESCALAS
+from wabun_bench.ejecutar import ejecutar_benchmark, comparar_resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m wabun_bench",
+        description="Benchmarks offline de WABUN sobre corpus sintéticos de CAELION"
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    
+    ejecutar = subparsers.add_parser("ejecutar", help="Ejecuta el benchmark")
+    ejecutar.add_argument(
+        "--escala", default="10k",
+        help=f"Chunks de interacciones: {', '.join(ESCALAS)} o un número (por defecto 10k)"
+    )
+    ejecutar.add_argument("--directorio", help="Directorio de la base de datos (por defecto temporal)")
+    ejecutar.add_argument("--repeticiones", type=int, default=20, help="Llamadas medidas por consulta")
+    ejecutar.add_argument("--muestras-ingesta", type=int, default=200, help="Llamadas medidas a registrar_interaccion")
+    ejecutar.add_argument("--semilla", type=int, default=1207, help="Semilla del corpus")
+    ejecutar.add_argument("--batch-size", type=int, default=256, help="Chunks por lote en la carga masiva")
+    ejecutar.add_argument("--salida", help="Ruta del JSON de resultados")
+    ejecutar.add_argument(
+        "--particiones", choices=("mes", "ciclo"),
+        help="Particionar las interacciones por mes o por ciclo (por defecto sin particiones)"
+    )
+    ejecutar.add_argument(
+        "--backend", choices=("chroma", "numpy"), default="chroma",
+        help="Almacén de vectores de WabunCore (por defecto chroma)"
+    )
+    
+    backends = subparsers.add_parser("backends", help="Compara recall y latencia de ChromaDB y NumPy")
+    backends.add_argument("--escala", default="10k", help="Vectores: 10k, 100k, 1m o un número")
+    backends.add_argument("--consultas", type=int, default=200, help="Consultas medidas por escenario")
+    backends.add_argument("--k", type=int, default=10, help="Vecinos por consulta")
+    backends.add_argument("--semilla", type=int, default=1207, help="Semilla del corpus")
+    backends.add_argument("--directorio", help="Directorio de trabajo (por defecto temporal)")
+    backends.add_argument("--salida", help="Ruta del JSON de resultados")
+    
+    comparar = subparsers.add_parser("comparar", help="Compara dos archivos de resultados")
+    comparar.add_argument("base", help="Resultados de referencia")
+    comparar.add_argument("nuevo", help="Resultados a comparar")
+    
+    args = parser.parse_args()
+    
+    if args.comando == "ejecutar":
+        resultados = ejecutar_benchmark(
+            escala=args.escala,
+            directorio=args.directorio,
+            repeticiones=args.repeticiones,
+            muestras_ingesta=args.muestras_ingesta,
+            semilla=args.semilla,
+            batch_size=args.batch_size,
+            salida=args.salida,
+            opciones_core={
+                **({"particiones": args.particiones} if args.particiones else {}),
+                **({"backend": args.backend} if args.backend != "chroma" else {})
+            } or None
+        )
+        if not args.salida:
+            print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    elif args.comando == "backends":
+        resultados = comparar_backends(
+            escala=args.escala,
+            consultas=args.consultas,
+            k=args.k,
+            semilla=args.semilla,
+            directorio=args.directorio,
+            salida=args.salida
+        )
+        if not args.salida:
+            print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    else:
+        comparar_resultados(args.base, args.nuevo)
+
+
+if __name__ == "__main__":
+    main()
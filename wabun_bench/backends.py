@@ -0,0 +1,168 @@
+"""
+Comparación de backends de vectores: ChromaDB (HNSW) frente a NumPy cuantizado.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+import itertools
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from wabun_bench.corpus import CUSTODIOS, ESCALAS, GeneradorCorpus
+from wabun_bench.embeddings import EmbeddingHashing
+from wabun_bench.ejecutar import _percentiles, _tamano_disco
+
+
+# Configuraciones del backend NumPy que se comparan con ChromaDB
+CONFIGURACIONES_NUMPY = {
+    "numpy_int8": {"cuantizacion": "int8", "reescalar": False},
+    "numpy_int8_reescalado": {"cuantizacion": "int8", "reescalar": True},
+    "numpy_float16": {"cuantizacion": "float16", "reescalar": False},
+    "numpy_int8_ivf": {"cuantizacion": "int8", "reescalar": True, "listas_ivf": 64, "sondas": 8}
+}
+
+# Chunks por escritura al cargar cada backend
+LOTE_CARGA = 1000
+
+
+def _recall(encontrados: List[List[str]], exactos: List[List[str]]) -> float:
+    """Fracción de los k vecinos exactos que devuelve el backend"""
+    aciertos = sum(len(set(a) & set(b)) for a, b in zip(encontrados, exactos))
+    total = sum(len(b) for b in exactos)
+    return aciertos / total if total else 1.0
+
+
+def comparar_backends(
+    escala: str = "10k",
+    consultas: int = 200,
+    k: int = 10,
+    semilla: int = 1207,
+    directorio: Optional[str] = None,
+    salida: Optional[str] = None,
+    configuraciones: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Mide recall@k y latencia de consulta de cada backend sobre el mismo corpus.
+    
+    Cada interacción sintética se embebe una vez como un vector y se carga
+    en una colección de ChromaDB y en una por configuración del backend
+    NumPy. La referencia es la búsqueda exacta en float32. Se mide sin
+    filtro y con un filtro `where` por custodio.
+    
+    Args:
+        escala: '10k', '100k', '1m' o un número de vectores
+        consultas: Consultas medidas por backend y escenario
+        k: Vecinos por consulta
+        semilla: Semilla del corpus
+        directorio: Directorio de trabajo (por defecto uno temporal)
+        salida: Ruta del JSON de resultados (opcional)
+        configuraciones: Configuraciones del backend NumPy (por defecto
+            CONFIGURACIONES_NUMPY)
+    
+    Returns:
+        Por backend: carga, disco, memoria del índice y, por escenario,
+        recall@k y percentiles de latencia
+    """
+    import chromadb
+    from chromadb.config import Settings
+    from wabun_vectores import ClienteNumpy
+    
+    n = ESCALAS.get(str(escala).lower()) or int(escala)
+    temporal = directorio is None
+    ruta = Path(directorio or tempfile.mkdtemp(prefix="wabun_backends_"))
+    funcion = EmbeddingHashing()
+    generador = GeneradorCorpus(semilla=semilla)
+    
+    interacciones = list(itertools.islice(generador.interacciones(n + consultas), n + consultas))
+    corpus, pendientes = interacciones[:n], interacciones[n:]
+    ids = [f"v{i}" for i in range(n)]
+    documentos = [f"{i['prompt_fundador']}\n\n{i['respuesta_ia']}" for i in corpus]
+    metadatas = [{"custodio_invocado": i["custodio_invocado"], "importancia": i["importancia"]} for i in corpus]
+    vectores = np.asarray(funcion(documentos), dtype=np.float32)
+    textos_consulta = [p["prompt_fundador"] for p in pendientes]
+    vectores_consulta = np.asarray(funcion(textos_consulta), dtype=np.float32)
+    custodios_consulta = [CUSTODIOS[i % len(CUSTODIOS)] for i in range(consultas)]
+    
+    # Referencia exacta (l2 en float32, la métrica por defecto de ambos backends)
+    normas = np.einsum("ij,ij->i", vectores, vectores)
+    columna_custodios = np.array([m["custodio_invocado"] for m in metadatas])
+    exactos: Dict[str, List[List[str]]] = {"sin_filtro": [], "filtro_custodio": []}
+    for consulta, custodio in zip(vectores_consulta, custodios_consulta):
+        distancias = normas - 2 * vectores @ consulta
+        exactos["sin_filtro"].append([ids[i] for i in np.argsort(distancias)[:k]])
+        distancias = np.where(columna_custodios == custodio, distancias, np.inf)
+        exactos["filtro_custodio"].append([ids[i] for i in np.argsort(distancias)[:k] if np.isfinite(distancias[i])])
+    
+    backends = {"chroma": None, **(configuraciones or CONFIGURACIONES_NUMPY)}
+    resultados: Dict[str, Any] = {
+        "configuracion": {"escala": str(escala), "vectores": n, "dimension": funcion.dimension,
+                          "consultas": consultas, "k": k, "semilla": semilla},
+        "backends": {}
+    }
+    try:
+        for nombre, opciones in backends.items():
+            directorio_backend = ruta / nombre
+            if opciones is None:
+                cliente = chromadb.PersistentClient(
+                    path=str(directorio_backend), settings=Settings(anonymized_telemetry=False)
+                )
+            else:
+                cliente = ClienteNumpy(str(directorio_backend), **opciones)
+            coleccion = cliente.get_or_create_collection(name="interactions", embedding_function=funcion)
+            
+            inicio = time.perf_counter()
+            for i in range(0, n, LOTE_CARGA):
+                coleccion.add(
+                    ids=ids[i:i + LOTE_CARGA],
+                    embeddings=vectores[i:i + LOTE_CARGA],
+                    documents=documentos[i:i + LOTE_CARGA],
+                    metadatas=metadatas[i:i + LOTE_CARGA]
+                )
+            if opciones and opciones.get("listas_ivf"):
+                coleccion.construir_ivf()
+            carga_s = time.perf_counter() - inicio
+            
+            escenarios = {}
+            for escenario in ("sin_filtro", "filtro_custodio"):
+                encontrados, latencias = [], []
+                for consulta, custodio in zip(vectores_consulta, custodios_consulta):
+                    where = {"custodio_invocado": custodio} if escenario == "filtro_custodio" else None
+                    inicio = time.perf_counter()
+                    respuesta = coleccion.query(
+                        query_embeddings=[consulta], n_results=k, where=where, include=["distances"]
+                    )
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    encontrados.append(respuesta["ids"][0])
+                escenarios[escenario] = {
+                    "recall_at_k": _recall(encontrados, exactos[escenario]),
+                    **_percentiles(latencias)
+                }
+            
+            resultados["backends"][nombre] = {
+                "opciones": opciones,
+                "carga_s": carga_s,
+                "disco_bytes": _tamano_disco(directorio_backend),
+                # ChromaDB mantiene en memoria el HNSW con los vectores en float32
+                "memoria_indice_bytes": (
+                    n * funcion.dimension * 4 if opciones is None
+                    else cliente.memoria_indice()["interactions"]["cuantizados_bytes"]
+                ),
+                "escenarios": escenarios
+            }
+            print(f"✓ {nombre}: recall@{k} {escenarios['sin_filtro']['recall_at_k']:.3f} "
+                  f"(filtrado {escenarios['filtro_custodio']['recall_at_k']:.3f}), "
+                  f"p50 {escenarios['sin_filtro']['p50_ms']:.2f} ms")
+    finally:
+        if temporal:
+            shutil.rmtree(ruta, ignore_errors=True)
+    
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"✓ Resultados guardados en: {salida}")
+    
+    return resultados
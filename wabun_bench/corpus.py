@@ -0,0 +1,153 @@
+"""
+Generador de corpus sintéticos de CAELION para los benchmarks.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Any
+import random
+
+
+# Escalas de referencia, en chunks de la colección `interactions`
+ESCALAS = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000
+}
+
+CUSTODIOS = [
+    "WABUN", "LIANG", "HECATE", "ARESK", "ARGOS", "LICURGO",
+    "CUSTOS", "GLIBATREE"
+]
+
+# Los primeros custodios concentran la mayor parte del trabajo
+PESOS_CUSTODIOS = [18, 22, 14, 20, 10, 6, 6, 4]
+
+PROYECTOS = [
+    "WABUN_Digital", "CAELION_Core", "Orquestador_Ciclos",
+    "Protocolos_Custodios", "General"
+]
+
+MOTORES = ["Gemini-2.5-Flash", "Claude-3.5-Sonnet", "GPT-4.1-mini", "Gemini-2.5-Pro"]
+
+FASES = ["Encendido", "Ejecucion", "Observacion", "Equilibrio"]
+
+ESTADOS = ["Propuesta", "Validada", "Ejecutada", "Archivada"]
+PESOS_ESTADOS = [35, 25, 25, 15]
+
+# Importancia 1-5: la mayoría de las interacciones son rutinarias
+PESOS_IMPORTANCIA = [15, 30, 30, 17, 8]
+
+VOCABULARIO = [
+    "memoria", "ciclo", "custodio", "decreto", "protocolo", "fase", "intención",
+    "arquitectura", "coherencia", "ritmo", "equilibrio", "expansión", "registro",
+    "esquema", "colección", "embedding", "contexto", "decisión", "validación",
+    "principio", "organismo", "simbiosis", "motor", "orquestador", "acta",
+    "entidad", "continuidad", "fundador", "observación", "reajuste", "claridad",
+    "prioridad", "búsqueda", "índice", "metadatos", "proyecto", "sesión",
+    "chromadb", "latencia", "persistencia", "identidad", "estrategia", "ética"
+]
+
+DURACION_CICLO = timedelta(hours=72)
+
+
+class GeneradorCorpus:
+    """
+    Genera interacciones sintéticas con la forma de las reales de CAELION.
+    
+    Las interacciones se reparten en ciclos de 72h consecutivos que avanzan
+    por sus cuatro fases, con distribuciones sesgadas de custodios,
+    importancia y estado de decisión. Con la misma semilla el corpus es
+    idéntico, así que los resultados son comparables entre commits.
+    """
+    
+    def __init__(
+        self,
+        semilla: int = 1207,
+        interacciones_por_ciclo: int = 400,
+        inicio: Optional[datetime] = None
+    ):
+        """
+        Inicializa el generador.
+        
+        Args:
+            semilla: Semilla del generador pseudoaleatorio
+            interacciones_por_ciclo: Interacciones en cada ciclo de 72h
+            inicio: Inicio del primer ciclo (por defecto 2025-01-01 UTC)
+        """
+        self.semilla = semilla
+        self.interacciones_por_ciclo = max(1, interacciones_por_ciclo)
+        self.inicio = inicio or datetime(2025, 1, 1, tzinfo=timezone.utc)
+    
+    def _frase(self, rng: random.Random, minimo: int, maximo: int) -> str:
+        palabras = rng.choices(VOCABULARIO, k=rng.randint(minimo, maximo))
+        return " ".join(palabras).capitalize() + "."
+    
+    def _parrafo(self, rng: random.Random, frases: int) -> str:
+        return " ".join(self._frase(rng, 6, 16) for _ in range(frases))
+    
+    def interacciones(self, n: int) -> Iterator[Dict[str, Any]]:
+        """
+        Genera `n` interacciones con los argumentos de `registrar_interaccion`.
+        
+        Args:
+            n: Número de interacciones
+        
+        Yields:
+            Diccionarios aptos para `WabunCore.registrar_interacciones_lote`
+        """
+        rng = random.Random(self.semilla)
+        for i in range(n):
+            n_ciclo, posicion = divmod(i, self.interacciones_por_ciclo)
+            avance = posicion / self.interacciones_por_ciclo
+            instante = self.inicio + n_ciclo * DURACION_CICLO + avance * DURACION_CICLO
+            custodio = rng.choices(CUSTODIOS, weights=PESOS_CUSTODIOS)[0]
+            palabras_clave = rng.sample(VOCABULARIO, k=rng.randint(2, 5))
+            
+            # Respuestas de longitud variable: algunas generan varios chunks
+            parrafos = rng.choices([1, 2, 3, 6], weights=[50, 30, 15, 5])[0]
+            respuesta = "\n\n".join(
+                self._parrafo(rng, rng.randint(2, 4)) for _ in range(parrafos)
+            )
+            
+            yield {
+                "prompt_fundador": f"{custodio}, {self._frase(rng, 8, 20).lower()}",
+                "respuesta_ia": respuesta,
+                "custodio_invocado": custodio,
+                "motor_ia_usado": rng.choice(MOTORES),
+                "intencion_fundador": self._frase(rng, 3, 6),
+                "palabras_clave": palabras_clave,
+                "proyecto_asociado": rng.choice(PROYECTOS),
+                "importancia": rng.choices(range(1, 6), weights=PESOS_IMPORTANCIA)[0],
+                "estado_decision": rng.choices(ESTADOS, weights=PESOS_ESTADOS)[0],
+                "timestamp_utc": int(instante.timestamp()),
+                "ciclo_id": f"ciclo_{(self.inicio + n_ciclo * DURACION_CICLO).strftime('%Y-%m-%d')}",
+                "fase_ciclo": FASES[min(int(avance * len(FASES)), len(FASES) - 1)]
+            }
+    
+    def decretos(self, n: int) -> List[Dict[str, Any]]:
+        """
+        Genera `n` decretos con los argumentos de `registrar_decreto`.
+        
+        Args:
+            n: Número de decretos
+        
+        Returns:
+            Lista de diccionarios aptos para `WabunCore.registrar_decretos_lote`
+        """
+        rng = random.Random(self.semilla + 1)
+        decretos = []
+        for i in range(n):
+            custodio = CUSTODIOS[i % len(CUSTODIOS)]
+            contenido = "\n\n".join(
+                f"Protocolo {custodio}. " + self._parrafo(rng, rng.randint(3, 6))
+                for _ in range(rng.randint(3, 10))
+            )
+            decretos.append({
+                "titulo_documento": f"Protocolo {custodio} {i}",
+                "contenido": contenido,
+                "decreto_id": f"DEC-{custodio}-{i:04d}-V1",
+                "custodios_implicados": rng.sample(CUSTODIOS, k=3),
+                "tipo_documento": rng.choice(["Protocolo", "Manifiesto", "Ley", "Principio"]),
+                "version": 1.0
+            })
+        return decretos
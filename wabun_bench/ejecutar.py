@@ -0,0 +1,342 @@
+"""
+Ejecución de los benchmarks de WABUN y comparación de resultados.
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from wabun_core import WabunCore
+from wabun_queries import WabunQueries
+from wabun_bench.corpus import (
+    CUSTODIOS, PROYECTOS, VOCABULARIO, DURACION_CICLO, ESCALAS, GeneradorCorpus
+)
+from wabun_bench.embeddings import EmbeddingHashing
+
+
+# Versión del formato del JSON de resultados
+FORMATO_RESULTADOS = "wabun-bench-1"
+
+# Interacciones que se ingieren entre comprobaciones del tamaño alcanzado
+BLOQUE_INGESTA = 2000
+
+
+def _percentiles(muestras_ms: List[float]) -> Dict[str, float]:
+    """Resume una serie de latencias en milisegundos"""
+    if not muestras_ms:
+        return {"n": 0}
+    ordenadas = sorted(muestras_ms)
+    
+    def percentil(p: float) -> float:
+        indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+        return ordenadas[indice]
+    
+    return {
+        "n": len(ordenadas),
+        "p50_ms": percentil(50),
+        "p95_ms": percentil(95),
+        "p99_ms": percentil(99),
+        "media_ms": statistics.fmean(ordenadas),
+        "max_ms": ordenadas[-1]
+    }
+
+
+def _tamano_disco(ruta: Path) -> int:
+    """Bytes ocupados por un directorio"""
+    total = 0
+    for raiz, _, archivos in os.walk(ruta):
+        for archivo in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, archivo))
+            except OSError:
+                pass
+    return total
+
+
+def _memoria_proceso() -> Dict[str, int]:
+    """RSS actual y máximo del proceso, en bytes"""
+    memoria = {}
+    try:
+        with open("/proc/self/statm") as f:
+            memoria["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa en KiB y macOS en bytes
+        memoria["rss_max_bytes"] = maximo if platform.system() == "Darwin" else maximo * 1024
+    except ImportError:
+        pass
+    return memoria
+
+
+def _commit_actual() -> Optional[str]:
+    """Hash del commit de git del código medido, si está disponible"""
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def _medir_llamadas(llamadas: List[Callable[[], Any]]) -> List[float]:
+    """Ejecuta cada llamada y devuelve su latencia en milisegundos"""
+    muestras = []
+    for llamada in llamadas:
+        inicio = time.perf_counter()
+        llamada()
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    return muestras
+
+
+def ejecutar_benchmark(
+    escala: str = "10k",
+    directorio: Optional[str] = None,
+    repeticiones: int = 20,
+    muestras_ingesta: int = 200,
+    semilla: int = 1207,
+    batch_size: int = 256,
+    salida: Optional[str] = None,
+    opciones_core: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark completo sobre un corpus sintético.
+    
+    Fases:
+        1. Carga masiva del corpus hasta la escala pedida (en chunks)
+        2. Ingesta individual con `registrar_interaccion`
+        3. Latencia de cada método de WabunQueries
+        4. Memoria del proceso y tamaño en disco
+    
+    Args:
+        escala: '10k', '100k', '1m' o un número de chunks
+        directorio: Directorio de la base de datos (por defecto uno temporal)
+        repeticiones: Llamadas medidas por método de consulta
+        muestras_ingesta: Llamadas medidas a `registrar_interaccion`
+        semilla: Semilla del corpus
+        batch_size: Chunks por lote en la carga masiva
+        salida: Ruta del JSON de resultados (opcional)
+        opciones_core: Argumentos adicionales para WabunCore
+    
+    Returns:
+        Diccionario de resultados (el mismo que se escribe en `salida`)
+    """
+    objetivo = ESCALAS.get(str(escala).lower()) or int(escala)
+    temporal = directorio is None
+    ruta = Path(directorio or tempfile.mkdtemp(prefix="wabun_bench_"))
+    generador = GeneradorCorpus(semilla=semilla)
+    silencio = io.StringIO()
+    queries = None
+    
+    try:
+        memoria_inicial = _memoria_proceso()
+        inicio = time.perf_counter()
+        wabun = WabunCore(
+            persist_directory=str(ruta),
+            embedding_function=EmbeddingHashing(),
+            **(opciones_core or {})
+        )
+        arranque_ms = (time.perf_counter() - inicio) * 1000
+        queries = WabunQueries(wabun)
+        
+        # 1. Carga masiva hasta alcanzar el número de chunks pedido
+        interacciones = generador.interacciones(10 ** 9)
+        total_interacciones = 0
+        chunks_masivos = 0
+        segundos_masivos = 0.0
+        with contextlib.redirect_stdout(silencio):
+            wabun.registrar_decretos_lote(generador.decretos(40), batch_size=batch_size)
+            while wabun.interactions.count() < objetivo:
+                bloque = list(itertools.islice(interacciones, BLOQUE_INGESTA))
+                wabun.registrar_interacciones_lote(bloque, batch_size=batch_size)
+                total_interacciones += len(bloque)
+                chunks_masivos += wabun.metricas_ultimo_lote["chunks"]
+                segundos_masivos += wabun.metricas_ultimo_lote["segundos"]
+        
+        # 2. Ingesta individual (el camino de cada turno de chat)
+        individuales = list(itertools.islice(interacciones, muestras_ingesta))
+        with contextlib.redirect_stdout(silencio):
+            antes = wabun.interactions.count()
+            latencias_ingesta = _medir_llamadas([
+                (lambda kwargs=kwargs: wabun.registrar_interaccion(**kwargs))
+                for kwargs in individuales
+            ])
+            chunks_individuales = wabun.interactions.count() - antes
+        
+        # 3. Latencia de cada consulta
+        n_ciclos = max(1, total_interacciones // generador.interacciones_por_ciclo)
+        ciclos = [
+            f"ciclo_{(generador.inicio + i * DURACION_CICLO).strftime('%Y-%m-%d')}"
+            for i in range(n_ciclos)
+        ]
+        fin_corpus = generador.inicio + n_ciclos * DURACION_CICLO
+        
+        def argumentos(i: int) -> Dict[str, Any]:
+            return {
+                "custodio": CUSTODIOS[i % len(CUSTODIOS)],
+                "proyecto": PROYECTOS[i % len(PROYECTOS)],
+                "ciclo": ciclos[(i * 7) % len(ciclos)],
+                "palabras": [VOCABULARIO[i % len(VOCABULARIO)], VOCABULARIO[(i * 5 + 1) % len(VOCABULARIO)]],
+                "desde": fin_corpus - timedelta(days=3 * (1 + i % 5))
+            }
+        
+        consultas = {
+            "recuperar_contexto_para_motor": lambda a: queries.recuperar_contexto_para_motor(
+                a["custodio"], a["proyecto"]
+            ),
+            "buscar_por_fecha": lambda a: queries.buscar_por_fecha(
+                a["desde"], fin_corpus, a["custodio"]
+            ),
+            "analizar_custodio": lambda a: queries.analizar_custodio(a["custodio"]),
+            "buscar_decisiones_pendientes": lambda a: queries.buscar_decisiones_pendientes(),
+            "buscar_por_importancia": lambda a: queries.buscar_por_importancia(4, a["custodio"]),
+            "generar_resumen_ciclo": lambda a: queries.generar_resumen_ciclo(a["ciclo"]),
+            "buscar_conocimiento_sobre": lambda a: queries.buscar_conocimiento_sobre(
+                f"decisiones de {a['custodio']} sobre la memoria del ciclo"
+            ),
+            "buscar_por_palabras_clave": lambda a: queries.buscar_por_palabras_clave(
+                a["palabras"], "OR", tema=f"{a['palabras'][0]} del proyecto {a['proyecto']}"
+            ),
+            "buscar_relevante": lambda a: queries.buscar_relevante(
+                f"decisiones de {a['custodio']} sobre la memoria del ciclo", a["custodio"]
+            )
+        }
+        latencias_consultas = {
+            nombre: _percentiles(_medir_llamadas([
+                (lambda i=i: consulta(argumentos(i))) for i in range(repeticiones)
+            ]))
+            for nombre, consulta in consultas.items()
+        }
+        
+        # 4. Memoria y disco
+        resultados = {
+            "formato": FORMATO_RESULTADOS,
+            "commit": _commit_actual(),
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "plataforma": {
+                "python": platform.python_version(),
+                "sistema": platform.platform(),
+                "cpus": os.cpu_count()
+            },
+            "configuracion": {
+                "escala": str(escala),
+                "chunks_objetivo": objetivo,
+                "semilla": semilla,
+                "batch_size": batch_size,
+                "repeticiones": repeticiones,
+                "muestras_ingesta": muestras_ingesta,
+                "opciones_core": {k: repr(v) for k, v in (opciones_core or {}).items()}
+            },
+            "corpus": {
+                "interacciones": total_interacciones + len(individuales),
+                "chunks_interacciones": wabun.interactions.count(),
+                "chunks_decretos": wabun.decretos.count(),
+                "ciclos": n_ciclos
+            },
+            "arranque_ms": arranque_ms,
+            "ingesta": {
+                "masiva": {
+                    "chunks": chunks_masivos,
+                    "segundos": segundos_masivos,
+                    "chunks_por_segundo": chunks_masivos / segundos_masivos if segundos_masivos else 0.0
+                },
+                "registrar_interaccion": {
+                    **_percentiles(latencias_ingesta),
+                    "chunks_por_segundo": (
+                        chunks_individuales / (sum(latencias_ingesta) / 1000)
+                        if latencias_ingesta else 0.0
+                    )
+                }
+            },
+            "consultas": latencias_consultas,
+            "memoria": {
+                "inicial": memoria_inicial,
+                "final": _memoria_proceso()
+            },
+            "disco_bytes": _tamano_disco(ruta)
+        }
+    finally:
+        if queries is not None:
+            queries.cerrar()
+        if temporal:
+            shutil.rmtree(ruta, ignore_errors=True)
+    
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"✓ Resultados guardados en: {salida}")
+    
+    return resultados
+
+
+def _metricas_comparables(resultados: Dict[str, Any]) -> Dict[str, float]:
+    """Aplana las métricas numéricas principales de un resultado"""
+    metricas = {
+        "ingesta.masiva.chunks_por_segundo": resultados["ingesta"]["masiva"]["chunks_por_segundo"],
+        "ingesta.registrar_interaccion.p50_ms": resultados["ingesta"]["registrar_interaccion"].get("p50_ms", 0.0),
+        "ingesta.registrar_interaccion.p99_ms": resultados["ingesta"]["registrar_interaccion"].get("p99_ms", 0.0),
+        "memoria.rss_max_bytes": resultados["memoria"]["final"].get("rss_max_bytes", 0),
+        "disco_bytes": resultados["disco_bytes"],
+        "arranque_ms": resultados["arranque_ms"]
+    }
+    for nombre, latencias in resultados["consultas"].items():
+        for clave in ("p50_ms", "p95_ms", "p99_ms"):
+            if clave in latencias:
+                metricas[f"consultas.{nombre}.{clave}"] = latencias[clave]
+    return metricas
+
+
+def _formatear(valor: Optional[float]) -> str:
+    return "n/d" if valor is None else f"{valor:,.2f}"
+
+
+def comparar_resultados(ruta_base: str, ruta_nuevo: str) -> Dict[str, Dict[str, float]]:
+    """
+    Compara dos archivos de resultados (por ejemplo, de dos commits).
+    
+    Args:
+        ruta_base: Resultados de referencia
+        ruta_nuevo: Resultados a comparar
+    
+    Returns:
+        Por métrica: valor base, valor nuevo y cociente nuevo/base
+    """
+    with open(ruta_base, encoding='utf-8') as f:
+        base = _metricas_comparables(json.load(f))
+    with open(ruta_nuevo, encoding='utf-8') as f:
+        nuevo = _metricas_comparables(json.load(f))
+    
+    comparacion = {}
+    for metrica in sorted(set(base) | set(nuevo)):
+        valor_base = base.get(metrica)
+        valor_nuevo = nuevo.get(metrica)
+        cociente = (
+            valor_nuevo / valor_base
+            if valor_base and valor_nuevo is not None else None
+        )
+        comparacion[metrica] = {"base": valor_base, "nuevo": valor_nuevo, "cociente": cociente}
+        texto_cociente = f"{cociente:.2f}x" if cociente is not None else "n/d"
+        print(
+            f"  {metrica:<55} {_formatear(valor_base):>16} → "
+            f"{_formatear(valor_nuevo):>16}  ({texto_cociente})"
+        )
+    
+    return comparacion
@@ -0,0 +1,65 @@
+"""
+Función de embeddings determinista y sin red para los benchmarks.
+"""
+
+from typing import List, Dict, Any
+import hashlib
+import re
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+
+_PATRON_PALABRAS = re.compile(r"\w+", re.UNICODE)
+
+
+class EmbeddingHashing(EmbeddingFunction):
+    """
+    Embeddings por hashing de palabras y trigramas de caracteres.
+    
+    No descarga ningún modelo y siempre produce el mismo vector para el
+    mismo texto, así que los benchmarks son reproducibles sin red. Textos
+    que comparten vocabulario quedan cerca, lo que basta para ejercitar el
+    índice HNSW de forma realista. La dimensión por defecto coincide con
+    la del modelo por defecto de ChromaDB (all-MiniLM-L6-v2).
+    """
+    
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+    
+    def _rasgos(self, texto: str) -> List[str]:
+        palabras = _PATRON_PALABRAS.findall(texto.lower())
+        rasgos = list(palabras)
+        for palabra in palabras:
+            envuelta = f"#{palabra}#"
+            rasgos.extend(envuelta[i:i + 3] for i in range(len(envuelta) - 2))
+        return rasgos
+    
+    def _vector(self, texto: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        rasgos = self._rasgos(texto)
+        if not rasgos:
+            return vector
+        indices = np.empty(len(rasgos), dtype=np.int64)
+        signos = np.empty(len(rasgos), dtype=np.float32)
+        for i, rasgo in enumerate(rasgos):
+            h = int.from_bytes(hashlib.blake2b(rasgo.encode("utf-8"), digest_size=8).digest(), "little")
+            indices[i] = h % self.dimension
+            signos[i] = 1.0 if (h >> 63) & 1 else -1.0
+        np.add.at(vector, indices, signos)
+        norma = np.linalg.norm(vector)
+        return vector / norma if norma > 0 else vector
+    
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return [self._vector(texto) for texto in input]
+    
+    @staticmethod
+    def name() -> str:
+        return "wabun_hashing"
+    
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimension": self.dimension}
+    
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "EmbeddingHashing":
+        return EmbeddingHashing(**config)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+WABUN Cliente - Cliente Ligero del Servidor Local de WABUN
+Expone WabunCore y WabunQueries de un servidor compartido sin cargar ChromaDB ni el modelo
+
+Autor: Manus AI (bajo la guía de WABUN y ARESK)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterator, Tuple
+from urllib.parse import urlsplit
+import http.client
+import json
+import os
+import queue
+import socket
+
+
+# Protocolo: POST de un lote de llamadas en JSON sobre HTTP/1.1 (keep-alive)
+RUTA_LLAMADAS = "/llamadas"
+RUTA_SALUD = "/salud"
+OBJETIVOS = ("core", "queries")
+
+# Token compartido: el servidor lo guarda (modo 0600) en su persist_directory
+# y cada petición lo envía como `Authorization: Bearer <token>`
+ARCHIVO_TOKEN = "wabun_servidor.token"
+VARIABLE_TOKEN = "WABUN_TOKEN"
+
+# Dirección por defecto del servidor (localhost; ver `python -m wabun_servidor`)
+DIRECCION_POR_DEFECTO = "http://127.0.0.1:8765"
+
+# Excepciones que el cliente vuelve a lanzar con su tipo original
+_EXCEPCIONES = {
+    excepcion.__name__: excepcion
+    for excepcion in (
+        ValueError, KeyError, TypeError, AttributeError,
+        RuntimeError, FileNotFoundError, NotImplementedError, PermissionError
+    )
+}
+
+# Errores de una conexión keep-alive que el servidor ya ha cerrado
+_CONEXION_CADUCADA = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError
+)
+
+
+class ErrorRemotoWabun(RuntimeError):
+    """Error del servidor de WABUN sin equivalente local"""
+    
+    def __init__(self, tipo: str, mensaje: str):
+        super().__init__(f"{tipo}: {mensaje}")
+        self.tipo = tipo
+        self.mensaje = mensaje
+
+
+def _a_json(valor: Any) -> Any:
+    """Tipos no nativos de JSON en las respuestas de WABUN (arrays, rutas, conjuntos)"""
+    if hasattr(valor, "tolist"):
+        return valor.tolist()
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    if hasattr(valor, "__fspath__"):
+        return str(valor)
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def codificar(carga: Any) -> bytes:
+    """Serializa una petición o respuesta del protocolo"""
+    return json.dumps(carga, ensure_ascii=False, default=_a_json).encode("utf-8")
+
+
+def error_local(error: Dict[str, str]) -> Exception:
+    """Excepción local equivalente a un error devuelto por el servidor"""
+    tipo = _EXCEPCIONES.get(error.get("tipo"))
+    if tipo is None:
+        return ErrorRemotoWabun(error.get("tipo", "Error"), error.get("mensaje", ""))
+    return tipo(error.get("mensaje", ""))
+
+
+class _ConexionTCP(http.client.HTTPConnection):
+    """Conexión HTTP sin Nagle: cabeceras y cuerpo no esperan al ACK del anterior"""
+    
+    def connect(self):
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _ConexionUnix(http.client.HTTPConnection):
+    """Conexión HTTP sobre un socket Unix"""
+    
+    def __init__(self, ruta: str, timeout: Optional[float]):
+        super().__init__("localhost", timeout=timeout)
+        self._ruta = ruta
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._ruta)
+
+
+class LlamadaDiferida:
+    """Resultado de una llamada encolada en un lote (ver `ClienteWabun.lote`)"""
+    
+    def __init__(self, objetivo: str, metodo: str, args: tuple, kwargs: Dict[str, Any]):
+        self.llamada = {"objetivo": objetivo, "metodo": metodo, "args": list(args), "kwargs": kwargs}
+        self._respuesta: Optional[Dict[str, Any]] = None
+    
+    def resultado(self) -> Any:
+        """
+        Valor devuelto por la llamada.
+        
+        Raises:
+            RuntimeError: Si el lote aún no se ha enviado
+            La excepción de la llamada, si falló en el servidor
+        """
+        if self._respuesta is None:
+            raise RuntimeError("El lote aún no se ha enviado")
+        if "error" in self._respuesta:
+            raise error_local(self._respuesta["error"])
+        return self._respuesta.get("resultado")
+
+
+class _ProxyRemoto:
+    """Expone los métodos públicos de un objetivo remoto como métodos locales"""
+    
+    def __init__(self, llamar, objetivo: str):
+        self._llamar = llamar
+        self._objetivo = objetivo
+    
+    def __getattr__(self, nombre: str) -> Any:
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        
+        def metodo(*args, **kwargs):
+            return self._llamar(self._objetivo, nombre, args, kwargs)
+        
+        metodo.__name__ = nombre
+        return metodo
+
+
+class _Lote:
+    """Llamadas acumuladas que se envían juntas en una sola petición"""
+    
+    def __init__(self):
+        self.llamadas: List[LlamadaDiferida] = []
+        self.core = _ProxyRemoto(self._encolar, "core")
+        self.queries = _ProxyRemoto(self._encolar, "queries")
+    
+    def _encolar(self, objetivo: str, metodo: str, args: tuple, kwargs: Dict[str, Any]) -> LlamadaDiferida:
+        llamada = LlamadaDiferida(objetivo, metodo, args, kwargs)
+        self.llamadas.append(llamada)
+        return llamada
+
+
+class ClienteWabun:
+    """
+    Cliente del servidor local de WABUN (`python -m wabun_servidor`).
+    
+    `core` y `queries` exponen los métodos públicos de WabunCore y
+    WabunQueries con la misma firma; cada llamada viaja como JSON por un
+    pool de conexiones keep-alive. Los resultados llegan en tipos JSON
+    (las tuplas como listas y los embeddings como listas de floats).
+        
+        cliente = ClienteWabun("unix:/run/wabun.sock", persist_directory="./wabun_db")
+        interaction_id = cliente.core.registrar_interaccion(prompt, respuesta, "LIANG", "Gemini")
+        contexto = cliente.queries.recuperar_contexto_para_motor("LIANG")
+        
+        with cliente.lote() as lote:   # una sola petición para varias llamadas
+            pendientes = lote.queries.buscar_decisiones_pendientes()
+            stats = lote.core.estadisticas()
+        print(stats.resultado())
+    
+    `escanear` no está disponible en remoto; usa `obtener_por_filtro`.
+    El token del servidor se lee de su `persist_directory` (o se da con
+    `token` o la variable de entorno WABUN_TOKEN).
+    """
+    
+    def __init__(
+        self,
+        direccion: str = DIRECCION_POR_DEFECTO,
+        tamano_pool: int = 4,
+        timeout: Optional[float] = 60.0,
+        token: Optional[str] = None,
+        persist_directory: Optional[str] = None
+    ):
+        """
+        Inicializa el cliente (las conexiones se abren en el primer uso).
+        
+        Args:
+            direccion: `unix:/ruta/al/socket` o `http://127.0.0.1:puerto`
+            tamano_pool: Conexiones keep-alive que se conservan abiertas
+            timeout: Segundos máximos por petición (None para esperar indefinidamente)
+            token: Token del servidor (por defecto el de `persist_directory`
+                o el de WABUN_TOKEN)
+            persist_directory: Memoria que sirve el servidor, donde está su token
+        """
+        self.direccion = direccion
+        self.timeout = timeout
+        if token is None and persist_directory is not None:
+            token = (Path(persist_directory) / ARCHIVO_TOKEN).read_text(encoding="utf-8").strip()
+        self._token = token or os.environ.get(VARIABLE_TOKEN)
+        if direccion.startswith("unix:"):
+            self._socket_unix: Optional[str] = direccion[len("unix:"):]
+            self._host, self._puerto = None, None
+        else:
+            partes = urlsplit(direccion if "://" in direccion else f"http://{direccion}")
+            self._socket_unix = None
+            self._host, self._puerto = partes.hostname or "127.0.0.1", partes.port or 80
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(max(1, tamano_pool))
+        
+        self.core = _ProxyRemoto(self._llamar, "core")
+        self.queries = _ProxyRemoto(self._llamar, "queries")
+    
+    def _nueva_conexion(self) -> http.client.HTTPConnection:
+        if self._socket_unix:
+            return _ConexionUnix(self._socket_unix, self.timeout)
+        return _ConexionTCP(self._host, self._puerto, timeout=self.timeout)
+    
+    @contextmanager
+    def _conexion(self) -> Iterator[Tuple[http.client.HTTPConnection, bool]]:
+        """Toma una conexión del pool (o abre una) y la devuelve si sigue sana"""
+        try:
+            conexion, reutilizada = self._pool.get_nowait(), True
+        except queue.Empty:
+            conexion, reutilizada = self._nueva_conexion(), False
+        try:
+            yield conexion, reutilizada
+        except BaseException:
+            conexion.close()
+            raise
+        try:
+            self._pool.put_nowait(conexion)
+        except queue.Full:
+            conexion.close()
+    
+    def _peticion(self, metodo: str, ruta: str, cuerpo: Optional[bytes] = None) -> Any:
+        """Envía una petición y decodifica su respuesta JSON"""
+        cabeceras = {"Content-Type": "application/json"} if cuerpo is not None else {}
+        if self._token:
+            cabeceras["Authorization"] = f"Bearer {self._token}"
+        while True:
+            with self._conexion() as (conexion, reutilizada):
+                try:
+                    conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                    respuesta = conexion.getresponse()
+                    datos = respuesta.read()
+                except _CONEXION_CADUCADA:
+                    # Una conexión del pool que el servidor cerró mientras
+                    # esperaba: la petición no llegó a procesarse
+                    if not reutilizada:
+                        raise
+                    conexion.close()
+                    continue
+            if respuesta.status != 200:
+                raise ErrorRemotoWabun(f"HTTP {respuesta.status}", datos.decode("utf-8", "replace"))
+            return json.loads(datos)
+    
+    def llamar_lote(self, llamadas: List[LlamadaDiferida]) -> List[LlamadaDiferida]:
+        """
+        Envía varias llamadas en una sola petición.
+        
+        El servidor las ejecuta en orden; un error en una no impide las
+        siguientes (cada `LlamadaDiferida` guarda su resultado o su error).
+        """
+        if not llamadas:
+            return llamadas
+        respuesta = self._peticion(
+            "POST", RUTA_LLAMADAS, codificar({"llamadas": [llamada.llamada for llamada in llamadas]})
+        )
+        for llamada, resultado in zip(llamadas, respuesta["resultados"]):
+            llamada._respuesta = resultado
+        return llamadas
+    
+    def _llamar(self, objetivo: str, metodo: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        llamada = LlamadaDiferida(objetivo, metodo, args, kwargs)
+        return self.llamar_lote([llamada])[0].resultado()
+    
+    @contextmanager
+    def lote(self) -> Iterator[_Lote]:
+        """
+        Acumula llamadas y las envía en una sola petición al salir del bloque.
+        
+        Yields:
+            Lote con `core` y `queries`; cada llamada devuelve una
+            `LlamadaDiferida` cuyo `resultado()` está disponible tras el bloque
+        """
+        lote = _Lote()
+        yield lote
+        self.llamar_lote(lote.llamadas)
+    
+    def salud(self) -> Dict[str, Any]:
+        """Estado del servidor: proceso, directorio, peticiones y llamadas atendidas"""
+        return self._peticion("GET", RUTA_SALUD)
+    
+    def cerrar(self):
+        """Cierra las conexiones del pool"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
+    def __enter__(self) -> "ClienteWabun":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.cerrar()
@@ -8,15 +8,136 @@ Fecha: 25 de noviembre de 2025
 Versión: 1.0
 """
 
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple, Union
 import uuid
 import json
+import time
+import base64
+import gzip
+import io
+import importlib
+import hashlib
+import threading
+import re
 from pathlib import Path
 
+import numpy as np
+
+from wabun_duplicados import IndiceDuplicados, MAX_HUELLAS_RECIENTES
+from wabun_embeddings import EmbeddingCache
+from wabun_fragmentos import Fragmentador, TOKENS_CHUNK_INTERACCION, TOKENS_CHUNK_DECRETO
+from wabun_indices import (
+    AlmacenCabeceras, CatalogoParticiones, IndiceLexico,
+    CAMPOS_SOLO_CABECERA, DIMENSIONES_AGREGADOS
+)
+from wabun_metricas import Metricas
+from wabun_particiones import ColeccionParticionada
+from wabun_tokens import ContadorTokens
+
+
+# Tamaños por defecto de la ingesta por lotes
+EMBEDDING_BATCH_SIZE = 256
+MAX_CHUNKS_POR_ADD = 1000
+
+# Tamaño de página de los recorridos por metadatos (sin embeddings)
+TAMANO_PAGINA = 500
+
+# Colecciones de WABUN y formato de exportación en flujo (JSONL)
+COLECCIONES = ("interactions", "decretos", "actas", "entidades")
+FORMATO_EXPORTACION = "wabun-jsonl-1"
+
+# Descripción de cada colección (metadatos de ChromaDB)
+DESCRIPCIONES_COLECCIONES = {
+    "interactions": "Interacciones entre Fundador y motores IA",
+    "decretos": "Protocolos, leyes y principios de CAELION",
+    "actas": "Resúmenes de ciclos de 72h",
+    "entidades": "Personas, proyectos, conceptos clave"
+}
+
+# Almacenes de vectores: ChromaDB (HNSW en float32) o NumPy cuantizado (ver wabun_vectores)
+BACKENDS = ("chroma", "numpy")
+
+# Opciones de la deduplicación de chunks en la ingesta (ver wabun_duplicados)
+OPCIONES_DEDUPLICACION = ("umbral_hamming", "roles", "campos_ambito", "max_recientes")
+
+# Modos de búsqueda: por embeddings, por BM25 o fusionando ambos rankings
+MODOS_BUSQUEDA = ("vectorial", "hibrido", "lexico")
+
+# Constante de la fusión por rango recíproco (RRF): 1 / (K_RRF + rango)
+K_RRF = 60
+
+# Candidatos por resultado que aporta cada ranking antes de filtrar o fusionar
+FACTOR_CANDIDATOS = 4
+
+# Consultas con forma de identificador (DEC-RITMO-72H-V1, int_a1b2, LIANG):
+# una sola palabra con guion, guion bajo o dígito, o en mayúsculas
+_PATRON_ID = re.compile(r"^\S*[-_\d]\S*$")
+
+# Peso por defecto de cada colección en la búsqueda federada
+PESOS_FEDERADOS = {
+    "interactions": 1.0,
+    "decretos": 1.0,
+    "actas": 1.0,
+    "entidades": 1.0
+}
+
+
+def _compresion_por_extension(ruta: str) -> Optional[str]:
+    """Compresión que corresponde a la extensión de un archivo"""
+    return {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}.get(Path(ruta).suffix.lower())
+
+
+def _abrir_archivo(ruta: str, modo: str, compresion: Optional[str] = "auto"):
+    """
+    Abre un archivo de texto UTF-8, opcionalmente comprimido.
+    
+    Args:
+        ruta: Ruta del archivo
+        modo: 'r' para leer o 'w' para escribir
+        compresion: None, 'gzip', 'zstd' o 'auto' (según la extensión)
+        
+    Returns:
+        Objeto de archivo en modo texto
+    """
+    if compresion == "auto":
+        compresion = _compresion_por_extension(ruta)
+    
+    if compresion is None:
+        return open(ruta, modo, encoding='utf-8')
+    if compresion == "gzip":
+        return gzip.open(ruta, modo + 't', encoding='utf-8')
+    if compresion == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "La compresión zstd requiere el paquete 'zstandard' (pip install zstandard)"
+            ) from e
+        if modo == 'w':
+            binario = zstandard.ZstdCompressor().stream_writer(open(ruta, 'wb'))
+        else:
+            binario = zstandard.ZstdDecompressor().stream_reader(open(ruta, 'rb'))
+        return io.TextIOWrapper(binario, encoding='utf-8')
+    raise ValueError(f"Compresión no soportada: {compresion}")
+
+
+def _codificar_embedding(embedding: Any) -> Optional[str]:
+    """Serializa un embedding como float32 en base64 (exacto y compacto)"""
+    if embedding is None:
+        return None
+    import numpy as np
+    return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode('ascii')
+
+
+def _decodificar_embedding(codificado: Optional[str]) -> Optional[Any]:
+    """Recupera un embedding serializado con `_codificar_embedding`"""
+    if codificado is None:
+        return None
+    import numpy as np
+    return np.frombuffer(base64.b64decode(codificado), dtype=np.float32)
+
 
 class WabunCore:
     """
@@ -25,105 +146,386 @@ class WabunCore:
     decretos, actas y entidades usando ChromaDB.
     """
     
-    def __init__(self, persist_directory: str = "./wabun_db"):
+    def __init__(
+        self,
+        persist_directory: str = "./wabun_db",
+        embedding_function: Optional[Any] = None,
+        cache_embeddings: bool = True,
+        cache_max_entradas: int = 10000,
+        cache_en_disco: bool = False,
+        tamano_pagina: int = TAMANO_PAGINA,
+        lazy: bool = False,
+        instrumentacion: bool = False,
+        contador_tokens: Optional[ContadorTokens] = None,
+        tokens_chunk_interaccion: int = TOKENS_CHUNK_INTERACCION,
+        tokens_chunk_decreto: int = TOKENS_CHUNK_DECRETO,
+        solapamiento_tokens: int = 0,
+        particiones: Optional[str] = None,
+        backend: str = "chroma",
+        opciones_backend: Optional[Dict[str, Any]] = None,
+        solo_lectura: bool = False,
+        deduplicar: bool = False,
+        opciones_deduplicacion: Optional[Dict[str, Any]] = None
+    ):
         """
         Inicializa el núcleo de WABUN.
         
         Args:
             persist_directory: Directorio donde se almacenará la base de datos
+            embedding_function: Función de embeddings (por defecto la de ChromaDB)
+            cache_embeddings: Si memorizar los embeddings ya calculados
+            cache_max_entradas: Tamaño máximo de la caché en memoria
+            cache_en_disco: Si persistir la caché junto a la base de datos
+            tamano_pagina: Registros por página en los recorridos por metadatos
+            lazy: Si diferir la carga de ChromaDB, del modelo de embeddings y
+                de cada colección hasta su primer uso
+            instrumentacion: Si medir chunking, embedding, escrituras y
+                consultas (ver `metricas` y `exportar_metricas`)
+            contador_tokens: Contador de tokens de la fragmentación (por
+                defecto el tokenizador del modelo de embeddings, ver
+                `ContadorTokens.del_modelo`)
+            tokens_chunk_interaccion: Máximo de tokens por chunk de interacción
+            tokens_chunk_decreto: Máximo de tokens por chunk de decreto
+            solapamiento_tokens: Tokens repetidos entre chunks consecutivos
+            particiones: Partir `interactions` en una colección por "mes" o
+                por "ciclo" (por defecto, la granularidad con la que ya se
+                particionó esta memoria, o ninguna)
+            backend: Almacén de vectores, "chroma" o "numpy" (embeddings
+                cuantizados en memoria mapeada, en `vectores/` dentro del
+                directorio de persistencia)
+            opciones_backend: Argumentos del backend NumPy (cuantizacion,
+                reescalar, listas_ivf, sondas; ver `ClienteNumpy`)
+            solo_lectura: Abrir un snapshot inmutable en lugar de la memoria
+                viva (ver `crear_snapshot`); `persist_directory` puede ser la
+                memoria viva, su directorio de snapshots o un snapshot concreto
+            deduplicar: Si guardar como referencias, sin embeber, los chunks
+                de interacción idénticos o casi idénticos a uno reciente
+            opciones_deduplicacion: umbral_hamming, roles, campos_ambito y
+                max_recientes (ver `wabun_duplicados`)
         """
-        self.persist_directory = Path(persist_directory)
-        self.persist_directory.mkdir(parents=True, exist_ok=True)
-        
-        # Configurar ChromaDB con persistencia
-        self.client = chromadb.PersistentClient(
-            path=str(self.persist_directory),
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend no soportado: {backend} (usa uno de {BACKENDS})")
+        desconocidas = set(opciones_deduplicacion or {}) - set(OPCIONES_DEDUPLICACION)
+        if desconocidas:
+            raise ValueError(
+                f"Opciones de deduplicación desconocidas: {sorted(desconocidas)} (usa {list(OPCIONES_DEDUPLICACION)})"
             )
+        self.solo_lectura = solo_lectura
+        self.snapshot: Optional[Dict[str, Any]] = None
+        if solo_lectura:
+            from wabun_snapshots import resolver_snapshot, leer_manifiesto
+            # Los snapshots siempre se escriben con el backend NumPy, y
+            # `refrescar_snapshot` vuelve a resolver el origen
+            self._origen_snapshot = Path(persist_directory)
+            self.persist_directory = resolver_snapshot(persist_directory)
+            self.snapshot = leer_manifiesto(self.persist_directory)
+            backend = "numpy"
+            opciones_backend = {**(opciones_backend or {}), **self.snapshot["backend"], "solo_lectura": True}
+            cache_en_disco = False
+        else:
+            self.persist_directory = Path(persist_directory)
+            self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self.tamano_pagina = max(1, tamano_pagina)
+        
+        # Contadores e histogramas de latencia por operación y colección
+        self.metricas = Metricas(activo=instrumentacion)
+        
+        # Fragmentación por tokens
+        self.contador_tokens = contador_tokens or ContadorTokens.del_modelo(embedding_function)
+
+        self.fragmentador = Fragmentador(self.contador_tokens, solapamiento=solapamiento_tokens)
+        self.tokens_chunk_interaccion = tokens_chunk_interaccion
+        self.tokens_chunk_decreto = tokens_chunk_decreto
+        
+        # Cabeceras de las interacciones, fuera de los metadatos de cada chunk
+        self.cabeceras = AlmacenCabeceras(
+            str(self.persist_directory / "wabun_indices.sqlite3"), solo_lectura=solo_lectura
         )
         
-        # Función de embeddings (usando el modelo por defecto de ChromaDB)
-        # En producción, considera usar OpenAI embeddings o modelos locales
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        # Índice BM25 del texto de los chunks, para la búsqueda léxica e híbrida
+        self.indice_lexico = IndiceLexico(
+            str(self.persist_directory / "wabun_lexico.sqlite3"), solo_lectura=solo_lectura
+        )
         
-        # Inicializar las cuatro colecciones principales
-        self._init_collections()
+        # Huellas de los chunks recientes y referencias de sus copias
+        self.duplicados = IndiceDuplicados(
+            str(self.persist_directory / "wabun_indices.sqlite3"), solo_lectura=solo_lectura
+        )
+        self.deduplicar = deduplicar and not solo_lectura
+        self._opciones_deduplicacion = dict(opciones_deduplicacion or {})
+        self._dimension_embeddings: Optional[int] = None
+        
+        # Particiones temporales de las interacciones
+        self.catalogo_particiones = CatalogoParticiones(
+            str(self.persist_directory / "wabun_indices.sqlite3"), solo_lectura=solo_lectura
+        )
+        granularidad = self.catalogo_particiones.granularidad("interactions")
+        if particiones and granularidad and particiones != granularidad:
+            raise ValueError(
+                f"Las interacciones ya están particionadas por {granularidad}, no por {particiones}"
+            )
+        self.particiones = particiones or granularidad
+        self._interacciones_particionadas: Optional[ColeccionParticionada] = None
+        # Recursos del snapshot anterior, que se cierran en el refresco siguiente
+        self._generacion_retirada: Optional[Tuple[Any, ...]] = None
+        
+        # Tiempo (ms) de cada fase de arranque, en orden de carga
+        self.tiempos_arranque: Dict[str, float] = {}
+        self._lock_carga = threading.RLock()
+        self.backend = backend
+        self._opciones_backend = dict(opciones_backend or {})
+        self._client = None
+        self._embedding_function = None
+        self._embedding_function_base = embedding_function
+        self._config_cache = (cache_embeddings, cache_max_entradas, cache_en_disco)
+        self._colecciones: Dict[str, Any] = {}
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        
+        if not lazy:
+            # Inicializar las cuatro colecciones principales
+            self._init_collections()
         
         # Estado del ciclo actual
         self.ciclo_actual = self._get_ciclo_id()
         self.fase_actual = "Ejecucion"  # Por defecto
         
-    def _init_collections(self):
-        """Inicializa las cuatro colecciones de WABUN"""
+        # Rendimiento de la última ingesta por lotes
+        self.metricas_ultimo_lote: Dict[str, Any] = {}
         
-        # Colección de interacciones (la más dinámica)
-        self.interactions = self.client.get_or_create_collection(
-            name="interactions",
-            embedding_function=self.embedding_function,
-            metadata={"description": "Interacciones entre Fundador y motores IA"}
+        # Hilos para consultar varias colecciones en paralelo
+        self._executor_busquedas = ThreadPoolExecutor(
+            max_workers=len(COLECCIONES),
+            thread_name_prefix="wabun-busqueda"
         )
+    
+    def _medir_arranque(self, fase: str, carga):
+        """Ejecuta una fase de carga y registra su duración"""
+        inicio = time.perf_counter()
+        resultado = carga()
+        self.tiempos_arranque[fase] = (time.perf_counter() - inicio) * 1000
+        return resultado
+    
+    @property
+    def client(self):
+        """Cliente persistente del backend de vectores (se abre en el primer uso)"""
+        if self._client is None:
+            with self._lock_carga:
+                if self._client is None and self.backend == "numpy":
+                    from wabun_vectores import ClienteNumpy
+                    self._client = self._medir_arranque("cliente", lambda: ClienteNumpy(
+                        str(self.persist_directory / "vectores"), **self._opciones_backend
+                    ))
+                if self._client is None:
+                    chromadb = self._medir_arranque(
+                        "importar_chromadb", lambda: importlib.import_module("chromadb")
+                    )
+                    from chromadb.config import Settings
+                    
+                    # Configurar ChromaDB con persistencia
+                    self._client = self._medir_arranque("cliente", lambda: chromadb.PersistentClient(
+                        path=str(self.persist_directory),
+                        settings=Settings(
+                            anonymized_telemetry=False,
+                            allow_reset=True
+                        )
+                    ))
+        return self._client
+    
+    @property
+    def embedding_function(self):
+        """Función de embeddings de WABUN (con caché, si está activada)"""
+        if self._embedding_function is None:
+            with self._lock_carga:
+                if self._embedding_function is None:
+                    self._embedding_function = self._medir_arranque(
+                        "modelo_embeddings", self._crear_embedding_function
+                    )
+        return self._embedding_function
+    
+    def _crear_embedding_function(self):
+        # Función de embeddings (usando el modelo por defecto de ChromaDB)
+        # En producción, considera usar OpenAI embeddings o modelos locales
+        embedding_function = self._embedding_function_base
+        if embedding_function is None:
+            from chromadb.utils import embedding_functions
+            embedding_function = embedding_functions.DefaultEmbeddingFunction()
         
-        # Colección de decretos (documentos fundacionales)
-        self.decretos = self.client.get_or_create_collection(
-            name="decretos",
-            embedding_function=self.embedding_function,
-            metadata={"description": "Protocolos, leyes y principios de CAELION"}
-        )
+        # Caché por contenido: los textos repetidos no vuelven a pasar por el modelo
+        cache_embeddings, cache_max_entradas, cache_en_disco = self._config_cache
+        if cache_embeddings:
+            self.embedding_cache = EmbeddingCache(
+                embedding_function,
+                max_entradas=cache_max_entradas,
+                ruta_disco=(
+                    str(self.persist_directory / "embedding_cache.sqlite3")
+                    if cache_en_disco else None
+                )
+            )
+            embedding_function = self.embedding_cache
+        return embedding_function
+    
+    def _coleccion(self, nombre: str):
+        """Abre (o crea) una colección en su primer uso"""
+        coleccion = self._colecciones.get(nombre)
+        if coleccion is None:
+            with self._lock_carga:
+                coleccion = self._colecciones.get(nombre)
+                if coleccion is None:
+                    client = self.client
+                    embedding_function = self.embedding_function
+                    coleccion = self._medir_arranque(
+                        f"coleccion_{nombre}",
+                        lambda: client.get_or_create_collection(
+                            name=nombre,
+                            embedding_function=embedding_function,
+                            metadata={"description": DESCRIPCIONES_COLECCIONES[nombre]}
+                        )
+                    )
+                    self._colecciones[nombre] = coleccion
+        return coleccion
+    
+    @property
+    def interactions(self):
+        """Colección de interacciones (la más dinámica), particionada si se configuró"""
+        base = self._coleccion("interactions")
+        if not self.particiones:
+            return base
+        if self._interacciones_particionadas is None:
+            with self._lock_carga:
+                if self._interacciones_particionadas is None:
+                    self._interacciones_particionadas = ColeccionParticionada(
+                        base,
+                        self.client,
+                        self.embedding_function,
+                        self.catalogo_particiones,
+                        self.particiones
+                    )
+        return self._interacciones_particionadas
+    
+    @property
+    def decretos(self):
+        """Colección de decretos (documentos fundacionales)"""
+        return self._coleccion("decretos")
+    
+    @property
+    def actas(self):
+        """Colección de actas (resúmenes de ciclos)"""
+        return self._coleccion("actas")
+    
+    @property
+    def entidades(self):
+        """Colección de entidades (conocimiento estructurado)"""
+        return self._coleccion("entidades")
+    
+    def _init_collections(self):
+        """Inicializa las cuatro colecciones de WABUN"""
+        for nombre in COLECCIONES:
+            self._coleccion(nombre)
+    
+    def warmup(self) -> Dict[str, float]:
+        """
+        Carga todo lo que el modo lazy difiere, para workers de larga vida.
         
-        # Colección de actas (resúmenes de ciclos)
-        self.actas = self.client.get_or_create_collection(
-            name="actas",
-            embedding_function=self.embedding_function,
-            metadata={"description": "Resúmenes de ciclos de 72h"}
-        )
+        Abre el cliente y las cuatro colecciones y ejecuta un embedding de
+        prueba, de modo que el modelo quede cargado antes de la primera
+        petición real.
         
-        # Colección de entidades (conocimiento estructurado)
-        self.entidades = self.client.get_or_create_collection(
-            name="entidades",
-            embedding_function=self.embedding_function,
-            metadata={"description": "Personas, proyectos, conceptos clave"}
+        Returns:
+            Tiempos de arranque por fase en milisegundos (ver `informe_arranque`)
+        """
+        self._init_collections()
+        if "primer_embedding" not in self.tiempos_arranque:
+            funcion = self.embedding_function
+            if self.embedding_cache is not None:
+                # Evitar la caché para que el modelo se cargue de verdad
+                funcion = self.embedding_cache._funcion
+            self._medir_arranque("primer_embedding", lambda: funcion(["warmup"]))
+        return self.informe_arranque()
+    
+    def cerrar(self):
+        """
+        Libera los hilos y las conexiones del núcleo.
+        
+        Detiene el pool de búsquedas y el de las particiones (esperando a
+        las consultas en curso) y cierra los almacenes SQLite, la caché de
+        embeddings y el cliente del backend NumPy. Después el núcleo ya no
+        se puede usar.
+        """
+        self._executor_busquedas.shutdown(wait=True)
+        with self._lock_carga:
+            generaciones = [self._generacion(), self._generacion_retirada]
+            self._interacciones_particionadas = None
+            self._generacion_retirada = None
+            if self.embedding_cache is not None:
+                self.embedding_cache.cerrar()
+        for generacion in generaciones:
+            if generacion is not None:
+                self._cerrar_generacion(generacion)
+    
+    def _generacion(self) -> Tuple[Any, ...]:
+        """Recursos abiertos sobre el directorio actual (ver `refrescar_snapshot`)"""
+        return (
+            self._client,
+            self._interacciones_particionadas,
+            self.cabeceras,
+            self.indice_lexico,
+            self.duplicados,
+            self.catalogo_particiones
         )
+    
+    @staticmethod
+    def _cerrar_generacion(generacion: Tuple[Any, ...]):
+        """Cierra el cliente, el pool de particiones y los almacenes SQLite de una generación"""
+        cliente, particionada, *almacenes = generacion
+        if particionada is not None:
+            particionada.cerrar()
+        for almacen in almacenes:
+            almacen.cerrar()
+        # ChromaDB no expone cómo cerrar su cliente persistente
+        cerrar_cliente = getattr(cliente, "cerrar", None)
+        if callable(cerrar_cliente):
+            cerrar_cliente()
+    
+    def informe_arranque(self) -> Dict[str, float]:
+        """
+        Obtiene el desglose del tiempo de arranque.
         
+        Returns:
+            Milisegundos por fase cargada hasta ahora y su total
+        """
+        informe = dict(self.tiempos_arranque)
+        informe["total"] = sum(self.tiempos_arranque.values())
+        return informe
+    
     def _get_ciclo_id(self) -> str:
         """Genera el identificador del ciclo actual basado en la fecha"""
         return f"ciclo_{datetime.now(timezone.utc).strftime('%Y-%m-%d')}"
     
-    def _chunk_text(self, text: str, chunk_size: int = 500) -> List[str]:
+    def _tramos_texto(
+        self,
+        text: str,
+        max_tokens: int,
+        coleccion: Optional[str] = None
+    ) -> List[Tuple[int, int]]:
         """
-        Divide un texto en fragmentos semánticos.
+        Divide un texto en fragmentos semánticos de como mucho `max_tokens`.
+        
+        Solo se guardan las posiciones de cada chunk, no su texto: los
+        chunks se extraen de uno en uno al pasar por el embedding y el
+        `add`, y conocer el número total permite rellenar `total_chunks`.
         
         Args:
             text: Texto a fragmentar
-            chunk_size: Tamaño aproximado de cada fragmento en caracteres
+            max_tokens: Máximo de tokens por chunk
+            coleccion: Colección de destino (para las métricas)
             
         Returns:
-            Lista de fragmentos de texto
+            Lista de tuplas (inicio, fin) de cada chunk en `text`
         """
-        # Implementación simple: dividir por párrafos y agrupar
-        paragraphs = text.split('\n\n')
-        chunks = []
-        current_chunk = ""
-        
-        for para in paragraphs:
-            if len(current_chunk) + len(para) < chunk_size:
-                current_chunk += para + "\n\n"
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para + "\n\n"
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        # Si el texto es muy corto, devolver como un solo chunk
-        if not chunks:
-            chunks = [text]
-            
-        return chunks
+        with self.metricas.medir("chunking", coleccion):
+            return list(self.fragmentador.tramos(text, max_tokens))
     
-    def registrar_interaccion(
+    def _preparar_interaccion(
         self,
         prompt_fundador: str,
         respuesta_ia: str,
@@ -133,35 +535,35 @@ class WabunCore:
         palabras_clave: Optional[List[str]] = None,
         proyecto_asociado: Optional[str] = None,
         importancia: int = 3,
-        estado_decision: str = "Propuesta"
-    ) -> str:
+        estado_decision: str = "Propuesta",
+        timestamp_utc: Optional[int] = None,
+        ciclo_id: Optional[str] = None,
+        fase_ciclo: Optional[str] = None,
+        interaction_id: Optional[str] = None
+    ) -> Tuple[str, Iterator[Tuple[List[str], List[str], List[Dict[str, Any]]]]]:
         """
-        Registra una interacción completa (prompt + respuesta) en WABUN.
+        Fragmenta una interacción y construye sus ids y metadatos por chunk.
+        
+        `timestamp_utc`, `ciclo_id` y `fase_ciclo` permiten registrar
+        interacciones históricas; por defecto se usan el momento y el
+        ciclo actuales. Un `interaction_id` ya asignado (por ejemplo, en
+        el diario de escritura) se conserva, y con él los ids de los chunks.
         
-        Args:
-            prompt_fundador: El texto del prompt del Fundador
-            respuesta_ia: La respuesta generada por el motor de IA
-            custodio_invocado: Custodio al que se dirige la intención
-            motor_ia_usado: Nombre del LLM usado
-            intencion_fundador: Resumen de la intención (opcional)
-            palabras_clave: Lista de palabras clave (opcional)
-            proyecto_asociado: Proyecto relacionado (opcional)
-            importancia: Nivel de importancia 1-5
-            estado_decision: Estado de la decisión
-            
         Returns:
-            El interaction_id generado
+            Tupla (interaction_id, fragmentos), donde fragmentos genera
+            tuplas (ids, documentos, metadatas) aptas para `_ingerir_lote`
         """
         # Generar ID único para esta interacción
-        interaction_id = f"int_{uuid.uuid4()}"
-        timestamp_utc = int(datetime.now(timezone.utc).timestamp())
+        interaction_id = interaction_id or f"int_{uuid.uuid4()}"
+        if timestamp_utc is None:
+            timestamp_utc = int(datetime.now(timezone.utc).timestamp())
         
         # Metadatos comunes
         base_metadata = {
             "interaction_id": interaction_id,
             "timestamp_utc": timestamp_utc,
-            "ciclo_id": self.ciclo_actual,
-            "fase_ciclo": self.fase_actual,
+            "ciclo_id": ciclo_id or self.ciclo_actual,
+            "fase_ciclo": fase_ciclo or self.fase_actual,
             "custodio_invocado": custodio_invocado,
             "motor_ia_usado": motor_ia_usado,
             "intencion_fundador": intencion_fundador or "No especificada",
@@ -171,210 +573,2077 @@ class WabunCore:
             "estado_decision": estado_decision
         }
         
-        # Procesar prompt del Fundador
-        prompt_chunks = self._chunk_text(prompt_fundador)
-        prompt_ids = []
-        prompt_metadatas = []
+        def fragmentos():
+            # Prompt del Fundador y respuesta de la IA, chunk a chunk
+            for rol, parte, texto in (
+                ("Fundador", "prompt", prompt_fundador),
+                ("Motor_IA", "response", respuesta_ia)
+            ):
+                tramos = self._tramos_texto(texto, self.tokens_chunk_interaccion, "interactions")
+                for idx, (inicio, fin) in enumerate(tramos):
+                    chunk_metadata = {
+                        **base_metadata,
+                        "rol": rol,
+                        "chunk_index": idx,
+                        "total_chunks": len(tramos)
+                    }
+                    yield (
+                        [f"{interaction_id}-{parte}-{idx}"],
+                        [texto[inicio:fin]],
+                        [chunk_metadata]
+                    )
         
-        for idx, chunk in enumerate(prompt_chunks):
-            chunk_id = f"{interaction_id}-prompt-{idx}"
-            chunk_metadata = {
-                **base_metadata,
-                "rol": "Fundador",
-                "chunk_index": idx,
-                "total_chunks": len(prompt_chunks)
-            }
-            prompt_ids.append(chunk_id)
-            prompt_metadatas.append(chunk_metadata)
+        return interaction_id, fragmentos()
+    
+    def _escribir_lote(
+        self,
+        coleccion,
+        ids: List[str],
+        documentos: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[List[Any]] = None,
+        reemplazar: bool = False
+    ):
+        """
+        Punto único de escritura hacia ChromaDB.
         
-        # Procesar respuesta de la IA
-        respuesta_chunks = self._chunk_text(respuesta_ia)
-        respuesta_ids = []
-        respuesta_metadatas = []
+        Si no se proporcionan embeddings, se calculan aquí con la función
+        de embeddings de WABUN (la misma que usaría la colección), para
+        medir por separado el embedding y la escritura. Con `reemplazar` se
+        usa `upsert`, de modo que reescribir los mismos ids es idempotente.
         
-        for idx, chunk in enumerate(respuesta_chunks):
-            chunk_id = f"{interaction_id}-response-{idx}"
-            chunk_metadata = {
-                **base_metadata,
-                "rol": "Motor_IA",
-                "chunk_index": idx,
-                "total_chunks": len(respuesta_chunks)
-            }
-            respuesta_ids.append(chunk_id)
-            respuesta_metadatas.append(chunk_metadata)
-        
-        # Insertar en ChromaDB
-        all_ids = prompt_ids + respuesta_ids
-        all_documents = prompt_chunks + respuesta_chunks
-        all_metadatas = prompt_metadatas + respuesta_metadatas
-        
-        self.interactions.add(
-            ids=all_ids,
-            documents=all_documents,
-            metadatas=all_metadatas
-        )
+        En `interactions`, la cabecera de cada interacción se guarda en el
+        almacén de cabeceras y los chunks solo conservan los campos
+        filtrables. El índice léxico recibe los metadatos completos.
+        """
+        self._comprobar_escritura()
+        nombre = coleccion.name
+        self.indice_lexico.indexar(nombre, ids, documentos, metadatas)
+        if nombre == "interactions":
+            cabeceras = {}
+            for metadata in metadatas:
+                if "interaction_id" in metadata:
+                    cabeceras.setdefault(metadata["interaction_id"], AlmacenCabeceras.extraer(metadata))
+            # La cabecera se escribe antes que los chunks que la referencian
+            self.cabeceras.guardar(cabeceras)
+            metadatas = [AlmacenCabeceras.recortar(metadata) for metadata in metadatas]
+        if embeddings is None:
+            embeddings = self._embeber_documentos(documentos, nombre)
+        escribir = coleccion.upsert if reemplazar else coleccion.add
+        with self.metricas.medir("escritura", nombre, len(ids)):
+            escribir(
+                ids=ids,
+                documents=documentos,
+                metadatas=metadatas,
+                embeddings=embeddings
+            )
+    
+    def _comprobar_escritura(self):
+        """Las escrituras no se admiten sobre un snapshot"""
+        if self.solo_lectura:
+            raise ValueError(
+                f"Memoria de solo lectura (snapshot {self.persist_directory.name}); escribe en la memoria viva"
+            )
+    
+    def _embeber_documentos(
+        self,
+        documentos: List[str],
+        coleccion: Optional[str] = None
+    ) -> List[Any]:
+        """Embebe documentos con la función de WABUN, midiendo el tiempo"""
+        with self.metricas.medir("embedding", coleccion, len(documentos)):
+            embeddings = self.embedding_function(documentos)
+        if len(embeddings) and self._dimension_embeddings is None:
+            self._dimension_embeddings = len(embeddings[0])
+        return embeddings
+    
+    def _actualizar_metadatas(
+        self,
+        coleccion,
+        ids: List[str],
+        metadatas: List[Dict[str, Any]],
+        reindexar: bool = True
+    ):
+        """
+        Reemplaza los metadatos de chunks existentes, sin re-embeber.
         
-        print(f"✓ Interacción registrada: {interaction_id}")
-        print(f"  - Custodio: {custodio_invocado}")
-        print(f"  - Chunks almacenados: {len(all_ids)}")
+        Con `reindexar` los metadatos (completos) se llevan también al
+        índice léxico; si solo se eliminan campos, no hace falta.
+        """
+        self._comprobar_escritura()
+        max_add = self._max_chunks_por_add(MAX_CHUNKS_POR_ADD)
+        with self.metricas.medir("actualizacion", coleccion.name, len(ids)):
+            for i in range(0, len(ids), max_add):
+                coleccion.update(ids=ids[i:i + max_add], metadatas=metadatas[i:i + max_add])
+        if reindexar:
+            self.indice_lexico.actualizar_claves(coleccion.name, ids, metadatas)
+    
+    def _borrar_lote(self, coleccion, ids: List[str]):
+        """
+        Punto único de borrado de chunks por id.
         
-        return interaction_id
+        En `interactions`, los chunks canónicos con referencias de otras
+        interacciones se sustituyen antes por una de ellas (ver
+        `_promover_referencias`), y las referencias borradas salen del
+        índice de duplicados.
+        """
+        self._comprobar_escritura()
+        max_add = self._max_chunks_por_add(MAX_CHUNKS_POR_ADD)
+        promovidos = self._promover_referencias(coleccion, ids) if coleccion.name == "interactions" else {}
+        with self.metricas.medir("borrado", coleccion.name, len(ids)):
+            for i in range(0, len(ids), max_add):
+                coleccion.delete(ids=ids[i:i + max_add])
+        self.indice_lexico.borrar(coleccion.name, ids)
+        if coleccion.name == "interactions":
+            self.duplicados.borrar(coleccion.name, ids, promovidos)
     
-    def registrar_decreto(
+    def _promover_referencias(self, coleccion, ids: List[str]) -> Dict[str, str]:
+        """
+        Escribe como chunk propio una referencia de cada canónico que se va a borrar.
+        
+        La referencia se escribe con su texto, sus metadatos y el embedding
+        del canónico (nunca se embebió: era idéntica o casi idéntica), de
+        modo que su interacción conserva el chunk aunque la retención borre
+        la interacción original.
+        
+        Returns:
+            Diccionario {canonico: id de la referencia promovida}
+        """
+        promociones = self.duplicados.promociones(coleccion.name, ids)
+        promovidos: Dict[str, str] = {}
+        canonicos = list(promociones)
+        max_add = self._max_chunks_por_add(MAX_CHUNKS_POR_ADD)
+        for i in range(0, len(canonicos), max_add):
+            pagina = coleccion.get(ids=canonicos[i:i + max_add], include=["documents", "embeddings"])
+            if not pagina["ids"]:
+                continue
+            referencias = [promociones[canonico] for canonico in pagina["ids"]]
+            documentos = [
+                referencia["documento"] or documento
+                for referencia, documento in zip(referencias, pagina["documents"])
+            ]
+            self._escribir_lote(
+                coleccion,
+                [referencia["chunk_id"] for referencia in referencias],
+                documentos,
+                [referencia["metadata"] for referencia in referencias],
+                pagina["embeddings"],
+                reemplazar=True
+            )
+            promovidos.update((r["canonico"], r["chunk_id"]) for r in referencias)
+        return promovidos
+    
+    def _max_chunks_por_add(self, solicitado: int) -> int:
+        """Acota el tamaño de un add al máximo que admite el cliente de ChromaDB"""
+        limite_cliente = None
+        if hasattr(self.client, "get_max_batch_size"):
+            limite_cliente = self.client.get_max_batch_size()
+        elif hasattr(self.client, "max_batch_size"):
+            limite_cliente = self.client.max_batch_size
+        if limite_cliente and limite_cliente > 0:
+            return max(1, min(solicitado, limite_cliente))
+        return max(1, solicitado)
+    
+    def _ingerir_lote(
         self,
-        titulo_documento: str,
-        contenido: str,
-        decreto_id: str,
-        custodios_implicados: List[str],
-        tipo_documento: str = "Protocolo",
-        version: float = 1.0,
-        fuente_documento: Optional[str] = None
-    ) -> str:
+        coleccion,
+        fragmentos: Iterable[Tuple[List[str], List[str], List[Dict[str, Any]]]],
+        batch_size: int,
+        max_chunks_por_add: int,
+        reemplazar: bool = False
+    ) -> Dict[str, Any]:
         """
-        Registra un decreto o documento fundacional en WABUN.
+        Embebe y escribe fragmentos de muchos documentos en lotes grandes.
+        
+        Los chunks se acumulan a través de documentos hasta completar
+        `batch_size`, se embeben en una sola llamada y se escriben con
+        `add` acotados a `max_chunks_por_add`.
+        
+        Con `deduplicar`, los chunks de `interactions` idénticos o casi
+        idénticos a uno reciente se separan antes de embeber y se guardan
+        como referencias a él (ver `IndiceDuplicados`).
         
         Args:
-            titulo_documento: Título oficial del documento
-            contenido: Texto completo del documento
-            decreto_id: Identificador único del decreto
-            custodios_implicados: Lista de custodios mencionados
-            tipo_documento: Tipo (Protocolo, Manifiesto, Ley, Principio)
-            version: Versión del documento
-            fuente_documento: Ruta al archivo original
+            coleccion: Colección de destino
+            fragmentos: Iterable de tuplas (ids, documentos, metadatas)
+            batch_size: Chunks por llamada a la función de embeddings
+            max_chunks_por_add: Chunks máximos por llamada a `add`
+            reemplazar: Si escribir con `upsert` (idempotente) en lugar de `add`
             
         Returns:
-            El decreto_id
+            Diccionario con chunks escritos, segundos y chunks por segundo
+            (y, con `deduplicar`, el ahorro en "deduplicacion")
         """
-        fecha_activacion = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        batch_size = max(1, batch_size)
+        max_add = self._max_chunks_por_add(max_chunks_por_add)
+        inicio = time.perf_counter()
+        total_chunks = 0
+        deduplicar = self.deduplicar and coleccion.name == "interactions"
+        opciones = dict(self._opciones_deduplicacion)
+        max_recientes = opciones.pop("max_recientes", MAX_HUELLAS_RECIENTES)
+        referencias_lote: List[Dict[str, Any]] = []
         
-        # Fragmentar el contenido
-        chunks = self._chunk_text(contenido, chunk_size=800)
+        buffer_ids: List[str] = []
+        buffer_docs: List[str] = []
+        buffer_metas: List[Dict[str, Any]] = []
         
-        ids = []
-        metadatas = []
+        def vaciar(ids, docs, metas):
+            huellas, referencias = [], []
+            if deduplicar:
+                with self.metricas.medir("deduplicacion", coleccion.name, len(ids)):
+                    nuevos, huellas, referencias = self.duplicados.separar(
+                        coleccion.name, ids, docs, metas, **opciones
+                    )
+                if referencias:
+                    ids = [ids[i] for i in nuevos]
+                    docs = [docs[i] for i in nuevos]
+                    metas = [metas[i] for i in nuevos]
+            embeddings = self._embeber_documentos(docs, coleccion.name) if ids else []
+            for i in range(0, len(ids), max_add):
+                self._escribir_lote(
+                    coleccion,
+                    ids[i:i + max_add],
+                    docs[i:i + max_add],
+                    metas[i:i + max_add],
+                    embeddings[i:i + max_add],
+                    reemplazar=reemplazar
+                )
+            if deduplicar:
+                # Las referencias se registran cuando sus canónicos ya existen
+                self._registrar_referencias(huellas, referencias, max_recientes)
+                referencias_lote.extend(referencias)
         
-        for idx, chunk in enumerate(chunks):
-            chunk_id = f"{decreto_id}-{idx}"
-            metadata = {
-                "decreto_id": decreto_id,
-                "titulo_documento": titulo_documento,
-                "fecha_activacion": fecha_activacion,
-                "custodios_implicados": json.dumps(custodios_implicados),
-                "tipo_documento": tipo_documento,
-                "version": version,
-                "fuente_documento": fuente_documento or "N/A",
-                "chunk_index": idx,
-                "total_chunks": len(chunks)
-            }
-            ids.append(chunk_id)
-            metadatas.append(metadata)
+        for ids, docs, metas in fragmentos:
+            buffer_ids.extend(ids)
+            buffer_docs.extend(docs)
+            buffer_metas.extend(metas)
+            
+            while len(buffer_ids) >= batch_size:
+                vaciar(
+                    buffer_ids[:batch_size],
+                    buffer_docs[:batch_size],
+                    buffer_metas[:batch_size]
+                )
+                total_chunks += batch_size
+                del buffer_ids[:batch_size]
+                del buffer_docs[:batch_size]
+                del buffer_metas[:batch_size]
         
-        self.decretos.add(
-            ids=ids,
-            documents=chunks,
-            metadatas=metadatas
-        )
+        if buffer_ids:
+            vaciar(buffer_ids, buffer_docs, buffer_metas)
+            total_chunks += len(buffer_ids)
         
-        print(f"✓ Decreto registrado: {decreto_id}")
-        print(f"  - Título: {titulo_documento}")
-        print(f"  - Chunks almacenados: {len(ids)}")
+        segundos = time.perf_counter() - inicio
+        resultado = {
+            "chunks": total_chunks,
+            "segundos": segundos,
+            "chunks_por_segundo": total_chunks / segundos if segundos > 0 else 0.0
+        }
+        if deduplicar:
+            ahorro = IndiceDuplicados.resumir(referencias_lote)
+            ahorro["bytes_vectores_evitados"] = (
+                ahorro["embeddings_evitados"] * self._dimension_vectores(coleccion) * 4
+            )
+            resultado["deduplicacion"] = ahorro
+        return resultado
+    
+    def _registrar_referencias(
+        self,
+        huellas: List[Dict[str, Any]],
+        referencias: List[Dict[str, Any]],
+        max_recientes: int = MAX_HUELLAS_RECIENTES
+    ):
+        """
+        Registra huellas y referencias de chunks duplicados (ver `IndiceDuplicados`).
         
-        return decreto_id
+        Los canónicos ya deben estar escritos. La cabecera de una
+        interacción se guarda aunque ninguno de sus chunks llegue a la
+        colección, y el texto propio de las copias casi idénticas entra en
+        el índice léxico con su id (`_buscar_lexico` lo resuelve al
+        canónico); las copias exactas no lo necesitan.
+        """
+        self._comprobar_escritura()
+        cabeceras = {}
+        for referencia in referencias:
+            metadata = referencia["metadata"]
+            if "interaction_id" in metadata:
+                cabeceras.setdefault(metadata["interaction_id"], AlmacenCabeceras.extraer(metadata))
+        self.cabeceras.guardar(cabeceras)
+        self._indexar_similares(referencias)
+        self.duplicados.guardar(huellas, referencias, max_recientes)
     
-    def buscar_contexto_reciente(
+    def _indexar_similares(self, referencias: Iterable[Dict[str, Any]]) -> int:
+        """Añade al índice léxico las referencias casi idénticas (con su propio texto)"""
+        similares = [r for r in referencias if r["tipo"] == "similar" and r["documento"]]
+        for referencia in similares:
+            self.indice_lexico.indexar(
+                referencia["coleccion"],
+                [referencia["chunk_id"]],
+                [referencia["documento"]],
+                [referencia["metadata"]]
+            )
+        return len(similares)
+    
+    def _dimension_vectores(self, coleccion) -> int:
+        """Dimensión de los embeddings (de la última llamada o de un chunk guardado)"""
+        if self._dimension_embeddings is None:
+            pagina = coleccion.get(limit=1, include=["embeddings"])
+            if pagina["ids"]:
+                self._dimension_embeddings = len(pagina["embeddings"][0])
+        return self._dimension_embeddings or 0
+    
+    def registrar_interaccion(
         self,
-        query: str,
-        n_results: int = 10,
-        filtros: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
+        prompt_fundador: str,
+        respuesta_ia: str,
+        custodio_invocado: str,
+        motor_ia_usado: str,
+        intencion_fundador: Optional[str] = None,
+        palabras_clave: Optional[List[str]] = None,
+        proyecto_asociado: Optional[str] = None,
+        importancia: int = 3,
+        estado_decision: str = "Propuesta",
+        timestamp_utc: Optional[int] = None,
+        ciclo_id: Optional[str] = None,
+        fase_ciclo: Optional[str] = None,
+        interaction_id: Optional[str] = None
+    ) -> str:
         """
-        Busca en las interacciones recientes usando búsqueda semántica.
+        Registra una interacción completa (prompt + respuesta) en WABUN.
         
         Args:
-            query: Texto de búsqueda
-            n_results: Número de resultados a devolver
-            filtros: Filtros adicionales para metadatos (ej. {"custodio_invocado": "LIANG"})
+            prompt_fundador: El texto del prompt del Fundador
+            respuesta_ia: La respuesta generada por el motor de IA
+            custodio_invocado: Custodio al que se dirige la intención
+            motor_ia_usado: Nombre del LLM usado
+            intencion_fundador: Resumen de la intención (opcional)
+            palabras_clave: Lista de palabras clave (opcional)
+            proyecto_asociado: Proyecto relacionado (opcional)
+            importancia: Nivel de importancia 1-5
+            estado_decision: Estado de la decisión
+            timestamp_utc: Momento de la interacción (por defecto ahora)
+            ciclo_id: Ciclo de la interacción (por defecto el actual)
+            fase_ciclo: Fase del ciclo (por defecto la actual)
+            interaction_id: Id ya asignado a la interacción (por defecto uno nuevo)
             
         Returns:
-            Diccionario con resultados y metadatos
+            El interaction_id generado
         """
-        where_clause = filtros or {}
+        interaction_id, fragmentos = self._preparar_interaccion(
+            prompt_fundador=prompt_fundador,
+            respuesta_ia=respuesta_ia,
+            custodio_invocado=custodio_invocado,
+            motor_ia_usado=motor_ia_usado,
+            intencion_fundador=intencion_fundador,
+            palabras_clave=palabras_clave,
+            proyecto_asociado=proyecto_asociado,
+            importancia=importancia,
+            estado_decision=estado_decision,
+            timestamp_utc=timestamp_utc,
+            ciclo_id=ciclo_id,
+            fase_ciclo=fase_ciclo,
+            interaction_id=interaction_id
+        )
         
-        results = self.interactions.query(
-            query_texts=[query],
-            n_results=n_results,
-            where=where_clause,
-            include=["documents", "metadatas", "distances"]
+        # Insertar en ChromaDB: los chunks pasan en flujo por embedding y add
+        resultado = self._ingerir_lote(
+            self.interactions, fragmentos, EMBEDDING_BATCH_SIZE, MAX_CHUNKS_POR_ADD
         )
         
-        return results
+        print(f"✓ Interacción registrada: {interaction_id}")
+        print(f"  - Custodio: {custodio_invocado}")
+        print(f"  - Chunks almacenados: {resultado['chunks']}")
+        if resultado.get("deduplicacion", {}).get("embeddings_evitados"):
+            print(f"  - Chunks duplicados (referencias): {resultado['deduplicacion']['embeddings_evitados']}")
+        
+        return interaction_id
     
-    def buscar_en_decretos(
+    def registrar_interacciones_lote(
         self,
-        query: str,
-        n_results: int = 5
-    ) -> Dict[str, Any]:
+        interacciones: Iterable[Dict[str, Any]],
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_chunks_por_add: int = MAX_CHUNKS_POR_ADD,
+        reemplazar: bool = False
+    ) -> List[str]:
         """
-        Busca en los decretos y documentos fundacionales.
+        Registra muchas interacciones con embeddings y escrituras por lotes.
+        
+        Pensado para migrar sesiones pasadas: los chunks de varias
+        interacciones se embeben juntos y se escriben en `add` masivos,
+        evitando el coste fijo de una llamada por interacción.
         
         Args:
-            query: Texto de búsqueda
-            n_results: Número de resultados
+            interacciones: Iterable de diccionarios con los mismos argumentos
+                que `registrar_interaccion` (prompt_fundador, respuesta_ia,
+                custodio_invocado, motor_ia_usado, ...) y, para sesiones
+                pasadas, opcionalmente timestamp_utc, ciclo_id y fase_ciclo
+            batch_size: Chunks por llamada a la función de embeddings
+            max_chunks_por_add: Chunks máximos por llamada a `add`
+            reemplazar: Si escribir con `upsert`, de modo que repetir
+                interacciones con interaction_id ya asignado no las duplica
             
         Returns:
-            Diccionario con resultados
+            Lista de interaction_id generados, en el orden de entrada
         """
-        results = self.decretos.query(
-            query_texts=[query],
-            n_results=n_results,
-            include=["documents", "metadatas", "distances"]
+        interaction_ids: List[str] = []
+        
+        def fragmentos():
+            for interaccion in interacciones:
+                interaction_id, fragmentos_interaccion = self._preparar_interaccion(**interaccion)
+                interaction_ids.append(interaction_id)
+                yield from fragmentos_interaccion
+        
+        resultado = self._ingerir_lote(
+            self.interactions, fragmentos(), batch_size, max_chunks_por_add, reemplazar
         )
+        self.metricas_ultimo_lote = {**resultado, "documentos": len(interaction_ids)}
         
-        return results
+        print(f"✓ Lote de interacciones registrado: {len(interaction_ids)}")
+        print(f"  - Chunks almacenados: {resultado['chunks']}")
+        print(f"  - Rendimiento: {resultado['chunks_por_segundo']:.1f} chunks/s")
+        if "deduplicacion" in resultado:
+            ahorro = resultado["deduplicacion"]
+            print(f"  - Duplicados: {ahorro['exactos']} exactos, {ahorro['similares']} casi idénticos "
+                  f"({ahorro['bytes_vectores_evitados'] / 1e6:.2f} MB de vectores evitados)")
+        
+        return interaction_ids
     
-    def obtener_contexto_ciclo_actual(self) -> Dict[str, Any]:
+    @staticmethod
+    def _hash_chunk(texto: str) -> str:
+        """Huella del contenido de un chunk (16 caracteres hexadecimales)"""
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+    
+    def _chunks_decreto(self, decreto_id: str, contenido: str) -> List[Tuple[str, str, int, int]]:
         """
-        Obtiene todas las interacciones del ciclo actual.
+        Fragmenta un decreto y asigna a cada chunk un id por contenido.
+        
+        El id es `{decreto_id}-{hash}-{k}`, donde `k` distingue chunks de
+        texto idéntico dentro del mismo decreto. Un chunk que no cambia
+        entre versiones conserva su id aunque cambie de posición.
         
         Returns:
-            Diccionario con todas las interacciones del ciclo
+            Lista de tuplas (chunk_id, hash, inicio, fin) en orden
         """
-        # Nota: ChromaDB tiene límites en get(), así que usamos query con filtro
-        results = self.interactions.query(
-            query_texts=["resumen del ciclo actual"],
-            n_results=100,  # Ajustar según necesidad
-            where={"ciclo_id": self.ciclo_actual}
-        )
-        
-        return results
+        tramos = self._tramos_texto(contenido, self.tokens_chunk_decreto, "decretos")
+        repeticiones: Dict[str, int] = {}
+        chunks = []
+        for inicio, fin in tramos:
+            huella = self._hash_chunk(contenido[inicio:fin])
+            k = repeticiones.get(huella, 0)
+            repeticiones[huella] = k + 1
+            chunks.append((f"{decreto_id}-{huella}-{k}", huella, inicio, fin))
+        return chunks
     
-    def estadisticas(self) -> Dict[str, int]:
+    def _preparar_decreto(
+        self,
+        titulo_documento: str,
+        contenido: str,
+        decreto_id: str,
+        custodios_implicados: List[str],
+        tipo_documento: str = "Protocolo",
+        version: float = 1.0,
+        fuente_documento: Optional[str] = None
+    ) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]]]]:
         """
-        Obtiene estadísticas de la base de datos.
+        Fragmenta un decreto y construye sus ids y metadatos por chunk.
         
-        Returns:
-            Diccionario con contadores
+        Yields:
+            Tuplas (ids, documentos, metadatas) de un chunk, aptas para
+            `_ingerir_lote`
         """
-        return {
-            "total_interacciones": self.interactions.count(),
-            "total_decretos": self.decretos.count(),
-            "total_actas": self.actas.count(),
-            "total_entidades": self.entidades.count(),
+        fecha_activacion = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        
+        # Fragmentar el contenido
+        chunks = self._chunks_decreto(decreto_id, contenido)
+        
+        for idx, (chunk_id, huella, inicio, fin) in enumerate(chunks):
+            metadata = {
+                "decreto_id": decreto_id,
+                "titulo_documento": titulo_documento,
+                "fecha_activacion": fecha_activacion,
+                "custodios_implicados": json.dumps(custodios_implicados),
+                "tipo_documento": tipo_documento,
+                "version": version,
+                "fuente_documento": fuente_documento or "N/A",
+                "chunk_index": idx,
+                "total_chunks": len(chunks),
+                "hash_contenido": huella
+            }
+            yield [chunk_id], [contenido[inicio:fin]], [metadata]
+    
+    def registrar_decreto(
+        self,
+        titulo_documento: str,
+        contenido: str,
+        decreto_id: str,
+        custodios_implicados: List[str],
+        tipo_documento: str = "Protocolo",
+        version: float = 1.0,
+        fuente_documento: Optional[str] = None
+    ) -> str:
+        """
+        Registra un decreto o documento fundacional en WABUN.
+        
+        Args:
+            titulo_documento: Título oficial del documento
+            contenido: Texto completo del documento
+            decreto_id: Identificador único del decreto
+            custodios_implicados: Lista de custodios mencionados
+            tipo_documento: Tipo (Protocolo, Manifiesto, Ley, Principio)
+            version: Versión del documento
+            fuente_documento: Ruta al archivo original
+            
+        Returns:
+            El decreto_id
+        """
+        existente = self.decretos.get(where={"decreto_id": decreto_id}, limit=1, include=[])
+        if existente["ids"]:
+            # Nueva versión de un decreto ya registrado: solo cambia lo distinto
+            self.actualizar_decreto(
+                decreto_id=decreto_id,
+                contenido=contenido,
+                titulo_documento=titulo_documento,
+                custodios_implicados=custodios_implicados,
+                tipo_documento=tipo_documento,
+                version=version,
+                fuente_documento=fuente_documento
+            )
+            return decreto_id
+        
+        fragmentos = self._preparar_decreto(
+            titulo_documento=titulo_documento,
+            contenido=contenido,
+            decreto_id=decreto_id,
+            custodios_implicados=custodios_implicados,
+            tipo_documento=tipo_documento,
+            version=version,
+            fuente_documento=fuente_documento
+        )
+        
+        # Los chunks pasan en flujo por embedding y add: la memoria no
+        # crece con el tamaño del decreto
+        resultado = self._ingerir_lote(
+            self.decretos, fragmentos, EMBEDDING_BATCH_SIZE, MAX_CHUNKS_POR_ADD
+        )
+        
+        print(f"✓ Decreto registrado: {decreto_id}")
+        print(f"  - Título: {titulo_documento}")
+        print(f"  - Chunks almacenados: {resultado['chunks']}")
+        
+        return decreto_id
+    
+    def actualizar_decreto(
+        self,
+        decreto_id: str,
+        contenido: str,
+        titulo_documento: Optional[str] = None,
+        custodios_implicados: Optional[List[str]] = None,
+        tipo_documento: Optional[str] = None,
+        version: Optional[float] = None,
+        fuente_documento: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Registra una nueva versión de un decreto re-embebiendo solo lo que cambia.
+        
+        Cada chunk se identifica por la huella de su contenido. Los chunks
+        que ya existen solo actualizan sus metadatos (versión, posición);
+        los que existen con otro id (decretos registrados con ids por
+        posición) se reescriben reutilizando su embedding; solo los chunks
+        nuevos o modificados pasan por el modelo, y los que desaparecen se
+        eliminan.
+        
+        Args:
+            decreto_id: Identificador del decreto
+            contenido: Texto completo de la nueva versión
+            titulo_documento: Título (por defecto el de la versión anterior)
+            custodios_implicados: Custodios (por defecto los de la versión anterior)
+            tipo_documento: Tipo (por defecto el de la versión anterior)
+            version: Nueva versión (por defecto la anterior + 1)
+            fuente_documento: Ruta al archivo original (por defecto la anterior)
+            
+        Returns:
+            Diccionario con la versión y los chunks conservados,
+            reetiquetados, nuevos y eliminados (los reetiquetados, cuyo id
+            anterior también se borra, cuentan solo como reetiquetados)
+        """
+        existentes = self.obtener_por_filtro(
+            self.decretos,
+            {"decreto_id": decreto_id},
+            include=["documents", "metadatas"]
+        )
+        if not existentes["ids"]:
+            self.registrar_decreto(
+                titulo_documento=titulo_documento or decreto_id,
+                contenido=contenido,
+                decreto_id=decreto_id,
+                custodios_implicados=custodios_implicados or [],
+                tipo_documento=tipo_documento or "Protocolo",
+                version=version if version is not None else 1.0,
+                fuente_documento=fuente_documento
+            )
+            total = self.decretos.get(where={"decreto_id": decreto_id}, include=[])
+            return {
+                "decreto_id": decreto_id,
+                "version": version if version is not None else 1.0,
+                "conservados": 0,
+                "reetiquetados": 0,
+                "nuevos": len(total["ids"]),
+                "eliminados": 0
+            }
+        
+        anterior = existentes["metadatas"][0]
+        if version is None:
+            version = max(float(m.get("version", 1.0)) for m in existentes["metadatas"]) + 1
+        base_metadata = {
+            "decreto_id": decreto_id,
+            "titulo_documento": titulo_documento or anterior.get("titulo_documento", decreto_id),
+            "fecha_activacion": datetime.now(timezone.utc).strftime('%Y-%m-%d'),
+            "custodios_implicados": (
+                json.dumps(custodios_implicados)
+                if custodios_implicados is not None
+                else anterior.get("custodios_implicados", "[]")
+            ),
+            "tipo_documento": tipo_documento or anterior.get("tipo_documento", "Protocolo"),
+            "version": version,
+            "fuente_documento": fuente_documento or anterior.get("fuente_documento", "N/A")
+        }
+        
+        chunks = self._chunks_decreto(decreto_id, contenido)
+        deseados = {chunk_id: idx for idx, (chunk_id, _, _, _) in enumerate(chunks)}
+        
+        # Chunks guardados con otro id, agrupados por la huella de su texto
+        actuales = set(existentes["ids"])
+        por_huella: Dict[str, List[str]] = {}
+        for chunk_id, documento, metadata in zip(
+            existentes["ids"], existentes["documents"], existentes["metadatas"]
+        ):
+            if chunk_id not in deseados:
+                huella = metadata.get("hash_contenido") or self._hash_chunk(documento)
+                por_huella.setdefault(huella, []).append(chunk_id)
+        
+        conservados: List[str] = []
+        reetiquetados: Dict[str, str] = {}
+        nuevos: List[int] = []
+        for idx, (chunk_id, huella, _, _) in enumerate(chunks):
+            if chunk_id in actuales:
+                conservados.append(chunk_id)
+            elif por_huella.get(huella):
+                reetiquetados[chunk_id] = por_huella[huella].pop()
+            else:
+                nuevos.append(idx)
+        eliminados = [chunk_id for chunk_id in existentes["ids"] if chunk_id not in deseados]
+        # Los ids anteriores de los reetiquetados también se borran, pero su texto sigue
+        eliminados_netos = len(eliminados) - len(reetiquetados)
+        
+        def metadata_chunk(idx: int) -> Dict[str, Any]:
+            return {
+                **base_metadata,
+                "chunk_index": idx,
+                "total_chunks": len(chunks),
+                "hash_contenido": chunks[idx][1]
+            }
+        
+        # 1. Chunks sin cambios: solo metadatos, sin embeddings
+        if conservados:
+            self._actualizar_metadatas(
+                self.decretos,
+                conservados,
+                [metadata_chunk(deseados[chunk_id]) for chunk_id in conservados]
+            )
+        
+        # 2. Mismo texto con otro id: se reutiliza el embedding guardado
+        if reetiquetados:
+            ids_anteriores = list(reetiquetados.values())
+            guardados = self.decretos.get(ids=ids_anteriores, include=["embeddings"])
+            embedding_por_id = dict(zip(guardados["ids"], guardados["embeddings"]))
+            ids_nuevos = list(reetiquetados)
+            self._escribir_lote(
+                self.decretos,
+                ids_nuevos,
+                [
+                    contenido[chunks[deseados[chunk_id]][2]:chunks[deseados[chunk_id]][3]]
+                    for chunk_id in ids_nuevos
+                ],
+                [metadata_chunk(deseados[chunk_id]) for chunk_id in ids_nuevos],
+                [embedding_por_id[reetiquetados[chunk_id]] for chunk_id in ids_nuevos],
+                reemplazar=True
+            )
+        
+        # 3. Chunks nuevos o modificados: embedding y add en flujo
+        if nuevos:
+            self._ingerir_lote(
+                self.decretos,
+                (
+                    (
+                        [chunks[idx][0]],
+                        [contenido[chunks[idx][2]:chunks[idx][3]]],
+                        [metadata_chunk(idx)]
+                    )
+                    for idx in nuevos
+                ),
+                EMBEDDING_BATCH_SIZE,
+                MAX_CHUNKS_POR_ADD
+            )
+        
+        # 4. Chunks que ya no forman parte del decreto
+        if eliminados:
+            self._borrar_lote(self.decretos, eliminados)
+        
+        print(f"✓ Decreto actualizado: {decreto_id} (versión {version})")
+        print(f"  - Chunks sin cambios: {len(conservados) + len(reetiquetados)}")
+        print(f"  - Chunks re-embebidos: {len(nuevos)}")
+        print(f"  - Chunks eliminados: {eliminados_netos}")
+        
+        return {
+            "decreto_id": decreto_id,
+            "version": version,
+            "conservados": len(conservados),
+            "reetiquetados": len(reetiquetados),
+            "nuevos": len(nuevos),
+            "eliminados": eliminados_netos
+        }
+    
+    def registrar_decretos_lote(
+        self,
+        decretos: Iterable[Dict[str, Any]],
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_chunks_por_add: int = MAX_CHUNKS_POR_ADD
+    ) -> List[str]:
+        """
+        Registra muchos decretos con embeddings y escrituras por lotes.
+        
+        Como en `registrar_decreto`, un decreto_id ya registrado (o repetido
+        en el lote) es una nueva versión: se aplica con `actualizar_decreto`
+        después del lote, en el orden de entrada.
+        
+        Args:
+            decretos: Iterable de diccionarios con los mismos argumentos
+                que `registrar_decreto`
+            batch_size: Chunks por llamada a la función de embeddings
+            max_chunks_por_add: Chunks máximos por llamada a `add`
+            
+        Returns:
+            Lista de decreto_id registrados, en el orden de entrada
+        """
+        decreto_ids: List[str] = []
+        actualizaciones: List[Dict[str, Any]] = []
+        
+        def fragmentos():
+            vistos = set()
+            for decreto in decretos:
+                decreto_id = decreto["decreto_id"]
+                decreto_ids.append(decreto_id)
+                if decreto_id in vistos or self.decretos.get(
+                    where={"decreto_id": decreto_id}, limit=1, include=[]
+                )["ids"]:
+                    actualizaciones.append(decreto)
+                    continue
+                vistos.add(decreto_id)
+                yield from self._preparar_decreto(**decreto)
+        
+        resultado = self._ingerir_lote(
+            self.decretos, fragmentos(), batch_size, max_chunks_por_add
+        )
+        for decreto in actualizaciones:
+            self.actualizar_decreto(**decreto)
+        self.metricas_ultimo_lote = {**resultado, "documentos": len(decreto_ids)}
+        
+        print(f"✓ Lote de decretos registrado: {len(decreto_ids)}")
+        print(f"  - Chunks almacenados: {resultado['chunks']}")
+        print(f"  - Decretos actualizados: {len(actualizaciones)}")
+        print(f"  - Rendimiento: {resultado['chunks_por_segundo']:.1f} chunks/s")
+        
+        return decreto_ids
+    
+    def registrar_acta(
+        self,
+        ciclo_id: str,
+        resumen: str,
+        logros: Optional[List[str]] = None,
+        lecciones: Optional[List[str]] = None,
+        custodios_implicados: Optional[List[str]] = None,
+        acta_id: Optional[str] = None,
+        metadatos: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Registra el acta de un ciclo (resumen, logros y lecciones aprendidas).
+        
+        Args:
+            ciclo_id: Ciclo al que se refiere el acta
+            resumen: Resumen del ciclo
+            logros: Logros del ciclo (opcional)
+            lecciones: Lecciones aprendidas (opcional)
+            custodios_implicados: Custodios que participaron (opcional)
+            acta_id: Identificador del acta (por defecto uno nuevo)
+            metadatos: Metadatos adicionales de valor escalar (opcional)
+            
+        Returns:
+            El acta_id
+        """
+        acta_id = acta_id or f"acta_{ciclo_id}_{uuid.uuid4().hex[:8]}"
+        partes = [resumen]
+        for titulo, elementos in (("Logros", logros), ("Lecciones aprendidas", lecciones)):
+            if elementos:
+                partes.append(f"{titulo}:\n" + "\n".join(f"- {elemento}" for elemento in elementos))
+        contenido = "\n\n".join(partes)
+        tramos = self._tramos_texto(contenido, self.tokens_chunk_decreto, "actas")
+        
+        def fragmentos():
+            for idx, (inicio, fin) in enumerate(tramos):
+                metadata = {
+                    **(metadatos or {}),
+                    "acta_id": acta_id,
+                    "ciclo_id": ciclo_id,
+                    "fecha_registro": int(time.time()),
+                    "custodios_implicados": json.dumps(custodios_implicados or []),
+                    "chunk_index": idx,
+                    "total_chunks": len(tramos)
+                }
+                yield [f"{acta_id}-{idx}"], [contenido[inicio:fin]], [metadata]
+        
+        resultado = self._ingerir_lote(
+            self.actas, fragmentos(), EMBEDDING_BATCH_SIZE, MAX_CHUNKS_POR_ADD
+        )
+        
+        print(f"✓ Acta registrada: {acta_id}")
+        print(f"  - Ciclo: {ciclo_id}")
+        print(f"  - Chunks almacenados: {resultado['chunks']}")
+        
+        return acta_id
+    
+    @staticmethod
+    def _normalizar_where(filtros: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Adapta un diccionario de filtros a la sintaxis `where` de ChromaDB.
+        
+        ChromaDB exige un único operador por nivel, así que varios campos
+        (o varios operadores sobre un campo, como un rango) se combinan con
+        `$and`. Un filtro vacío equivale a no filtrar.
+        """
+        if not filtros:
+            return None
+        
+        clausulas = []
+        for campo, valor in filtros.items():
+            if not campo.startswith("$") and isinstance(valor, dict) and len(valor) > 1:
+                clausulas.extend({campo: {op: v}} for op, v in valor.items())
+            else:
+                clausulas.append({campo: valor})
+        
+        if len(clausulas) == 1:
+            return clausulas[0]
+        return {"$and": clausulas}
+    
+    @staticmethod
+    def _como_resultado_query(resultado: Dict[str, Any]) -> Dict[str, Any]:
+        """Envuelve un resultado de `get` con la forma anidada de `query`"""
+        return {
+            "ids": [resultado.get("ids") or []],
+            "documents": [resultado.get("documents") or []],
+            "metadatas": [resultado.get("metadatas") or []],
+            "distances": None
+        }
+    
+    def _resolver_coleccion(self, coleccion: Union[str, Any]):
+        """Acepta una colección o su nombre ('interactions', 'decretos', ...)"""
+        if isinstance(coleccion, str):
+            return getattr(self, coleccion)
+        return coleccion
+    
+    def escanear(
+        self,
+        coleccion: Union[str, Any],
+        filtros: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+        tamano_pagina: Optional[int] = None,
+        unir_cabeceras: bool = True,
+        incluir_referencias: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre una colección por metadatos, página a página, sin embeddings.
+        
+        Args:
+            coleccion: Colección o nombre de la colección
+            filtros: Filtros de metadatos (ej. {"custodio_invocado": "LIANG"})
+            include: Campos a incluir (por defecto documentos y metadatos)
+            tamano_pagina: Registros por página (por defecto `self.tamano_pagina`)
+            unir_cabeceras: Si completar los metadatos de `interactions` con
+                la cabecera de su interacción (innecesario si solo se usan
+                campos filtrables)
+            incluir_referencias: Si añadir al final los chunks deduplicados
+                (ver `deduplicar`) que cumplen los filtros, materializados
+                con el texto de su canónico
+            
+        Yields:
+            Páginas con la forma de `get` (ids, documents, metadatas)
+        """
+        coleccion = self._resolver_coleccion(coleccion)
+        if coleccion.name == "interactions" and filtros:
+            filtros = self._filtros_con_cabecera(filtros)
+            if filtros is None:
+                # Ninguna interacción cumple los filtros de cabecera
+                return
+        where = self._normalizar_where(filtros)
+        include = include if include is not None else ["documents", "metadatas"]
+        tamano = max(1, tamano_pagina or self.tamano_pagina)
+        unir = unir_cabeceras and coleccion.name == "interactions" and "metadatas" in include
+        
+        # Una colección particionada se pagina partición a partición, y solo
+        # en las que pueden cumplir los filtros
+        if isinstance(coleccion, ColeccionParticionada):
+            partes = coleccion.particiones(where)
+        else:
+            partes = [coleccion]
+        
+        for parte in partes:
+            offset = 0
+            while True:
+                with self.metricas.medir("escaneo", coleccion.name):
+                    pagina = parte.get(
+                        where=where,
+                        include=include,
+                        limit=tamano,
+                        offset=offset
+                    )
+                leidos = len(pagina["ids"])
+                if leidos == 0:
+                    break
+                if unir:
+                    self.cabeceras.unir(pagina["metadatas"])
+                yield pagina
+                if leidos < tamano:
+                    break
+                offset += leidos
+        
+        if incluir_referencias:
+            referencias = self.duplicados.filtrar(coleccion.name, where)
+            for i in range(0, len(referencias), tamano):
+                pagina = self._pagina_referencias(referencias[i:i + tamano], include)
+                if unir:
+                    self.cabeceras.unir(pagina["metadatas"])
+                yield pagina
+    
+    def obtener_por_filtro(
+        self,
+        coleccion: Union[str, Any],
+        filtros: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+        limite: Optional[int] = None,
+        tamano_pagina: Optional[int] = None,
+        unir_cabeceras: bool = True,
+        incluir_referencias: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Obtiene el conjunto completo de registros que cumplen unos filtros.
+        
+        A diferencia de `query`, no calcula embeddings ni recorre el índice
+        HNSW, y no trunca el resultado salvo que se indique un `limite`.
+        
+        Args:
+            coleccion: Colección o nombre de la colección
+            filtros: Filtros de metadatos
+            include: Campos a incluir (por defecto documentos y metadatos)
+            limite: Máximo de registros a devolver (opcional)
+            tamano_pagina: Registros por página
+            unir_cabeceras: Si completar los metadatos con la cabecera de
+                cada interacción
+            incluir_referencias: Si incluir los chunks deduplicados que
+                cumplen los filtros (ver `escanear`)
+            
+        Returns:
+            Diccionario con la forma de `get` (ids, documents, metadatas)
+        """
+        include = include if include is not None else ["documents", "metadatas"]
+        tamano = max(1, tamano_pagina or self.tamano_pagina)
+        if limite is not None:
+            tamano = max(1, min(tamano, limite))
+        
+        resultado: Dict[str, Any] = {"ids": []}
+        for campo in include:
+            resultado[campo] = []
+        
+        for pagina in self.escanear(coleccion, filtros, include, tamano, unir_cabeceras, incluir_referencias):
+            resultado["ids"].extend(pagina["ids"])
+            for campo in include:
+                resultado[campo].extend(pagina.get(campo) or [])
+            if limite is not None and len(resultado["ids"]) >= limite:
+                for campo in resultado:
+                    resultado[campo] = resultado[campo][:limite]
+                break
+        
+        return resultado
+    
+    def _filtros_con_cabecera(self, filtros: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Traduce los filtros por campos que solo se guardan en la cabecera.
+        
+        `motor_ia_usado`, `intencion_fundador` y `palabras_clave` no están
+        en los metadatos de los chunks: las interacciones que cumplen esos
+        filtros se buscan en el almacén de cabeceras y se pasan como
+        `interaction_id $in`, igual que en `_filtros_con_palabras`.
+        
+        Returns:
+            Filtros sin campos de cabecera, o None si ninguna interacción los cumple
+        
+        Raises:
+            ValueError: Si un campo de cabecera aparece dentro de `$and` u `$or`
+        """
+        if not filtros:
+            return filtros
+        
+        def campos_anidados(clausulas):
+            for clausula in clausulas:
+                for clave, valor in clausula.items():
+                    if clave in ("$and", "$or"):
+                        yield from campos_anidados(valor)
+                    else:
+                        yield clave
+        
+        for operador in ("$and", "$or"):
+            if any(campo in CAMPOS_SOLO_CABECERA for campo in campos_anidados(filtros.get(operador) or [])):
+                raise ValueError(
+                    f"Los campos {', '.join(CAMPOS_SOLO_CABECERA)} solo se pueden filtrar "
+                    f"en el primer nivel de los filtros, no dentro de {operador}"
+                )
+        campos = [campo for campo in filtros if campo in CAMPOS_SOLO_CABECERA]
+        if not campos:
+            return filtros
+        
+        candidatas: Optional[set] = None
+        for campo in campos:
+            encontradas = set(self.cabeceras.filtrar(campo, filtros[campo]))
+            candidatas = encontradas if candidatas is None else candidatas & encontradas
+        if not candidatas:
+            return None
+        restriccion = {"interaction_id": {"$in": sorted(candidatas)}}
+        where = self._normalizar_where({
+            campo: valor for campo, valor in filtros.items() if campo not in CAMPOS_SOLO_CABECERA
+        })
+        if where is None:
+            return restriccion
+        return {"$and": [where, restriccion]}
+    
+    def _filtros_con_palabras(
+        self,
+        filtros: Optional[Dict[str, Any]],
+        palabras_clave: Optional[List[str]],
+        operador_palabras: str = "AND"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Añade a unos filtros la restricción por palabras clave.
+        
+        Las interacciones candidatas se obtienen del índice invertido y se
+        pasan como `interaction_id $in`, de modo que la búsqueda vectorial
+        solo considera chunks de esas interacciones.
+        
+        Returns:
+            Filtros combinados, o None si ninguna interacción tiene las palabras
+        """
+        if not palabras_clave:
+            return filtros
+        candidatas = self.cabeceras.buscar_palabras(palabras_clave, operador_palabras)
+        if not candidatas:
+            return None
+        restriccion = {"interaction_id": {"$in": candidatas}}
+        where = self._normalizar_where(filtros)
+        if where is None:
+            return restriccion
+        return {"$and": [where, restriccion]}
+    
+    def buscar_contexto_reciente(
+        self,
+        query: Optional[str],
+        n_results: int = 10,
+        filtros: Optional[Dict[str, Any]] = None,
+        palabras_clave: Optional[List[str]] = None,
+        operador_palabras: str = "AND",
+        modo: str = "vectorial"
+    ) -> Dict[str, Any]:
+        """
+        Busca en las interacciones recientes usando búsqueda semántica.
+        
+        Si `query` está vacío no hay intención semántica: se hace un
+        recorrido por metadatos sin embeddings y `distances` es None.
+        
+        Args:
+            query: Texto de búsqueda (None o vacío para filtrar solo por metadatos)
+            n_results: Número de resultados a devolver
+            filtros: Filtros adicionales para metadatos (ej. {"custodio_invocado": "LIANG"})
+            palabras_clave: Palabras clave que deben tener las interacciones (opcional)
+            operador_palabras: "AND" (todas las palabras) u "OR" (alguna)
+            modo: "vectorial", "lexico" (BM25) o "hibrido" (ver `_buscar`)
+            
+        Returns:
+            Diccionario con resultados y metadatos
+        """
+        return self.buscar_contexto_reciente_lote(
+            [query], n_results, filtros, palabras_clave, operador_palabras, modo
+        )[0]
+    
+    @staticmethod
+    def _alinear(valor: Any, n: int, nombre: str, por_consulta: bool) -> List[Any]:
+        """Argumento de una búsqueda por lotes: uno por consulta, o el mismo para todas"""
+        if not por_consulta:
+            return [valor] * n
+        if len(valor) != n:
+            raise ValueError(f"Se esperaban {n} valores en {nombre}, se recibieron {len(valor)}")
+        return list(valor)
+    
+    def buscar_contexto_reciente_lote(
+        self,
+        queries: List[Optional[str]],
+        n_results: int = 10,
+        filtros: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]] = None,
+        palabras_clave: Optional[Union[List[str], List[Optional[List[str]]]]] = None,
+        operador_palabras: str = "AND",
+        modo: str = "vectorial"
+    ) -> List[Dict[str, Any]]:
+        """
+        Varias búsquedas de `buscar_contexto_reciente` de una vez.
+        
+        Todas las consultas se embeben en una sola pasada y las que comparten
+        filtro se resuelven con una sola llamada a `query` de ChromaDB.
+        
+        Args:
+            queries: Textos de búsqueda (None o vacío para filtrar solo por metadatos)
+            n_results: Número de resultados por consulta
+            filtros: Filtros de metadatos comunes, o una lista con los de cada consulta
+            palabras_clave: Palabras clave comunes, o una lista con las de
+                cada consulta (listas o None)
+            operador_palabras: "AND" (todas las palabras) u "OR" (alguna)
+            modo: "vectorial", "lexico" (BM25) o "hibrido" (ver `_buscar`)
+            
+        Returns:
+            Un resultado por consulta, en el mismo orden y con la forma de
+            `buscar_contexto_reciente`
+        """
+        n = len(queries)
+        filtros_consultas = self._alinear(filtros, n, "filtros", isinstance(filtros, list))
+        palabras_consultas = self._alinear(
+            palabras_clave, n, "palabras_clave",
+            bool(palabras_clave) and all(p is None or isinstance(p, (list, tuple)) for p in palabras_clave)
+        )
+        
+        resultados: List[Optional[Dict[str, Any]]] = [None] * n
+        semanticas, wheres = [], []
+        consultas = zip(queries, filtros_consultas, palabras_consultas)
+        for i, (query, filtros_consulta, palabras) in enumerate(consultas):
+            if filtros_consulta:
+                filtros_consulta = self._filtros_con_cabecera(filtros_consulta)
+                if filtros_consulta is None:
+                    resultados[i] = self._como_resultado_query({"ids": []})
+                    continue
+            if palabras:
+                filtros_consulta = self._filtros_con_palabras(filtros_consulta, palabras, operador_palabras)
+                if filtros_consulta is None:
+                    # Ninguna interacción tiene esas palabras: no hace falta embeber
+                    resultados[i] = self._como_resultado_query({"ids": []})
+                    continue
+            if not query or not query.strip():
+                resultados[i] = self._como_resultado_query(
+                    self.obtener_por_filtro(
+                        self.interactions, filtros_consulta, limite=n_results, incluir_referencias=True
+                    )
+                )
+                continue
+            semanticas.append(i)
+            wheres.append(self._normalizar_where(filtros_consulta))
+        
+        if semanticas:
+            encontrados = self._buscar_lote(
+                self.interactions, [queries[i] for i in semanticas], n_results, wheres, modo
+            )
+            # Una sola lectura de cabeceras para todos los resultados
+            self.cabeceras.unir([m for resultado in encontrados for m in resultado["metadatas"][0]])
+            for i, resultado in zip(semanticas, encontrados):
+                resultados[i] = resultado
+        
+        # Linaje de los chunks que otras interacciones también contenían
+        self.duplicados.unir(
+            "interactions",
+            [chunk_id for resultado in resultados for chunk_id in resultado["ids"][0]],
+            [m for resultado in resultados for m in resultado["metadatas"][0]]
+        )
+        return resultados
+    
+    def buscar_contexto_priorizado(
+        self,
+        query: str,
+        n_results: int = 10,
+        filtros: Optional[Dict[str, Any]] = None,
+        palabras_clave: Optional[List[str]] = None,
+        operador_palabras: str = "AND",
+        pesos: Optional[Dict[str, float]] = None,
+        vida_media_dias: Optional[float] = None,
+        factor_candidatos: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Interacciones relevantes, recientes e importantes con una sola consulta.
+        
+        Pide al índice `n_results * factor_candidatos` candidatos (con sus
+        embeddings) y los reordena en NumPy combinando distancia,
+        decaimiento por `timestamp_utc`, `importancia` y una penalización
+        MMR por redundancia (ver `wabun_rerank.reordenar`).
+        
+        Args:
+            query: Texto de búsqueda
+            n_results: Número de resultados a devolver
+            filtros: Filtros adicionales para metadatos
+            palabras_clave: Palabras clave que deben tener las interacciones (opcional)
+            operador_palabras: "AND" (todas las palabras) u "OR" (alguna)
+            pesos: Pesos de relevancia, recencia, importancia y diversidad
+                (por defecto PESOS_RERANK)
+            vida_media_dias: Días en que la recencia cae a la mitad
+            factor_candidatos: Candidatos por resultado que se reordenan
+            
+        Returns:
+            Resultado con la forma de `query`, más "puntuaciones" y
+            "componentes" (relevancia, recencia, importancia y redundancia
+            de cada resultado)
+        """
+        from wabun_rerank import FACTOR_SOBREMUESTREO, VIDA_MEDIA_DIAS, combinar_pesos, reordenar
+        
+        if not query or not query.strip():
+            raise ValueError("La búsqueda priorizada necesita un texto de consulta")
+        pesos = combinar_pesos(pesos)
+        vacio = dict(self._como_resultado_query({"ids": []}), puntuaciones=[[]], componentes=[[]])
+        if filtros:
+            filtros = self._filtros_con_cabecera(filtros)
+            if filtros is None:
+                return vacio
+        if palabras_clave:
+            filtros = self._filtros_con_palabras(filtros, palabras_clave, operador_palabras)
+            if filtros is None:
+                return vacio
+        
+        coleccion = self.interactions
+        candidatos = self._buscar_vectorial(
+            coleccion,
+            [query],
+            n_results * max(1, factor_candidatos or FACTOR_SOBREMUESTREO),
+            [self._normalizar_where(filtros)],
+            incluir_embeddings=True
+        )[0]
+        if not candidatos["ids"][0]:
+            return vacio
+        
+        with self.metricas.medir("rerank", coleccion.name, len(candidatos["ids"][0])):
+            orden, puntuaciones, componentes = reordenar(
+                candidatos["distances"][0],
+                candidatos["metadatas"][0],
+                candidatos["embeddings"][0],
+                n_results,
+                pesos,
+                self._espacio_coleccion(coleccion),
+                VIDA_MEDIA_DIAS if vida_media_dias is None else vida_media_dias
+            )
+        
+        ids = [candidatos["ids"][0][i] for i in orden]
+        metadatas = [candidatos["metadatas"][0][i] for i in orden]
+        self.cabeceras.unir(metadatas)
+        self.duplicados.unir(coleccion.name, ids, metadatas)
+        return {
+            "ids": [ids],
+            "documents": [[candidatos["documents"][0][i] for i in orden]],
+            "metadatas": [metadatas],
+            "distances": [[float(candidatos["distances"][0][i]) for i in orden]],
+            "puntuaciones": [puntuaciones.astype(float).tolist()],
+            "componentes": [[
+                {nombre: float(valores[posicion]) for nombre, valores in componentes.items()}
+                for posicion in range(len(orden))
+            ]]
+        }
+    
+    def buscar_en_decretos(
+        self,
+        query: str,
+        n_results: int = 5,
+        modo: str = "vectorial"
+    ) -> Dict[str, Any]:
+        """
+        Busca en los decretos y documentos fundacionales.
+        
+        Args:
+            query: Texto de búsqueda
+            n_results: Número de resultados
+            modo: "vectorial", "lexico" (BM25) o "hibrido" (ver `_buscar`)
+            
+        Returns:
+            Diccionario con resultados
+        """
+        return self.buscar_en_decretos_lote([query], n_results, modo=modo)[0]
+    
+    def buscar_en_decretos_lote(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        filtros: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]] = None,
+        modo: str = "vectorial"
+    ) -> List[Dict[str, Any]]:
+        """
+        Varias búsquedas en los decretos de una vez (ver `buscar_contexto_reciente_lote`).
+        
+        Args:
+            queries: Textos de búsqueda
+            n_results: Número de resultados por consulta
+            filtros: Filtros de metadatos comunes (ej. {"tipo_documento": "Protocolo"}),
+                o una lista con los de cada consulta
+            modo: "vectorial", "lexico" (BM25) o "hibrido" (ver `_buscar`)
+            
+        Returns:
+            Un resultado por consulta, en el mismo orden
+        """
+        filtros_consultas = self._alinear(filtros, len(queries), "filtros", isinstance(filtros, list))
+        return self._buscar_lote(
+            self.decretos,
+            queries,
+            n_results,
+            [self._normalizar_where(f) for f in filtros_consultas],
+            modo
+        )
+    
+    @staticmethod
+    def _parece_id(query: str) -> bool:
+        """Si una consulta es un identificador más que una pregunta"""
+        query = query.strip()
+        if _PATRON_ID.match(query):
+            return True
+        return len(query) >= 3 and query.isalpha() and query.isupper()
+    
+    def _buscar(
+        self,
+        coleccion,
+        query: str,
+        n_results: int,
+        where: Optional[Dict[str, Any]],
+        modo: str
+    ) -> Dict[str, Any]:
+        """
+        Busca en una colección según el modo indicado.
+        
+        En modo "hibrido" los rankings vectorial y BM25 se fusionan por
+        rango recíproco. Si la consulta parece un identificador, primero se
+        prueba solo el índice léxico, sin embeber la consulta, y la búsqueda
+        vectorial queda como respaldo si no hay coincidencias.
+        
+        Returns:
+            Resultado con la forma de `query`; los modos léxico e híbrido
+            añaden "puntuaciones" y tienen distancia None en los resultados
+            que no vienen de la búsqueda vectorial
+        """
+        return self._buscar_lote(coleccion, [query], n_results, [where], modo)[0]
+    
+    def _buscar_lote(
+        self,
+        coleccion,
+        queries: List[str],
+        n_results: int,
+        wheres: List[Optional[Dict[str, Any]]],
+        modo: str
+    ) -> List[Dict[str, Any]]:
+        """Varias búsquedas de `_buscar`, con la parte vectorial agrupada (ver `_buscar_vectorial`)"""
+        if modo not in MODOS_BUSQUEDA:
+            raise ValueError(f"Modo de búsqueda no soportado: {modo} (usa uno de {MODOS_BUSQUEDA})")
+        
+        if modo == "vectorial":
+            return self._buscar_vectorial(coleccion, queries, n_results, wheres)
+        if modo == "lexico":
+            return [
+                self._buscar_lexico(coleccion, query, n_results, where)
+                for query, where in zip(queries, wheres)
+            ]
+        
+        resultados: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        pendientes = []
+        for i, (query, where) in enumerate(zip(queries, wheres)):
+            if self._parece_id(query):
+                lexico = self._buscar_lexico(coleccion, query, n_results, where)
+                if lexico["ids"][0]:
+                    resultados[i] = lexico
+                    continue
+            pendientes.append(i)
+        
+        profundidad = n_results * FACTOR_CANDIDATOS
+        vectoriales = self._buscar_vectorial(
+            coleccion, [queries[i] for i in pendientes], profundidad, [wheres[i] for i in pendientes]
+        )
+        for i, vectorial in zip(pendientes, vectoriales):
+            resultados[i] = self._fusionar_rrf(
+                [vectorial, self._buscar_lexico(coleccion, queries[i], profundidad, wheres[i])],
+                n_results
+            )
+        return resultados
+    
+    def _buscar_vectorial(
+        self,
+        coleccion,
+        queries: List[str],
+        n_results: int,
+        wheres: List[Optional[Dict[str, Any]]],
+        incluir_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Búsqueda por similitud de embeddings de varias consultas.
+        
+        Los textos distintos se embeben en una sola llamada y las consultas
+        con el mismo `where` comparten una llamada a `query`. Con
+        `incluir_embeddings` se devuelven también los de cada resultado.
+        
+        Returns:
+            Un resultado con la forma de `query` por consulta, en su orden
+        """
+        if not queries:
+            return []
+        textos = list(dict.fromkeys(queries))
+        vectores = dict(zip(textos, self._embeber_consultas(textos, coleccion.name)))
+        
+        grupos: Dict[str, List[int]] = {}
+        for i, where in enumerate(wheres):
+            clave = json.dumps(where, sort_keys=True, ensure_ascii=False, default=str)
+            grupos.setdefault(clave, []).append(i)
+        
+        include = ["documents", "metadatas", "distances"]
+        if incluir_embeddings:
+            include.append("embeddings")
+        resultados: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        for indices in grupos.values():
+            with self.metricas.medir("consulta", coleccion.name, len(indices)):
+                resultado = coleccion.query(
+                    query_embeddings=[vectores[queries[i]] for i in indices],
+                    n_results=n_results,
+                    where=wheres[indices[0]],
+                    include=include
+                )
+            referencias = self._referencias_fuera_de_filtro(coleccion, wheres[indices[0]])
+            if referencias:
+                resultado = self._sumar_referencias(
+                    coleccion, resultado, [vectores[queries[i]] for i in indices], referencias, n_results
+                )
+            if len(indices) == 1:
+                resultados[indices[0]] = resultado
+                continue
+            for fila, i in enumerate(indices):
+                resultados[i] = {
+                    clave: [resultado[clave][fila]] if resultado.get(clave) is not None else None
+                    for clave in ["ids"] + include
+                }
+        return resultados
+    
+    def _referencias_fuera_de_filtro(
+        self,
+        coleccion,
+        where: Optional[Dict[str, Any]],
+        canonicos: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Una referencia que cumple `where` por cada chunk canónico que no lo cumple.
+        
+        Un chunk deduplicado solo existe como referencia, así que un filtro
+        por proyecto, ciclo o interacción no lo encuentra en la colección
+        si su canónico es de otra. En ese caso el texto se recupera a
+        través de la primera referencia (por id) que cumple el filtro.
+        """
+        if not where:
+            return []
+        referencias = self.duplicados.filtrar(coleccion.name, where, canonicos)
+        if not referencias:
+            return []
+        por_canonico: Dict[str, Dict[str, Any]] = {}
+        for referencia in referencias:
+            por_canonico.setdefault(referencia["canonico"], referencia)
+        cumplen = set(coleccion.get(ids=list(por_canonico), where=where, include=[])["ids"])
+        return [referencia for canonico, referencia in por_canonico.items() if canonico not in cumplen]
+    
+    def _sumar_referencias(
+        self,
+        coleccion,
+        resultado: Dict[str, Any],
+        consultas: List[Any],
+        referencias: List[Dict[str, Any]],
+        n_results: int
+    ) -> Dict[str, Any]:
+        """
+        Mezcla en un resultado de `query` los chunks deduplicados que cumplen su filtro.
+        
+        Cada referencia se materializa con el embedding de su canónico y su
+        distancia se calcula con la métrica de la colección; cada consulta
+        conserva sus `n_results` resultados más cercanos.
+        """
+        pagina = self._pagina_referencias(referencias, ["documents", "metadatas", "embeddings"])
+        validas = [i for i, embedding in enumerate(pagina["embeddings"]) if embedding is not None]
+        if not validas:
+            return resultado
+        matriz = np.asarray([pagina["embeddings"][i] for i in validas], dtype=np.float64)
+        vectores = np.asarray(consultas, dtype=np.float64)
+        espacio = self._espacio_coleccion(coleccion)
+        if espacio == "cosine":
+            matriz = matriz / np.maximum(np.linalg.norm(matriz, axis=1, keepdims=True), 1e-12)
+            vectores = vectores / np.maximum(np.linalg.norm(vectores, axis=1, keepdims=True), 1e-12)
+        productos = vectores @ matriz.T
+        if espacio == "l2":
+            # ChromaDB usa la distancia euclídea al cuadrado
+            distancias = (vectores ** 2).sum(axis=1)[:, None] + (matriz ** 2).sum(axis=1)[None, :] - 2 * productos
+        else:
+            distancias = 1.0 - productos
+        
+        claves = ["ids", "documents", "metadatas", "distances"]
+        if resultado.get("embeddings") is not None:
+            claves.append("embeddings")
+        mezclado: Dict[str, List[List[Any]]] = {clave: [] for clave in claves}
+        for fila in range(len(consultas)):
+            filas = list(zip(*(resultado[clave][fila] for clave in claves)))
+            for columna, i in enumerate(validas):
+                materializada = {
+                    "ids": pagina["ids"][i],
+                    "documents": pagina["documents"][i],
+                    "metadatas": dict(pagina["metadatas"][i]),
+                    "distances": float(distancias[fila, columna]),
+                    "embeddings": pagina["embeddings"][i]
+                }
+                filas.append(tuple(materializada[clave] for clave in claves))
+            filas = sorted(filas, key=lambda f: f[3])[:n_results]
+            for posicion, clave in enumerate(claves):
+                mezclado[clave].append([f[posicion] for f in filas])
+        return mezclado
+        
+    def _buscar_lexico(
+        self,
+        coleccion,
+        query: str,
+        n_results: int,
+        where: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Búsqueda BM25 en el índice léxico, sin embeddings.
+        
+        Con filtros se piden más candidatos al índice y ChromaDB descarta
+        los que no cumplen `where`, conservando el orden BM25. Las copias
+        casi idénticas deduplicadas se resuelven a su chunk canónico, con
+        la mejor puntuación de cualquiera de ellas.
+        """
+        expresion = IndiceLexico.consulta(query)
+        candidatos = []
+        if expresion:
+            limite = n_results * FACTOR_CANDIDATOS if where else n_results
+            with self.metricas.medir("consulta_lexica", coleccion.name):
+                candidatos = self.indice_lexico.buscar(coleccion.name, expresion, limite)
+        if not candidatos:
+            resultado = self._como_resultado_query({"ids": []})
+            resultado["puntuaciones"] = [[]]
+            return resultado
+        
+        canonicos = self.duplicados.canonicos_de(coleccion.name, [c for c, _ in candidatos])
+        if canonicos:
+            # Orden BM25 descendente: la primera aparición es la mejor
+            mejores: Dict[str, float] = {}
+            for chunk_id, puntuacion in candidatos:
+                mejores.setdefault(canonicos.get(chunk_id, chunk_id), puntuacion)
+            candidatos = list(mejores.items())
+        puntuaciones = dict(candidatos)
+        encontrados = coleccion.get(
+            ids=list(puntuaciones),
+            where=where,
+            include=["documents", "metadatas"]
+        )
+        filas = {
+            chunk_id: (chunk_id, documento, metadata)
+            for chunk_id, documento, metadata in zip(
+                encontrados["ids"], encontrados["documents"], encontrados["metadatas"]
+            )
+        }
+        # Chunks canónicos que no cumplen el filtro pero alguna de sus
+        # referencias sí (ver `_referencias_fuera_de_filtro`)
+        faltantes = [chunk_id for chunk_id, _ in candidatos if chunk_id not in filas]
+        referencias = self._referencias_fuera_de_filtro(coleccion, where, faltantes) if faltantes else []
+        if referencias:
+            pagina = self._pagina_referencias(referencias, ["documents", "metadatas"])
+            for referencia, chunk_id, documento, metadata in zip(
+                referencias, pagina["ids"], pagina["documents"], pagina["metadatas"]
+            ):
+                filas[referencia["canonico"]] = (chunk_id, documento, metadata)
+        orden = [chunk_id for chunk_id, _ in candidatos if chunk_id in filas][:n_results]
+        return {
+            "ids": [[filas[c][0] for c in orden]],
+            "documents": [[filas[c][1] for c in orden]],
+            "metadatas": [[filas[c][2] for c in orden]],
+            "distances": [[None] * len(orden)],
+            "puntuaciones": [[puntuaciones[c] for c in orden]]
+        }
+    
+    @staticmethod
+    def _fusionar_rrf(rankings: List[Dict[str, Any]], n_results: int) -> Dict[str, Any]:
+        """
+        Fusiona rankings con forma de `query` por rango recíproco (RRF).
+        
+        Cada resultado suma 1 / (K_RRF + rango) por cada ranking en el que
+        aparece; la distancia es la del primer ranking que la tenga.
+        """
+        puntuaciones: Dict[str, float] = {}
+        datos: Dict[str, Tuple[Any, Any, Optional[float]]] = {}
+        for ranking in rankings:
+            distancias = (ranking.get("distances") or [[]])[0] or [None] * len(ranking["ids"][0])
+            for rango, (chunk_id, documento, metadata, distancia) in enumerate(zip(
+                ranking["ids"][0],
+                ranking["documents"][0],
+                ranking["metadatas"][0],
+                distancias
+            ), start=1):
+                puntuaciones[chunk_id] = puntuaciones.get(chunk_id, 0.0) + 1.0 / (K_RRF + rango)
+                previo = datos.get(chunk_id)
+                if previo is None or previo[2] is None:
+                    datos[chunk_id] = (documento, metadata, distancia)
+        
+        orden = sorted(puntuaciones, key=puntuaciones.get, reverse=True)[:n_results]
+        return {
+            "ids": [orden],
+            "documents": [[datos[c][0] for c in orden]],
+            "metadatas": [[datos[c][1] for c in orden]],
+            "distances": [[datos[c][2] for c in orden]],
+            "puntuaciones": [[puntuaciones[c] for c in orden]]
+        }
+    
+    def _embeber_consultas(self, textos: List[str], coleccion: Optional[str] = None) -> List[Any]:
+        """Embebe textos de consulta una sola vez con la función de WABUN"""
+        funcion = getattr(self.embedding_function, "embed_query", self.embedding_function)
+        with self.metricas.medir("embedding_consulta", coleccion, len(textos)):
+            return funcion(textos)
+    
+    @staticmethod
+    def _espacio_coleccion(coleccion) -> str:
+        """Métrica de distancia de una colección ('l2', 'cosine' o 'ip')"""
+        metadata = getattr(coleccion, "metadata", None) or {}
+        if "hnsw:space" in metadata:
+            return metadata["hnsw:space"]
+        configuracion = getattr(coleccion, "configuration", None) or {}
+        hnsw = configuracion.get("hnsw") if isinstance(configuracion, dict) else None
+        if isinstance(hnsw, dict) and hnsw.get("space"):
+            return hnsw["space"]
+        return "l2"
+    
+    @staticmethod
+    def _similitud(distancia: float, espacio: str) -> float:
+        """
+        Convierte una distancia de ChromaDB en similitud coseno.
+        
+        Supone embeddings normalizados (como los del modelo por defecto),
+        para los que l2² = 2 - 2·cos e ip = 1 - cos. Así las puntuaciones
+        de colecciones con métricas distintas son comparables.
+        """
+        if espacio == "l2":
+            similitud = 1 - distancia / 2
+        else:
+            similitud = 1 - distancia
+        return max(-1.0, min(1.0, similitud))
+    
+    def busqueda_federada(
+        self,
+        query: str,
+        colecciones: Optional[List[str]] = None,
+        n_results: int = 10,
+        pesos: Optional[Dict[str, float]] = None,
+        filtros: Optional[Dict[str, Dict[str, Any]]] = None,
+        n_por_coleccion: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Busca en varias colecciones embebiendo la consulta una sola vez.
+        
+        El embedding se pasa como `query_embeddings` a cada colección y las
+        consultas se ejecutan en paralelo. Los resultados se fusionan en un
+        único ranking por `puntuacion = peso × similitud`.
+        
+        Args:
+            query: Texto de búsqueda
+            colecciones: Nombres de las colecciones (por defecto las cuatro)
+            n_results: Número de resultados del ranking combinado
+            pesos: Peso por colección (por defecto PESOS_FEDERADOS)
+            filtros: Filtros de metadatos por colección (opcional)
+            n_por_coleccion: Resultados a pedir a cada colección (por defecto n_results)
+            
+        Returns:
+            Diccionario con el ranking combinado ('resultados') y los
+            resultados de cada colección ('por_coleccion')
+        """
+        nombres = list(colecciones or COLECCIONES)
+        pesos = {**PESOS_FEDERADOS, **(pesos or {})}
+        filtros = filtros or {}
+        n_por_coleccion = n_por_coleccion or {}
+        
+        query_embeddings = self._embeber_consultas([query])
+        
+        def consultar(nombre: str) -> List[Dict[str, Any]]:
+            coleccion = self._resolver_coleccion(nombre)
+            n = n_por_coleccion.get(nombre, n_results)
+            if n <= 0:
+                return []
+            filtros_coleccion = filtros.get(nombre)
+            if nombre == "interactions" and filtros_coleccion:
+                filtros_coleccion = self._filtros_con_cabecera(filtros_coleccion)
+                if filtros_coleccion is None:
+                    return []
+            with self.metricas.medir("consulta", nombre):
+                resultados = coleccion.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n,
+                    where=self._normalizar_where(filtros_coleccion),
+                    include=["documents", "metadatas", "distances"]
+                )
+            if nombre == "interactions":
+                self.cabeceras.unir(resultados['metadatas'][0])
+                self.duplicados.unir(coleccion.name, resultados['ids'][0], resultados['metadatas'][0])
+            espacio = self._espacio_coleccion(coleccion)
+
+            encontrados = []
+            for idx, chunk_id in enumerate(resultados['ids'][0]):
+                distancia = resultados['distances'][0][idx]
+                similitud = self._similitud(distancia, espacio)
+                encontrados.append({
+                    "coleccion": nombre,
+                    "id": chunk_id,
+                    "texto": resultados['documents'][0][idx],
+                    "metadata": resultados['metadatas'][0][idx],
+                    "distancia": distancia,
+                    "similitud": similitud,
+                    "puntuacion": pesos.get(nombre, 1.0) * similitud
+                })
+            return encontrados
+        
+        por_coleccion = dict(zip(nombres, self._executor_busquedas.map(consultar, nombres)))
+        
+        combinados = [r for encontrados in por_coleccion.values() for r in encontrados]
+        combinados.sort(key=lambda r: r["puntuacion"], reverse=True)
+        
+        return {
+            "query": query,
+            "resultados": combinados[:n_results],
+            "por_coleccion": por_coleccion
+        }
+    
+    def obtener_contexto_ciclo_actual(self) -> Dict[str, Any]:
+        """
+        Obtiene todas las interacciones del ciclo actual.
+        
+        Returns:
+            Diccionario con la forma de `get` (ids, documents, metadatas)
+            con todas las interacciones del ciclo, sin límite (incluidos
+            los chunks deduplicados)
+        """
+        return self.obtener_por_filtro(
+            self.interactions,
+            {"ciclo_id": self.ciclo_actual},
+            incluir_referencias=True
+        )
+    
+    def estadisticas(self) -> Dict[str, int]:
+        """
+        Obtiene estadísticas de la base de datos.
+        
+        Returns:
+            Diccionario con contadores
+        """
+        stats = {
+            "total_interacciones": self.interactions.count(),
+            "total_decretos": self.decretos.count(),
+            "total_actas": self.actas.count(),
+            "total_entidades": self.entidades.count(),
+            "total_cabeceras": self.cabeceras.contar(),
+            "total_indice_lexico": self.indice_lexico.contar(),
+            "particiones_interacciones": (
+                len(self.catalogo_particiones.describir("interactions")) if self.particiones else 0
+            ),
             "ciclo_actual": self.ciclo_actual,
             "fase_actual": self.fase_actual
         }
+        # Conteos por dimensión, leídos de los agregados (sin recorridos)
+        stats["interacciones_por"] = {
+            dimension: self.cabeceras.agregados([dimension])
+            for dimension in DIMENSIONES_AGREGADOS
+        }
+        if self.embedding_cache is not None:
+            stats["cache_embeddings"] = self.embedding_cache.estadisticas()
+        deduplicacion = self.duplicados.estadisticas()
+        if self.deduplicar or deduplicacion["referencias"]:
+            deduplicacion["bytes_vectores_evitados"] = (
+                deduplicacion["referencias"] * self._dimension_vectores(self.interactions) * 4
+            )
+            stats["deduplicacion"] = deduplicacion
+        if self.metricas.activo:
+            stats["instrumentacion"] = self.metricas.instantanea()["operaciones"]
+        return stats
+    
+    def exportar_metricas(self, output_path: str, formato: Optional[str] = None) -> str:
+        """
+        Exporta las métricas de instrumentación a un archivo.
+        
+        Args:
+            output_path: Ruta del archivo (.prom para Prometheus, otra para JSON)
+            formato: "prometheus" o "json" (por defecto según la extensión)
+            
+        Returns:
+            Ruta del archivo escrito
+        """
+        ruta = self.metricas.exportar(output_path, formato)
+        print(f"✓ Métricas exportadas a: {ruta}")
+        return ruta
+    
+    def normalizar_cabeceras(self) -> Dict[str, int]:
+        """
+        Migra interacciones con metadatos replicados al almacén de cabeceras.
+        
+        Las interacciones registradas antes del almacén llevan en cada chunk
+        los campos de texto libre de la cabecera. Este método guarda esas
+        cabeceras y elimina los campos de los chunks, sin re-embeber.
+        
+        Returns:
+            Diccionario con las interacciones y chunks migrados
+        """
+        interacciones = set()
+        migrados = 0
+        for pagina in self.escanear(
+            self.interactions,
+            include=["metadatas"],
+            unir_cabeceras=False
+        ):
+            ids = []
+            metadatas = []
+            cabeceras = {}
+            for chunk_id, metadata in zip(pagina["ids"], pagina["metadatas"]):
+                if not any(campo in metadata for campo in CAMPOS_SOLO_CABECERA):
+                    continue
+                if "interaction_id" in metadata:
+                    cabeceras.setdefault(metadata["interaction_id"], AlmacenCabeceras.extraer(metadata))
+                ids.append(chunk_id)
+                # Un valor None elimina el campo del chunk
+                metadatas.append({campo: None for campo in CAMPOS_SOLO_CABECERA})
+            if ids:
+                self.cabeceras.guardar(cabeceras)
+                self._actualizar_metadatas(self.interactions, ids, metadatas, reindexar=False)
+                interacciones.update(cabeceras)
+                migrados += len(ids)
+        
+        print(f"✓ Cabeceras normalizadas: {len(interacciones)} interacciones")
+        print(f"  - Chunks recortados: {migrados}")
+        
+        return {"interacciones": len(interacciones), "chunks": migrados}
+    
+    def reconstruir_agregados(self) -> Dict[str, int]:
+        """
+        Recalcula cabeceras y agregados a partir de la colección `interactions`.
+        
+        Pensado para después de restaurar ChromaDB sin su almacén de
+        cabeceras, o de modificar la colección por fuera de WabunCore.
+        Recorre el primer chunk de cada interacción (solo metadatos),
+        completa las cabeceras con sus campos filtrables, elimina las de
+        interacciones que ya no existen y recalcula los agregados.
+        
+        Returns:
+            Diccionario con las interacciones encontradas y las cabeceras eliminadas
+        """
+        vigentes = set()
+        for pagina in self.escanear(
+            self.interactions,
+            {"chunk_index": 0},
+            include=["metadatas"],
+            unir_cabeceras=False
+        ):
+            cabeceras = {}
+            for metadata in pagina["metadatas"]:
+                interaction_id = metadata.get("interaction_id")
+                if interaction_id and interaction_id not in vigentes:
+                    cabeceras[interaction_id] = AlmacenCabeceras.extraer(metadata)
+            self.cabeceras.guardar(cabeceras)
+            vigentes.update(cabeceras)
+        
+        eliminadas = self.cabeceras.conservar(vigentes)
+        self.cabeceras.recalcular_agregados()
+        
+        print(f"✓ Agregados reconstruidos: {len(vigentes)} interacciones")
+        print(f"  - Cabeceras huérfanas eliminadas: {eliminadas}")
+        
+        return {"interacciones": len(vigentes), "cabeceras_eliminadas": eliminadas}
+    
+    def describir_particiones(self) -> List[Dict[str, Any]]:
+        """
+        Estado de las particiones de `interactions`.
+        
+        Returns:
+            Lista con nombre, rango de timestamps, ciclos, chunks, borrados
+            pendientes y si es de solo lectura, de la más antigua a la más
+            reciente (vacía si no hay particiones)
+        """
+        if not self.particiones:
+            return []
+        return self.interactions.describir()
+    
+    def cerrar_particiones(self, conservar_abiertas: int = 2, compactar: bool = True) -> Dict[str, Any]:
+        """
+        Cierra las particiones antiguas y compacta las que tienen borrados.
+        
+        Las particiones cerradas no admiten chunks nuevos (sí borrados y
+        cambios de metadatos), así que su índice no vuelve a crecer. Solo
+        se compactan las que han perdido chunks desde la última vez: la
+        copia reutiliza los embeddings y no re-embebe nada.
+        
+        Args:
+            conservar_abiertas: Particiones recientes que siguen abiertas
+            compactar: Si compactar las particiones cerradas con borrados
+            
+        Returns:
+            Diccionario con las particiones cerradas y los chunks copiados
+            por cada partición compactada
+        """
+        if not self.particiones:
+            raise ValueError("Las interacciones no están particionadas (usa particiones='mes' o 'ciclo')")
+        
+        cerradas = self.interactions.cerrar_anteriores(conservar_abiertas)
+        compactadas = self.compactar_particiones() if compactar else {}
+        
+        print(f"✓ Particiones cerradas: {len(cerradas)}")
+        print(f"  - Compactadas: {len(compactadas)} ({sum(compactadas.values())} chunks copiados)")
+        
+        return {"cerradas": cerradas, "compactadas": compactadas}
+    
+    def compactar_particiones(self) -> Dict[str, int]:
+        """
+        Compacta las particiones de solo lectura que han perdido chunks.
+        
+        Returns:
+            Chunks copiados por cada partición compactada (vacío si las
+            interacciones no están particionadas)
+        """
+        if not self.particiones:
+            return {}
+        compactadas = {}
+        for particion in self.catalogo_particiones.describir("interactions"):
+            if particion["solo_lectura"] and particion["borrados"] > 0:
+                with self.metricas.medir("compactacion", particion["nombre"]):
+                    compactadas[particion["nombre"]] = self.interactions.compactar(
+                        particion["nombre"], self.tamano_pagina
+                    )
+        return compactadas
+    
+    def reconstruir_indice_lexico(self) -> Dict[str, int]:
+        """
+        Reconstruye el índice léxico (BM25) a partir de las colecciones.
+        
+        El índice se mantiene al escribir, así que solo hace falta para
+        memorias creadas antes de existir o modificadas por fuera de
+        WabunCore.
+        
+        Returns:
+            Diccionario con los chunks indexados por colección
+        """
+        self.indice_lexico.vaciar()
+        indexados = {}
+        for nombre in COLECCIONES:
+            indexados[nombre] = 0
+            for pagina in self.escanear(nombre):
+                self.indice_lexico.indexar(
+                    nombre,
+                    pagina["ids"],
+                    pagina["documents"],
+                    pagina["metadatas"]
+                )
+                indexados[nombre] += len(pagina["ids"])
+        indexados["interactions"] += self._indexar_similares(
+            fila for tipo, fila in self.duplicados.exportar() if tipo == "referencia"
+        )
+        
+        print(f"✓ Índice léxico reconstruido: {sum(indexados.values())} chunks")
+
+        for nombre, total in indexados.items():
+            print(f"  - {nombre}: {total}")
+        
+        return indexados
+    
+    def crear_snapshot(self, directorio: Optional[str] = None, **opciones) -> Dict[str, Any]:
+        """
+        Publica un snapshot inmutable de la memoria para workers de consulta.
+        
+        Los workers lo abren con `WabunCore(persist_directory, solo_lectura=True)`:
+        vectores cuantizados e índices SQLite en memoria mapeada, sin copiar
+        nada al arrancar y sin bloquear a este proceso. Cada snapshot nuevo
+        sustituye al anterior de forma atómica (ver `refrescar_snapshot`).
+        
+        Args:
+            directorio: Directorio de snapshots (por defecto `snapshots/` en
+                el directorio de persistencia)
+            **opciones: conservar, cuantizacion, reescalar, listas_ivf (ver
+                `wabun_snapshots.crear_snapshot`)
+            
+        Returns:
+            Manifiesto del snapshot publicado, con su ruta y tamaño
+        """
+        from wabun_snapshots import crear_snapshot
+        return crear_snapshot(self, directorio, **opciones)
+    
+    def refrescar_snapshot(self) -> bool:
+        """
+        Pasa al snapshot publicado más reciente (solo en modo de solo lectura).
+        
+        El snapshot nuevo se abre por completo antes del cambio, y las
+        referencias se sustituyen juntas bajo el lock de carga. Las consultas
+        en curso terminan sobre el anterior, cuyos archivos siguen mapeados
+        aunque el escritor ya los haya borrado. Sus conexiones y su pool de
+        particiones se cierran en el refresco siguiente, cuando esas
+        consultas ya han terminado.
+        
+        Returns:
+            True si se cambió de snapshot, False si ya era el más reciente
+        """
+        if not self.solo_lectura:
+            raise ValueError("Solo se refresca una memoria abierta con solo_lectura=True")
+        from wabun_snapshots import resolver_snapshot, leer_manifiesto
+        from wabun_vectores import ClienteNumpy
+        
+        ruta = resolver_snapshot(self._origen_snapshot)
+        if ruta == self.persist_directory:
+            return False
+        manifiesto = leer_manifiesto(ruta)
+        opciones_backend = {**self._opciones_backend, **manifiesto["backend"], "solo_lectura": True}
+        cliente = ClienteNumpy(str(ruta / "vectores"), **opciones_backend)
+        colecciones = {
+            nombre: cliente.get_collection(nombre, embedding_function=self.embedding_function)
+            for nombre in self._colecciones
+        }
+        cabeceras = AlmacenCabeceras(str(ruta / "wabun_indices.sqlite3"), solo_lectura=True)
+        indice_lexico = IndiceLexico(str(ruta / "wabun_lexico.sqlite3"), solo_lectura=True)
+        catalogo_particiones = CatalogoParticiones(str(ruta / "wabun_indices.sqlite3"), solo_lectura=True)
+        duplicados = IndiceDuplicados(str(ruta / "wabun_indices.sqlite3"), solo_lectura=True)
+        
+        with self._lock_carga:
+            anterior = self.persist_directory.name
+            obsoleta, self._generacion_retirada = self._generacion_retirada, self._generacion()
+            self.persist_directory = ruta
+            self.snapshot = manifiesto
+            self._opciones_backend = opciones_backend
+            self._client = cliente
+            self._colecciones = colecciones
+            self.cabeceras = cabeceras
+            self.indice_lexico = indice_lexico
+            self.catalogo_particiones = catalogo_particiones
+            self.duplicados = duplicados
+            self.particiones = catalogo_particiones.granularidad("interactions")
+            self._interacciones_particionadas = None
+        if obsoleta is not None:
+            self._cerrar_generacion(obsoleta)
+        
+        print(f"✓ Snapshot actualizado: {anterior} → {ruta.name}")
+        return True
     
     def exportar_memoria_completa(self, output_path: str):
         """
         Exporta toda la memoria a un archivo JSON.
         
+        Carga las colecciones completas en memoria; para memorias grandes
+        usa `exportar_memoria`, que escribe en flujo y admite restauración.
+        
         Args:
             output_path: Ruta del archivo de salida
         """
         memoria = {
             "fecha_exportacion": datetime.now(timezone.utc).isoformat(),
             "estadisticas": self.estadisticas(),
-            "interacciones": self.interactions.get(include=["documents", "metadatas"]),
+            "interacciones": self.obtener_por_filtro(self.interactions),
             "decretos": self.decretos.get(include=["documents", "metadatas"])
         }
         
@@ -382,6 +2651,321 @@ class WabunCore:
             json.dump(memoria, f, indent=2, ensure_ascii=False)
         
         print(f"✓ Memoria exportada a: {output_path}")
+    
+    def exportar_memoria(
+        self,
+        output_path: str,
+        compresion: Optional[str] = "auto",
+        tamano_pagina: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Exporta las cuatro colecciones en flujo a un archivo JSONL.
+        
+        Recorre cada colección por páginas y escribe un registro por línea,
+        con su embedding almacenado, de modo que el consumo de memoria no
+        depende del tamaño de la base de datos y la restauración no necesita
+        volver a embeber. Al final van las huellas y las referencias de los
+        chunks deduplicados (registros "huella" y "referencia"), que
+        `importar_memoria` vuelve a registrar tras los chunks canónicos.
+        
+        Args:
+            output_path: Ruta del archivo de salida (.jsonl, .jsonl.gz, .jsonl.zst)
+            compresion: None, 'gzip', 'zstd' o 'auto' (según la extensión)
+            tamano_pagina: Registros por página (por defecto `self.tamano_pagina`)
+            
+        Returns:
+            Diccionario con el número de registros exportados por colección
+            (y de referencias de chunks deduplicados, si las hay)
+        """
+        conteos = {nombre: 0 for nombre in COLECCIONES}
+        
+        with _abrir_archivo(output_path, 'w', compresion) as f:
+            cabecera = {
+                "tipo": "cabecera",
+                "formato": FORMATO_EXPORTACION,
+                "fecha_exportacion": datetime.now(timezone.utc).isoformat(),
+                "estadisticas": self.estadisticas()
+            }
+            f.write(json.dumps(cabecera, ensure_ascii=False) + "\n")
+            
+            for nombre in COLECCIONES:
+                for pagina in self.escanear(
+                    nombre,
+                    include=["documents", "metadatas", "embeddings"],
+                    tamano_pagina=tamano_pagina
+                ):
+                    for registro in self._registros_exportacion(nombre, pagina):
+                        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                    conteos[nombre] += len(pagina["ids"])
+            
+            for tipo, fila in self.duplicados.exportar():
+                f.write(json.dumps({"tipo": tipo, tipo: fila}, ensure_ascii=False) + "\n")
+                if tipo == "referencia":
+                    conteos["referencias"] = conteos.get("referencias", 0) + 1
+        
+        print(f"✓ Memoria exportada a: {output_path}")
+        for nombre, total in conteos.items():
+            print(f"  - {nombre}: {total}")
+        
+        return conteos
+    
+    @staticmethod
+    def _registros_exportacion(nombre: str, pagina: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Registros JSONL de una página de `escanear` (con embeddings)"""
+        embeddings = pagina.get("embeddings")
+        for idx, chunk_id in enumerate(pagina["ids"]):
+            yield {
+                "tipo": "registro",
+                "coleccion": nombre,
+                "id": chunk_id,
+                "documento": pagina["documents"][idx],
+                "metadata": pagina["metadatas"][idx],
+                "embedding": _codificar_embedding(
+                    embeddings[idx] if embeddings is not None else None
+                )
+            }
+    
+    def _paginas_interacciones(
+        self,
+        interaction_ids: List[str],
+        include: List[str],
+        filtros: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Páginas con todos los chunks de unas interacciones.
+        
+        Los chunks guardados como referencias (ver `deduplicar`) se
+        materializan con el texto y el embedding de su canónico.
+        """
+        for i in range(0, len(interaction_ids), self.tamano_pagina):
+            yield from self.escanear(
+                self.interactions,
+                {**(filtros or {}), "interaction_id": {"$in": interaction_ids[i:i + self.tamano_pagina]}},
+                include=include
+            )
+        referencias = self.duplicados.de_interacciones("interactions", interaction_ids)
+        for i in range(0, len(referencias), self.tamano_pagina):
+            yield self._pagina_referencias(referencias[i:i + self.tamano_pagina], include)
+    
+    def _pagina_referencias(self, referencias: List[Dict[str, Any]], include: List[str]) -> Dict[str, Any]:
+        """Página con la forma de `get` de chunks guardados como referencias"""
+        pagina: Dict[str, Any] = {"ids": [referencia["chunk_id"] for referencia in referencias]}
+        canonicos: Dict[str, Any] = {"ids": []}
+        if "embeddings" in include or "documents" in include:
+            canonicos = self.interactions.get(
+                ids=list(dict.fromkeys(referencia["canonico"] for referencia in referencias)),
+                include=[campo for campo in ("documents", "embeddings") if campo in include]
+            )
+        posicion = {chunk_id: i for i, chunk_id in enumerate(canonicos["ids"])}
+        if "documents" in include:
+            pagina["documents"] = [
+                referencia["documento"] or (
+                    canonicos["documents"][posicion[referencia["canonico"]]]
+                    if referencia["canonico"] in posicion else None
+                )
+                for referencia in referencias
+            ]
+        if "metadatas" in include:
+            pagina["metadatas"] = [dict(referencia["metadata"]) for referencia in referencias]
+        if "embeddings" in include:
+            pagina["embeddings"] = [
+                canonicos["embeddings"][posicion[referencia["canonico"]]]
+                if referencia["canonico"] in posicion else None
+                for referencia in referencias
+            ]
+        return pagina
+    
+    def archivar_interacciones(
+        self,
+        interaction_ids: List[str],
+        output_path: str,
+        compresion: Optional[str] = "auto",
+        filtros: Optional[Dict[str, Any]] = None,
+        cabecera: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Copia los chunks de unas interacciones a un archivo frío, sin borrarlos.
+        
+        El archivo tiene el formato de `exportar_memoria` (con embeddings y
+        cabeceras unidas), así que `importar_memoria` lo restaura sin
+        re-embeber. Se escribe en un temporal que se renombra al terminar.
+        
+        Args:
+            interaction_ids: Interacciones a archivar
+            output_path: Archivo de destino (.jsonl, .jsonl.gz, .jsonl.zst)
+            compresion: None, 'gzip', 'zstd' o 'auto' (según la extensión)
+            filtros: Filtros adicionales que acotan la búsqueda (ej. el ciclo,
+                para consultar solo su partición)
+            cabecera: Campos adicionales para la línea de cabecera
+            
+        Returns:
+            Diccionario con los ids de los chunks archivados, los bytes de
+            texto y de vectores que ocupaban y los bytes del archivo
+        """
+        destino = Path(output_path)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporal = destino.with_name(destino.name + ".tmp")
+        if compresion == "auto":
+            compresion = _compresion_por_extension(destino.name)
+        chunk_ids: List[str] = []
+        bytes_texto = 0
+        bytes_vectores = 0
+        
+        with _abrir_archivo(str(temporal), 'w', compresion) as f:
+            f.write(json.dumps({
+                **(cabecera or {}),
+                "tipo": "cabecera",
+                "formato": FORMATO_EXPORTACION,
+                "fecha_exportacion": datetime.now(timezone.utc).isoformat()
+            }, ensure_ascii=False) + "\n")
+            for pagina in self._paginas_interacciones(
+                interaction_ids,
+                ["documents", "metadatas", "embeddings"],
+                filtros
+            ):
+                embeddings = pagina.get("embeddings")
+                for idx, registro in enumerate(self._registros_exportacion("interactions", pagina)):
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                    bytes_texto += len(registro["documento"].encode("utf-8"))
+                    if embeddings is not None:
+                        bytes_vectores += len(embeddings[idx]) * 4
+                chunk_ids.extend(pagina["ids"])
+        temporal.replace(destino)
+        
+        return {
+            "chunk_ids": chunk_ids,
+            "bytes_texto": bytes_texto,
+            "bytes_vectores": bytes_vectores,
+            "bytes_archivo": destino.stat().st_size
+        }
+    
+    def olvidar_interacciones(
+        self,
+        interaction_ids: List[str],
+        chunk_ids: Optional[List[str]] = None
+    ) -> int:
+        """
+        Elimina unas interacciones de la memoria viva.
+        
+        Borra sus chunks (y su entrada en el índice léxico) y sus
+        cabeceras; los agregados y el índice de palabras clave se
+        actualizan con ellas.
+        
+        Args:
+            interaction_ids: Interacciones a eliminar
+            chunk_ids: Ids de sus chunks, si ya se conocen (se evita buscarlos)
+            
+        Returns:
+            Número de chunks eliminados
+        """
+        if chunk_ids is None:
+            chunk_ids = [
+                chunk_id
+                for pagina in self._paginas_interacciones(interaction_ids, [])
+                for chunk_id in pagina["ids"]
+            ]
+        self._borrar_lote(self.interactions, chunk_ids)
+        self.cabeceras.borrar(interaction_ids)
+        return len(chunk_ids)
+    
+    def importar_memoria(
+        self,
+        input_path: str,
+        compresion: Optional[str] = "auto",
+        batch_size: int = MAX_CHUNKS_POR_ADD
+    ) -> Dict[str, int]:
+        """
+        Restaura un archivo generado por `exportar_memoria`.
+        
+        Lee el archivo en flujo y escribe por lotes con `upsert`, reutilizando
+        los embeddings exportados; importar dos veces el mismo archivo no
+        duplica registros. Las huellas y referencias de chunks deduplicados
+        se registran al final, cuando sus canónicos ya están escritos.
+        
+        Args:
+            input_path: Ruta del archivo exportado
+            compresion: None, 'gzip', 'zstd' o 'auto' (según la extensión)
+            batch_size: Registros por escritura en cada colección
+            
+        Returns:
+            Diccionario con el número de registros importados por colección
+            (y de referencias de chunks deduplicados, si las hay)
+        """
+        batch_size = self._max_chunks_por_add(batch_size)
+        conteos = {nombre: 0 for nombre in COLECCIONES}
+        buffers: Dict[str, Dict[str, list]] = {
+            nombre: {"ids": [], "documentos": [], "metadatas": [], "embeddings": []}
+            for nombre in COLECCIONES
+        }
+        huellas: List[Dict[str, Any]] = []
+        referencias: List[Dict[str, Any]] = []
+        
+        def vaciar(nombre: str):
+            buffer = buffers[nombre]
+            if not buffer["ids"]:
+                return
+            embeddings = buffer["embeddings"]
+            faltantes = [i for i, emb in enumerate(embeddings) if emb is None]
+            if faltantes:
+                # Registros exportados sin embedding: se calculan solo esos
+                nuevos = self._embeber_documentos(
+                    [buffer["documentos"][i] for i in faltantes], nombre
+                )
+                for i, emb in zip(faltantes, nuevos):
+                    embeddings[i] = emb
+            self._escribir_lote(
+                getattr(self, nombre),
+                buffer["ids"],
+                buffer["documentos"],
+                buffer["metadatas"],
+                embeddings,
+                reemplazar=True
+            )
+            conteos[nombre] += len(buffer["ids"])
+            for lista in buffer.values():
+                lista.clear()
+        
+        with _abrir_archivo(input_path, 'r', compresion) as f:
+            for linea in f:
+                if not linea.strip():
+                    continue
+                registro = json.loads(linea)
+                if registro.get("tipo") == "cabecera":
+                    if registro.get("formato") != FORMATO_EXPORTACION:
+                        raise ValueError(
+                            f"Formato de exportación no soportado: {registro.get('formato')}"
+                        )
+                    continue
+                if registro.get("tipo") == "huella":
+                    huellas.append(registro["huella"])
+                    continue
+                if registro.get("tipo") == "referencia":
+                    referencias.append(registro["referencia"])
+                    continue
+                
+                nombre = registro["coleccion"]
+                if nombre not in buffers:
+                    raise ValueError(f"Colección desconocida en la exportación: {nombre}")
+                buffer = buffers[nombre]
+                buffer["ids"].append(registro["id"])
+                buffer["documentos"].append(registro["documento"])
+                buffer["metadatas"].append(registro["metadata"])
+                buffer["embeddings"].append(_decodificar_embedding(registro.get("embedding")))
+                if len(buffer["ids"]) >= batch_size:
+                    vaciar(nombre)
+        
+        for nombre in COLECCIONES:
+            vaciar(nombre)
+        
+        if huellas or referencias:
+            self._registrar_referencias(huellas, referencias)
+            conteos["referencias"] = len(referencias)
+        
+        print(f"✓ Memoria importada desde: {input_path}")
+        for nombre, total in conteos.items():
+            print(f"  - {nombre}: {total}")
+        
+        return conteos
 
 
 def demo_wabun():
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+WABUN Diario - Escritura Diferida de Interacciones con Diario Persistente
+Registra interacciones sin esperar al embedding y las vuelca a ChromaDB por lotes
+
+Autor: Manus AI (bajo la guía de WABUN y ARESK)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple
+import json
+import sqlite3
+import threading
+import uuid
+
+from wabun_core import WabunCore, EMBEDDING_BATCH_SIZE
+
+
+# Umbrales de volcado por defecto: interacciones pendientes y segundos
+MAX_PENDIENTES = 64
+INTERVALO_SEGUNDOS = 1.0
+
+# Interacciones máximas por volcado a ChromaDB
+MAX_INTERACCIONES_VOLCADO = 256
+
+
+class DiarioEscritura:
+    """
+    Diario de escritura anticipada (write-ahead) en SQLite.
+    
+    Cada interacción se anota, con su interaction_id ya asignado, antes de
+    embeberla. Las entradas se confirman (y se eliminan) cuando la
+    interacción está escrita en ChromaDB; las que quedan tras una caída se
+    reproducen al reabrir el diario.
+    """
+    
+    def __init__(self, ruta: str, sincronizar: bool = True):
+        """
+        Abre (o crea) el diario.
+        
+        Args:
+            ruta: Ruta del archivo SQLite del diario
+            sincronizar: Si forzar cada anotación a disco (`synchronous=FULL`);
+                sin ello una caída del sistema operativo, no del proceso,
+                puede perder las últimas anotaciones
+        """
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(str(ruta), check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(f"PRAGMA synchronous={'FULL' if sincronizar else 'NORMAL'}")
+        with self._conexion:
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS diario (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    interaction_id TEXT NOT NULL,
+                    interaccion TEXT NOT NULL
+                )
+                """
+            )
+    
+    def anotar(self, interaction_id: str, interaccion: Dict[str, Any]) -> int:
+        """
+        Anota una interacción pendiente de volcar.
+        
+        Returns:
+            Número de secuencia de la anotación
+        """
+        with self._lock, self._conexion:
+            cursor = self._conexion.execute(
+                "INSERT INTO diario (interaction_id, interaccion) VALUES (?, ?)",
+                (interaction_id, json.dumps(interaccion, ensure_ascii=False))
+            )
+            return cursor.lastrowid
+    
+    def pendientes(self, limite: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Anotaciones sin confirmar, en orden de llegada.
+        
+        Returns:
+            Lista de (seq, interacción con su interaction_id)
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT seq, interaction_id, interaccion FROM diario ORDER BY seq LIMIT ?",
+                (limite,)
+            ).fetchall()
+        return [
+            (seq, dict(json.loads(interaccion), interaction_id=interaction_id))
+            for seq, interaction_id, interaccion in filas
+        ]
+    
+    def confirmar(self, hasta_seq: int):
+        """Elimina las anotaciones ya escritas, hasta `hasta_seq` incluida"""
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM diario WHERE seq <= ?", (hasta_seq,))
+    
+    def contar(self) -> int:
+        """Número de anotaciones sin confirmar"""
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM diario").fetchone()[0]
+    
+    def cerrar(self):
+        """Cierra la conexión con el diario"""
+        with self._lock:
+            self._conexion.close()
+
+
+class EscritorDiferido:
+    """
+    Escritura diferida de interacciones (group commit).
+    
+    `registrar_interaccion` anota la interacción en el diario y devuelve su
+    interaction_id sin embeber. Un hilo en segundo plano vuelca las
+    pendientes a ChromaDB con `registrar_interacciones_lote` cuando se
+    acumulan `max_pendientes` o pasan `intervalo_segundos`. Los volcados
+    usan `upsert`, así que reproducir una anotación ya escrita no la
+    duplica. `flush()` espera a que todo lo anotado esté en ChromaDB.
+        
+        with EscritorDiferido(wabun) as escritor:
+            interaction_id = escritor.registrar_interaccion(prompt, respuesta, "LIANG", "Gemini")
+            escritor.flush()  # lecturas posteriores ya ven la interacción
+    """
+    
+    def __init__(
+        self,
+        wabun_core: WabunCore,
+        ruta_diario: Optional[str] = None,
+        max_pendientes: int = MAX_PENDIENTES,
+        intervalo_segundos: float = INTERVALO_SEGUNDOS,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        sincronizar: bool = True
+    ):
+        """
+        Abre el diario, reproduce sus anotaciones pendientes y arranca el hilo de volcado.
+        
+        Args:
+            wabun_core: Instancia de WabunCore
+            ruta_diario: Archivo del diario (por defecto `wabun_diario.sqlite3`
+                en el directorio de persistencia)
+            max_pendientes: Interacciones pendientes que disparan un volcado
+            intervalo_segundos: Espera máxima de una interacción antes de volcarse
+            batch_size: Chunks por llamada a la función de embeddings
+            sincronizar: Si forzar cada anotación a disco (ver `DiarioEscritura`)
+        """
+        self.wabun = wabun_core
+        self.metricas = wabun_core.metricas
+        self.max_pendientes = max(1, max_pendientes)
+        self.intervalo_segundos = intervalo_segundos
+        self.batch_size = batch_size
+        self.diario = DiarioEscritura(
+            ruta_diario or str(wabun_core.persist_directory / "wabun_diario.sqlite3"),
+            sincronizar=sincronizar
+        )
+        
+        self._lock_volcado = threading.Lock()
+        self._lock_pendientes = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self.pendientes = self.diario.contar()
+        self.volcadas = 0
+        self.ultimo_error: Optional[BaseException] = None
+        
+        # Anotaciones de una ejecución anterior que no llegaron a ChromaDB
+        self.reproducidas = self.flush() if self.pendientes else 0
+        if self.reproducidas:
+            print(f"✓ Diario reproducido: {self.reproducidas} interacciones pendientes")
+        
+        self._hilo = threading.Thread(target=self._bucle, name="wabun-escritor", daemon=True)
+        self._hilo.start()
+    
+    def registrar_interaccion(
+        self,
+        prompt_fundador: str,
+        respuesta_ia: str,
+        custodio_invocado: str,
+        motor_ia_usado: str,
+        intencion_fundador: Optional[str] = None,
+        palabras_clave: Optional[List[str]] = None,
+        proyecto_asociado: Optional[str] = None,
+        importancia: int = 3,
+        estado_decision: str = "Propuesta",
+        timestamp_utc: Optional[int] = None,
+        ciclo_id: Optional[str] = None,
+        fase_ciclo: Optional[str] = None
+    ) -> str:
+        """
+        Anota una interacción para registrarla en segundo plano.
+        
+        Mismos argumentos que `WabunCore.registrar_interaccion`. El
+        momento, el ciclo y la fase se fijan al anotar, no al volcar.
+        
+        Returns:
+            El interaction_id asignado
+        """
+        if self._detener.is_set():
+            raise RuntimeError("El escritor diferido está cerrado")
+        
+        interaction_id = f"int_{uuid.uuid4()}"
+        interaccion = {
+            "prompt_fundador": prompt_fundador,
+            "respuesta_ia": respuesta_ia,
+            "custodio_invocado": custodio_invocado,
+            "motor_ia_usado": motor_ia_usado,
+            "intencion_fundador": intencion_fundador,
+            "palabras_clave": palabras_clave,
+            "proyecto_asociado": proyecto_asociado,
+            "importancia": importancia,
+            "estado_decision": estado_decision,
+            "timestamp_utc": timestamp_utc or int(datetime.now(timezone.utc).timestamp()),
+            "ciclo_id": ciclo_id or self.wabun.ciclo_actual,
+            "fase_ciclo": fase_ciclo or self.wabun.fase_actual
+        }
+        with self.metricas.medir("diario.anotar"):
+            self.diario.anotar(interaction_id, interaccion)
+        
+        with self._lock_pendientes:
+            self.pendientes += 1
+            if self.pendientes >= self.max_pendientes:
+                self._despertar.set()
+        return interaction_id
+    
+    def _volcar(self) -> int:
+        """
+        Escribe en ChromaDB todas las anotaciones pendientes.
+        
+        Returns:
+            Número de interacciones volcadas
+        """
+        volcadas = 0
+        with self._lock_volcado:
+            while True:
+                lote = self.diario.pendientes(MAX_INTERACCIONES_VOLCADO)
+                if not lote:
+                    break
+                with self.metricas.medir("diario.volcar", elementos=len(lote)):
+                    self.wabun.registrar_interacciones_lote(
+                        [interaccion for _, interaccion in lote],
+                        batch_size=self.batch_size,
+                        reemplazar=True
+                    )
+                self.diario.confirmar(lote[-1][0])
+                volcadas += len(lote)
+                with self._lock_pendientes:
+                    self.pendientes = max(0, self.pendientes - len(lote))
+            self.volcadas += volcadas
+        return volcadas
+    
+    def _bucle(self):
+        """Hilo de volcado: despierta por tamaño o por tiempo"""
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo_segundos)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            try:
+                self._volcar()
+                self.ultimo_error = None
+            except Exception as error:
+                # Las anotaciones siguen en el diario: se reintentan en el
+                # siguiente intervalo y `flush()` propaga el error
+                self.ultimo_error = error
+    
+    def flush(self) -> int:
+        """
+        Barrera de lectura: vuelca ahora todo lo anotado hasta este momento.
+        
+        Al volver, las interacciones registradas antes de la llamada son
+        visibles en las búsquedas. Los errores de escritura se propagan.
+        
+        Returns:
+            Número de interacciones volcadas por esta llamada
+        """
+        return self._volcar()
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del escritor: pendientes, volcadas, reproducidas y último error"""
+        return {
+            "pendientes": self.diario.contar(),
+            "volcadas": self.volcadas,
+            "reproducidas": self.reproducidas,
+            "max_pendientes": self.max_pendientes,
+            "intervalo_segundos": self.intervalo_segundos,
+            "ultimo_error": repr(self.ultimo_error) if self.ultimo_error else None
+        }
+    
+    def cerrar(self, volcar: bool = True):
+        """
+        Detiene el hilo de volcado y cierra el diario.
+        
+        Args:
+            volcar: Si volcar antes las anotaciones pendientes (si no, se
+                reproducen la próxima vez que se abra el diario)
+        """
+        if self._detener.is_set():
+            return
+        self._detener.set()
+        self._despertar.set()
+        self._hilo.join()
+        if volcar:
+            self.flush()
+        self.diario.cerrar()
+    
+    def __enter__(self) -> "EscritorDiferido":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.cerrar()
@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+"""
+WABUN Duplicados - Deduplicación de Chunks en la Ingesta
+Huellas exactas y SimHash de los chunks recientes; las copias se guardan como referencias
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
+import hashlib
+import json
+import re
+import threading
+
+import numpy as np
+
+from wabun_indices import _abrir_sqlite, _MAX_PARAMETROS
+
+
+# Bits de la huella SimHash
+BITS_SIMHASH = 64
+
+# Bits distintos como máximo entre dos chunks casi idénticos. En el corpus
+# sintético de wabun_bench, cambiar una palabra de una respuesta deja la
+# huella a 6 bits de mediana, y dos respuestas distintas nunca quedan a
+# menos de 18
+UMBRAL_HAMMING = 8
+
+# Palabras por shingle, y shingles mínimos para comparar por SimHash
+# (los chunks más cortos solo se deduplican si son idénticos)
+PALABRAS_SHINGLE = 3
+SHINGLES_MINIMOS = 8
+
+# Chunks canónicos recientes que se conservan en el índice de huellas
+MAX_HUELLAS_RECIENTES = 50000
+
+# Roles cuyos chunks se deduplican (las respuestas repiten encabezados,
+# advertencias y contexto; los prompts del Fundador se guardan siempre)
+ROLES_DEDUPLICADOS = ("Motor_IA",)
+
+# Metadatos que delimitan dónde se busca el original: un chunk solo
+# referencia a otro del mismo custodio y rol, así que los filtros por
+# ellos siguen encontrando el texto. Los filtros por otros campos
+# (proyecto, ciclo, interacción) se resuelven también con los metadatos
+# de las referencias (ver `IndiceDuplicados.filtrar`)
+CAMPOS_AMBITO = ("custodio_invocado", "rol")
+
+# Comparaciones numéricas de los filtros `where`, en SQL
+_OPERADORES_SQL = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+_PATRON_PALABRAS = re.compile(r"\w+", re.UNICODE)
+_MASCARA = (1 << BITS_SIMHASH) - 1
+
+# Bits a uno de cada byte, para contar los de muchas huellas a la vez
+_BITS_POR_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def huella_exacta(texto: str) -> str:
+    """Huella SHA-256 del texto de un chunk (32 caracteres hexadecimales)"""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+def simhash(texto: str, palabras_shingle: int = PALABRAS_SHINGLE) -> Optional[int]:
+    """
+    Huella SimHash de 64 bits de un texto.
+    
+    Cada shingle de palabras (en minúsculas) se resume con BLAKE2b y vota
+    cada bit de la huella; textos que comparten casi todos sus shingles
+    quedan a pocos bits de distancia.
+    
+    Returns:
+        Huella sin signo, o None si el texto tiene menos de SHINGLES_MINIMOS shingles
+    """
+    palabras = _PATRON_PALABRAS.findall(texto.lower())
+    total = len(palabras) - palabras_shingle + 1
+    if total < SHINGLES_MINIMOS:
+        return None
+    resumenes = b"".join(
+        hashlib.blake2b(" ".join(palabras[i:i + palabras_shingle]).encode("utf-8"), digest_size=8).digest()
+        for i in range(total)
+    )
+    bits = np.unpackbits(np.frombuffer(resumenes, dtype=np.uint8).reshape(total, 8), axis=1, bitorder="little")
+    votos = bits.sum(axis=0, dtype=np.int64) * 2 - total
+    return int.from_bytes(np.packbits(votos > 0, bitorder="little").tobytes(), "little")
+
+
+def distancia_hamming(a: int, b: int) -> int:
+    """Bits distintos entre dos huellas SimHash"""
+    return ((a ^ b) & _MASCARA).bit_count()
+
+
+def distancias_hamming(huella: int, huellas: np.ndarray) -> np.ndarray:
+    """Bits distintos entre una huella y un vector de huellas (uint64)"""
+    diferencias = np.bitwise_xor(huellas, np.uint64(huella))
+    return _BITS_POR_BYTE[diferencias.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _con_signo(huella: Optional[int]) -> Optional[int]:
+    """Huella sin signo como entero de 64 bits de SQLite"""
+    if huella is None:
+        return None
+    return huella - (1 << BITS_SIMHASH) if huella >= 1 << (BITS_SIMHASH - 1) else huella
+
+
+def _condicion_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Traduce un filtro `where` de ChromaDB a SQL sobre los metadatos de las referencias.
+    
+    Sigue la semántica de ChromaDB: `$ne` y `$nin` también cumplen si
+    falta el campo, y las comparaciones numéricas solo con números.
+    """
+    partes: List[str] = []
+    parametros: List[Any] = []
+    for clave, condicion in where.items():
+        if clave in ("$and", "$or"):
+            subcondiciones = [_condicion_sql(parte) for parte in condicion]
+            if not subcondiciones:
+                partes.append("1" if clave == "$and" else "0")
+                continue
+            enlace = " AND " if clave == "$and" else " OR "
+            partes.append("(" + enlace.join(sql for sql, _ in subcondiciones) + ")")
+            for _, valores in subcondiciones:
+                parametros.extend(valores)
+            continue
+        operadores = condicion if isinstance(condicion, dict) else {"$eq": condicion}
+        for operador, valor in operadores.items():
+            sql, valores = _comparacion_sql(clave, operador, valor)
+            partes.append(sql)
+            parametros.extend(valores)
+    return " AND ".join(partes) or "1", parametros
+
+
+def _comparacion_sql(campo: str, operador: str, valor: Any) -> Tuple[str, List[Any]]:
+    ruta = '$."' + campo.replace('"', '\\"') + '"'
+    columna = "json_extract(metadata, ?)"
+    if operador == "$eq":
+        return f"{columna} = ?", [ruta, valor]
+    if operador == "$ne":
+        return f"({columna} IS NULL OR {columna} <> ?)", [ruta, ruta, valor]
+    if operador == "$in":
+        return f"{columna} IN (SELECT value FROM json_each(?))", [ruta, json.dumps(list(valor))]
+    if operador == "$nin":
+        return (
+            f"({columna} IS NULL OR {columna} NOT IN (SELECT value FROM json_each(?)))",
+            [ruta, ruta, json.dumps(list(valor))]
+        )
+    if operador in _OPERADORES_SQL:
+        if not isinstance(valor, (int, float)) or isinstance(valor, bool):
+            raise ValueError(f"{operador} solo admite números, no {valor!r}")
+        return (
+            f"(typeof({columna}) IN ('integer', 'real') AND {columna} {_OPERADORES_SQL[operador]} ?)",
+            [ruta, ruta, valor]
+        )
+    raise ValueError(f"Operador no soportado en where: {operador}")
+
+
+class IndiceDuplicados:
+    """
+    Huellas de los chunks canónicos recientes y referencias de sus copias.
+    
+    Al ingerir, cada chunk se compara con las huellas de su ámbito: si su
+    SHA-256 coincide es un duplicado exacto, y si su SimHash está a
+    `umbral_hamming` bits o menos de otro, uno casi idéntico. En ambos
+    casos no se embebe ni se escribe en la colección; se guarda una
+    referencia (su id, el del chunk canónico, su interacción y sus
+    metadatos) y, si no es idéntico, su propio texto.
+    
+    Las referencias conservan el linaje: las búsquedas añaden a cada
+    chunk canónico las interacciones que también lo contenían, los
+    recorridos por interacción las materializan y, si se borra un chunk
+    canónico, una de sus referencias ocupa su lugar.
+    """
+    
+    def __init__(self, ruta: str, solo_lectura: bool = False):
+        """
+        Inicializa el índice.
+        
+        Args:
+            ruta: Archivo SQLite (se crea si no existe)
+            solo_lectura: Si abrir un índice existente e inmutable (snapshot)
+        """
+        self.ruta = str(ruta)
+        self._lock = threading.Lock()
+        self._conexion = _abrir_sqlite(self.ruta, solo_lectura)
+        # Huellas SimHash por (colección, ámbito), cargadas en el primer uso
+        self._cache: Dict[Tuple[str, str], Tuple[List[str], np.ndarray]] = {}
+        if solo_lectura:
+            # Snapshots anteriores a la deduplicación: sin referencias
+            self._existe = self._conexion.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'referencias_chunks'"
+            ).fetchone() is not None
+            return
+        self._existe = True
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS huellas_chunks (
+                id INTEGER PRIMARY KEY,
+                coleccion TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                ambito TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                simhash INTEGER,
+                UNIQUE (coleccion, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS huellas_hash ON huellas_chunks (coleccion, ambito, hash);
+            CREATE TABLE IF NOT EXISTS referencias_chunks (
+                coleccion TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                canonico TEXT NOT NULL,
+                interaction_id TEXT,
+                tipo TEXT NOT NULL,
+                distancia INTEGER NOT NULL,
+                bytes_texto INTEGER NOT NULL,
+                documento TEXT,
+                metadata TEXT NOT NULL,
+                PRIMARY KEY (coleccion, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS referencias_canonico ON referencias_chunks (coleccion, canonico);
+            CREATE INDEX IF NOT EXISTS referencias_interaccion ON referencias_chunks (interaction_id);
+        """)
+        self._conexion.commit()
+    
+    @staticmethod
+    def ambito(metadata: Dict[str, Any], campos: Iterable[str] = CAMPOS_AMBITO) -> str:
+        """Clave del ámbito de un chunk (los valores de CAMPOS_AMBITO)"""
+        return json.dumps([metadata.get(campo) for campo in campos], ensure_ascii=False)
+    
+    def _canonicos(self, coleccion: str, ids: List[str]) -> set:
+        """Ids que ya son chunks canónicos del índice"""
+        return {
+            chunk_id for (chunk_id,) in self._filas(
+                "SELECT chunk_id FROM huellas_chunks WHERE coleccion = ? AND chunk_id IN (?)",
+                [coleccion], ids
+            )
+        }
+    
+    def separar(
+        self,
+        coleccion: str,
+        ids: List[str],
+        documentos: List[str],
+        metadatas: List[Dict[str, Any]],
+        umbral_hamming: int = UMBRAL_HAMMING,
+        roles: Iterable[str] = ROLES_DEDUPLICADOS,
+        campos_ambito: Iterable[str] = CAMPOS_AMBITO
+    ) -> Tuple[List[int], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Separa un lote de chunks en nuevos y duplicados, sin escribir nada.
+        
+        Los chunks del propio lote también se comparan entre sí. Un chunk
+        que ya es canónico (una reescritura con `upsert`) sigue siéndolo.
+        
+        Args:
+            coleccion: Nombre de la colección
+            ids: Ids de los chunks
+            documentos: Texto de cada chunk
+            metadatas: Metadatos completos de cada chunk
+            umbral_hamming: Bits distintos como máximo para ser casi idéntico
+                (0 para deduplicar solo copias exactas)
+            roles: Roles cuyos chunks se deduplican
+            campos_ambito: Metadatos que delimitan dónde se busca el original
+        
+        Returns:
+            Tupla (posiciones de los chunks nuevos, huellas de los nuevos y
+            referencias de los duplicados) para `guardar` tras escribirlos
+        """
+        if not 0 <= umbral_hamming < BITS_SIMHASH // 2:
+            raise ValueError(f"umbral_hamming debe estar entre 0 y {BITS_SIMHASH // 2 - 1}")
+        roles = set(roles)
+        campos_ambito = tuple(campos_ambito)
+        nuevos: List[int] = []
+        huellas: List[Dict[str, Any]] = []
+        referencias: List[Dict[str, Any]] = []
+        # Huellas de los chunks nuevos de este lote (aún no están en SQLite)
+        lote_hash: Dict[Tuple[str, str], str] = {}
+        lote_simhash: List[Tuple[str, int, str]] = []
+        
+        with self._lock:
+            ya_canonicos = self._canonicos(coleccion, list(ids))
+            for posicion, (chunk_id, documento, metadata) in enumerate(zip(ids, documentos, metadatas)):
+                ambito = self.ambito(metadata, campos_ambito)
+                huella = huella_exacta(documento)
+                huella_similar = simhash(documento) if umbral_hamming > 0 else None
+                
+                original, distancia, tipo = None, 0, "exacto"
+                if metadata.get("rol") in roles and chunk_id not in ya_canonicos:
+                    original = lote_hash.get((ambito, huella))
+                    if original is None:
+                        fila = self._conexion.execute(
+                            "SELECT chunk_id FROM huellas_chunks "
+                            "WHERE coleccion = ? AND ambito = ? AND hash = ? LIMIT 1",
+                            (coleccion, ambito, huella)
+                        ).fetchone()
+                        original = fila[0] if fila else None
+                    if original is None and huella_similar is not None:
+                        original, distancia = self._mas_cercano(
+                            coleccion, ambito, huella_similar, umbral_hamming, lote_simhash
+                        )
+                        tipo = "similar"
+                
+                if original is None:
+                    nuevos.append(posicion)
+                    huellas.append({
+                        "coleccion": coleccion, "chunk_id": chunk_id, "ambito": ambito,
+                        "hash": huella, "simhash": _con_signo(huella_similar)
+                    })
+                    lote_hash.setdefault((ambito, huella), chunk_id)
+                    if huella_similar is not None:
+                        lote_simhash.append((ambito, huella_similar, chunk_id))
+                else:
+                    # Una copia exacta se lee del canónico; una casi idéntica
+                    # guarda su texto para que el linaje no pierda nada
+                    referencias.append({
+                        "coleccion": coleccion, "chunk_id": chunk_id, "canonico": original,
+                        "interaction_id": metadata.get("interaction_id"),
+                        "tipo": tipo, "distancia": distancia,
+                        "bytes_texto": len(documento.encode("utf-8")),
+                        "documento": None if tipo == "exacto" else documento,
+                        "metadata": metadata
+                    })
+        return nuevos, huellas, referencias
+    
+    @staticmethod
+    def resumir(referencias: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Ahorro de unas referencias devueltas por `separar`"""
+        exactas = [referencia for referencia in referencias if referencia["tipo"] == "exacto"]
+        return {
+            "exactos": len(exactas),
+            "similares": len(referencias) - len(exactas),
+            "embeddings_evitados": len(referencias),
+            "bytes_texto_evitados": sum(referencia["bytes_texto"] for referencia in exactas)
+        }
+    
+    def _recientes(self, coleccion: str, ambito: str) -> Tuple[List[str], np.ndarray]:
+        """Ids y huellas SimHash de los canónicos recientes de un ámbito (en memoria)"""
+        clave = (coleccion, ambito)
+        if clave not in self._cache:
+            filas = self._conexion.execute(
+                "SELECT chunk_id, simhash FROM huellas_chunks "
+                "WHERE coleccion = ? AND ambito = ? AND simhash IS NOT NULL ORDER BY id",
+                clave
+            ).fetchall()
+            self._cache[clave] = (
+                [chunk_id for chunk_id, _ in filas],
+                np.array([valor for _, valor in filas], dtype=np.int64).view(np.uint64)
+            )
+        return self._cache[clave]
+    
+    def _mas_cercano(
+        self,
+        coleccion: str,
+        ambito: str,
+        huella: int,
+        umbral_hamming: int,
+        lote_simhash: List[Tuple[str, int, str]]
+    ) -> Tuple[Optional[str], int]:
+        """
+        Chunk canónico más cercano por SimHash dentro del umbral (o None).
+        
+        Las huellas recientes del ámbito se comparan todas de una vez en
+        NumPy (XOR y recuento de bits), sin perder ningún candidato.
+        """
+        mejor, mejor_distancia = None, umbral_hamming + 1
+        ids, huellas = self._recientes(coleccion, ambito)
+        if len(ids):
+            distancias = distancias_hamming(huella, huellas)
+            posicion = int(np.argmin(distancias))
+            if distancias[posicion] < mejor_distancia:
+                mejor, mejor_distancia = ids[posicion], int(distancias[posicion])
+        for a, valor, chunk_id in lote_simhash:
+            distancia = distancia_hamming(huella, valor)
+            if a == ambito and distancia < mejor_distancia:
+                mejor, mejor_distancia = chunk_id, distancia
+        return (mejor, mejor_distancia) if mejor is not None else (None, 0)
+    
+    def guardar(
+        self,
+        huellas: List[Dict[str, Any]],
+        referencias: List[Dict[str, Any]],
+        max_recientes: int = MAX_HUELLAS_RECIENTES
+    ):
+        """
+        Registra las huellas de los chunks ya escritos y las referencias de sus copias.
+        
+        Se llama después de escribir los chunks nuevos en la colección, de
+        modo que ninguna referencia apunta a un chunk que aún no existe.
+        Las huellas más antiguas que `max_recientes` salen del índice (sus
+        referencias se conservan).
+        
+        Args:
+            huellas: Huellas de los chunks canónicos (como las de `separar`)
+            referencias: Referencias de sus copias (como las de `separar`)
+            max_recientes: Huellas que se conservan en el índice
+        """
+        if not huellas and not referencias:
+            return
+        with self._lock:
+            self._conexion.executemany(
+                "INSERT INTO huellas_chunks (coleccion, chunk_id, ambito, hash, simhash) "
+                "VALUES (:coleccion, :chunk_id, :ambito, :hash, :simhash) "
+                "ON CONFLICT (coleccion, chunk_id) DO UPDATE SET "
+                "ambito = excluded.ambito, hash = excluded.hash, simhash = excluded.simhash",
+                huellas
+            )
+            # Un chunk que vuelve a ser canónico deja de ser una referencia
+            self._conexion.executemany(
+                "DELETE FROM referencias_chunks WHERE coleccion = :coleccion AND chunk_id = :chunk_id",
+                huellas
+            )
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO referencias_chunks (coleccion, chunk_id, canonico, interaction_id, "
+                "tipo, distancia, bytes_texto, documento, metadata) VALUES (:coleccion, :chunk_id, "
+                ":canonico, :interaction_id, :tipo, :distancia, :bytes_texto, :documento, :metadata)",
+                [
+                    {**referencia, "metadata": json.dumps(referencia["metadata"], ensure_ascii=False)}
+                    for referencia in referencias
+                ]
+            )
+            # Se poda a rachas (al pasar del máximo en un 10%) para no
+            # recargar las huellas en memoria en cada lote
+            minimo, maximo = self._conexion.execute("SELECT MIN(id), MAX(id) FROM huellas_chunks").fetchone()
+            max_recientes = max(1, max_recientes)
+            if maximo is not None and maximo - minimo >= max_recientes * 1.1:
+                self._conexion.execute("DELETE FROM huellas_chunks WHERE id <= ?", (maximo - max_recientes,))
+                self._cache.clear()
+            self._conexion.commit()
+            nuevas: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}
+            for huella in huellas:
+                clave = (huella["coleccion"], huella["ambito"])
+                if huella["simhash"] is not None and clave in self._cache:
+                    nuevas.setdefault(clave, []).append((huella["chunk_id"], huella["simhash"]))
+            for clave, filas in nuevas.items():
+                ids, valores = self._cache[clave]
+                self._cache[clave] = (
+                    ids + [chunk_id for chunk_id, _ in filas],
+                    np.concatenate([valores, np.array([v for _, v in filas], dtype=np.int64).view(np.uint64)])
+                )
+    
+    def _filas(self, sql: str, prefijo: List[Any], valores: List[str]) -> List[Tuple]:
+        """Ejecuta una consulta `... IN (?)` por partes de _MAX_PARAMETROS valores"""
+        filas: List[Tuple] = []
+        for i in range(0, len(valores), _MAX_PARAMETROS):
+            parte = valores[i:i + _MAX_PARAMETROS]
+            filas.extend(self._conexion.execute(
+                sql.replace("(?)", f"({','.join('?' * len(parte))})"), [*prefijo, *parte]
+            ))
+        return filas
+    
+    def interacciones(self, coleccion: str, canonicos: Iterable[str]) -> Dict[str, List[str]]:
+        """Interacciones que referencian cada chunk canónico (solo los que tienen referencias)"""
+        canonicos = list(dict.fromkeys(canonicos))
+        if not self._existe or not canonicos:
+            return {}
+        resultado: Dict[str, List[str]] = {}
+        with self._lock:
+            filas = self._filas(
+                "SELECT canonico, interaction_id FROM referencias_chunks "
+                "WHERE coleccion = ? AND canonico IN (?) ORDER BY canonico, interaction_id",
+                [coleccion], canonicos
+            )
+        for canonico, interaction_id in filas:
+            if interaction_id and interaction_id not in resultado.setdefault(canonico, []):
+                resultado[canonico].append(interaction_id)
+        return resultado
+    
+    def unir(
+        self,
+        coleccion: str,
+        ids: List[str],
+        metadatas: List[Optional[Dict[str, Any]]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Añade en el sitio el linaje de los chunks canónicos de un resultado.
+        
+        Los metadatos de cada chunk con referencias reciben
+        `interacciones_duplicadas`: las demás interacciones que contenían
+        su texto (o uno casi idéntico).
+        
+        Returns:
+            La misma lista, completada
+        """
+        linaje = self.interacciones(coleccion, ids)
+        for chunk_id, metadata in zip(ids, metadatas):
+            if metadata is not None and chunk_id in linaje:
+                propia = metadata.get("interaction_id")
+                metadata["interacciones_duplicadas"] = [i for i in linaje[chunk_id] if i != propia]
+        return metadatas
+    
+    def de_interacciones(self, coleccion: str, interaction_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Referencias de los chunks de unas interacciones.
+        
+        Returns:
+            Lista de diccionarios con chunk_id, canonico, documento (None
+            en las copias exactas) y metadata (completa)
+        """
+        interaction_ids = list(dict.fromkeys(interaction_ids))
+        if not self._existe or not interaction_ids:
+            return []
+        with self._lock:
+            filas = self._filas(
+                "SELECT chunk_id, canonico, documento, metadata FROM referencias_chunks "
+                "WHERE coleccion = ? AND interaction_id IN (?) ORDER BY chunk_id",
+                [coleccion], interaction_ids
+            )
+        return [
+            {"chunk_id": chunk_id, "canonico": canonico, "documento": documento, "metadata": json.loads(metadata)}
+            for chunk_id, canonico, documento, metadata in filas
+        ]
+    
+    def filtrar(
+        self,
+        coleccion: str,
+        where: Optional[Dict[str, Any]] = None,
+        canonicos: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Referencias cuyos metadatos cumplen un filtro `where` de ChromaDB.
+        
+        Args:
+            coleccion: Nombre de la colección
+            where: Filtro con la sintaxis de ChromaDB (None para todas)
+            canonicos: Limitar a las referencias de estos chunks canónicos
+        
+        Returns:
+            Lista de diccionarios como los de `de_interacciones`
+        """
+        if not self._existe:
+            return []
+        condicion, parametros = _condicion_sql(where) if where else ("1", [])
+        sql = (
+            "SELECT chunk_id, canonico, documento, metadata FROM referencias_chunks "
+            f"WHERE coleccion = ? AND {condicion}"
+        )
+        parametros = [coleccion, *parametros]
+        if canonicos is not None:
+            canonicos = list(dict.fromkeys(canonicos))
+            if not canonicos:
+                return []
+            sql += " AND canonico IN (SELECT value FROM json_each(?))"
+            parametros.append(json.dumps(canonicos))
+        with self._lock:
+            filas = self._conexion.execute(sql + " ORDER BY chunk_id", parametros).fetchall()
+        return [
+            {"chunk_id": chunk_id, "canonico": canonico, "documento": documento, "metadata": json.loads(metadata)}
+            for chunk_id, canonico, documento, metadata in filas
+        ]
+    
+    def promociones(self, coleccion: str, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Referencia que sustituirá a cada chunk canónico que se va a borrar.
+        
+        Solo se consideran las referencias que no se borran a la vez, y
+        las copias exactas antes que las casi idénticas (así las demás
+        copias exactas siguen leyendo el mismo texto).
+        
+        Returns:
+            Diccionario {canonico: referencia (como en `de_interacciones`)}
+        """
+        ids = list(dict.fromkeys(ids))
+        if not self._existe or not ids:
+            return {}
+        borrados = set(ids)
+        with self._lock:
+            filas = self._filas(
+                "SELECT canonico, chunk_id, documento, metadata FROM referencias_chunks "
+                "WHERE coleccion = ? AND canonico IN (?) ORDER BY canonico, tipo <> 'exacto', chunk_id",
+                [coleccion], ids
+            )
+        promociones: Dict[str, Dict[str, Any]] = {}
+        for canonico, chunk_id, documento, metadata in filas:
+            if chunk_id not in borrados and canonico not in promociones:
+                promociones[canonico] = {
+                    "chunk_id": chunk_id, "canonico": canonico,
+                    "documento": documento, "metadata": json.loads(metadata)
+                }
+        return promociones
+    
+    def borrar(self, coleccion: str, ids: Iterable[str], promovidos: Optional[Dict[str, str]] = None):
+        """
+        Actualiza el índice tras borrar chunks de una colección.
+        
+        Args:
+            coleccion: Nombre de la colección
+            ids: Ids de los chunks borrados (canónicos o referencias)
+            promovidos: {canonico borrado: referencia que ya ocupa su lugar};
+                las demás referencias y la huella pasan a apuntar a ella
+        """
+        ids = list(dict.fromkeys(ids))
+        if not self._existe or not ids:
+            return
+        with self._lock:
+            for canonico, nuevo in (promovidos or {}).items():
+                self._conexion.execute(
+                    "DELETE FROM referencias_chunks WHERE coleccion = ? AND chunk_id = ?", (coleccion, nuevo)
+                )
+                self._conexion.execute(
+                    "UPDATE referencias_chunks SET canonico = ? WHERE coleccion = ? AND canonico = ?",
+                    (nuevo, coleccion, canonico)
+                )
+                self._conexion.execute(
+                    "UPDATE huellas_chunks SET chunk_id = ? WHERE coleccion = ? AND chunk_id = ?",
+                    (nuevo, coleccion, canonico)
+                )
+            for sql in (
+                "DELETE FROM referencias_chunks WHERE coleccion = ? AND chunk_id IN (?)",
+                # Canónicos sin referencias que los sustituyan: sus copias se pierden con ellos
+                "DELETE FROM referencias_chunks WHERE coleccion = ? AND canonico IN (?)",
+                "DELETE FROM huellas_chunks WHERE coleccion = ? AND chunk_id IN (?)"
+            ):
+                self._filas(sql, [coleccion], ids)
+            self._conexion.commit()
+            self._cache.clear()
+    
+    def exportar(self, tamano_pagina: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Recorre las huellas y las referencias guardadas, página a página.
+        
+        Yields:
+            Tuplas ("huella", huella) y ("referencia", referencia), con la
+            forma de las de `separar`, aptas para volver a `guardar`
+        """
+        if not self._existe:
+            return
+        ultimo = -1
+        while True:
+            with self._lock:
+                filas = self._conexion.execute(
+                    "SELECT id, coleccion, chunk_id, ambito, hash, simhash FROM huellas_chunks "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (ultimo, tamano_pagina)
+                ).fetchall()
+            for fila in filas:
+                yield "huella", dict(zip(("coleccion", "chunk_id", "ambito", "hash", "simhash"), fila[1:]))
+            if len(filas) < tamano_pagina:
+                break
+            ultimo = filas[-1][0]
+        columnas = (
+            "coleccion", "chunk_id", "canonico", "interaction_id", "tipo",
+            "distancia", "bytes_texto", "documento", "metadata"
+        )
+        ultimo_clave = ("", "")
+        while True:
+            with self._lock:
+                filas = self._conexion.execute(
+                    f"SELECT {', '.join(columnas)} FROM referencias_chunks "
+                    f"WHERE (coleccion, chunk_id) > (?, ?) ORDER BY coleccion, chunk_id LIMIT ?",
+                    (*ultimo_clave, tamano_pagina)
+                ).fetchall()
+            for fila in filas:
+                referencia = dict(zip(columnas, fila))
+                referencia["metadata"] = json.loads(referencia["metadata"])
+                yield "referencia", referencia
+            if len(filas) < tamano_pagina:
+                break
+            ultimo_clave = (filas[-1][0], filas[-1][1])
+    
+    def canonicos_de(self, coleccion: str, ids: Iterable[str]) -> Dict[str, str]:
+        """Chunk canónico de cada id que es una referencia (los demás no aparecen)"""
+        ids = list(dict.fromkeys(ids))
+        if not self._existe or not ids:
+            return {}
+        with self._lock:
+            return dict(self._filas(
+                "SELECT chunk_id, canonico FROM referencias_chunks WHERE coleccion = ? AND chunk_id IN (?)",
+                [coleccion], ids
+            ))
+    
+    def estadisticas(self) -> Dict[str, int]:
+        """Referencias guardadas por tipo, bytes de texto que no se duplicaron y huellas recientes"""
+        if not self._existe:
+            return {"referencias": 0, "exactos": 0, "similares": 0, "bytes_texto_evitados": 0, "huellas": 0}
+        with self._lock:
+            exactos, similares, bytes_texto = self._conexion.execute(
+                "SELECT IFNULL(SUM(tipo = 'exacto'), 0), IFNULL(SUM(tipo = 'similar'), 0), "
+                "IFNULL(SUM(CASE WHEN tipo = 'exacto' THEN bytes_texto ELSE 0 END), 0) "
+                "FROM referencias_chunks"
+            ).fetchone()
+            huellas = self._conexion.execute("SELECT COUNT(*) FROM huellas_chunks").fetchone()[0]
+        return {
+            "referencias": exactos + similares,
+            "exactos": exactos,
+            "similares": similares,
+            "bytes_texto_evitados": bytes_texto,
+            "huellas": huellas
+        }
+    
+    def cerrar(self):
+        """Cierra la base SQLite"""
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+WABUN Embeddings - Caché de Embeddings Direccionada por Contenido
+Evita recalcular embeddings de textos ya vistos por WABUN
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Envoltorio con caché para una función de embeddings de ChromaDB.
+    
+    Cada texto se identifica por un hash de su contenido y del modelo que
+    lo embebe. La caché tiene dos niveles: un LRU en memoria acotado por
+    número de entradas y, opcionalmente, un archivo SQLite en disco que
+    sobrevive a reinicios. Solo los textos que no están en ningún nivel
+    llegan al modelo.
+    
+    ChromaDB guarda en la configuración de cada colección el nombre y la
+    configuración de su función de embeddings, y registra su clase. Cada
+    tipo de función envuelta tiene por eso su propia subclase, con el
+    `name()` y el `build_from_config()` de la clase real: la colección
+    queda registrada con la función real, con o sin caché.
+    """
+    
+    # Subclase por tipo de función envuelta (ver `__new__`)
+    _subclases: Dict[type, type] = {}
+    
+    def __new__(cls, embedding_function: Any, *args, **kwargs):
+        tipo = type(embedding_function)
+        if cls is not EmbeddingCache or not callable(getattr(tipo, "name", None)):
+            return super().__new__(cls)
+        subclase = EmbeddingCache._subclases.get(tipo)
+        if subclase is None:
+            subclase = type(f"EmbeddingCache[{tipo.__name__}]", (EmbeddingCache,), {
+                "name": staticmethod(tipo.name),
+                "build_from_config": staticmethod(tipo.build_from_config)
+            })
+            EmbeddingCache._subclases[tipo] = subclase
+        return super().__new__(subclase)
+    
+    def __init__(
+        self,
+        embedding_function: Any,
+        max_entradas: int = 10000,
+        ruta_disco: Optional[str] = None,
+        modelo: Optional[str] = None
+    ):
+        """
+        Inicializa la caché.
+        
+        Args:
+            embedding_function: Función de embeddings a envolver
+            max_entradas: Máximo de embeddings en el nivel en memoria
+            ruta_disco: Archivo SQLite del nivel en disco (opcional)
+            modelo: Identificador del modelo para la clave (por defecto se deduce)
+        """
+        self._funcion = embedding_function
+        self.max_entradas = max(0, max_entradas)
+        self.modelo = modelo or self._identificar_modelo(embedding_function)
+        self._memoria: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        
+        self._disco: Optional[sqlite3.Connection] = None
+        if ruta_disco:
+            Path(ruta_disco).parent.mkdir(parents=True, exist_ok=True)
+            self._disco = sqlite3.connect(str(ruta_disco), check_same_thread=False)
+            self._disco.execute("PRAGMA journal_mode=WAL")
+            self._disco.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "clave BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._disco.commit()
+    
+    @staticmethod
+    def _identificar_modelo(embedding_function: Any) -> str:
+        """Construye un identificador estable del modelo de embeddings"""
+        nombre_clase = type(embedding_function).__name__
+        nombre = getattr(embedding_function, "name", None)
+        if callable(nombre):
+            try:
+                nombre = nombre()
+            except Exception:
+                nombre = None
+        if isinstance(nombre, str):
+            return f"{nombre_clase}:{nombre}"
+        return nombre_clase
+    
+    def __getattr__(self, nombre: str) -> Any:
+        # ChromaDB consulta default_space(), supported_spaces(), etc.; se
+        # delegan al modelo real
+        if nombre == "_funcion":
+            raise AttributeError(nombre)
+        return getattr(self._funcion, nombre)
+    
+    def is_legacy(self) -> bool:
+        """Si la función envuelta no declara nombre ni configuración para ChromaDB"""
+        es_legada = getattr(self._funcion, "is_legacy", None)
+        return es_legada() if callable(es_legada) else True
+    
+    def get_config(self) -> Dict[str, Any]:
+        """Configuración de la función envuelta (la caché no se persiste)"""
+        return self._funcion.get_config()
+    
+    def _clave(self, texto: str, espacio: str = "") -> bytes:
+        return hashlib.sha256(f"{self.modelo}{espacio}\x00{texto}".encode("utf-8")).digest()
+    
+    def _guardar_en_memoria(self, clave: bytes, vector: np.ndarray):
+        if self.max_entradas == 0:
+            return
+        self._memoria[clave] = vector
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+    
+    def _leer_de_disco(self, claves: List[bytes]) -> Dict[bytes, np.ndarray]:
+        encontrados: Dict[bytes, np.ndarray] = {}
+        if self._disco is None or not claves:
+            return encontrados
+        # SQLite limita el número de parámetros por sentencia
+        for i in range(0, len(claves), 500):
+            parte = claves[i:i + 500]
+            marcadores = ",".join("?" * len(parte))
+            filas = self._disco.execute(
+                f"SELECT clave, vector FROM embeddings WHERE clave IN ({marcadores})",
+                parte
+            )
+            for clave, vector in filas:
+                encontrados[clave] = np.frombuffer(vector, dtype=np.float32)
+        return encontrados
+    
+    def _escribir_en_disco(self, nuevos: Dict[bytes, np.ndarray]):
+        if self._disco is None or not nuevos:
+            return
+        self._disco.executemany(
+            "INSERT OR REPLACE INTO embeddings (clave, vector) VALUES (?, ?)",
+            [(clave, vector.tobytes()) for clave, vector in nuevos.items()]
+        )
+        self._disco.commit()
+    
+    def _embeber(self, textos: List[str], funcion, espacio: str = "") -> List[np.ndarray]:
+        claves = [self._clave(texto, espacio) for texto in textos]
+        resultado: Dict[bytes, np.ndarray] = {}
+        
+        with self._lock:
+            for clave in claves:
+                vector = self._memoria.get(clave)
+                if vector is not None:
+                    self._memoria.move_to_end(clave)
+                    resultado[clave] = vector
+            self.hits_memoria += sum(1 for clave in claves if clave in resultado)
+            
+            pendientes = [clave for clave in dict.fromkeys(claves) if clave not in resultado]
+            desde_disco = self._leer_de_disco(pendientes)
+            for clave, vector in desde_disco.items():
+                self._guardar_en_memoria(clave, vector)
+                resultado[clave] = vector
+            self.hits_disco += sum(1 for clave in claves if clave in desde_disco)
+        
+        # Textos nuevos: cada texto distinto se embebe una sola vez
+        faltantes: Dict[bytes, str] = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in resultado:
+                faltantes.setdefault(clave, texto)
+        
+        if faltantes:
+            vectores = funcion(list(faltantes.values()))
+            nuevos = {
+                clave: np.asarray(vector, dtype=np.float32)
+                for clave, vector in zip(faltantes.keys(), vectores)
+            }
+            with self._lock:
+                # Como los hits, por aparición: hits + misses = textos pedidos
+                self.misses += sum(1 for clave in claves if clave in nuevos)
+                for clave, vector in nuevos.items():
+                    self._guardar_en_memoria(clave, vector)
+                self._escribir_en_disco(nuevos)
+            resultado.update(nuevos)
+        
+        return [resultado[clave] for clave in claves]
+    
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return self._embeber(list(input), self._funcion)
+    
+    def embed_query(self, input: List[str]) -> List[np.ndarray]:
+        metodo = getattr(type(self._funcion), "embed_query", None)
+        if metodo is None or metodo.__qualname__.startswith("EmbeddingFunction."):
+            # El modelo embebe igual consultas y documentos: se comparte la caché
+            return self._embeber(list(input), self._funcion)
+        return self._embeber(list(input), self._funcion.embed_query, ":query")
+    
+    def estadisticas(self) -> Dict[str, int]:
+        """
+        Obtiene los contadores de la caché.
+        
+        Los contadores son por texto pedido: un texto repetido en una
+        llamada cuenta tantas veces como aparece.
+        
+        Returns:
+            Diccionario con hits por nivel, misses y entradas en memoria
+        """
+        with self._lock:
+            return {
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "entradas_memoria": len(self._memoria)
+            }
+    
+    def cerrar(self):
+        """Cierra el nivel en disco, si existe"""
+        with self._lock:
+            if self._disco is not None:
+                self._disco.close()
+                self._disco = None
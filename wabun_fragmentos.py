@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+WABUN Fragmentos - Fragmentación de Textos por Tokens
+Divide documentos en chunks medidos en tokens, en flujo y en tiempo lineal
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from bisect import bisect_right
+from collections import deque
+from itertools import chain
+from typing import Iterator, Optional, Tuple
+import re
+
+from wabun_tokens import ContadorTokens
+
+
+# Tamaños por defecto de los chunks, en tokens (el modelo de embeddings
+# por defecto trunca a 256, así que se deja margen)
+TOKENS_CHUNK_INTERACCION = 128
+TOKENS_CHUNK_DECRETO = 200
+
+# Párrafos: separados por una o más líneas en blanco
+_PATRON_PARRAFO = re.compile(r"\n[ \t]*\n\s*")
+
+# Fin de frase: signo de cierre, comillas o paréntesis opcionales y espacio
+_PATRON_FIN_FRASE = re.compile(r"[.!?…]+[\"'»”)\]]*\s+")
+
+
+def _recortar(texto: str, inicio: int, fin: int) -> Tuple[int, int]:
+    """Ajusta un tramo para que no empiece ni termine en espacio"""
+    while inicio < fin and texto[inicio].isspace():
+        inicio += 1
+    while fin > inicio and texto[fin - 1].isspace():
+        fin -= 1
+    return inicio, fin
+
+
+class Fragmentador:
+    """
+    Fragmentador de textos por párrafos, medido en tokens.
+    
+    Los párrafos se agrupan mientras quepan en `max_tokens`. Un párrafo
+    que no cabe se parte en frases y una frase que tampoco cabe, en
+    tramos de tokens, así que ningún chunk supera el máximo. Cada párrafo
+    se tokeniza una sola vez (frases y tramos se miden con sus fronteras
+    de token) y los chunks se generan de uno en uno, de modo que el coste
+    es lineal y no se construye la lista completa.
+    """
+    
+    def __init__(
+        self,
+        contador: Optional[ContadorTokens] = None,
+        max_tokens: int = TOKENS_CHUNK_INTERACCION,
+        solapamiento: int = 0
+    ):
+        """
+        Inicializa el fragmentador.
+        
+        Args:
+            contador: Contador de tokens (idealmente el del modelo de embeddings)
+            max_tokens: Máximo de tokens por chunk
+            solapamiento: Tokens del final de un chunk que se repiten al
+                principio del siguiente (en unidades completas: párrafos,
+                frases o tramos)
+        """
+        self.contador = contador or ContadorTokens()
+        self.max_tokens = max(1, max_tokens)
+        self.solapamiento = max(0, solapamiento)
+    
+    def _frases(self, texto: str, inicio: int, fin: int) -> Iterator[Tuple[int, int]]:
+        """Fronteras de frase dentro de texto[inicio:fin]"""
+        desde = inicio
+        for m in _PATRON_FIN_FRASE.finditer(texto, inicio, fin):
+            yield desde, m.end()
+            desde = m.end()
+        if desde < fin:
+            yield desde, fin
+    
+    def _unidades(self, texto: str, max_tokens: int) -> Iterator[Tuple[int, int, int]]:
+        """
+        Divide el texto en unidades que caben en un chunk.
+        
+        Yields:
+            Tuplas (inicio, fin, tokens)
+        """
+        desde = 0
+        for m in chain(_PATRON_PARRAFO.finditer(texto), [None]):
+            inicio, fin = _recortar(texto, desde, m.start() if m else len(texto))
+            if m:
+                desde = m.end()
+            if inicio == fin:
+                continue
+            
+            fines = [inicio + f for f in self.contador.fines(texto[inicio:fin])]
+            if len(fines) <= max_tokens:
+                yield inicio, fin, len(fines)
+                continue
+            
+            def tokens(a: int, b: int) -> int:
+                # Tokens del párrafo que terminan en (a, b]
+                return bisect_right(fines, b) - bisect_right(fines, a)
+            
+            # Párrafo demasiado largo: se parte en frases
+            for frase_inicio, frase_fin in self._frases(texto, inicio, fin):
+                frase_inicio, frase_fin = _recortar(texto, frase_inicio, frase_fin)
+                if frase_inicio == frase_fin:
+                    continue
+                primero = bisect_right(fines, frase_inicio)
+                ultimo = bisect_right(fines, frase_fin)
+                if ultimo - primero <= max_tokens:
+                    yield frase_inicio, frase_fin, ultimo - primero
+                    continue
+                
+                # Frase demasiado larga: se parte en tramos de tokens
+                a = frase_inicio
+                for k in range(primero + max_tokens, ultimo + max_tokens, max_tokens):
+                    b = fines[k - 1] if k < ultimo else frase_fin
+                    tramo_inicio, tramo_fin = _recortar(texto, a, b)
+                    if tramo_inicio < tramo_fin:
+                        yield tramo_inicio, tramo_fin, tokens(tramo_inicio, tramo_fin)
+                    a = b
+    
+    def tramos(
+        self,
+        texto: str,
+        max_tokens: Optional[int] = None,
+        solapamiento: Optional[int] = None
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Calcula los chunks de un texto como posiciones, sin copiarlo.
+        
+        Un texto vacío (o solo con espacios) produce un único chunk con el
+        texto completo, como hasta ahora.
+        
+        Args:
+            texto: Texto a fragmentar
+            max_tokens: Máximo de tokens por chunk (por defecto el del fragmentador)
+            solapamiento: Tokens de solapamiento (por defecto el del fragmentador)
+        
+        Yields:
+            Tuplas (inicio, fin) de cada chunk en `texto`
+        """
+        max_tokens = max(1, max_tokens or self.max_tokens)
+        solapamiento = self.solapamiento if solapamiento is None else max(0, solapamiento)
+        solapamiento = min(solapamiento, max_tokens - 1)
+        
+        actual: deque = deque()
+        tokens_actual = 0
+        
+        for inicio, fin, tokens in self._unidades(texto, max_tokens):
+            if actual and tokens_actual + tokens > max_tokens:
+                yield actual[0][0], actual[-1][1]
+                # Conservar el final del chunk como solapamiento, si cabe
+                while actual and (
+                    tokens_actual > solapamiento
+                    or tokens_actual + tokens > max_tokens
+                ):
+                    tokens_actual -= actual.popleft()[2]
+            actual.append((inicio, fin, tokens))
+            tokens_actual += tokens
+        
+        if actual:
+            yield actual[0][0], actual[-1][1]
+        else:
+            yield 0, len(texto)
+    
+    def fragmentar(
+        self,
+        texto: str,
+        max_tokens: Optional[int] = None,
+        solapamiento: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Divide un texto en fragmentos semánticos.
+        
+        Args:
+            texto: Texto a fragmentar
+            max_tokens: Máximo de tokens por chunk (por defecto el del fragmentador)
+            solapamiento: Tokens de solapamiento (por defecto el del fragmentador)
+        
+        Yields:
+            Fragmentos de texto, en orden
+        """
+        for inicio, fin in self.tramos(texto, max_tokens, solapamiento):
+            yield texto[inicio:fin]
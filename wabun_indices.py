@@ -0,0 +1,1098 @@
+#!/usr/bin/env python3
+"""
+WABUN Índices - Almacenes Auxiliares en SQLite
+Datos derivados de las colecciones que ChromaDB no guarda de forma eficiente
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterable, Tuple
+import json
+import re
+import sqlite3
+import threading
+
+
+# Campos de la cabecera de una interacción (comunes a todos sus chunks)
+CAMPOS_CABECERA = (
+    "timestamp_utc",
+    "ciclo_id",
+    "fase_ciclo",
+    "custodio_invocado",
+    "motor_ia_usado",
+    "intencion_fundador",
+    "palabras_clave",
+    "proyecto_asociado",
+    "importancia",
+    "estado_decision"
+)
+
+# Campos que solo se guardan en la cabecera: texto libre que no está en los
+# metadatos de los chunks, así que los filtros por ellos se traducen a
+# `interaction_id` con `AlmacenCabeceras.filtrar`. El resto se replica en
+# cada chunk para poder filtrar.
+CAMPOS_SOLO_CABECERA = (
+    "motor_ia_usado",
+    "intencion_fundador",
+    "palabras_clave"
+)
+
+# Dimensiones de los agregados de interacciones
+DIMENSIONES_AGREGADOS = (
+    "ciclo_id",
+    "custodio_invocado",
+    "proyecto_asociado",
+    "estado_decision",
+    "importancia"
+)
+
+# Operadores de los filtros por palabras clave
+OPERADORES_PALABRAS = ("AND", "OR")
+
+# Metadatos cuyo valor se indexa junto al texto de cada chunk, para que
+# los ids, nombres y códigos se encuentren aunque no aparezcan en el texto
+CAMPOS_LEXICOS = (
+    "interaction_id",
+    "custodio_invocado",
+    "proyecto_asociado",
+    "palabras_clave",
+    "decreto_id",
+    "titulo_documento",
+    "tipo_documento",
+    "custodios_implicados"
+)
+
+# Memoria mapeada para leer el índice léxico sin copiarlo (bytes)
+MMAP_INDICE_LEXICO = 256 * 1024 * 1024
+
+# Términos de una consulta para el índice léxico (guiones y _ forman parte del término)
+_PATRON_TERMINOS = re.compile(r"[\w\-]+", re.UNICODE)
+
+# Máximo de parámetros por sentencia (límite conservador de SQLite)
+_MAX_PARAMETROS = 500
+
+
+def abrir_sqlite_inmutable(ruta: str, mmap_bytes: int = MMAP_INDICE_LEXICO) -> sqlite3.Connection:
+    """
+    Abre una base SQLite que nadie va a modificar (la de un snapshot).
+    
+    Con `immutable=1` SQLite no toma bloqueos ni busca el WAL, y la
+    memoria mapeada lee las páginas de la caché del sistema operativo,
+    compartida por todos los procesos que abren el mismo archivo.
+    """
+    uri = f"{Path(ruta).resolve().as_uri()}?immutable=1"
+    conexion = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conexion.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+    return conexion
+
+
+def copiar_sqlite(origen: str, destino: str):
+    """
+    Copia consistente de una base SQLite (en uso o no) a un archivo nuevo.
+    
+    La copia queda compactada y sin WAL, lista para abrirse con
+    `abrir_sqlite_inmutable`.
+    """
+    Path(destino).parent.mkdir(parents=True, exist_ok=True)
+    fuente = sqlite3.connect(str(origen))
+    copia = sqlite3.connect(str(destino))
+    try:
+        fuente.backup(copia)
+        copia.execute("PRAGMA journal_mode=DELETE")
+        copia.execute("VACUUM")
+    finally:
+        copia.close()
+        fuente.close()
+
+
+def _abrir_sqlite(ruta: str, solo_lectura: bool = False) -> sqlite3.Connection:
+    """Abre una base SQLite compartible entre hilos, en modo WAL (o inmutable)"""
+    if solo_lectura:
+        return abrir_sqlite_inmutable(ruta)
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    conexion = sqlite3.connect(str(ruta), check_same_thread=False)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    return conexion
+
+
+def normalizar_palabra(palabra: str) -> str:
+    """Forma canónica de una palabra clave (sin espacios extremos, sin mayúsculas)"""
+    return str(palabra).strip().casefold()
+
+
+def _leer_palabras(valor: Any) -> List[str]:
+    """Palabras clave normalizadas de un campo `palabras_clave` (lista o JSON)"""
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor)
+        except ValueError:
+            valor = [valor]
+    if not isinstance(valor, (list, tuple)):
+        return []
+    return list(dict.fromkeys(
+        palabra for palabra in (normalizar_palabra(p) for p in valor) if palabra
+    ))
+
+
+def _esquema_agregados() -> str:
+    """
+    Tabla de agregados y triggers que la mantienen al escribir cabeceras.
+    
+    Cada fila cuenta las interacciones de una combinación de dimensiones.
+    Los valores nulos se guardan como '' para que la clave sea única.
+    """
+    dimensiones = ", ".join(DIMENSIONES_AGREGADOS)
+    
+    def clave(fila: str) -> str:
+        return ", ".join(f"IFNULL({fila}.{d}, '')" for d in DIMENSIONES_AGREGADOS)
+    
+    def coincide(fila: str) -> str:
+        return " AND ".join(f"{d} = IFNULL({fila}.{d}, '')" for d in DIMENSIONES_AGREGADOS)
+    
+    cambia = " OR ".join(
+        f"IFNULL(OLD.{d}, '') IS NOT IFNULL(NEW.{d}, '')" for d in DIMENSIONES_AGREGADOS
+    )
+    alta = (
+        f"INSERT INTO agregados ({dimensiones}, interacciones) VALUES ({clave('NEW')}, 1) "
+        f"ON CONFLICT({dimensiones}) DO UPDATE SET interacciones = interacciones + 1;"
+    )
+    baja = f"UPDATE agregados SET interacciones = interacciones - 1 WHERE {coincide('OLD')};"
+    return f"""
+        CREATE TABLE IF NOT EXISTS agregados (
+            {", ".join(f"{d} NOT NULL" for d in DIMENSIONES_AGREGADOS)},
+            interacciones INTEGER NOT NULL,
+            PRIMARY KEY ({dimensiones})
+        );
+        CREATE TRIGGER IF NOT EXISTS agregados_alta AFTER INSERT ON cabeceras
+        BEGIN {alta} END;
+        CREATE TRIGGER IF NOT EXISTS agregados_baja AFTER DELETE ON cabeceras
+        BEGIN {baja} END;
+        CREATE TRIGGER IF NOT EXISTS agregados_cambio
+        AFTER UPDATE OF {dimensiones} ON cabeceras WHEN {cambia}
+        BEGIN {baja} {alta} END;
+    """
+
+
+class AlmacenCabeceras:
+    """
+    Cabeceras de las interacciones, una fila por `interaction_id`.
+    
+    Los metadatos comunes de una interacción se guardan una sola vez en
+    lugar de replicarse en cada chunk de ChromaDB; al leer, se vuelven a
+    unir con los metadatos de cada chunk.
+    
+    Cada escritura de una cabecera actualiza también, mediante triggers,
+    los agregados por ciclo, custodio, proyecto, estado e importancia, de
+    modo que los conteos se leen sin recorrer las colecciones, y el índice
+    invertido de palabras clave (palabra → interacciones).
+    """
+    
+    def __init__(self, ruta: str, solo_lectura: bool = False):
+        """
+        Inicializa el almacén.
+        
+        Args:
+            ruta: Archivo SQLite (se crea si no existe)
+            solo_lectura: Si abrir un almacén existente e inmutable (snapshot)
+        """
+        self.ruta = str(ruta)
+        self._lock = threading.Lock()
+        self._conexion = _abrir_sqlite(self.ruta, solo_lectura)
+        if solo_lectura:
+            return
+        self._conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS cabeceras ("
+            f"interaction_id TEXT PRIMARY KEY, {', '.join(CAMPOS_CABECERA)})"
+        )
+        self._conexion.execute(
+            "CREATE INDEX IF NOT EXISTS cabeceras_custodio "
+            "ON cabeceras (custodio_invocado, timestamp_utc)"
+        )
+        nuevos_agregados = self._conexion.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agregados'"
+        ).fetchone() is None
+        nuevo_indice_palabras = self._conexion.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'palabras_clave'"
+        ).fetchone() is None
+        self._conexion.executescript(_esquema_agregados())
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS palabras_clave (
+                palabra TEXT NOT NULL,
+                interaction_id TEXT NOT NULL,
+                PRIMARY KEY (palabra, interaction_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS palabras_clave_interaccion
+            ON palabras_clave (interaction_id);
+            CREATE TRIGGER IF NOT EXISTS palabras_clave_baja AFTER DELETE ON cabeceras
+            BEGIN DELETE FROM palabras_clave WHERE interaction_id = OLD.interaction_id; END;
+        """)
+        self._conexion.commit()
+        if nuevos_agregados:
+            # Almacén anterior a los agregados: se calculan desde las cabeceras
+            self.recalcular_agregados()
+        if nuevo_indice_palabras:
+            self.recalcular_indice_palabras()
+    
+    @staticmethod
+    def extraer(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Separa la cabecera de los metadatos completos de un chunk.
+        
+        Args:
+            metadata: Metadatos completos (como los construye WabunCore)
+        
+        Returns:
+            Campos de cabecera presentes en `metadata`
+        """
+        return {campo: metadata[campo] for campo in CAMPOS_CABECERA if campo in metadata}
+    
+    @staticmethod
+    def recortar(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Quita de los metadatos de un chunk los campos que solo van en la cabecera.
+        
+        Args:
+            metadata: Metadatos completos
+        
+        Returns:
+            Metadatos a guardar en el chunk
+        """
+        return {
+            campo: valor for campo, valor in metadata.items()
+            if campo not in CAMPOS_SOLO_CABECERA
+        }
+    
+    def guardar(self, cabeceras: Dict[str, Dict[str, Any]]):
+        """
+        Inserta o completa cabeceras.
+        
+        Los campos ausentes en una cabecera no sobrescriben los ya guardados.
+        
+        Args:
+            cabeceras: Diccionario {interaction_id: campos de cabecera}
+        """
+        if not cabeceras:
+            return
+        with self._lock:
+            for interaction_id, campos in cabeceras.items():
+                if not campos:
+                    continue
+                nombres = list(campos)
+                self._conexion.execute(
+                    f"INSERT INTO cabeceras (interaction_id, {', '.join(nombres)}) "
+                    f"VALUES (?{', ?' * len(nombres)}) "
+                    f"ON CONFLICT(interaction_id) DO UPDATE SET "
+                    + ", ".join(f"{nombre} = excluded.{nombre}" for nombre in nombres),
+                    [interaction_id, *campos.values()]
+                )
+                if "palabras_clave" in campos:
+                    self._indexar_palabras(interaction_id, campos["palabras_clave"])
+            self._conexion.commit()
+    
+    def _indexar_palabras(self, interaction_id: str, palabras_clave: Any):
+        """Reemplaza las entradas del índice invertido de una interacción"""
+        self._conexion.execute(
+            "DELETE FROM palabras_clave WHERE interaction_id = ?", (interaction_id,)
+        )
+        self._conexion.executemany(
+            "INSERT OR IGNORE INTO palabras_clave (palabra, interaction_id) VALUES (?, ?)",
+            ((palabra, interaction_id) for palabra in _leer_palabras(palabras_clave))
+        )
+    
+    def recalcular_indice_palabras(self):
+        """Reconstruye el índice invertido de palabras clave desde las cabeceras"""
+        with self._lock:
+            self._conexion.execute("DELETE FROM palabras_clave")
+            filas = self._conexion.execute(
+                "SELECT interaction_id, palabras_clave FROM cabeceras "
+                "WHERE palabras_clave IS NOT NULL"
+            ).fetchall()
+            for interaction_id, palabras_clave in filas:
+                self._indexar_palabras(interaction_id, palabras_clave)
+            self._conexion.commit()
+    
+    def buscar_palabras(self, palabras: Iterable[str], operador: str = "AND") -> List[str]:
+        """
+        Interacciones que tienen unas palabras clave.
+        
+        Args:
+            palabras: Palabras clave (sin distinguir mayúsculas)
+            operador: "AND" (todas las palabras) u "OR" (alguna)
+        
+        Returns:
+            Lista de interaction_id, sin orden definido
+        """
+        operador = operador.upper()
+        if operador not in OPERADORES_PALABRAS:
+            raise ValueError(f"Operador de palabras clave no soportado: {operador}")
+        palabras = list(dict.fromkeys(
+            palabra for palabra in (normalizar_palabra(p) for p in palabras) if palabra
+        ))
+        if not palabras:
+            return []
+        marcadores = ",".join("?" * len(palabras))
+        if operador == "OR":
+            consulta = (
+                f"SELECT DISTINCT interaction_id FROM palabras_clave "
+                f"WHERE palabra IN ({marcadores})"
+            )
+            valores = palabras
+        else:
+            consulta = (
+                f"SELECT interaction_id FROM palabras_clave WHERE palabra IN ({marcadores}) "
+                f"GROUP BY interaction_id HAVING COUNT(*) = ?"
+            )
+            valores = [*palabras, len(palabras)]
+        with self._lock:
+            return [fila[0] for fila in self._conexion.execute(consulta, valores)]
+    
+    def filtrar(self, campo: str, condicion: Any) -> List[str]:
+        """
+        Interacciones cuya cabecera cumple una condición `where` sobre un campo.
+        
+        `palabras_clave` se resuelve con el índice invertido: `$eq` exige
+        una palabra y `$in` alguna de varias. Los demás campos admiten
+        `$eq`, `$ne`, `$in` y `$nin`, con la semántica de ChromaDB (`$ne` y
+        `$nin` también se cumplen si falta el campo).
+        
+        Args:
+            campo: Campo de cabecera
+            condicion: Valor (igualdad) o diccionario {operador: valor}
+        
+        Returns:
+            Lista de interaction_id, sin orden definido
+        
+        Raises:
+            ValueError: Si el campo no es de cabecera o el operador no se admite
+        """
+        if campo not in CAMPOS_CABECERA:
+            raise ValueError(f"Campo no indexado: {campo}")
+        operadores = condicion if isinstance(condicion, dict) else {"$eq": condicion}
+        encontradas: Optional[set] = None
+        for operador, valor in operadores.items():
+            if campo == "palabras_clave":
+                if operador == "$eq":
+                    ids = self.buscar_palabras([valor])
+                elif operador == "$in":
+                    ids = self.buscar_palabras(valor, "OR")
+                else:
+                    raise ValueError(f"Operador no soportado en palabras_clave: {operador} (usa $eq o $in)")
+            else:
+                if operador == "$eq":
+                    sql, valores = f"{campo} = ?", [valor]
+                elif operador == "$ne":
+                    sql, valores = f"({campo} IS NULL OR {campo} <> ?)", [valor]
+                elif operador == "$in":
+                    sql, valores = f"{campo} IN (SELECT value FROM json_each(?))", [json.dumps(list(valor))]
+                elif operador == "$nin":
+                    sql = f"({campo} IS NULL OR {campo} NOT IN (SELECT value FROM json_each(?)))"
+                    valores = [json.dumps(list(valor))]
+                else:
+                    raise ValueError(f"Operador no soportado en {campo}: {operador}")
+                with self._lock:
+                    ids = [
+                        fila[0] for fila in
+                        self._conexion.execute(f"SELECT interaction_id FROM cabeceras WHERE {sql}", valores)
+                    ]
+            encontradas = set(ids) if encontradas is None else encontradas & set(ids)
+        return list(encontradas or ())
+
+
+    def frecuencia_palabras(self, n: int = 20) -> Dict[str, int]:
+        """
+        Palabras clave más frecuentes.
+        
+        Args:
+            n: Número de palabras a devolver
+        
+        Returns:
+            Diccionario {palabra: interacciones}, de mayor a menor
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT palabra, COUNT(*) FROM palabras_clave "
+                "GROUP BY palabra ORDER BY COUNT(*) DESC, palabra LIMIT ?",
+                (n,)
+            ).fetchall()
+        return dict(filas)
+    
+    def obtener(self, interaction_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Lee las cabeceras de varias interacciones.
+        
+        Args:
+            interaction_ids: Ids de las interacciones
+        
+        Returns:
+            Diccionario {interaction_id: campos de cabecera no nulos}
+        """
+        ids = list(dict.fromkeys(interaction_ids))
+        cabeceras: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for i in range(0, len(ids), _MAX_PARAMETROS):
+                parte = ids[i:i + _MAX_PARAMETROS]
+                filas = self._conexion.execute(
+                    f"SELECT interaction_id, {', '.join(CAMPOS_CABECERA)} FROM cabeceras "
+                    f"WHERE interaction_id IN ({','.join('?' * len(parte))})",
+                    parte
+                )
+                for fila in filas:
+                    cabeceras[fila[0]] = {
+                        campo: valor
+                        for campo, valor in zip(CAMPOS_CABECERA, fila[1:])
+                        if valor is not None
+                    }
+        return cabeceras
+    
+    def unir(self, metadatas: List[Optional[Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Completa en el sitio los metadatos de chunks con su cabecera.
+        
+        Los campos del chunk tienen prioridad, de modo que los chunks
+        antiguos con metadatos replicados se leen igual que antes.
+        
+        Args:
+            metadatas: Metadatos de chunks de `interactions`
+        
+        Returns:
+            La misma lista, completada
+        """
+        cabeceras = self.obtener(
+            m["interaction_id"] for m in metadatas if m and "interaction_id" in m
+        )
+        for metadata in metadatas:
+            if metadata and metadata.get("interaction_id") in cabeceras:
+                for campo, valor in cabeceras[metadata["interaction_id"]].items():
+                    metadata.setdefault(campo, valor)
+        return metadatas
+    
+    def borrar(self, interaction_ids: Iterable[str]):
+        """
+        Elimina cabeceras.
+        
+        Args:
+            interaction_ids: Ids de las interacciones
+        """
+        ids = list(interaction_ids)
+        with self._lock:
+            for i in range(0, len(ids), _MAX_PARAMETROS):
+                parte = ids[i:i + _MAX_PARAMETROS]
+                self._conexion.execute(
+                    f"DELETE FROM cabeceras WHERE interaction_id IN ({','.join('?' * len(parte))})",
+                    parte
+                )
+            self._conexion.commit()
+    
+    def recientes(self, filtros: Dict[str, Any], n: int) -> List[str]:
+        """
+        Obtiene las interacciones más recientes que cumplen unos filtros.
+        
+        Args:
+            filtros: Igualdades sobre campos de cabecera (ej. {"custodio_invocado": "LIANG"})
+            n: Número máximo de interacciones
+        
+        Returns:
+            Lista de interaction_id, de la más reciente a la más antigua
+        """
+        condiciones, valores = self._condiciones(filtros, CAMPOS_CABECERA)
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT interaction_id FROM cabeceras {condiciones} "
+                f"ORDER BY timestamp_utc DESC LIMIT ?",
+                [*valores, n]
+            ).fetchall()
+        return [fila[0] for fila in filas]
+    
+    def ciclos(self) -> List[Tuple[str, int]]:
+        """
+        Ciclos con interacciones, del más reciente al más antiguo.
+        
+        Returns:
+            Lista de (ciclo_id, timestamp_utc de su última interacción)
+        """
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT ciclo_id, MAX(timestamp_utc) FROM cabeceras "
+                "WHERE ciclo_id IS NOT NULL GROUP BY ciclo_id ORDER BY 2 DESC"
+            ).fetchall()
+    
+    def compactables(
+        self,
+        ciclos: Iterable[str],
+        importancia_maxima: int,
+        estados_protegidos: Iterable[str] = (),
+        importancia_protegida: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Interacciones de unos ciclos que una política de retención puede archivar.
+        
+        Args:
+            ciclos: Ciclos a considerar
+            importancia_maxima: Importancia máxima (una importancia ausente cuenta como 0)
+            estados_protegidos: Estados de decisión que nunca se archivan
+            importancia_protegida: Importancia a partir de la cual nunca se archiva
+        
+        Returns:
+            Diccionario {ciclo_id: [cabeceras]}, cada lista por timestamp
+        """
+        ciclos = list(ciclos)
+        if not ciclos:
+            return {}
+        estados = list(estados_protegidos)
+        condiciones = [
+            f"ciclo_id IN ({','.join('?' * len(ciclos))})",
+            "IFNULL(importancia, 0) <= ?"
+        ]
+        valores: List[Any] = [*ciclos, importancia_maxima]
+        if estados:
+            condiciones.append(
+                f"IFNULL(estado_decision, '') NOT IN ({','.join('?' * len(estados))})"
+            )
+            valores.extend(estados)
+        if importancia_protegida is not None:
+            condiciones.append("IFNULL(importancia, 0) < ?")
+            valores.append(importancia_protegida)
+        with self._lock:
+            cursor = self._conexion.execute(
+                f"SELECT interaction_id, {', '.join(CAMPOS_CABECERA)} FROM cabeceras "
+                f"WHERE {' AND '.join(condiciones)} ORDER BY ciclo_id, timestamp_utc",
+                valores
+            )
+            columnas = [d[0] for d in cursor.description]
+            filas = cursor.fetchall()
+        
+        por_ciclo: Dict[str, List[Dict[str, Any]]] = {}
+        for fila in filas:
+            cabecera = dict(zip(columnas, fila))
+            por_ciclo.setdefault(cabecera["ciclo_id"], []).append(cabecera)
+        return por_ciclo
+    
+    @staticmethod
+    def _condiciones(filtros: Optional[Dict[str, Any]], permitidos) -> tuple:
+        """Construye la cláusula WHERE de igualdades sobre columnas conocidas"""
+        filtros = filtros or {}
+        for campo in filtros:
+            if campo not in permitidos:
+                raise ValueError(f"Campo no indexado: {campo}")
+        if not filtros:
+            return "", []
+        return (
+            "WHERE " + " AND ".join(f"{campo} = ?" for campo in filtros),
+            list(filtros.values())
+        )
+    
+    def agregados(
+        self,
+        agrupar_por: Iterable[str],
+        filtros: Optional[Dict[str, Any]] = None
+    ) -> Dict[Any, int]:
+        """
+        Cuenta interacciones agrupadas por una o varias dimensiones.
+        
+        Se lee de la tabla de agregados, cuyo tamaño depende del número de
+        combinaciones distintas y no del número de interacciones.
+        
+        Args:
+            agrupar_por: Dimensiones (de DIMENSIONES_AGREGADOS); vacío para el total
+            filtros: Igualdades sobre dimensiones (ej. {"custodio_invocado": "LIANG"})
+        
+        Returns:
+            Diccionario {valor: interacciones} con una dimensión, o
+            {tupla de valores: interacciones} con varias
+        """
+        agrupar_por = list(agrupar_por)
+        for campo in agrupar_por:
+            if campo not in DIMENSIONES_AGREGADOS:
+                raise ValueError(f"Dimensión no agregada: {campo}")
+        condiciones, valores = self._condiciones(
+            {
+                campo: "" if valor is None else valor
+                for campo, valor in (filtros or {}).items()
+            },
+            DIMENSIONES_AGREGADOS
+        )
+        seleccion = ", ".join(agrupar_por) or "'total'"
+        grupo = f"GROUP BY {', '.join(agrupar_por)}" if agrupar_por else ""
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT {seleccion}, SUM(interacciones) FROM agregados "
+                f"{condiciones} {grupo} HAVING SUM(interacciones) > 0",
+                valores
+            ).fetchall()
+        if len(agrupar_por) > 1:
+            return {tuple(fila[:-1]): fila[-1] for fila in filas}
+        return {fila[0]: fila[1] for fila in filas}
+    
+    def conservar(self, interaction_ids: Iterable[str]) -> int:
+        """
+        Elimina las cabeceras de interacciones que ya no existen.
+        
+        Args:
+            interaction_ids: Ids de todas las interacciones vigentes
+        
+        Returns:
+            Número de cabeceras eliminadas
+        """
+        with self._lock:
+            self._conexion.execute("CREATE TEMP TABLE IF NOT EXISTS vigentes (id TEXT PRIMARY KEY)")
+            self._conexion.execute("DELETE FROM vigentes")
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO vigentes (id) VALUES (?)",
+                ((interaction_id,) for interaction_id in interaction_ids)
+            )
+            borradas = self._conexion.execute(
+                "DELETE FROM cabeceras WHERE interaction_id NOT IN (SELECT id FROM vigentes)"
+            ).rowcount
+            self._conexion.execute("DELETE FROM vigentes")
+            self._conexion.commit()
+        return borradas
+    
+    def recalcular_agregados(self):
+        """Recalcula la tabla de agregados desde las cabeceras"""
+        dimensiones = ", ".join(DIMENSIONES_AGREGADOS)
+        valores = ", ".join("IFNULL(%s, '')" % d for d in DIMENSIONES_AGREGADOS)
+        with self._lock:
+            self._conexion.execute("DELETE FROM agregados")
+            self._conexion.execute(
+                f"INSERT INTO agregados ({dimensiones}, interacciones) "
+                f"SELECT {valores}, COUNT(*) FROM cabeceras GROUP BY {valores}"
+            )
+            self._conexion.commit()
+    
+    def contar(self) -> int:
+        """Número de cabeceras guardadas"""
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM cabeceras").fetchone()[0]
+    
+    def cerrar(self):
+        """Cierra la base SQLite"""
+        with self._lock:
+            self._conexion.close()
+
+
+class IndiceLexico:
+    """
+    Índice de texto completo (BM25) sobre los chunks de todas las colecciones.
+    
+    Usa FTS5 de SQLite: se actualiza de forma incremental con cada
+    escritura y se lee con memoria mapeada, así que no hay que cargarlo
+    al arrancar. El tokenizador conserva guiones y guiones bajos dentro
+    de los términos, de modo que ids como `DEC-RITMO-72H-V1` o códigos
+    como `WABUN_Digital` son un único término exacto.
+    """
+    
+    def __init__(self, ruta: str, mmap_bytes: int = MMAP_INDICE_LEXICO, solo_lectura: bool = False):
+        """
+        Inicializa el índice.
+        
+        Args:
+            ruta: Archivo SQLite (se crea si no existe)
+            mmap_bytes: Bytes del archivo a mapear en memoria (0 para no mapear)
+            solo_lectura: Si abrir un índice existente e inmutable (snapshot)
+        """
+        self.ruta = str(ruta)
+        self._lock = threading.Lock()
+        self._conexion = _abrir_sqlite(self.ruta, solo_lectura)
+        self._conexion.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        if solo_lectura:
+            return
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks_lexico (
+                id INTEGER PRIMARY KEY,
+                coleccion TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                UNIQUE (coleccion, chunk_id)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS texto_lexico USING fts5(
+                texto, claves,
+                tokenize = "unicode61 remove_diacritics 2 tokenchars '-_'"
+            );
+        """)
+        self._conexion.commit()
+    
+    @staticmethod
+    def _claves(metadata: Optional[Dict[str, Any]]) -> str:
+        """Texto indexable de los metadatos de un chunk"""
+        if not metadata:
+            return ""
+        partes = []
+        for campo in CAMPOS_LEXICOS:
+            valor = metadata.get(campo)
+            if valor is None:
+                continue
+            if isinstance(valor, str) and valor.startswith("["):
+                partes.extend(str(v) for v in _leer_palabras(valor))
+            else:
+                partes.append(str(valor))
+        return " ".join(partes)
+    
+    @staticmethod
+    def consulta(texto: str, exacta: bool = False) -> Optional[str]:
+        """
+        Traduce un texto libre a una expresión MATCH de FTS5.
+        
+        Args:
+            texto: Texto de búsqueda
+            exacta: Si buscar el texto como un único término o frase
+        
+        Returns:
+            Expresión MATCH, o None si el texto no tiene términos
+        """
+        terminos = _PATRON_TERMINOS.findall(texto or "")
+        if not terminos:
+            return None
+        if exacta:
+            return '"' + " ".join(terminos).replace('"', '""') + '"'
+        return " OR ".join('"' + termino.replace('"', '""') + '"' for termino in terminos)
+    
+    def _fila(self, coleccion: str, chunk_id: str) -> int:
+        return self._conexion.execute(
+            "INSERT INTO chunks_lexico (coleccion, chunk_id) VALUES (?, ?) "
+            "ON CONFLICT (coleccion, chunk_id) DO UPDATE SET chunk_id = excluded.chunk_id "
+            "RETURNING id",
+            (coleccion, chunk_id)
+        ).fetchone()[0]
+    
+    def indexar(
+        self,
+        coleccion: str,
+        ids: List[str],
+        documentos: List[str],
+        metadatas: List[Optional[Dict[str, Any]]]
+    ):
+        """
+        Añade o reemplaza chunks en el índice.
+        
+        Args:
+            coleccion: Nombre de la colección
+            ids: Ids de los chunks
+            documentos: Texto de cada chunk
+            metadatas: Metadatos completos de cada chunk
+        """
+        with self._lock:
+            for chunk_id, documento, metadata in zip(ids, documentos, metadatas):
+                fila = self._fila(coleccion, chunk_id)
+                self._conexion.execute("DELETE FROM texto_lexico WHERE rowid = ?", (fila,))
+                self._conexion.execute(
+                    "INSERT INTO texto_lexico (rowid, texto, claves) VALUES (?, ?, ?)",
+                    (fila, documento or "", self._claves(metadata))
+                )
+            self._conexion.commit()
+    
+    def actualizar_claves(
+        self,
+        coleccion: str,
+        ids: List[str],
+        metadatas: List[Optional[Dict[str, Any]]]
+    ):
+        """
+        Reindexa los metadatos de chunks ya indexados, sin tocar su texto.
+        
+        Args:
+            coleccion: Nombre de la colección
+            ids: Ids de los chunks
+            metadatas: Metadatos completos de cada chunk
+        """
+        with self._lock:
+            for chunk_id, metadata in zip(ids, metadatas):
+                self._conexion.execute(
+                    "UPDATE texto_lexico SET claves = ? WHERE rowid = "
+                    "(SELECT id FROM chunks_lexico WHERE coleccion = ? AND chunk_id = ?)",
+                    (self._claves(metadata), coleccion, chunk_id)
+                )
+            self._conexion.commit()
+    
+    def borrar(self, coleccion: str, ids: Iterable[str]):
+        """
+        Elimina chunks del índice.
+        
+        Args:
+            coleccion: Nombre de la colección
+            ids: Ids de los chunks
+        """
+        ids = list(ids)
+        with self._lock:
+            for i in range(0, len(ids), _MAX_PARAMETROS):
+                parte = ids[i:i + _MAX_PARAMETROS]
+                marcadores = ",".join("?" * len(parte))
+                filas = [
+                    (fila[0],) for fila in self._conexion.execute(
+                        f"SELECT id FROM chunks_lexico "
+                        f"WHERE coleccion = ? AND chunk_id IN ({marcadores})",
+                        [coleccion, *parte]
+                    )
+                ]
+                self._conexion.executemany("DELETE FROM texto_lexico WHERE rowid = ?", filas)
+                self._conexion.executemany("DELETE FROM chunks_lexico WHERE id = ?", filas)
+            self._conexion.commit()
+    
+    def buscar(self, coleccion: str, consulta: str, n: int) -> List[Tuple[str, float]]:
+        """
+        Busca chunks de una colección por BM25.
+        
+        Args:
+            coleccion: Nombre de la colección
+            consulta: Expresión MATCH (ver `consulta`)
+            n: Número máximo de resultados
+        
+        Returns:
+            Lista de (chunk_id, puntuación BM25), de más a menos relevante
+            (puntuaciones positivas: mayor es mejor)
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT c.chunk_id, -bm25(texto_lexico) FROM texto_lexico "
+                "JOIN chunks_lexico AS c ON c.id = texto_lexico.rowid "
+                "WHERE texto_lexico MATCH ? AND c.coleccion = ? "
+                "ORDER BY bm25(texto_lexico) LIMIT ?",
+                (consulta, coleccion, n)
+            ).fetchall()
+        return [(chunk_id, puntuacion) for chunk_id, puntuacion in filas]
+    
+    def vaciar(self, coleccion: Optional[str] = None):
+        """
+        Elimina todo el índice o el de una colección.
+        
+        Args:
+            coleccion: Nombre de la colección (por defecto todas)
+        """
+        with self._lock:
+            if coleccion is None:
+                self._conexion.execute("DELETE FROM texto_lexico")
+                self._conexion.execute("DELETE FROM chunks_lexico")
+            else:
+                self._conexion.execute(
+                    "DELETE FROM texto_lexico WHERE rowid IN "
+                    "(SELECT id FROM chunks_lexico WHERE coleccion = ?)",
+                    (coleccion,)
+                )
+                self._conexion.execute("DELETE FROM chunks_lexico WHERE coleccion = ?", (coleccion,))
+            self._conexion.commit()
+    
+    def contar(self) -> int:
+        """Número de chunks indexados"""
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM chunks_lexico").fetchone()[0]
+    
+    def cerrar(self):
+        """Cierra la base SQLite"""
+        with self._lock:
+            self._conexion.close()
+
+
+class CatalogoParticiones:
+    """
+    Catálogo de las particiones temporales de una colección.
+    
+    Por cada partición guarda el rango de `timestamp_utc` que contiene,
+    los ciclos que aparecen en ella, si está cerrada a escrituras y los
+    chunks borrados desde su última compactación. Con esto se decide qué
+    particiones consultar sin abrirlas.
+    """
+    
+    def __init__(self, ruta: str, solo_lectura: bool = False):
+        """
+        Inicializa el catálogo.
+        
+        Args:
+            ruta: Archivo SQLite (se crea si no existe)
+            solo_lectura: Si abrir un catálogo existente e inmutable (snapshot)
+        """
+        self.ruta = str(ruta)
+        self._lock = threading.Lock()
+        self._conexion = _abrir_sqlite(self.ruta, solo_lectura)
+        if not solo_lectura:
+            self._conexion.executescript("""
+                CREATE TABLE IF NOT EXISTS particiones (
+                    nombre TEXT PRIMARY KEY,
+                    coleccion TEXT NOT NULL,
+                    granularidad TEXT NOT NULL,
+                    desde INTEGER,
+                    hasta INTEGER,
+                    solo_lectura INTEGER NOT NULL DEFAULT 0,
+                    borrados INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS particiones_ciclos (
+                    ciclo_id TEXT NOT NULL,
+                    particion TEXT NOT NULL,
+                    PRIMARY KEY (ciclo_id, particion)
+                ) WITHOUT ROWID;
+            """)
+            self._conexion.commit()
+        self._solo_lectura = {
+            nombre for (nombre,) in self._conexion.execute(
+                "SELECT nombre FROM particiones WHERE solo_lectura = 1"
+            )
+        }
+    
+    def granularidad(self, coleccion: str) -> Optional[str]:
+        """Granularidad con la que se particionó una colección (None si no lo está)"""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT granularidad FROM particiones WHERE coleccion = ? LIMIT 1",
+                (coleccion,)
+            ).fetchone()
+        return fila[0] if fila else None
+    
+    def registrar(
+        self,
+        coleccion: str,
+        granularidad: str,
+        nombre: str,
+        timestamps: Iterable[int],
+        ciclos: Iterable[str]
+    ):
+        """
+        Amplía el rango y los ciclos de una partición tras escribir en ella.
+        
+        Args:
+            coleccion: Colección particionada (ej. "interactions")
+            granularidad: "mes" o "ciclo"
+            nombre: Nombre de la partición
+            timestamps: `timestamp_utc` de los chunks escritos
+            ciclos: `ciclo_id` de los chunks escritos
+        """
+        timestamps = [int(t) for t in timestamps if t is not None]
+        ciclos = {c for c in ciclos if c}
+        with self._lock:
+            self._conexion.execute(
+                "INSERT INTO particiones (nombre, coleccion, granularidad, desde, hasta) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (nombre) DO UPDATE SET "
+                "desde = MIN(IFNULL(desde, excluded.desde), IFNULL(excluded.desde, desde)), "
+                "hasta = MAX(IFNULL(hasta, excluded.hasta), IFNULL(excluded.hasta, hasta))",
+                (
+                    nombre,
+                    coleccion,
+                    granularidad,
+                    min(timestamps) if timestamps else None,
+                    max(timestamps) if timestamps else None
+                )
+            )
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO particiones_ciclos (ciclo_id, particion) VALUES (?, ?)",
+                [(ciclo, nombre) for ciclo in ciclos]
+            )
+            self._conexion.commit()
+    
+    def listar(
+        self,
+        coleccion: str,
+        desde: Optional[int] = None,
+        hasta: Optional[int] = None,
+        ciclos: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        """
+        Particiones que pueden contener chunks de un rango o de unos ciclos.
+        
+        Args:
+            coleccion: Colección particionada
+            desde: Timestamp mínimo (incluido, opcional)
+            hasta: Timestamp máximo (incluido, opcional)
+            ciclos: Ciclos buscados (opcional)
+        
+        Returns:
+            Nombres de las particiones, de la más antigua a la más reciente
+        """
+        condiciones = ["coleccion = ?"]
+        parametros: List[Any] = [coleccion]
+        if desde is not None:
+            condiciones.append("(hasta IS NULL OR hasta >= ?)")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append("(desde IS NULL OR desde <= ?)")
+            parametros.append(hasta)
+        if ciclos is not None:
+            ciclos = list(ciclos)
+            condiciones.append(
+                f"nombre IN (SELECT particion FROM particiones_ciclos "
+                f"WHERE ciclo_id IN ({','.join('?' * len(ciclos))}))"
+            )
+            parametros.extend(ciclos)
+        with self._lock:
+            return [
+                nombre for (nombre,) in self._conexion.execute(
+                    f"SELECT nombre FROM particiones WHERE {' AND '.join(condiciones)} "
+                    f"ORDER BY desde, nombre",
+                    parametros
+                )
+            ]
+    
+    def solo_lectura(self, nombre: str) -> bool:
+        """Si una partición está cerrada a nuevos chunks"""
+        return nombre in self._solo_lectura
+    
+    def marcar_solo_lectura(self, nombres: Iterable[str]):
+        """
+        Cierra particiones a nuevos chunks.
+        
+        Args:
+            nombres: Particiones a cerrar
+        """
+        nombres = list(nombres)
+        with self._lock:
+            self._conexion.executemany(
+                "UPDATE particiones SET solo_lectura = 1 WHERE nombre = ?",
+                [(nombre,) for nombre in nombres]
+            )
+            self._conexion.commit()
+            self._solo_lectura.update(nombres)
+    
+    def sumar_borrados(self, nombre: str, borrados: int):
+        """Anota chunks borrados de una partición, pendientes de compactar"""
+        with self._lock:
+            self._conexion.execute(
+                "UPDATE particiones SET borrados = borrados + ? WHERE nombre = ?",
+                (borrados, nombre)
+            )
+            self._conexion.commit()
+    
+    def compactada(self, nombre: str):
+        """Reinicia los borrados pendientes de una partición"""
+        with self._lock:
+            self._conexion.execute("UPDATE particiones SET borrados = 0 WHERE nombre = ?", (nombre,))
+            self._conexion.commit()
+    
+    def olvidar(self, nombre: str):
+        """Elimina una partición del catálogo"""
+        with self._lock:
+            self._conexion.execute("DELETE FROM particiones_ciclos WHERE particion = ?", (nombre,))
+            self._conexion.execute("DELETE FROM particiones WHERE nombre = ?", (nombre,))
+            self._conexion.commit()
+            self._solo_lectura.discard(nombre)
+    
+    def describir(self, coleccion: str) -> List[Dict[str, Any]]:
+        """
+        Estado de las particiones de una colección.
+        
+        Returns:
+            Lista de diccionarios (nombre, desde, hasta, solo_lectura,
+            borrados, ciclos), de la más antigua a la más reciente
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT nombre, desde, hasta, solo_lectura, borrados, "
+                "(SELECT COUNT(*) FROM particiones_ciclos WHERE particion = nombre) "
+                "FROM particiones WHERE coleccion = ? ORDER BY desde, nombre",
+                (coleccion,)
+            ).fetchall()
+        return [
+            {
+                "nombre": nombre,
+                "desde": desde,
+                "hasta": hasta,
+                "solo_lectura": bool(solo_lectura),
+                "borrados": borrados,
+                "ciclos": ciclos
+            }
+            for nombre, desde, hasta, solo_lectura, borrados, ciclos in filas
+        ]
+    
+    def cerrar(self):
+        """Cierra la base SQLite"""
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+WABUN Métricas - Instrumentación de las Rutas Críticas
+Contadores e histogramas de latencia por operación y colección
+
+Autor: Manus AI (bajo la guía de WABUN y ARGOS)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Callable, Tuple
+import bisect
+import functools
+import json
+import threading
+import time
+
+
+# Límites superiores (segundos) de los buckets del histograma de latencias
+BUCKETS_LATENCIA = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Contexto vacío compartido: con la instrumentación apagada no se mide nada
+_SIN_MEDIR = nullcontext()
+
+
+class _Serie:
+    """Contadores e histograma de una pareja (operación, colección)"""
+    
+    __slots__ = ("llamadas", "errores", "elementos", "suma", "maximo", "buckets")
+    
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.elementos = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        # Un contador por bucket más el de +Inf
+        self.buckets = [0] * (len(BUCKETS_LATENCIA) + 1)
+    
+    def observar(self, segundos: float, elementos: int, error: bool):
+        self.llamadas += 1
+        self.errores += int(error)
+        self.elementos += elementos
+        self.suma += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.buckets[bisect.bisect_left(BUCKETS_LATENCIA, segundos)] += 1
+    
+    def percentil(self, fraccion: float) -> float:
+        """Percentil aproximado: límite superior del bucket que lo contiene"""
+        if self.llamadas == 0:
+            return 0.0
+        objetivo = fraccion * self.llamadas
+        acumulado = 0
+        for limite, cuenta in zip(BUCKETS_LATENCIA, self.buckets):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+
+class Metricas:
+    """
+    Registro de tiempos de las operaciones de WABUN.
+    
+    Cada medición se asocia a una operación ("chunking", "embedding",
+    "escritura", "consulta", ...) y, si aplica, a una colección. Además de
+    acumular contadores e histogramas, cada medición se entrega a los hooks
+    registrados con `agregar_hook`, para enviarla a otros sistemas.
+    
+    Con `activo=False`, `medir` devuelve un contexto vacío compartido y el
+    coste por operación es el de una comprobación de atributo.
+    """
+    
+    def __init__(self, activo: bool = False):
+        """
+        Inicializa el registro.
+        
+        Args:
+            activo: Si medir desde el inicio
+        """
+        self.activo = activo
+        self._series: Dict[Tuple[str, str], _Serie] = {}
+        self._hooks: List[Callable[[str, Optional[str], float, int, bool], None]] = []
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+    
+    def agregar_hook(self, hook: Callable[[str, Optional[str], float, int, bool], None]):
+        """
+        Registra una función que recibe cada medición.
+        
+        Args:
+            hook: Función hook(operacion, coleccion, segundos, elementos, error)
+        """
+        self._hooks.append(hook)
+    
+    def quitar_hook(self, hook: Callable):
+        """Elimina un hook registrado con `agregar_hook`"""
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+    
+    def registrar(
+        self,
+        operacion: str,
+        segundos: float,
+        coleccion: Optional[str] = None,
+        elementos: int = 1,
+        error: bool = False
+    ):
+        """
+        Añade una medición ya tomada.
+        
+        Args:
+            operacion: Nombre de la operación
+            segundos: Duración
+            coleccion: Colección afectada (opcional)
+            elementos: Chunks, textos o resultados procesados
+            error: Si la operación terminó con una excepción
+        """
+        if not self.activo:
+            return
+        clave = (operacion, coleccion or "")
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = _Serie()
+            serie.observar(segundos, elementos, error)
+        for hook in self._hooks:
+            hook(operacion, coleccion, segundos, elementos, error)
+    
+    def medir(self, operacion: str, coleccion: Optional[str] = None, elementos: int = 1):
+        """
+        Contexto que mide la duración del bloque que envuelve:
+            
+            with metricas.medir("embedding", "interactions", len(textos)):
+                vectores = funcion(textos)
+        
+        Args:
+            operacion: Nombre de la operación
+            coleccion: Colección afectada (opcional)
+            elementos: Chunks, textos o resultados procesados
+        """
+        if not self.activo:
+            return _SIN_MEDIR
+        return self._medir(operacion, coleccion, elementos)
+    
+    @contextmanager
+    def _medir(self, operacion: str, coleccion: Optional[str], elementos: int):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.registrar(operacion, time.perf_counter() - inicio, coleccion, elementos, error)
+    
+    def reiniciar(self):
+        """Borra todas las series acumuladas"""
+        with self._lock:
+            self._series.clear()
+            self.inicio = time.time()
+    
+    def instantanea(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado de todas las series.
+        
+        Returns:
+            Diccionario {operacion: {coleccion: resumen}} con llamadas,
+            errores, elementos, latencias (ms) y buckets del histograma
+        """
+        with self._lock:
+            series = sorted(self._series.items())
+        
+        operaciones: Dict[str, Dict[str, Any]] = {}
+        for (operacion, coleccion), serie in series:
+            operaciones.setdefault(operacion, {})[coleccion or "_"] = {
+                "llamadas": serie.llamadas,
+                "errores": serie.errores,
+                "elementos": serie.elementos,
+                "total_ms": serie.suma * 1000,
+                "media_ms": serie.suma * 1000 / serie.llamadas if serie.llamadas else 0.0,
+                "p50_ms": serie.percentil(0.50) * 1000,
+                "p95_ms": serie.percentil(0.95) * 1000,
+                "p99_ms": serie.percentil(0.99) * 1000,
+                "max_ms": serie.maximo * 1000,
+                "buckets": dict(zip(
+                    [str(limite) for limite in BUCKETS_LATENCIA] + ["+Inf"],
+                    serie.buckets
+                ))
+            }
+        return {
+            "activo": self.activo,
+            "desde_utc": int(self.inicio),
+            "operaciones": operaciones
+        }
+    
+    def como_prometheus(self, prefijo: str = "wabun") -> str:
+        """
+        Serializa las series en el formato de texto de Prometheus.
+        
+        Args:
+            prefijo: Prefijo de los nombres de las métricas
+        
+        Returns:
+            Texto apto para el textfile collector de node_exporter
+        """
+        with self._lock:
+            series = sorted(self._series.items())
+        
+        nombre = f"{prefijo}_operacion_segundos"
+        lineas = [
+            f"# HELP {nombre} Duración de las operaciones de WABUN",
+            f"# TYPE {nombre} histogram"
+        ]
+        for (operacion, coleccion), serie in series:
+            etiquetas = f'operacion="{operacion}",coleccion="{coleccion}"'
+            acumulado = 0
+            for limite, cuenta in zip(BUCKETS_LATENCIA, serie.buckets):
+                acumulado += cuenta
+                lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {serie.llamadas}')
+            lineas.append(f"{nombre}_sum{{{etiquetas}}} {serie.suma:.6f}")
+            lineas.append(f"{nombre}_count{{{etiquetas}}} {serie.llamadas}")
+        
+        for sufijo, ayuda, atributo in (
+            ("elementos_total", "Chunks, textos o resultados procesados", "elementos"),
+            ("errores_total", "Operaciones terminadas con excepción", "errores")
+        ):
+            lineas.append(f"# HELP {prefijo}_operacion_{sufijo} {ayuda}")
+            lineas.append(f"# TYPE {prefijo}_operacion_{sufijo} counter")
+            for (operacion, coleccion), serie in series:
+                lineas.append(
+                    f'{prefijo}_operacion_{sufijo}{{operacion="{operacion}",'
+                    f'coleccion="{coleccion}"}} {getattr(serie, atributo)}'
+                )
+        return "\n".join(lineas) + "\n"
+    
+    def exportar(self, ruta: str, formato: Optional[str] = None) -> str:
+        """
+        Escribe las métricas en un archivo.
+        
+        La escritura es atómica (archivo temporal + rename), como exige el
+        textfile collector de Prometheus.
+        
+        Args:
+            ruta: Archivo de destino
+            formato: "prometheus" o "json" (por defecto según la extensión:
+                .prom es Prometheus, cualquier otra es JSON)
+        
+        Returns:
+            Ruta del archivo escrito
+        """
+        destino = Path(ruta)
+        formato = formato or ("prometheus" if destino.suffix == ".prom" else "json")
+        if formato == "prometheus":
+            contenido = self.como_prometheus()
+        elif formato == "json":
+            contenido = json.dumps(self.instantanea(), indent=2, ensure_ascii=False)
+        else:
+            raise ValueError(f"Formato de métricas no soportado: {formato}")
+        
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporal = destino.with_name(destino.name + ".tmp")
+        temporal.write_text(contenido, encoding="utf-8")
+        temporal.replace(destino)
+        return str(destino)
+
+
+def medido(operacion: str):
+    """
+    Decorador que mide un método de un objeto con atributo `metricas`.
+    
+    Args:
+        operacion: Nombre de la operación registrada
+    """
+    def decorador(metodo: Callable) -> Callable:
+        @functools.wraps(metodo)
+        def envoltorio(self, *args, **kwargs):
+            metricas = self.metricas
+            if not metricas.activo:
+                return metodo(self, *args, **kwargs)
+            with metricas.medir(operacion):
+                return metodo(self, *args, **kwargs)
+        return envoltorio
+    return decorador
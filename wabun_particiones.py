@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+WABUN Particiones - Interacciones Particionadas por Tiempo
+Una colección de ChromaDB por mes o por ciclo, con poda de particiones
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Any, Iterator, Tuple
+import re
+import threading
+
+from wabun_indices import CatalogoParticiones
+
+
+# Granularidades admitidas: una partición por mes natural (UTC) o por ciclo
+GRANULARIDADES = ("mes", "ciclo")
+
+# Sufijo de la copia de una partición mientras se compacta
+SUFIJO_COMPACTACION = "__compactando"
+
+# Caracteres no admitidos en los nombres de colección de ChromaDB
+_PATRON_NOMBRE_INVALIDO = re.compile(r"[^A-Za-z0-9_-]+")
+
+# Claves de un resultado de `get` / `query` que se concatenan por partición
+_CLAVES_RESULTADO = ("ids", "embeddings", "documents", "metadatas", "uris", "data")
+
+
+def nombre_particion(base: str, granularidad: str, metadata: Dict[str, Any]) -> Optional[str]:
+    """
+    Partición a la que pertenece un chunk.
+    
+    Args:
+        base: Nombre de la colección particionada (ej. "interactions")
+        granularidad: "mes" o "ciclo"
+        metadata: Metadatos del chunk
+    
+    Returns:
+        Nombre de la colección de la partición (ej. "interactions_2025_11"),
+        o None si el chunk no tiene el campo que decide la partición
+    """
+    if granularidad == "mes":
+        timestamp = metadata.get("timestamp_utc")
+        if timestamp is None:
+            return None
+        return f"{base}_{datetime.fromtimestamp(int(timestamp), tz=timezone.utc):%Y_%m}"
+    
+    ciclo = _PATRON_NOMBRE_INVALIDO.sub("_", str(metadata.get("ciclo_id") or "")).strip("_-")
+    if not ciclo:
+        return None
+    return f"{base}_{ciclo}"
+
+
+def restricciones_temporales(
+    where: Optional[Dict[str, Any]]
+) -> Tuple[Optional[int], Optional[int], Optional[set]]:
+    """
+    Extrae de un `where` las condiciones que acotan las particiones.
+    
+    Solo se tienen en cuenta las condiciones sobre `timestamp_utc` y
+    `ciclo_id` del nivel superior o dentro de `$and`; las que están bajo
+    `$or` no acotan nada.
+    
+    Returns:
+        Tupla (desde, hasta, ciclos); None donde no hay restricción
+    """
+    desde = hasta = None
+    ciclos = None
+    pendientes = [where] if where else []
+    while pendientes:
+        clausula = pendientes.pop()
+        for campo, condicion in clausula.items():
+            if campo == "$and":
+                pendientes.extend(condicion)
+                continue
+            if campo.startswith("$") or campo not in ("timestamp_utc", "ciclo_id"):
+                continue
+            if not isinstance(condicion, dict):
+                condicion = {"$eq": condicion}
+            for operador, valor in condicion.items():
+                if campo == "timestamp_utc":
+                    if operador in ("$gte", "$gt", "$eq"):
+                        desde = valor if desde is None else max(desde, valor)
+                    if operador in ("$lte", "$lt", "$eq"):
+                        hasta = valor if hasta is None else min(hasta, valor)
+                    continue
+                if operador == "$eq":
+                    nuevos = {valor}
+                elif operador == "$in":
+                    nuevos = set(valor)
+                else:
+                    continue
+                ciclos = nuevos if ciclos is None else ciclos & nuevos
+    return desde, hasta, ciclos
+
+
+def _tomar(valores: Optional[Any], indices: List[int]) -> Optional[List[Any]]:
+    """Elementos de una lista (o array) en unas posiciones"""
+    if valores is None:
+        return None
+    return [valores[i] for i in indices]
+
+
+class ColeccionParticionada:
+    """
+    Colección de ChromaDB repartida en una colección por periodo.
+    
+    Expone el subconjunto de la API de `Collection` que usa WABUN (`add`,
+    `upsert`, `update`, `delete`, `get`, `query` y `count`), así que el
+    resto del núcleo no distingue una colección particionada de una
+    normal. Cada chunk se escribe en la partición de su `timestamp_utc`
+    (o de su `ciclo_id`); las lecturas con filtros de fecha o de ciclo
+    solo abren las particiones que pueden contener resultados, y los
+    top-k de varias particiones se fusionan por distancia.
+    
+    La colección base conserva los chunks escritos antes de particionar
+    (o sin el campo que decide la partición) y se consulta como la
+    partición más antigua mientras no esté vacía.
+    """
+    
+    def __init__(
+        self,
+        base,
+        client,
+        embedding_function,
+        catalogo: CatalogoParticiones,
+        granularidad: str = "mes",
+        max_hilos: int = 4
+    ):
+        """
+        Inicializa la colección particionada.
+        
+        Args:
+            base: Colección base de ChromaDB (da nombre a las particiones)
+            client: Cliente de ChromaDB
+            embedding_function: Función de embeddings de las particiones
+            catalogo: Catálogo de particiones
+            granularidad: "mes" o "ciclo"
+            max_hilos: Particiones consultadas en paralelo
+        """
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"Granularidad no soportada: {granularidad} (usa una de {GRANULARIDADES})")
+        
+        self.base = base
+        self.name = base.name
+        self.metadata = base.metadata
+        self.configuration = getattr(base, "configuration", None)
+        self.catalogo = catalogo
+        self.granularidad = granularidad
+        self._client = client
+        self._embedding_function = embedding_function
+        self._abiertas: Dict[str, Any] = {}
+        self._base_con_datos: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="wabun-particion")
+        self._recuperar_compactaciones()
+    
+    def _recuperar_compactaciones(self):
+        """Termina o descarta compactaciones interrumpidas"""
+        nombres = {getattr(c, "name", c) for c in self._client.list_collections()}
+        for nombre in nombres:
+            if not nombre.endswith(SUFIJO_COMPACTACION):
+                continue
+            original = nombre[:-len(SUFIJO_COMPACTACION)]
+            if original in nombres:
+                # La copia no llegó a sustituir a la original: se descarta
+                self._client.delete_collection(nombre)
+            else:
+                # La original ya se borró: la copia completa ocupa su lugar
+                self._client.get_collection(nombre).modify(name=original)
+    
+    def _abrir(self, nombre: str):
+        """Abre (o crea) una partición"""
+        coleccion = self._abiertas.get(nombre)
+        if coleccion is None:
+            with self._lock:
+                coleccion = self._abiertas.get(nombre)
+                if coleccion is None:
+                    coleccion = self._client.get_or_create_collection(
+                        name=nombre,
+                        embedding_function=self._embedding_function,
+                        metadata=self.metadata
+                    )
+                    self._abiertas[nombre] = coleccion
+        return coleccion
+    
+    def _incluir_base(self) -> bool:
+        """Si la colección base tiene chunks (anteriores al particionado)"""
+        if self._base_con_datos is None:
+            self._base_con_datos = self.base.count() > 0
+        return self._base_con_datos
+    
+    def particiones(self, where: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Particiones que pueden contener chunks que cumplan un `where`.
+        
+        Args:
+            where: Filtro con la sintaxis de ChromaDB (opcional)
+        
+        Returns:
+            Colecciones de las particiones, de la más antigua a la más reciente
+        """
+        desde, hasta, ciclos = restricciones_temporales(where)
+        colecciones = [
+            self._abrir(nombre)
+            for nombre in self.catalogo.listar(self.name, desde, hasta, ciclos)
+        ]
+        if self._incluir_base():
+            colecciones.insert(0, self.base)
+        return colecciones
+    
+    def count(self) -> int:
+        """Chunks en todas las particiones"""
+        return sum(coleccion.count() for coleccion in self.particiones())
+    
+    def _agrupar(self, metadatas: List[Dict[str, Any]]) -> Dict[Optional[str], List[int]]:
+        """Posiciones de los chunks de cada partición (None: colección base)"""
+        grupos: Dict[Optional[str], List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            nombre = nombre_particion(self.name, self.granularidad, metadata or {})
+            grupos.setdefault(nombre, []).append(i)
+        return grupos
+    
+    def _escribir(self, metodo: str, ids, documents=None, metadatas=None, embeddings=None):
+        grupos = self._agrupar(metadatas or [{}] * len(ids))
+        cerradas = [n for n in grupos if n is not None and self.catalogo.solo_lectura(n)]
+        if cerradas:
+            raise ValueError(f"Particiones de solo lectura: {', '.join(sorted(cerradas))}")
+        
+        for nombre, indices in grupos.items():
+            if nombre is None:
+                coleccion = self.base
+                self._base_con_datos = True
+            else:
+                # El catálogo se actualiza antes de escribir, para que la
+                # partición nunca quede fuera de las lecturas
+                self.catalogo.registrar(
+                    self.name,
+                    self.granularidad,
+                    nombre,
+                    (metadatas[i].get("timestamp_utc") for i in indices),
+                    (metadatas[i].get("ciclo_id") for i in indices)
+                )
+                coleccion = self._abrir(nombre)
+            getattr(coleccion, metodo)(
+                ids=_tomar(ids, indices),
+                documents=_tomar(documents, indices),
+                metadatas=_tomar(metadatas, indices),
+                embeddings=_tomar(embeddings, indices)
+            )
+    
+    def add(self, ids, documents=None, metadatas=None, embeddings=None):
+        """Añade chunks, cada uno en su partición"""
+        self._escribir("add", ids, documents, metadatas, embeddings)
+    
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        """Añade o reemplaza chunks, cada uno en su partición"""
+        self._escribir("upsert", ids, documents, metadatas, embeddings)
+    
+    def _localizar(self, ids: List[str]) -> Iterator[Tuple[Any, List[str]]]:
+        """Partición de cada id: pares (colección, ids que contiene)"""
+        restantes = set(ids)
+        for coleccion in self.particiones():
+            if not restantes:
+                break
+            encontrados = coleccion.get(ids=list(restantes), include=[])["ids"]
+            if encontrados:
+                restantes.difference_update(encontrados)
+                yield coleccion, encontrados
+    
+    def update(self, ids, metadatas=None, documents=None, embeddings=None):
+        """
+        Actualiza chunks existentes en la partición donde estén.
+        
+        Los metadatos se pueden actualizar también en particiones de solo
+        lectura; el texto y los embeddings, no.
+        """
+        posicion = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        for coleccion, encontrados in self._localizar(list(ids)):
+            if (documents is not None or embeddings is not None) and self.catalogo.solo_lectura(coleccion.name):
+                raise ValueError(f"Partición de solo lectura: {coleccion.name}")
+            indices = [posicion[chunk_id] for chunk_id in encontrados]
+            coleccion.update(
+                ids=encontrados,
+                metadatas=_tomar(metadatas, indices),
+                documents=_tomar(documents, indices),
+                embeddings=_tomar(embeddings, indices)
+            )
+    
+    def delete(self, ids=None, where=None):
+        """
+        Borra chunks por id o por filtro.
+        
+        Los borrados de cada partición se anotan en el catálogo, para
+        saber qué particiones conviene compactar.
+        """
+        if ids is not None:
+            localizados = list(self._localizar(list(ids)))
+        else:
+            localizados = [
+                (coleccion, coleccion.get(where=where, include=[])["ids"])
+                for coleccion in self.particiones(where)
+            ]
+        for coleccion, encontrados in localizados:
+            if not encontrados:
+                continue
+            coleccion.delete(ids=encontrados)
+            if coleccion is self.base:
+                self._base_con_datos = None
+            else:
+                self.catalogo.sumar_borrados(coleccion.name, len(encontrados))
+    
+    @staticmethod
+    def _unir_resultados(partes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Concatena resultados de `get` de varias particiones"""
+        resultado: Dict[str, Any] = {"ids": []}
+        for clave in _CLAVES_RESULTADO[1:]:
+            valores = [parte.get(clave) for parte in partes]
+            resultado[clave] = (
+                None if not partes or any(v is None for v in valores)
+                else [elemento for v in valores for elemento in v]
+            )
+        for parte in partes:
+            resultado["ids"].extend(parte["ids"])
+        if partes:
+            resultado["included"] = partes[0].get("included")
+        return resultado
+    
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None):
+        """
+        Lee chunks de las particiones que pueden cumplir `where`.
+        
+        Con `offset`, las particiones anteriores se cuentan sin leer sus
+        datos. Para recorrer colecciones grandes es mejor paginar cada
+        partición por separado (ver `particiones`).
+        """
+        argumentos = {"where": where}
+        if include is not None:
+            argumentos["include"] = include
+        
+        partes = []
+        if ids is not None:
+            restantes = set(ids)
+            for coleccion in self.particiones(where):
+                if not restantes:
+                    break
+                parte = coleccion.get(ids=list(restantes), **argumentos)
+                if parte["ids"]:
+                    restantes.difference_update(parte["ids"])
+                    partes.append(parte)
+            return self._unir_resultados(partes)
+        
+        saltar = offset or 0
+        faltan = limit
+        for coleccion in self.particiones(where):
+            if faltan is not None and faltan <= 0:
+                break
+            if saltar:
+                total = len(coleccion.get(where=where, include=[])["ids"]) if where else coleccion.count()
+                if total <= saltar:
+                    saltar -= total
+                    continue
+            parte = coleccion.get(limit=faltan, offset=saltar or None, **argumentos)
+            saltar = 0
+            partes.append(parte)
+            if faltan is not None:
+                faltan -= len(parte["ids"])
+        return self._unir_resultados(partes)
+    
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=None):
+        """
+        Busca los vecinos más cercanos en las particiones que pueden cumplir `where`.
+        
+        Cada partición devuelve su top-k y los resultados se fusionan por
+        distancia, de modo que el top-k global es el mismo que daría una
+        única colección.
+        """
+        include = include if include is not None else ["documents", "metadatas", "distances"]
+        colecciones = self.particiones(where)
+        
+        def consultar(coleccion):
+            return coleccion.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                include=include
+            )
+        
+        if len(colecciones) > 1:
+            partes = list(self._executor.map(consultar, colecciones))
+        else:
+            partes = [consultar(coleccion) for coleccion in colecciones]
+        
+        claves = ["ids"] + [c for c in ("distances", "documents", "metadatas", "embeddings") if c in include]
+        resultado: Dict[str, Any] = {clave: [] for clave in claves}
+        for fila in range(len(query_embeddings)):
+            candidatos = [
+                (parte["distances"][fila][j] if "distances" in include else 0.0, p, j)
+                for p, parte in enumerate(partes)
+                for j in range(len(parte["ids"][fila]))
+            ]
+            candidatos.sort(key=lambda candidato: candidato[0])
+            for clave in claves:
+                resultado[clave].append([
+                    partes[p][clave][fila][j] for _, p, j in candidatos[:n_results]
+                ])
+        for clave in ("distances", "documents", "metadatas", "embeddings"):
+            resultado.setdefault(clave, None)
+        return resultado
+    
+    def cerrar_anteriores(self, conservar: int = 2) -> List[str]:
+        """
+        Marca como solo lectura todas las particiones salvo las más recientes.
+        
+        Args:
+            conservar: Particiones recientes que siguen admitiendo chunks nuevos
+        
+        Returns:
+            Particiones cerradas en esta llamada
+        """
+        nombres = self.catalogo.listar(self.name)
+        antiguas = nombres[:-conservar] if conservar > 0 else nombres
+        cerradas = [nombre for nombre in antiguas if not self.catalogo.solo_lectura(nombre)]
+        self.catalogo.marcar_solo_lectura(cerradas)
+        return cerradas
+    
+    def compactar(self, nombre: str, tamano_pagina: int = 500) -> int:
+        """
+        Reescribe una partición sin los huecos que dejan los chunks borrados.
+        
+        Copia los chunks (con sus embeddings, sin re-embeber) a una
+        colección nueva y la renombra en lugar de la original. Si el proceso
+        se interrumpe, la siguiente apertura termina o descarta la copia.
+        
+        Args:
+            nombre: Partición a compactar
+            tamano_pagina: Chunks copiados por lote
+        
+        Returns:
+            Chunks copiados
+        """
+        origen = self._abrir(nombre)
+        temporal = nombre + SUFIJO_COMPACTACION
+        if temporal in {getattr(c, "name", c) for c in self._client.list_collections()}:
+            self._client.delete_collection(temporal)
+        copia = self._client.create_collection(
+            name=temporal,
+            embedding_function=self._embedding_function,
+            metadata=self.metadata
+        )
+        
+        tamano = max(1, min(tamano_pagina, self._client.get_max_batch_size()))
+        copiados = 0
+        while True:
+            pagina = origen.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=tamano,
+                offset=copiados
+            )
+            if not pagina["ids"]:
+                break
+            copia.add(
+                ids=pagina["ids"],
+                embeddings=pagina["embeddings"],
+                documents=pagina["documents"],
+                metadatas=pagina["metadatas"]
+            )
+            copiados += len(pagina["ids"])
+        
+        with self._lock:
+            self._client.delete_collection(nombre)
+            copia.modify(name=nombre)
+            self._abiertas[nombre] = copia
+        self.catalogo.compactada(nombre)
+        return copiados
+    
+    def describir(self) -> List[Dict[str, Any]]:
+        """
+        Estado de cada partición, con su número de chunks.
+        
+        Returns:
+            Lista de diccionarios del catálogo, de la más antigua a la más reciente
+        """
+        particiones = self.catalogo.describir(self.name)
+        for particion in particiones:
+            particion["chunks"] = self._abrir(particion["nombre"]).count()
+        return particiones
+    
+    def cerrar(self, esperar: bool = True):
+        """
+        Libera el pool de consultas en paralelo.
+        
+        Args:
+            esperar: Si esperar a que terminen las consultas en curso
+        """
+        self._executor.shutdown(wait=esperar, cancel_futures=True)
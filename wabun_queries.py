@@ -9,26 +9,85 @@ Versión: 1.0
 """
 
 from wabun_core import WabunCore
-from typing import List, Dict, Optional, Any
+from wabun_metricas import medido
+from wabun_tokens import ContadorTokens
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Callable, Tuple
 from datetime import datetime, timedelta, timezone
 import json
+import time
+
+
+# Reparto del presupuesto de tokens del contexto, en orden de prioridad.
+# Cada sección puede usar hasta esa fracción de lo que queda; lo que no
+# usa pasa a las secciones siguientes. La última sección presente (sin
+# proyecto, "recientes") recibe todo lo que queda.
+CUOTAS_CONTEXTO = (
+    ("protocolo", 0.4),
+    ("recientes", 0.6),
+    ("decisiones", 1.0)
+)
 
 
 class WabunQueries:
     """
     Módulo de consultas avanzadas para WABUN.
     Proporciona métodos especializados para diferentes tipos de recuperación.
+    
+    Las sub-consultas del contexto corren en un pool de hilos propio; usa
+    `cerrar()` (o `with WabunQueries(wabun) as queries:`) para liberarlo.
     """
     
-    def __init__(self, wabun_core: WabunCore):
+    def __init__(
+        self,
+        wabun_core: WabunCore,
+        contador_tokens: Optional[ContadorTokens] = None,
+        max_concurrencia: int = 3
+    ):
         """
         Inicializa el módulo de consultas.
         
         Args:
             wabun_core: Instancia de WabunCore
+            contador_tokens: Contador para el presupuesto del contexto (por
+                defecto el de la fragmentación de WabunCore)
+            max_concurrencia: Sub-consultas simultáneas al construir el contexto
         """
         self.wabun = wabun_core
+        # Las consultas se miden en el mismo registro que el núcleo
+        self.metricas = wabun_core.metricas
+        self.contador_tokens = contador_tokens or wabun_core.contador_tokens
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrencia),
+            thread_name_prefix="wabun-queries"
+        )
+        
+        # Latencias y consumo de tokens de la última construcción de contexto
+        self.ultimo_informe_contexto: Dict[str, Any] = {}
+    
+    def cerrar(self, esperar: bool = True):
+        """
+        Libera el pool de hilos de las sub-consultas.
+        
+        Args:
+            esperar: Si esperar a que terminen las sub-consultas en curso
+        """
+        self._executor.shutdown(wait=esperar, cancel_futures=True)
     
+    def __enter__(self) -> "WabunQueries":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.cerrar()
+    
+    @staticmethod
+    def _medir(consulta: Callable[[], Any]) -> Tuple[Any, float]:
+        """Ejecuta una consulta y devuelve (resultado, milisegundos)"""
+        inicio = time.perf_counter()
+        resultado = consulta()
+        return resultado, (time.perf_counter() - inicio) * 1000
+    
+    @medido("queries.recuperar_contexto_para_motor")
     def recuperar_contexto_para_motor(
         self,
         custodio: str,
@@ -39,6 +98,14 @@ class WabunQueries:
         Recupera el contexto relevante para iniciar una sesión con un motor de IA.
         Esta función es clave para la continuidad de CAELION.
         
+        Las sub-consultas (protocolo del custodio, interacciones recientes y
+        decisiones validadas) cuya sección recibirá presupuesto aunque las
+        anteriores agoten su cuota se lanzan a la vez, así que el tiempo
+        total es el de la más lenta. Las demás solo se lanzan al llegar a
+        su sección, si aún queda presupuesto. Las secciones se llenan por
+        prioridad hasta agotar `max_tokens_aprox`; las latencias y los
+        tokens usados quedan en `self.ultimo_informe_contexto`.
+        
         Args:
             custodio: Custodio que será invocado
             proyecto: Proyecto específico (opcional)
@@ -47,6 +114,8 @@ class WabunQueries:
         Returns:
             String formateado con el contexto relevante
         """
+        inicio = time.perf_counter()
+        contar = self.contador_tokens.contar
         contexto_partes = []
         
         # 1. Identidad del Fundador (desde CUSTOS)
@@ -62,48 +131,114 @@ class WabunQueries:
         contexto_partes.append(f"Custodio Invocado: {custodio}")
         contexto_partes.append("")
         
-        # 3. Principios del Custodio Invocado
-        contexto_partes.append(f"## PROTOCOLO DE {custodio}")
-        principios = self.wabun.buscar_en_decretos(
-            f"Protocolo {custodio} propósito principio",
-            n_results=2
-        )
-        if principios['documents'][0]:
-            contexto_partes.append(principios['documents'][0][0])
-        contexto_partes.append("")
+        restante = max_tokens_aprox - sum(contar(linea) + 1 for linea in contexto_partes)
         
-        # 4. Interacciones Recientes Relevantes
-        contexto_partes.append("## CONTEXTO RECIENTE")
+        # 3-5. Secciones recuperadas de la memoria, en orden de prioridad
         filtros = {"custodio_invocado": custodio}
         if proyecto:
             filtros["proyecto_asociado"] = proyecto
         
-        recientes = self.wabun.buscar_contexto_reciente(
-            f"resumen de interacciones con {custodio}",
-            n_results=5,
-            filtros=filtros
-        )
-        
-        if recientes['documents'][0]:
-            for idx, doc in enumerate(recientes['documents'][0][:3]):
-                metadata = recientes['metadatas'][0][idx]
-                contexto_partes.append(f"[{metadata.get('timestamp_utc', 'N/A')}] {doc[:200]}...")
-        contexto_partes.append("")
-        
-        # 5. Decisiones Validadas del Proyecto
+        secciones = {
+            "protocolo": (
+                f"## PROTOCOLO DE {custodio}",
+                lambda: self.wabun.buscar_en_decretos(
+                    f"Protocolo {custodio} propósito principio",
+                    n_results=2,
+                    modo="hibrido"
+                ),
+                lambda doc, metadata: doc
+            ),
+            "recientes": (
+                "## CONTEXTO RECIENTE",
+                lambda: self.wabun.buscar_contexto_reciente(
+                    f"resumen de interacciones con {custodio}",
+                    n_results=5,
+                    filtros=filtros
+                ),
+                lambda doc, metadata: f"[{metadata.get('timestamp_utc', 'N/A')}] {doc}"
+            )
+        }
         if proyecto:
-            contexto_partes.append(f"## DECISIONES VALIDADAS - {proyecto}")
-            decisiones = self.wabun.buscar_contexto_reciente(
-                f"decisiones del proyecto {proyecto}",
-                n_results=5,
-                filtros={"proyecto_asociado": proyecto, "estado_decision": "Validada"}
+            secciones["decisiones"] = (
+                f"## DECISIONES VALIDADAS - {proyecto}",
+                lambda: self.wabun.buscar_contexto_reciente(
+                    f"decisiones del proyecto {proyecto}",
+                    n_results=5,
+                    filtros={"proyecto_asociado": proyecto, "estado_decision": "Validada"}
+                ),
+                lambda doc, metadata: f"- {doc}"
             )
-            if decisiones['documents'][0]:
-                for doc in decisiones['documents'][0][:3]:
-                    contexto_partes.append(f"- {doc[:150]}...")
         
-        return "\n".join(contexto_partes)
+        cuotas = [(nombre, fraccion) for nombre, fraccion in CUOTAS_CONTEXTO if nombre in secciones]
+        cuotas[-1] = (cuotas[-1][0], 1.0)
+        
+        # Lanzar a la vez las sub-consultas con presupuesto garantizado: el
+        # que queda aunque cada sección anterior agote su cuota
+        futuros = {}
+        garantizado = restante
+        for nombre, fraccion in cuotas:
+            titulo, consulta, _ = secciones[nombre]
+            if garantizado <= contar(titulo) + 1:
+                break
+            futuros[nombre] = self._executor.submit(self._medir, consulta)
+            garantizado -= int(garantizado * fraccion) + 1
+        
+        latencias = {}
+        tokens_por_seccion = {}
+        for nombre, fraccion in cuotas:
+            titulo, consulta, formatear = secciones[nombre]
+            coste_titulo = contar(titulo) + 1
+            if restante <= coste_titulo:
+                # Presupuesto agotado: las secciones siguientes no se consultan
+                break
+            
+            if nombre in futuros:
+                resultados, latencias[nombre] = futuros[nombre].result()
+            else:
+                resultados, latencias[nombre] = self._medir(consulta)
+
+            cuota = int(restante * fraccion) - coste_titulo
+            usados = coste_titulo
+            contexto_partes.append(titulo)
+            
+            documentos = resultados['documents'][0] if resultados['documents'] else []
+            metadatas = resultados['metadatas'][0] if resultados['metadatas'] else []
+            for doc, metadata in zip(documentos, metadatas):
+                linea = formatear(doc, metadata)
+                coste = contar(linea) + 1
+                if coste <= cuota:
+                    contexto_partes.append(linea)
+                else:
+                    # Último elemento que cabe: se recorta al presupuesto
+                    recorte = self.contador_tokens.truncar(linea, cuota - 2)
+                    if recorte:
+                        contexto_partes.append(recorte + "...")
+                        coste = contar(recorte + "...") + 1
+                    else:
+                        coste = 0
+                cuota -= coste
+                usados += coste
+                if cuota <= 1:
+                    break
+            
+            contexto_partes.append("")
+            usados += 1
+            tokens_por_seccion[nombre] = usados
+            restante -= usados
+        
+        contexto = "\n".join(contexto_partes)
+        self.ultimo_informe_contexto = {
+            "presupuesto_tokens": max_tokens_aprox,
+            "tokens_totales": contar(contexto),
+            "tokens_por_seccion": tokens_por_seccion,
+            "latencias_ms": latencias,
+            "latencia_total_ms": (time.perf_counter() - inicio) * 1000,
+            "metodo_conteo": self.contador_tokens.metodo
+        }
+        
+        return contexto
     
+    @medido("queries.buscar_por_fecha")
     def buscar_por_fecha(
         self,
         fecha_inicio: datetime,
@@ -119,7 +254,8 @@ class WabunQueries:
             custodio: Filtrar por custodio específico
             
         Returns:
-            Resultados de la búsqueda
+            Todos los chunks del rango, del más reciente al más antiguo
+            (ver `_recorrer_recientes`)
         """
         if fecha_fin is None:
             fecha_fin = datetime.now(timezone.utc)
@@ -137,13 +273,10 @@ class WabunQueries:
         if custodio:
             filtros["custodio_invocado"] = custodio
         
-        return self.wabun.interactions.query(
-            query_texts=["resumen de interacciones en el período"],
-            n_results=50,
-            where=filtros,
-            include=["documents", "metadatas", "distances"]
-        )
+        # Sin intención semántica: recorrido por metadatos, sin embeddings
+        return self._recorrer_recientes(filtros)
     
+    @medido("queries.analizar_custodio")
     def analizar_custodio(self, custodio: str) -> Dict[str, Any]:
         """
         Analiza el historial completo de un custodio.
@@ -154,40 +287,69 @@ class WabunQueries:
         Returns:
             Diccionario con análisis
         """
-        # Obtener todas las interacciones del custodio
-        resultados = self.wabun.interactions.query(
-            query_texts=[f"análisis completo de {custodio}"],
-            n_results=100,
-            where={"custodio_invocado": custodio},
-            include=["documents", "metadatas"]
-        )
-        
-        # Contar por estado de decisión
-        estados = {}
-        proyectos = set()
-        total_interacciones = 0
-        
-        if resultados['metadatas'][0]:
-            for metadata in resultados['metadatas'][0]:
-                estado = metadata.get('estado_decision', 'Desconocido')
-                estados[estado] = estados.get(estado, 0) + 1
-                
-                proyecto = metadata.get('proyecto_asociado')
-                if proyecto:
-                    proyectos.add(proyecto)
-                
-                # Contar solo prompts del Fundador para evitar duplicados
-                if metadata.get('rol') == 'Fundador':
-                    total_interacciones += 1
+        # Conteos desde los agregados: no depende del número de interacciones
+        filtro = {"custodio_invocado": custodio}
+        estados = self.wabun.cabeceras.agregados(["estado_decision"], filtro)
+        proyectos = self.wabun.cabeceras.agregados(["proyecto_asociado"], filtro)
+        
+        # Muestra: primer chunk del prompt de las tres interacciones más recientes
+        muestra = []
+        recientes = self.wabun.cabeceras.recientes(filtro, 3)
+        if recientes:
+            textos = self.wabun.interactions.get(
+                ids=[f"{interaction_id}-prompt-0" for interaction_id in recientes],
+                include=["documents"]
+            )
+            por_id = dict(zip(textos['ids'], textos['documents']))
+            muestra = [
+                por_id[f"{interaction_id}-prompt-0"]
+                for interaction_id in recientes
+                if f"{interaction_id}-prompt-0" in por_id
+            ]
         
         return {
             "custodio": custodio,
-            "total_interacciones": total_interacciones,
+            "total_interacciones": sum(estados.values()),
             "estados_decisiones": estados,
-            "proyectos_involucrados": list(proyectos),
-            "muestra_reciente": resultados['documents'][0][:3] if resultados['documents'][0] else []
+            "proyectos_involucrados": [p for p in proyectos if p],
+            "muestra_reciente": muestra
         }
     
+    @medido("queries.buscar_por_palabras_clave")
+    def buscar_por_palabras_clave(
+        self,
+        palabras: List[str],
+        operador: str = "AND",
+        tema: Optional[str] = None,
+        custodio: Optional[str] = None,
+        n_results: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Busca interacciones por sus palabras clave.
+        
+        El índice invertido da el conjunto exacto de interacciones; si se
+        indica un tema, la búsqueda semántica se limita a ellas.
+        
+        Args:
+            palabras: Palabras clave (sin distinguir mayúsculas)
+            operador: "AND" (todas las palabras) u "OR" (alguna)
+            tema: Texto para ordenar por relevancia semántica (opcional)
+            custodio: Filtrar por custodio (opcional)
+            n_results: Número de resultados
+            
+        Returns:
+            Resultados de la búsqueda
+        """
+        filtros = {"custodio_invocado": custodio} if custodio else None
+        return self.wabun.buscar_contexto_reciente(
+            tema,
+            n_results=n_results,
+            filtros=filtros,
+            palabras_clave=palabras,
+            operador_palabras=operador
+        )
+    
+    @medido("queries.buscar_decisiones_pendientes")
     def buscar_decisiones_pendientes(self) -> List[Dict[str, Any]]:
         """
         Encuentra todas las decisiones que están en estado 'Propuesta'.
@@ -195,30 +357,28 @@ class WabunQueries:
         Returns:
             Lista de decisiones pendientes
         """
-        resultados = self.wabun.interactions.query(
-            query_texts=["decisiones pendientes de validación"],
-            n_results=50,
-            where={
-                "estado_decision": "Propuesta",
-                "rol": "Fundador"  # Solo prompts del Fundador
-            },
-            include=["documents", "metadatas"]
-        )
-        
         decisiones = []
-        if resultados['metadatas'][0]:
-            for idx, metadata in enumerate(resultados['metadatas'][0]):
+        for pagina in self.wabun.escanear(
+            self.wabun.interactions,
+            {
+                "estado_decision": "Propuesta",
+                "rol": "Fundador",  # Solo prompts del Fundador
+                "chunk_index": 0  # Una entrada por interacción
+            }
+        ):
+            for idx, metadata in enumerate(pagina['metadatas']):
                 decisiones.append({
                     "interaction_id": metadata.get('interaction_id'),
                     "custodio": metadata.get('custodio_invocado'),
                     "proyecto": metadata.get('proyecto_asociado'),
                     "intencion": metadata.get('intencion_fundador'),
                     "importancia": metadata.get('importancia'),
-                    "texto": resultados['documents'][0][idx][:200]
+                    "texto": pagina['documents'][idx][:200]
                 })
         
         return decisiones
     
+    @medido("queries.buscar_por_importancia")
     def buscar_por_importancia(
         self,
         nivel_minimo: int = 4,
@@ -232,7 +392,8 @@ class WabunQueries:
             custodio: Filtrar por custodio (opcional)
             
         Returns:
-            Resultados de alta importancia
+            Todos los chunks de alta importancia, del más reciente al más
+            antiguo (ver `_recorrer_recientes`)
         """
         filtros = {
             "importancia": {"$gte": nivel_minimo}
@@ -241,13 +402,75 @@ class WabunQueries:
         if custodio:
             filtros["custodio_invocado"] = custodio
         
-        return self.wabun.interactions.query(
-            query_texts=["interacciones de alta importancia"],
-            n_results=30,
-            where=filtros,
-            include=["documents", "metadatas", "distances"]
+        # Sin intención semántica: recorrido por metadatos, sin embeddings
+        return self._recorrer_recientes(filtros)
+    
+    def _recorrer_recientes(self, filtros: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Todos los chunks que cumplen unos filtros, sin límite ni embeddings.
+        
+        Recorre la colección por páginas (incluidos los chunks
+        deduplicados) y ordena por `timestamp_utc` descendente.
+        
+        Returns:
+            Diccionario con la forma de `query` (ids, documents y metadatas
+            anidados en una lista; distances es None)
+        """
+        resultado = self.wabun.obtener_por_filtro(
+            self.wabun.interactions, filtros, incluir_referencias=True
+        )
+        metadatas = resultado["metadatas"]
+        orden = sorted(
+            range(len(resultado["ids"])),
+            key=lambda i: -(metadatas[i].get("timestamp_utc") or 0)
         )
+        return {
+            "ids": [[resultado["ids"][i] for i in orden]],
+            "documents": [[resultado["documents"][i] for i in orden]],
+            "metadatas": [[metadatas[i] for i in orden]],
+            "distances": None
+        }
     
+    @medido("queries.buscar_relevante")
+    def buscar_relevante(
+        self,
+        tema: str,
+        custodio: Optional[str] = None,
+        proyecto: Optional[str] = None,
+        n_results: int = 10,
+        pesos: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Interacciones relevantes, recientes e importantes en una sola consulta.
+        
+        Sustituye a combinar a mano `buscar_contexto_reciente`,
+        `buscar_por_fecha` y `buscar_por_importancia`: los candidatos de
+        una única búsqueda vectorial se reordenan por relevancia, recencia,
+        importancia y diversidad (ver `WabunCore.buscar_contexto_priorizado`).
+        
+        Args:
+            tema: Texto de búsqueda
+            custodio: Filtrar por custodio (opcional)
+            proyecto: Filtrar por proyecto (opcional)
+            n_results: Número de resultados
+            pesos: Pesos de relevancia, recencia, importancia y diversidad
+            
+        Returns:
+            Resultados reordenados, con su puntuación y sus componentes
+        """
+        filtros = {}
+        if custodio:
+            filtros["custodio_invocado"] = custodio
+        if proyecto:
+            filtros["proyecto_asociado"] = proyecto
+        return self.wabun.buscar_contexto_priorizado(
+            tema,
+            n_results=n_results,
+            filtros=filtros or None,
+            pesos=pesos
+        )
+    
+    @medido("queries.generar_resumen_ciclo")
     def generar_resumen_ciclo(self, ciclo_id: Optional[str] = None) -> str:
         """
         Genera un resumen narrativo de un ciclo completo.
@@ -261,11 +484,10 @@ class WabunQueries:
         if ciclo_id is None:
             ciclo_id = self.wabun.ciclo_actual
         
-        resultados = self.wabun.interactions.query(
-            query_texts=["resumen completo del ciclo"],
-            n_results=100,
-            where={"ciclo_id": ciclo_id, "rol": "Fundador"},
-            include=["documents", "metadatas"]
+        resultados = self.wabun.obtener_por_filtro(
+            self.wabun.interactions,
+            {"ciclo_id": ciclo_id, "rol": "Fundador", "chunk_index": 0},
+            include=["metadatas"]
         )
         
         resumen = [f"# RESUMEN DEL CICLO: {ciclo_id}\n"]
@@ -273,8 +495,9 @@ class WabunQueries:
         # Agrupar por fase
         por_fase = {"Encendido": [], "Ejecucion": [], "Observacion": [], "Equilibrio": []}
         
-        if resultados['metadatas'][0]:
-            for idx, metadata in enumerate(resultados['metadatas'][0]):
+        if resultados['metadatas']:
+            metadatas = sorted(resultados['metadatas'], key=lambda m: m.get('timestamp_utc', 0))
+            for metadata in metadatas:
                 fase = metadata.get('fase_ciclo', 'Desconocido')
                 if fase in por_fase:
                     por_fase[fase].append({
@@ -292,6 +515,7 @@ class WabunQueries:
         
         return "\n".join(resumen)
     
+    @medido("queries.buscar_conocimiento_sobre")
     def buscar_conocimiento_sobre(
         self,
         tema: str,
@@ -302,6 +526,9 @@ class WabunQueries:
         Búsqueda semántica general sobre un tema.
         Combina resultados de interacciones y decretos.
         
+        El tema se embebe una sola vez y ambas colecciones se consultan en
+        paralelo mediante la búsqueda federada de WabunCore.
+        
         Args:
             tema: Tema a buscar
             incluir_decretos: Si incluir búsqueda en decretos
@@ -310,33 +537,29 @@ class WabunQueries:
         Returns:
             Resultados combinados
         """
+        colecciones = ["interactions", "decretos"] if incluir_decretos else ["interactions"]
+        federada = self.wabun.busqueda_federada(
+            tema,
+            colecciones=colecciones,
+            n_results=n_results + n_results // 2,
+            n_por_coleccion={"interactions": n_results, "decretos": n_results // 2}
+        )
+        
         resultados = {
             "tema": tema,
             "interacciones": [],
-            "decretos": []
+            "decretos": [],
+            "ranking": federada["resultados"]
         }
         
-        # Buscar en interacciones
-        inter_results = self.wabun.buscar_contexto_reciente(tema, n_results=n_results)
-        if inter_results['documents'][0]:
-            for idx, doc in enumerate(inter_results['documents'][0]):
-                resultados["interacciones"].append({
-                    "texto": doc,
-                    "metadata": inter_results['metadatas'][0][idx],
-                    "relevancia": 1 - inter_results['distances'][0][idx]  # Convertir distancia a score
+        for clave, nombre in (("interacciones", "interactions"), ("decretos", "decretos")):
+            for encontrado in federada["por_coleccion"].get(nombre, []):
+                resultados[clave].append({
+                    "texto": encontrado["texto"],
+                    "metadata": encontrado["metadata"],
+                    "relevancia": encontrado["similitud"]
                 })
         
-        # Buscar en decretos
-        if incluir_decretos:
-            dec_results = self.wabun.buscar_en_decretos(tema, n_results=n_results//2)
-            if dec_results['documents'][0]:
-                for idx, doc in enumerate(dec_results['documents'][0]):
-                    resultados["decretos"].append({
-                        "texto": doc,
-                        "metadata": dec_results['metadatas'][0][idx],
-                        "relevancia": 1 - dec_results['distances'][0][idx]
-                    })
-        
         return resultados
 
 
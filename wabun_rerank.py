@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+WABUN Rerank - Reordenación por Relevancia, Recencia, Importancia y Diversidad
+Puntúa en NumPy los candidatos de una sola consulta vectorial sobremuestreada
+
+Autor: Manus AI (bajo la guía de WABUN y HECATE)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from typing import List, Dict, Optional, Any, Tuple
+import time
+
+import numpy as np
+
+
+# Peso de cada componente de la puntuación. La diversidad es la penalización
+# MMR: similitud máxima con los resultados ya elegidos
+PESOS_RERANK = {
+    "relevancia": 1.0,
+    "recencia": 0.3,
+    "importancia": 0.2,
+    "diversidad": 0.3
+}
+
+# Días en que la recencia de una interacción cae a la mitad
+VIDA_MEDIA_DIAS = 14.0
+
+# Candidatos por resultado que se piden al índice antes de reordenar
+FACTOR_SOBREMUESTREO = 5
+
+# Escala de `importancia` (se normaliza a [0, 1]; sin valor cuenta como la media)
+IMPORTANCIA_MINIMA = 1
+IMPORTANCIA_MAXIMA = 5
+
+
+def combinar_pesos(pesos: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Pesos por defecto actualizados con los dados.
+    
+    Raises:
+        ValueError: Si algún componente no existe
+    """
+    desconocidos = set(pesos or {}) - set(PESOS_RERANK)
+    if desconocidos:
+        raise ValueError(
+            f"Componentes de rerank desconocidos: {sorted(desconocidos)} (usa {list(PESOS_RERANK)})"
+        )
+    return {**PESOS_RERANK, **(pesos or {})}
+
+
+def similitudes(distancias: np.ndarray, espacio: str = "l2") -> np.ndarray:
+    """Similitud coseno de un vector de distancias (ver `WabunCore._similitud`)"""
+    distancias = np.asarray(distancias, dtype=np.float32)
+    similitud = 1 - distancias / 2 if espacio == "l2" else 1 - distancias
+    return np.clip(similitud, -1.0, 1.0)
+
+
+def reordenar(
+    distancias: Any,
+    metadatas: List[Optional[Dict[str, Any]]],
+    embeddings: Any,
+    n_results: int,
+    pesos: Optional[Dict[str, float]] = None,
+    espacio: str = "l2",
+    vida_media_dias: float = VIDA_MEDIA_DIAS,
+    ahora: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Elige los n_results mejores candidatos combinando cuatro señales.
+    
+    La puntuación base de todos los candidatos se calcula de una vez:
+    relevancia (similitud con la consulta), recencia (decaimiento
+    exponencial de `timestamp_utc`) e importancia normalizada. La
+    selección es MMR: en cada paso se elige el candidato con mayor
+    puntuación base menos `diversidad` por su similitud máxima con los ya
+    elegidos, que se actualiza con un solo producto matriz-vector.
+    
+    Args:
+        distancias: Distancias de los candidatos a la consulta
+        metadatas: Metadatos de los candidatos (timestamp_utc, importancia)
+        embeddings: Embeddings de los candidatos (para la diversidad)
+        n_results: Resultados a elegir
+        pesos: Pesos de relevancia, recencia, importancia y diversidad
+            (los que falten se toman de PESOS_RERANK)
+        espacio: Métrica de las distancias ("l2", "cosine" o "ip")
+        vida_media_dias: Días en que la recencia cae a la mitad
+        ahora: Momento de referencia (timestamp UTC; por defecto, el actual)
+    
+    Returns:
+        (índices elegidos en orden, puntuación final de cada uno,
+        componentes por candidato elegido: relevancia, recencia,
+        importancia y redundancia)
+    """
+    pesos = combinar_pesos(pesos)
+    n = len(metadatas)
+    if n == 0 or n_results <= 0:
+        vacio = np.empty(0, dtype=np.float32)
+        componentes = {c: vacio for c in ("relevancia", "recencia", "importancia", "redundancia")}
+        return np.empty(0, dtype=np.int64), vacio, componentes
+    
+    relevancia = similitudes(distancias, espacio)
+    
+    ahora = int(time.time()) if ahora is None else ahora
+    timestamps = np.array(
+        [(m or {}).get("timestamp_utc", np.nan) for m in metadatas], dtype=np.float64
+    )
+    edad_dias = np.maximum(0.0, ahora - timestamps) / 86400.0
+    # Sin timestamp (decretos, entidades) no hay recencia que premiar
+    recencia = np.nan_to_num(np.exp2(-edad_dias / max(vida_media_dias, 1e-9)), nan=0.0).astype(np.float32)
+    
+    importancias = np.array(
+        [(m or {}).get("importancia", np.nan) for m in metadatas], dtype=np.float64
+    )
+    importancia = (importancias - IMPORTANCIA_MINIMA) / (IMPORTANCIA_MAXIMA - IMPORTANCIA_MINIMA)
+    importancia = np.clip(np.nan_to_num(importancia, nan=0.5), 0.0, 1.0).astype(np.float32)
+    
+    base = pesos["relevancia"] * relevancia + pesos["recencia"] * recencia + pesos["importancia"] * importancia
+    
+    k = min(n_results, n)
+    if pesos["diversidad"] and k > 1:
+        vectores = np.asarray(embeddings, dtype=np.float32)
+        normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+        vectores = vectores / np.where(normas == 0, 1.0, normas)
+        disponibles = np.ones(n, dtype=bool)
+        maxima = np.full(n, -np.inf, dtype=np.float32)
+        elegidos, finales, redundancias = [], [], []
+        for paso in range(k):
+            puntuacion = base - pesos["diversidad"] * np.maximum(maxima, 0.0) if paso else base.copy()
+            puntuacion[~disponibles] = -np.inf
+            elegido = int(np.argmax(puntuacion))
+            elegidos.append(elegido)
+            finales.append(puntuacion[elegido])
+            redundancias.append(max(float(maxima[elegido]), 0.0) if paso else 0.0)
+            disponibles[elegido] = False
+            maxima = np.maximum(maxima, vectores @ vectores[elegido])
+        orden = np.array(elegidos, dtype=np.int64)
+        puntuaciones = np.array(finales, dtype=np.float32)
+        redundancia = np.array(redundancias, dtype=np.float32)
+    else:
+        orden = np.argsort(-base, kind="stable")[:k]
+        puntuaciones = base[orden]
+        redundancia = np.zeros(k, dtype=np.float32)
+    
+    componentes = {
+        "relevancia": relevancia[orden],
+        "recencia": recencia[orden],
+        "importancia": importancia[orden],
+        "redundancia": redundancia
+    }
+    return orden, puntuaciones, componentes
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+WABUN Retención - Compactación de Interacciones Antiguas en Actas
+Archiva en frío las interacciones de poco peso y las resume en actas
+
+Autor: Manus AI (bajo la guía de WABUN y HECATE)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple
+import json
+import re
+
+from wabun_core import WabunCore
+from wabun_metricas import medido
+
+
+# Política por defecto: ciclos más recientes que nunca se compactan e
+# importancia máxima de las interacciones que se pueden archivar
+CICLOS_VIVOS = 10
+IMPORTANCIA_MAXIMA = 2
+
+# Decisiones que siempre se quedan en la memoria viva, sea cual sea la política
+ESTADOS_PROTEGIDOS = ("Validada",)
+IMPORTANCIA_PROTEGIDA = 4
+
+# Intenciones del Fundador que se citan en cada acta
+MAX_INTENCIONES_ACTA = 20
+
+# Caracteres que no se usan en los nombres de los archivos fríos
+_PATRON_NOMBRE_ARCHIVO = re.compile(r"[^\w.-]+")
+
+
+def _tamano_directorio(ruta: Path, excluir: Optional[Path] = None) -> int:
+    """Bytes ocupados por los archivos de un directorio (salvo los de `excluir`)"""
+    return sum(
+        archivo.stat().st_size
+        for archivo in ruta.rglob("*")
+        if archivo.is_file() and not (excluir and excluir in archivo.parents)
+    )
+
+
+def _palabras(valor: Any) -> List[str]:
+    """Palabras clave de una cabecera (lista JSON o lista)"""
+    if isinstance(valor, str):
+        valor = json.loads(valor) if valor.startswith("[") else [valor]
+    return list(valor or [])
+
+
+def _contados(contador: Counter, n: int = 5) -> str:
+    """Los n valores más frecuentes, como 'valor (cuenta), ...'"""
+    return ", ".join(f"{valor} ({cuenta})" for valor, cuenta in contador.most_common(n)) or "N/A"
+
+
+class WabunRetencion:
+    """
+    Política de retención de las interacciones de WABUN.
+    
+    Las interacciones de los ciclos antiguos con poca importancia se
+    resumen en un acta por ciclo, se archivan con sus embeddings en un
+    archivo frío comprimido (restaurable con `importar_memoria`) y se
+    eliminan de la memoria viva. Las decisiones validadas y las de
+    importancia alta nunca se compactan.
+    """
+    
+    def __init__(
+        self,
+        wabun_core: WabunCore,
+        ciclos_vivos: int = CICLOS_VIVOS,
+        importancia_maxima: int = IMPORTANCIA_MAXIMA,
+        directorio_archivo: Optional[str] = None
+    ):
+        """
+        Inicializa la política de retención.
+        
+        Args:
+            wabun_core: Instancia de WabunCore
+            ciclos_vivos: Ciclos más recientes que no se compactan
+            importancia_maxima: Importancia máxima de las interacciones
+                compactables (nunca alcanza IMPORTANCIA_PROTEGIDA)
+            directorio_archivo: Directorio de los archivos fríos (por
+                defecto `archivo/` dentro del directorio de persistencia)
+        """
+        self.wabun = wabun_core
+        self.metricas = wabun_core.metricas
+        self.ciclos_vivos = max(0, ciclos_vivos)
+        self.importancia_maxima = min(importancia_maxima, IMPORTANCIA_PROTEGIDA - 1)
+        self.directorio_archivo = Path(
+            directorio_archivo or wabun_core.persist_directory / "archivo"
+        )
+    
+    def politica(self) -> Dict[str, Any]:
+        """Parámetros de la política, tal como se anotan en actas y archivos"""
+        return {
+            "ciclos_vivos": self.ciclos_vivos,
+            "importancia_maxima": self.importancia_maxima,
+            "estados_protegidos": list(ESTADOS_PROTEGIDOS),
+            "importancia_protegida": IMPORTANCIA_PROTEGIDA
+        }
+    
+    def ciclos_compactables(self) -> List[str]:
+        """
+        Ciclos anteriores a los `ciclos_vivos` más recientes.
+        
+        Returns:
+            Lista de ciclo_id, del más reciente al más antiguo (nunca el
+            ciclo actual)
+        """
+        ciclos = [ciclo_id for ciclo_id, _ in self.wabun.cabeceras.ciclos()]
+        return [
+            ciclo_id for ciclo_id in ciclos[self.ciclos_vivos:]
+            if ciclo_id != self.wabun.ciclo_actual
+        ]
+    
+    def planificar(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Interacciones que la política compactaría ahora.
+        
+        Se decide con el almacén de cabeceras, sin recorrer ChromaDB.
+        
+        Returns:
+            Diccionario {ciclo_id: [cabeceras]}
+        """
+        return self.wabun.cabeceras.compactables(
+            self.ciclos_compactables(),
+            self.importancia_maxima,
+            ESTADOS_PROTEGIDOS,
+            IMPORTANCIA_PROTEGIDA
+        )
+    
+    @staticmethod
+    def resumir_ciclo(
+        ciclo_id: str,
+        cabeceras: List[Dict[str, Any]]
+    ) -> Tuple[str, List[str], List[str]]:
+        """
+        Resume las cabeceras de las interacciones compactadas de un ciclo.
+        
+        Args:
+            ciclo_id: Ciclo compactado
+            cabeceras: Cabeceras de sus interacciones compactadas
+        
+        Returns:
+            Tupla (resumen, logros, custodios implicados)
+        """
+        custodios = Counter(c["custodio_invocado"] for c in cabeceras if c.get("custodio_invocado"))
+        proyectos = Counter(c["proyecto_asociado"] for c in cabeceras if c.get("proyecto_asociado"))
+        fases = Counter(c["fase_ciclo"] for c in cabeceras if c.get("fase_ciclo"))
+        estados = Counter(c["estado_decision"] for c in cabeceras if c.get("estado_decision"))
+        palabras = Counter(
+            palabra for c in cabeceras for palabra in _palabras(c.get("palabras_clave"))
+        )
+        instantes = [c["timestamp_utc"] for c in cabeceras if c.get("timestamp_utc") is not None]
+        
+        def fecha(timestamp: int) -> str:
+            return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+        
+        lineas = [
+            f"Acta de compactación del ciclo {ciclo_id}: {len(cabeceras)} interacciones archivadas"
+            + (f" entre {fecha(min(instantes))} y {fecha(max(instantes))} UTC." if instantes else "."),
+            f"Custodios: {_contados(custodios)}.",
+            f"Proyectos: {_contados(proyectos)}.",
+            f"Fases: {_contados(fases)}.",
+            f"Estados de decisión: {_contados(estados)}.",
+            f"Palabras clave frecuentes: {_contados(palabras, 10)}."
+        ]
+        
+        intenciones = []
+        vistas = set()
+        for cabecera in cabeceras:
+            intencion = cabecera.get("intencion_fundador")
+            if intencion and intencion not in vistas:
+                vistas.add(intencion)
+                intenciones.append(
+                    f"- [{cabecera.get('custodio_invocado')}] {intencion} "
+                    f"(Proyecto: {cabecera.get('proyecto_asociado') or 'N/A'})"
+                )
+        if intenciones:
+            lineas.append("Intenciones del Fundador:")
+            lineas.extend(intenciones[:MAX_INTENCIONES_ACTA])
+        
+        logros = [
+            f"[{c.get('custodio_invocado')}] {c.get('intencion_fundador')}"
+            for c in cabeceras
+            if c.get("estado_decision") == "Ejecutada" and c.get("intencion_fundador")
+        ][:MAX_INTENCIONES_ACTA]
+        
+        return "\n".join(lineas), logros, sorted(custodios)
+    
+    def _disco_vivo(self) -> int:
+        """Bytes de la memoria viva en disco (sin los archivos fríos)"""
+        return _tamano_directorio(self.wabun.persist_directory, self.directorio_archivo)
+    
+    @medido("retencion.compactar")
+    def compactar(self, simular: bool = False) -> Dict[str, Any]:
+        """
+        Aplica la política: archiva, resume en actas y elimina de la memoria viva.
+        
+        Por cada ciclo compactable, primero se escribe el archivo frío,
+        después el acta y por último se borran los chunks y cabeceras, de
+        modo que una interrupción nunca pierde interacciones.
+        
+        Args:
+            simular: Si solo informar de lo que se compactaría
+        
+        Returns:
+            Informe con las interacciones (y, si no se simula, los chunks,
+            el acta y el archivo) compactados por ciclo, los
+            bytes de texto y de vectores retirados del índice, el tamaño de
+            los archivos fríos y el disco de la memoria viva antes y después
+            (SQLite no devuelve al sistema el espacio de las filas borradas,
+            así que el disco de ChromaDB se reutiliza pero no encoge)
+        """
+        plan = self.planificar()
+        informe: Dict[str, Any] = {
+            "simulacion": simular,
+            "politica": self.politica(),
+            "ciclos": {},
+            "interacciones": 0,
+            "chunks": 0,
+            "bytes_texto": 0,
+            "bytes_vectores": 0,
+            "bytes_archivo": 0,
+            "disco_antes_bytes": self._disco_vivo(),
+            "particiones_compactadas": {}
+        }
+        
+        for ciclo_id, cabeceras in plan.items():
+            interaction_ids = [cabecera["interaction_id"] for cabecera in cabeceras]
+            informe["interacciones"] += len(interaction_ids)
+            if simular:
+                informe["ciclos"][ciclo_id] = {"interacciones": len(interaction_ids)}
+                continue
+            
+            marca = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            ruta = self.directorio_archivo / (
+                f"interactions_{_PATRON_NOMBRE_ARCHIVO.sub('_', ciclo_id)}_{marca}.jsonl.gz"
+            )
+            archivado = self.wabun.archivar_interacciones(
+                interaction_ids,
+                str(ruta),
+                filtros={"ciclo_id": ciclo_id},
+                cabecera={"retencion": {"ciclo_id": ciclo_id, "politica": self.politica()}}
+            )
+            
+            resumen, logros, custodios = self.resumir_ciclo(ciclo_id, cabeceras)
+            acta_id = self.wabun.registrar_acta(
+                ciclo_id,
+                resumen,
+                logros=logros,
+                custodios_implicados=custodios,
+                acta_id=f"acta_{ciclo_id}_compactacion_{marca}",
+                metadatos={
+                    "tipo_acta": "compactacion",
+                    "interacciones_compactadas": len(interaction_ids),
+                    "chunks_archivados": len(archivado["chunk_ids"]),
+                    "archivo": str(ruta),
+                    "politica": json.dumps(self.politica())
+                }
+            )
+            
+            borrados = self.wabun.olvidar_interacciones(interaction_ids, archivado["chunk_ids"])
+            informe["ciclos"][ciclo_id] = {
+                "interacciones": len(interaction_ids),
+                "chunks": borrados,
+                "acta_id": acta_id,
+                "archivo": str(ruta)
+            }
+            informe["chunks"] += borrados
+            for clave in ("bytes_texto", "bytes_vectores", "bytes_archivo"):
+                informe[clave] += archivado[clave]
+        
+        if not simular and plan:
+            # Las particiones cerradas que han perdido chunks se reescriben
+            informe["particiones_compactadas"] = self.wabun.compactar_particiones()
+        informe["disco_despues_bytes"] = self._disco_vivo()
+        
+        print(f"✓ Retención {'simulada' if simular else 'aplicada'}: {len(plan)} ciclos")
+        print(f"  - Interacciones: {informe['interacciones']} ({informe['chunks']} chunks)")
+        print(f"  - Vectores retirados del índice: {informe['bytes_vectores'] / 1024:.1f} KB")
+        print(f"  - Archivos fríos: {informe['bytes_archivo'] / 1024:.1f} KB")
+        
+        return informe
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+WABUN Servidor - Servidor Local que Comparte un WabunCore entre Procesos
+Un solo proceso abre ChromaDB y el modelo de embeddings y atiende a los orquestadores
+
+Autor: Manus AI (bajo la guía de WABUN y ARESK)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+
+Uso:
+    python -m wabun_servidor --socket /run/wabun.sock --persist-directory ./wabun_db
+    python -m wabun_servidor --puerto 8765 --persist-directory ./wabun_db
+
+Cada petición debe llevar el token que el servidor guarda en
+`<persist_directory>/wabun_servidor.token` (ver `ClienteWabun`).
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple
+import argparse
+import hmac
+import json
+import os
+import secrets
+import socketserver
+import stat
+import threading
+
+from wabun_cliente import RUTA_LLAMADAS, RUTA_SALUD, OBJETIVOS, ARCHIVO_TOKEN, codificar
+from wabun_core import WabunCore
+from wabun_queries import WabunQueries
+
+
+# Métodos que modifican la memoria (o la copian entera, como los snapshots):
+# se ejecutan de uno en uno
+METODOS_ESCRITURA = frozenset({
+    "registrar_interaccion",
+    "registrar_interacciones_lote",
+    "registrar_decreto",
+    "registrar_decretos_lote",
+    "actualizar_decreto",
+    "registrar_acta",
+    "olvidar_interacciones",
+    "importar_memoria",
+    "normalizar_cabeceras",
+    "reconstruir_agregados",
+    "reconstruir_indice_lexico",
+    "cerrar_particiones",
+    "compactar_particiones",
+    "crear_snapshot",
+    "refrescar_snapshot"
+})
+
+# Métodos que no se pueden servir: los que devuelven generadores y los del
+# ciclo de vida del proceso, que gestiona el propio servidor (cerrar el
+# núcleo o el pool de consultas desde un cliente lo dejaría inservible)
+METODOS_NO_REMOTOS = frozenset({"escanear", "cerrar", "warmup"})
+
+# Métodos que leen o escriben rutas del sistema de archivos del servidor:
+# solo se sirven si el operador lo permite (`--permitir-rutas`)
+METODOS_CON_RUTAS = frozenset({
+    "exportar_memoria",
+    "exportar_memoria_completa",
+    "importar_memoria",
+    "archivar_interacciones",
+    "exportar_metricas",
+    "crear_snapshot"
+})
+
+# Valores de la cabecera Host aceptados (además de la interfaz de escucha),
+# para que una página web no alcance el servidor por DNS rebinding
+HOSTS_LOCALES = frozenset({"localhost", "127.0.0.1", "::1"})
+
+PUERTO_POR_DEFECTO = 8765
+
+
+def _host_sin_puerto(host: str) -> str:
+    """Nombre de una cabecera Host, sin puerto ni corchetes de IPv6"""
+    host = host.strip().lower()
+    if host.startswith("["):
+        return host[1:].split("]", 1)[0]
+    return host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+
+
+def _guardar_token(ruta: Path, token: Optional[str] = None) -> str:
+    """
+    Token compartido del servidor, guardado en `ruta` con permisos 0600.
+    
+    Se reutiliza el token ya guardado (los clientes en marcha siguen
+    valiendo tras reiniciar el servidor) salvo que otros usuarios puedan
+    leer el archivo; en ese caso se genera uno nuevo.
+    """
+    if token is None and ruta.exists() and not stat.S_IMODE(ruta.stat().st_mode) & 0o077:
+        token = ruta.read_text(encoding="utf-8").strip() or None
+    token = token or secrets.token_urlsafe(32)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    os.chmod(ruta, 0o600)
+    return token
+
+
+def _serializable(resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultado de una llamada, o su error si no se puede enviar como JSON"""
+    try:
+        codificar(resultado)
+        return resultado
+    except TypeError as error:
+        return {"error": {"tipo": "TypeError", "mensaje": str(error)}}
+
+
+class _ManejadorWabun(BaseHTTPRequestHandler):
+    """Peticiones HTTP/1.1 con keep-alive: GET /salud y POST /llamadas"""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def _responder(self, estado: int, carga: Any):
+        try:
+            cuerpo = codificar(carga)
+        except TypeError:
+            # Algún resultado no es serializable: el error se devuelve en
+            # su llamada y el resto del lote llega intacto
+            carga = {"resultados": [_serializable(r) for r in carga["resultados"]]}
+            cuerpo = codificar(carga)
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(cuerpo)
+    
+    def _rechazo(self, cuerpo_json: bool) -> Optional[Tuple[int, str]]:
+        """Estado y motivo por el que no se atiende la petición (None si se atiende)"""
+        servidor = self.server.wabun_servidor
+        if _host_sin_puerto(self.headers.get("Host", "")) not in servidor.hosts_permitidos:
+            return 403, "Cabecera Host no permitida"
+        autorizacion = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(autorizacion.encode("utf-8"), f"Bearer {servidor.token}".encode("utf-8")):
+            return 401, "Token ausente o incorrecto"
+        if cuerpo_json:
+            tipo = self.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+            if tipo != "application/json":
+                return 415, "Se requiere Content-Type: application/json"
+        return None
+    
+    def do_GET(self):
+        if self.path != RUTA_SALUD:
+            self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+            return
+        rechazo = self._rechazo(cuerpo_json=False)
+        if rechazo:
+            self._responder(rechazo[0], {"error": rechazo[1]})
+            return
+        self._responder(200, self.server.wabun_servidor.salud())
+    
+    def do_POST(self):
+        if self.path != RUTA_LLAMADAS:
+            self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+            return
+        rechazo = self._rechazo(cuerpo_json=True)
+        if rechazo:
+            # El cuerpo no se lee: la conexión no puede reutilizarse
+            self.close_connection = True
+            self._responder(rechazo[0], {"error": rechazo[1]})
+            return
+        try:
+            longitud = int(self.headers.get("Content-Length", 0))
+            llamadas = json.loads(self.rfile.read(longitud))["llamadas"]
+        except (ValueError, KeyError, TypeError) as error:
+            self._responder(400, {"error": f"Petición mal formada: {error}"})
+            return
+        self._responder(200, {"resultados": self.server.wabun_servidor.ejecutar_lote(llamadas)})
+    
+    def address_string(self) -> str:
+        return self.client_address[0] if self.client_address else "unix"
+    
+    def log_message(self, formato: str, *args):
+        # Cada llamada se cuenta en `salud()`; no se registra por petición
+        pass
+
+
+class _ManejadorWabunTCP(_ManejadorWabun):
+    """Sin Nagle: las respuestas pequeñas no esperan al ACK retardado del cliente"""
+    
+    disable_nagle_algorithm = True
+
+
+class _ServidorHTTPUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor HTTP con un hilo por conexión sobre un socket Unix"""
+    
+    daemon_threads = True
+    
+    def get_request(self):
+        conexion, _ = super().get_request()
+        return conexion, ("unix", 0)
+
+
+class ServidorWabun:
+    """
+    Servidor local de WABUN.
+    
+    Aloja un único WabunCore (y su modelo de embeddings) y sirve los
+    métodos públicos de WabunCore y WabunQueries a muchos procesos con
+    `ClienteWabun`, sobre un socket Unix o HTTP en localhost. Las lecturas
+    se atienden en paralelo; las escrituras (METODOS_ESCRITURA) se
+    serializan, de modo que varios orquestadores comparten un mismo
+    `persist_directory` sin abrirlo cada uno por su cuenta.
+    
+    Solo se atienden peticiones con el token compartido, una cabecera
+    Host local y, en las llamadas, Content-Type: application/json. Los
+    métodos que toman rutas (METODOS_CON_RUTAS) requieren `permitir_rutas`.
+        
+        with ServidorWabun(socket_unix="/run/wabun.sock", persist_directory="./wabun_db") as servidor:
+            servidor.servir()
+    """
+    
+    def __init__(
+        self,
+        wabun_core: Optional[WabunCore] = None,
+        socket_unix: Optional[str] = None,
+        host: str = "127.0.0.1",
+        puerto: int = PUERTO_POR_DEFECTO,
+        precargar: bool = True,
+        token: Optional[str] = None,
+        permitir_rutas: bool = False,
+        **kwargs_core
+    ):
+        """
+        Crea el núcleo (si no se da) y abre el socket de escucha.
+        
+        Args:
+            wabun_core: Instancia de WabunCore (si no se da, se crea con kwargs_core)
+            socket_unix: Ruta del socket Unix (si se da, no se escucha por TCP)
+            host: Interfaz TCP de escucha (por defecto solo localhost)
+            puerto: Puerto TCP de escucha (0 para uno libre)
+            precargar: Si cargar colecciones y modelo antes de la primera petición
+            token: Token compartido (por defecto el guardado en
+                `<persist_directory>/wabun_servidor.token`, o uno nuevo)
+            permitir_rutas: Si servir los métodos que leen o escriben rutas
+                del servidor (METODOS_CON_RUTAS)
+            **kwargs_core: Argumentos para crear WabunCore
+        """
+        # Un núcleo recibido lo cierra quien lo creó
+        self._core_propio = wabun_core is None
+        self.wabun = wabun_core or WabunCore(**kwargs_core)
+        self.queries = WabunQueries(self.wabun)
+        self._objetivos = {"core": self.wabun, "queries": self.queries}
+        self.archivo_token = Path(self.wabun.persist_directory) / ARCHIVO_TOKEN
+        self.token = _guardar_token(self.archivo_token, token)
+        self.permitir_rutas = permitir_rutas
+        self.hosts_permitidos = HOSTS_LOCALES | {_host_sin_puerto(host)}
+        self._lock_escritura = threading.Lock()
+        self._lock_contadores = threading.Lock()
+        self.peticiones = 0
+        self.llamadas = 0
+        self.errores = 0
+        
+        if precargar:
+            self.wabun.warmup()
+        
+        self.socket_unix = socket_unix
+        if socket_unix:
+            ruta = Path(socket_unix)
+            if ruta.exists():
+                # Socket huérfano de una ejecución anterior
+                ruta.unlink()
+            self._http = _ServidorHTTPUnix(str(ruta), _ManejadorWabun)
+            os.chmod(ruta, 0o600)
+            self.direccion = f"unix:{ruta}"
+        else:
+            self._http = ThreadingHTTPServer((host, puerto), _ManejadorWabunTCP)
+            self._http.daemon_threads = True
+            self.direccion = f"http://{host}:{self._http.server_address[1]}"
+        self._http.wabun_servidor = self
+        self._hilo: Optional[threading.Thread] = None
+    
+    def ejecutar(self, llamada: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta una llamada del protocolo.
+        
+        Args:
+            llamada: {"objetivo": "core"|"queries", "metodo", "args", "kwargs"}
+        
+        Returns:
+            {"resultado": valor} o {"error": {"tipo", "mensaje"}}
+        """
+        objetivo = llamada.get("objetivo", "core")
+        metodo = llamada.get("metodo") or ""
+        try:
+            if objetivo not in OBJETIVOS:
+                raise ValueError(f"Objetivo desconocido: {objetivo}. Usa uno de {OBJETIVOS}")
+            funcion = getattr(self._objetivos[objetivo], metodo, None)
+            if metodo.startswith("_") or metodo in METODOS_NO_REMOTOS or not callable(funcion):
+                raise AttributeError(f"Método no disponible en remoto: {objetivo}.{metodo}")
+            if objetivo == "core" and metodo in METODOS_CON_RUTAS and not self.permitir_rutas:
+                raise PermissionError(
+                    f"{metodo} toma rutas del servidor: arráncalo con --permitir-rutas para servirlo"
+                )
+            args = llamada.get("args") or []
+            kwargs = llamada.get("kwargs") or {}
+            if objetivo == "core" and metodo in METODOS_ESCRITURA:
+                with self._lock_escritura:
+                    resultado = funcion(*args, **kwargs)
+            else:
+                resultado = funcion(*args, **kwargs)
+            return {"resultado": resultado}
+        except Exception as error:
+            with self._lock_contadores:
+                self.errores += 1
+            return {"error": {"tipo": type(error).__name__, "mensaje": str(error)}}
+    
+    def ejecutar_lote(self, llamadas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ejecuta en orden las llamadas de una petición"""
+        with self._lock_contadores:
+            self.peticiones += 1
+            self.llamadas += len(llamadas)
+        return [self.ejecutar(llamada) for llamada in llamadas]
+    
+    def salud(self) -> Dict[str, Any]:
+        """Estado del servidor"""
+        return {
+            "estado": "ok",
+            "pid": os.getpid(),
+            "direccion": self.direccion,
+            "persist_directory": str(self.wabun.persist_directory),
+            "peticiones": self.peticiones,
+            "llamadas": self.llamadas,
+            "errores": self.errores
+        }
+    
+    def servir(self):
+        """Atiende peticiones hasta `detener()` (bloquea)"""
+        print(f"✓ Servidor WABUN escuchando en {self.direccion}")
+        print(f"  - Memoria: {self.wabun.persist_directory}")
+        print(f"  - Token: {self.archivo_token}")
+        self._http.serve_forever()
+    
+    def iniciar(self) -> "ServidorWabun":
+        """Atiende peticiones en un hilo en segundo plano"""
+        self._hilo = threading.Thread(target=self.servir, name="wabun-servidor", daemon=True)
+        self._hilo.start()
+        return self
+    
+    def detener(self):
+        """
+        Deja de atender peticiones y libera el socket y el pool de consultas.
+        
+        El núcleo se cierra (ver `WabunCore.cerrar`) si lo creó el servidor.
+        """
+        if self._hilo is not None:
+            self._http.shutdown()
+            self._hilo.join()
+            self._hilo = None
+        self._http.server_close()
+        self.queries.cerrar()
+        if self._core_propio:
+            self.wabun.cerrar()
+        if self.socket_unix and Path(self.socket_unix).exists():
+            Path(self.socket_unix).unlink()
+    
+    def __enter__(self) -> "ServidorWabun":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m wabun_servidor",
+        description="Servidor local que comparte un WabunCore entre procesos"
+    )
+    parser.add_argument("--persist-directory", default="./wabun_db", help="Directorio de la memoria")
+    parser.add_argument("--socket", help="Ruta del socket Unix (por defecto HTTP en localhost)")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz TCP de escucha")
+    parser.add_argument("--puerto", type=int, default=PUERTO_POR_DEFECTO, help="Puerto TCP de escucha")
+    parser.add_argument(
+        "--particiones", choices=("mes", "ciclo"),
+        help="Particionar las interacciones por mes o por ciclo (por defecto sin particiones)"
+    )
+    parser.add_argument(
+        "--solo-lectura", action="store_true",
+        help="Servir el último snapshot de la memoria en lugar de la memoria viva"
+    )
+    parser.add_argument(
+        "--deduplicar", action="store_true",
+        help="Guardar como referencias los chunks de respuesta repetidos o casi idénticos"
+    )
+    parser.add_argument("--instrumentacion", action="store_true", help="Medir las operaciones del núcleo")
+    parser.add_argument(
+        "--permitir-rutas", action="store_true",
+        help="Servir los métodos que leen o escriben rutas del servidor (exportar, importar, snapshots...)"
+    )
+    args = parser.parse_args()
+    
+    servidor = ServidorWabun(
+        socket_unix=args.socket,
+        host=args.host,
+        puerto=args.puerto,
+        permitir_rutas=args.permitir_rutas,
+        persist_directory=args.persist_directory,
+        particiones=args.particiones,
+        instrumentacion=args.instrumentacion,
+        solo_lectura=args.solo_lectura,
+        deduplicar=args.deduplicar
+    )
+    try:
+        servidor.servir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+WABUN Snapshots - Réplicas Inmutables de la Memoria para Workers de Consulta
+Copias compactas en memoria mapeada que se abren en solo lectura sin competir con la ingesta
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+import json
+import os
+import shutil
+
+from wabun_indices import copiar_sqlite
+from wabun_particiones import SUFIJO_COMPACTACION
+
+
+# Estructura: <persist_directory>/snapshots/<nombre>/ y el puntero ACTUAL,
+# que contiene el nombre del snapshot vigente
+DIRECTORIO_SNAPSHOTS = "snapshots"
+PUNTERO_ACTUAL = "ACTUAL"
+MANIFIESTO = "snapshot.json"
+FORMATO_SNAPSHOT = "wabun-snapshot-1"
+PREFIJO_SNAPSHOT = "snapshot_"
+
+# Snapshots que se conservan (el vigente y los anteriores que aún puedan
+# estar abiertos por algún worker)
+SNAPSHOTS_CONSERVADOS = 2
+
+# Almacenes SQLite de la memoria que viajan con cada snapshot
+ARCHIVOS_SQLITE = ("wabun_indices.sqlite3", "wabun_lexico.sqlite3")
+
+# Chunks por página al copiar cada colección (con sus embeddings)
+TAMANO_PAGINA_SNAPSHOT = 1000
+
+
+def _sincronizar(ruta: Path):
+    """Fuerza a disco un archivo o la entrada de un directorio"""
+    descriptor = os.open(str(ruta), os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _tamano(ruta: Path) -> int:
+    return sum(archivo.stat().st_size for archivo in ruta.rglob("*") if archivo.is_file())
+
+
+def leer_manifiesto(ruta_snapshot: str) -> Dict[str, Any]:
+    """Manifiesto (`snapshot.json`) de un snapshot"""
+    with open(Path(ruta_snapshot) / MANIFIESTO, encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    if manifiesto.get("formato") != FORMATO_SNAPSHOT:
+        raise ValueError(f"Formato de snapshot no soportado: {manifiesto.get('formato')}")
+    return manifiesto
+
+
+def resolver_snapshot(ruta: str) -> Path:
+    """
+    Directorio del snapshot que hay que abrir.
+    
+    Args:
+        ruta: Un snapshot concreto, un directorio de snapshots (se sigue su
+            puntero ACTUAL) o una memoria viva (se sigue `snapshots/ACTUAL`)
+    
+    Raises:
+        FileNotFoundError: Si no hay ningún snapshot publicado
+    """
+    ruta = Path(ruta)
+    if (ruta / MANIFIESTO).exists():
+        return ruta
+    for base in (ruta, ruta / DIRECTORIO_SNAPSHOTS):
+        puntero = base / PUNTERO_ACTUAL
+        if puntero.exists():
+            return base / puntero.read_text(encoding="utf-8").strip()
+    raise FileNotFoundError(f"No hay ningún snapshot en {ruta} (créalo con `crear_snapshot()`)")
+
+
+def listar_snapshots(directorio: str) -> List[Path]:
+    """Snapshots publicados en un directorio, del más antiguo al más reciente"""
+    directorio = Path(directorio)
+    if not directorio.exists():
+        return []
+    return sorted(
+        ruta for ruta in directorio.iterdir()
+        if ruta.name.startswith(PREFIJO_SNAPSHOT) and (ruta / MANIFIESTO).exists()
+    )
+
+
+def crear_snapshot(
+    wabun_core,
+    directorio: Optional[str] = None,
+    conservar: int = SNAPSHOTS_CONSERVADOS,
+    cuantizacion: str = "int8",
+    reescalar: bool = True,
+    listas_ivf: int = 0,
+    tamano_pagina: int = TAMANO_PAGINA_SNAPSHOT
+) -> Dict[str, Any]:
+    """
+    Escribe un snapshot inmutable de la memoria y lo publica.
+    
+    Cada colección (particiones incluidas) se copia, con los embeddings
+    ya calculados, a un almacén del backend NumPy sin huecos; las
+    cabeceras, el catálogo de particiones y el índice léxico se copian con
+    la API de backup de SQLite. El snapshot se escribe en un directorio
+    temporal, se fuerza a disco, se renombra y solo entonces se reescribe
+    el puntero ACTUAL (con `os.replace`), así que un lector ve el snapshot
+    anterior o el nuevo completo, nunca uno a medias.
+    
+    Para que el snapshot sea consistente no debe haber escrituras en
+    curso: créalo desde el proceso de ingesta (o a través del servidor,
+    que lo serializa con las escrituras).
+    
+    Args:
+        wabun_core: Instancia de WabunCore sobre la memoria viva
+        directorio: Directorio de snapshots (por defecto `snapshots/` en el
+            directorio de persistencia)
+        conservar: Snapshots publicados que se conservan (mínimo 1)
+        cuantizacion: "int8" o "float16" (ver `ClienteNumpy`)
+        reescalar: Si incluir los vectores en float32 para reordenar
+        listas_ivf: Listas IVF que se entrenan en cada colección (0 para no)
+        tamano_pagina: Chunks por página al copiar
+    
+    Returns:
+        Manifiesto del snapshot, con su ruta
+    """
+    from wabun_vectores import ClienteNumpy
+    
+    if wabun_core.solo_lectura:
+        raise ValueError("No se puede crear un snapshot desde otro snapshot; usa la memoria viva")
+    base = Path(directorio or wabun_core.persist_directory / DIRECTORIO_SNAPSHOTS)
+    base.mkdir(parents=True, exist_ok=True)
+    # Snapshots a medio escribir de una ejecución interrumpida
+    for huerfano in base.glob(f".{PREFIJO_SNAPSHOT}*.tmp"):
+        shutil.rmtree(huerfano, ignore_errors=True)
+    
+    creado = datetime.now(timezone.utc)
+    nombre = f"{PREFIJO_SNAPSHOT}{creado.strftime('%Y%m%dT%H%M%S%fZ')}"
+    temporal = base / f".{nombre}.tmp"
+    
+    # Las cuatro colecciones existen aunque el núcleo sea lazy
+    wabun_core._init_collections()
+    
+    opciones_backend = {"cuantizacion": cuantizacion, "reescalar": reescalar, "listas_ivf": max(0, listas_ivf)}
+    cliente = ClienteNumpy(str(temporal / "vectores"), **opciones_backend)
+    nombres = sorted(getattr(c, "name", c) for c in wabun_core.client.list_collections())
+    conteos: Dict[str, int] = {}
+    try:
+        for nombre_origen in nombres:
+            nombre_destino = nombre_origen
+            if nombre_origen.endswith(SUFIJO_COMPACTACION):
+                nombre_destino = nombre_origen[:-len(SUFIJO_COMPACTACION)]
+                if nombre_destino in nombres:
+                    # Copia de una compactación en curso: la original es la vigente
+                    continue
+            origen = wabun_core.client.get_collection(nombre_origen)
+            metadata = dict(origen.metadata or {})
+            espacio = wabun_core._espacio_coleccion(origen)
+            if espacio != "l2":
+                metadata["hnsw:space"] = espacio
+            destino = cliente.create_collection(nombre_destino, metadata=metadata or None)
+            
+            offset = 0
+            with wabun_core.metricas.medir("snapshot", nombre_destino):
+                while True:
+                    pagina = origen.get(
+                        include=["documents", "metadatas", "embeddings"],
+                        limit=tamano_pagina,
+                        offset=offset
+                    )
+                    leidos = len(pagina["ids"])
+                    if leidos == 0:
+                        break
+                    destino.add(
+                        ids=pagina["ids"],
+                        embeddings=pagina["embeddings"],
+                        metadatas=pagina["metadatas"],
+                        documents=pagina["documents"]
+                    )
+                    offset += leidos
+                    if leidos < tamano_pagina:
+                        break
+                if listas_ivf:
+                    destino.construir_ivf()
+            conteos[nombre_destino] = destino.count()
+        cliente.cerrar()
+        
+        for archivo in ARCHIVOS_SQLITE:
+            if (wabun_core.persist_directory / archivo).exists():
+                copiar_sqlite(str(wabun_core.persist_directory / archivo), str(temporal / archivo))
+        
+        manifiesto = {
+            "formato": FORMATO_SNAPSHOT,
+            "nombre": nombre,
+            "creado": creado.isoformat(),
+            "origen": str(wabun_core.persist_directory.resolve()),
+            "backend": opciones_backend,
+            "particiones": wabun_core.particiones,
+            "colecciones": conteos
+        }
+        with open(temporal / MANIFIESTO, "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        
+        for archivo in temporal.rglob("*"):
+            _sincronizar(archivo)
+        _sincronizar(temporal)
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+    
+    # Publicación: el directorio completo y después el puntero, ambos atómicos
+    destino_final = base / nombre
+    temporal.rename(destino_final)
+    puntero_temporal = base / f".{PUNTERO_ACTUAL}.tmp"
+    with open(puntero_temporal, "w", encoding="utf-8") as f:
+        f.write(nombre)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(puntero_temporal, base / PUNTERO_ACTUAL)
+    _sincronizar(base)
+    
+    # Los workers que aún tengan abierto un snapshot borrado siguen
+    # leyéndolo: sus archivos mapeados no desaparecen hasta que los cierran
+    eliminados = []
+    for antiguo in listar_snapshots(base)[:-max(1, conservar)]:
+        shutil.rmtree(antiguo, ignore_errors=True)
+        eliminados.append(antiguo.name)
+    
+    manifiesto["ruta"] = str(destino_final)
+    manifiesto["bytes"] = _tamano(destino_final)
+    manifiesto["eliminados"] = eliminados
+    
+    print(f"✓ Snapshot publicado: {destino_final}")
+    for nombre_coleccion, total in conteos.items():
+        print(f"  - {nombre_coleccion}: {total}")
+    print(f"  - Tamaño: {manifiesto['bytes'] / 1e6:.1f} MB ({cuantizacion})")
+    
+    return manifiesto
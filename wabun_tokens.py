@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+WABUN Tokens - Conteo y Recorte de Textos por Tokens
+Mide los textos en tokens en lugar de caracteres para respetar presupuestos
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from pathlib import Path
+from typing import List, Optional, Any, Iterator, Tuple
+import math
+import re
+import threading
+
+
+# Palabras y signos sueltos, para la aproximación sin tokenizador
+_PATRON_PIEZAS = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Caracteres medios por token de un tokenizador BPE en textos en español
+_CARACTERES_POR_TOKEN = 4
+
+
+class ContadorTokens:
+    """
+    Cuenta tokens con el tokenizador que se le indique.
+    
+    Por orden: un tokenizador explícito o el `tokenizer.json` de un modelo
+    (de la librería `tokenizers`; ver `del_modelo`), una codificación de
+    `tiktoken` pedida expresamente y, si no hay ninguno, una aproximación
+    por palabras que no requiere dependencias. Nunca descarga nada.
+    """
+    
+    def __init__(
+        self,
+        tokenizer: Optional[Any] = None,
+        codificacion: Optional[str] = None,
+        ruta_tokenizer: Optional[str] = None
+    ):
+        """
+        Inicializa el contador.
+        
+        Args:
+            tokenizer: Objeto con `encode(texto)` (opcional)
+            codificacion: Codificación de tiktoken (p. ej. "cl100k_base"), si
+                los textos se miden para un modelo de OpenAI; tiktoken puede
+                descargarla la primera vez
+            ruta_tokenizer: `tokenizer.json` que se carga en el primer uso,
+                si existe para entonces
+        """
+        self._tokenizer = tokenizer
+        self._ruta_tokenizer = ruta_tokenizer if tokenizer is None else None
+        self._lock_carga = threading.Lock()
+        self._tiktoken = None
+        if tokenizer is None and codificacion:
+            try:
+                import tiktoken
+                self._tiktoken = tiktoken.get_encoding(codificacion)
+            except Exception:
+                # Sin tiktoken (o sin su codificación): aproximación
+                self._tiktoken = None
+    
+    @classmethod
+    def del_modelo(cls, embedding_function: Optional[Any] = None) -> "ContadorTokens":
+        """
+        Contador con el tokenizador del modelo de embeddings.
+        
+        Para el modelo por defecto de ChromaDB (all-MiniLM-L6-v2, con
+        `embedding_function` None) y los modelos ONNX de ChromaDB se usa el
+        `tokenizer.json` de su descarga, que se carga en el primer uso sin
+        cargar el modelo; si aún no se ha descargado, se aproxima. Otras
+        funciones de embeddings aportan su tokenizador con un atributo
+        `tokenizer` que tenga `encode(texto)`.
+        
+        Args:
+            embedding_function: Función de embeddings (None para la de ChromaDB)
+        
+        Returns:
+            ContadorTokens
+        """
+        modelo = embedding_function
+        if modelo is None or type(modelo).__name__ == "DefaultEmbeddingFunction":
+            try:
+                from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2 as modelo
+            except ImportError:
+                return cls()
+        descarga = getattr(modelo, "DOWNLOAD_PATH", None)
+        carpeta = getattr(modelo, "EXTRACTED_FOLDER_NAME", None)
+        if descarga and carpeta:
+            return cls(ruta_tokenizer=str(Path(descarga).expanduser() / carpeta / "tokenizer.json"))
+        tokenizer = getattr(modelo, "tokenizer", None)
+        return cls(tokenizer if hasattr(tokenizer, "encode") else None)
+    
+    def _cargar(self):
+        """Carga el `tokenizer.json` pendiente (una sola vez)"""
+        if self._ruta_tokenizer is None:
+            return
+        with self._lock_carga:
+            if self._ruta_tokenizer is None:
+                return
+            ruta = Path(self._ruta_tokenizer)
+            if ruta.exists():
+                try:
+                    from tokenizers import Tokenizer
+                    self._tokenizer = Tokenizer.from_file(str(ruta))
+                    # tokenizer.json puede traer el truncado y el relleno
+                    # de la longitud de entrada del modelo: se cuenta el
+                    # texto completo, sin tokens de relleno
+                    self._tokenizer.no_truncation()
+                    self._tokenizer.no_padding()
+                except Exception:
+                    # Sin la librería tokenizers (o archivo ilegible): aproximación
+                    self._tokenizer = None
+            self._ruta_tokenizer = None
+    
+    @property
+    def metodo(self) -> str:
+        """Nombre del método de conteo en uso"""
+        self._cargar()
+        if self._tokenizer is not None:
+            return "tokenizer"
+        if self._tiktoken is not None:
+            return "tiktoken"
+        return "aproximado"
+    
+    def _ids_tokenizer(self, texto: str) -> List[int]:
+        codificado = self._tokenizer.encode(texto, add_special_tokens=False)
+        return list(getattr(codificado, "ids", codificado))
+    
+    @staticmethod
+    def _tokens_pieza(pieza: str) -> int:
+        return max(1, math.ceil(len(pieza) / _CARACTERES_POR_TOKEN))
+    
+    def contar(self, texto: str) -> int:
+        """
+        Cuenta los tokens de un texto.
+        
+        Args:
+            texto: Texto a medir
+        
+        Returns:
+            Número de tokens
+        """
+        if not texto:
+            return 0
+        self._cargar()
+        if self._tokenizer is not None:
+            return len(self._ids_tokenizer(texto))
+        if self._tiktoken is not None:
+            return len(self._tiktoken.encode(texto, disallowed_special=()))
+        return sum(self._tokens_pieza(m.group()) for m in _PATRON_PIEZAS.finditer(texto))
+    
+    def _piezas(self, texto: str) -> Iterator[Tuple[int, int]]:
+        """Recorre el texto una sola vez: (fin de la pieza, tokens que cuesta)"""
+        self._cargar()
+        if self._tokenizer is not None:
+            codificado = self._tokenizer.encode(texto, add_special_tokens=False)
+            for _, fin in getattr(codificado, "offsets", None) or []:
+                yield fin, 1
+            return
+        
+        if self._tiktoken is not None:
+            tokens = self._tiktoken.encode(texto, disallowed_special=())
+            _, inicios = self._tiktoken.decode_with_offsets(tokens)
+            for fin in inicios[1:]:
+                yield fin, 1
+            if inicios:
+                yield len(texto), 1
+            return
+        
+        for m in _PATRON_PIEZAS.finditer(texto):
+            pieza = m.group()
+            coste = self._tokens_pieza(pieza)
+            if coste == 1:
+                yield m.end(), 1
+                continue
+            # Palabras largas (hashes, base64...): una pieza por token aproximado
+            for inicio in range(m.start(), m.end(), _CARACTERES_POR_TOKEN):
+                yield min(inicio + _CARACTERES_POR_TOKEN, m.end()), 1
+    
+    def fines(self, texto: str) -> List[int]:
+        """
+        Posición final de cada token de un texto, con una sola tokenización.
+        
+        `len(fines(texto))` es `contar(texto)`; los tokens de un tramo
+        texto[a:b] se cuentan sin volver a tokenizar con `bisect` sobre
+        la lista.
+        
+        Args:
+            texto: Texto a medir
+        
+        Returns:
+            Lista creciente de posiciones en `texto`
+        """
+        return [fin for fin, _ in self._piezas(texto)] if texto else []
+    
+    def tramos(self, texto: str, max_tokens: int) -> Iterator[Tuple[int, int]]:
+        """
+        Parte un texto en tramos consecutivos de como mucho `max_tokens`.
+        
+        El texto se tokeniza una sola vez, así que el coste es lineal en su
+        longitud. Los cortes caen en fronteras de token.
+        
+        Args:
+            texto: Texto a partir
+            max_tokens: Máximo de tokens por tramo
+        
+        Yields:
+            Tuplas (inicio, fin) de posiciones en `texto`
+        """
+        max_tokens = max(1, max_tokens)
+        inicio = 0
+        fin = 0
+        usados = 0
+        for fin_pieza, coste in self._piezas(texto):
+            if usados and usados + coste > max_tokens:
+                yield inicio, fin
+                inicio = fin
+                usados = 0
+            usados += coste
+            fin = fin_pieza
+        if fin > inicio:
+            yield inicio, fin
+    
+    def truncar(self, texto: str, max_tokens: int) -> str:
+        """
+        Recorta un texto para que no supere un número de tokens.
+        
+        Args:
+            texto: Texto a recortar
+            max_tokens: Máximo de tokens permitido
+        
+        Returns:
+            Prefijo del texto que cabe en `max_tokens`
+        """
+        if max_tokens <= 0 or not texto:
+            return ""
+        
+        self._cargar()
+        if self._tokenizer is not None:
+            codificado = self._tokenizer.encode(texto, add_special_tokens=False)
+            offsets = getattr(codificado, "offsets", None)
+            if offsets is None:
+                return self._tokenizer.decode(list(codificado)[:max_tokens])
+            if len(offsets) <= max_tokens:
+                return texto
+            return texto[:offsets[max_tokens - 1][1]]
+        
+        if self._tiktoken is not None:
+            tokens = self._tiktoken.encode(texto, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return texto
+            return self._tiktoken.decode(tokens[:max_tokens])
+        
+        usados = 0
+        fin = 0
+        for m in _PATRON_PIEZAS.finditer(texto):
+            usados += self._tokens_pieza(m.group())
+            if usados > max_tokens:
+                break
+            fin = m.end()
+        else:
+            return texto
+        return texto[:fin]
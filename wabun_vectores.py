@@ -0,0 +1,953 @@
+#!/usr/bin/env python3
+"""
+WABUN Vectores - Backend Vectorial Cuantizado en NumPy
+Alternativa en proceso a ChromaDB con embeddings int8/float16 en memoria mapeada
+
+Autor: Manus AI (bajo la guía de WABUN y LIANG)
+Fecha: 25 de noviembre de 2025
+Versión: 1.0
+"""
+
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterable, Tuple
+import json
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+
+from wabun_indices import abrir_sqlite_inmutable
+
+
+# Cuantizaciones de los embeddings en memoria
+CUANTIZACIONES = ("int8", "float16")
+
+# Métricas de distancia, con los mismos nombres y valores que ChromaDB
+# (l2 al cuadrado, 1 - coseno y 1 - producto interno)
+ESPACIOS = ("l2", "cosine", "ip")
+
+# Candidatos por resultado que se reordenan en precisión completa (float32)
+FACTOR_REESCALADO = 4
+
+# Filas que se puntúan de una vez (acota la memoria temporal de cada consulta)
+FILAS_POR_BLOQUE = 65536
+
+# Vectores por lista necesarios para entrenar el índice IVF (criterio de FAISS)
+VECTORES_POR_LISTA_IVF = 39
+
+# Con menos candidatas que esto (p. ej. tras un filtro selectivo) se recorren
+# todas por fuerza bruta, que es exacta y ya es barata
+MIN_CANDIDATAS_IVF = 8192
+
+# Iteraciones de k-means al entrenar el índice IVF
+ITERACIONES_KMEANS = 10
+
+# Máximo de chunks por escritura (equivalente a `get_max_batch_size` de ChromaDB)
+MAX_LOTE = 5000
+
+_OPERADORES_NUMERICOS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal
+}
+
+
+def _espacio(metadata: Optional[Dict[str, Any]], configuration: Optional[Dict[str, Any]]) -> str:
+    """Métrica de una colección según sus metadatos o su configuración"""
+    espacio = (metadata or {}).get("hnsw:space")
+    hnsw = (configuration or {}).get("hnsw") if isinstance(configuration, dict) else None
+    if not espacio and isinstance(hnsw, dict):
+        espacio = hnsw.get("space")
+    espacio = espacio or "l2"
+    if espacio not in ESPACIOS:
+        raise ValueError(f"Métrica no soportada: {espacio} (usa una de {ESPACIOS})")
+    return espacio
+
+
+def _fusionar_metadata(actual: Optional[Dict[str, Any]], nueva: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Como ChromaDB: las claves nuevas sustituyen a las anteriores y None las elimina"""
+    fusionada = dict(actual or {})
+    for clave, valor in (nueva or {}).items():
+        if valor is None:
+            fusionada.pop(clave, None)
+        else:
+            fusionada[clave] = valor
+    return fusionada
+
+
+class ColeccionNumpy:
+    """
+    Colección vectorial en NumPy con la API de una colección de ChromaDB.
+    
+    Los embeddings se guardan cuantizados (int8 con una escala por vector, o
+    float16) en archivos binarios que se leen por memoria mapeada, y
+    opcionalmente también en float32 para reordenar los mejores candidatos
+    con la distancia exacta. Las consultas puntúan por fuerza bruta
+    vectorizada o, con `listas_ivf`, solo en las listas IVF más cercanas.
+    Ids, documentos y metadatos viven en SQLite y en memoria, y los
+    filtros `where` ($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, $and, $or)
+    se evalúan como máscaras sobre columnas.
+    
+    Los borrados y reemplazos dejan huecos en los archivos; `compactar()`
+    los reescribe sin ellos. En un cliente de solo lectura las escrituras
+    lanzan ValueError.
+    """
+    
+    def __init__(
+        self,
+        cliente: "ClienteNumpy",
+        id_coleccion: str,
+        nombre: str,
+        metadata: Optional[Dict[str, Any]],
+        dimension: Optional[int],
+        embedding_function: Any = None
+    ):
+        self._cliente = cliente
+        self.id = id_coleccion
+        self.name = nombre
+        self.metadata = metadata
+        self.espacio = _espacio(metadata, None)
+        self.configuration = {"hnsw": {"space": self.espacio}}
+        self._embedding_function = embedding_function
+        self._directorio = cliente.ruta / id_coleccion
+        if not cliente.solo_lectura:
+            self._directorio.mkdir(parents=True, exist_ok=True)
+        self._dimension = dimension
+        self._lock = threading.RLock()
+        self._cargar()
+    
+    def _comprobar_escritura(self):
+        if self._cliente.solo_lectura:
+            raise ValueError(f"La colección {self.name} es de solo lectura (snapshot)")
+    
+    @property
+    def _tipo(self):
+        return np.int8 if self._cliente.cuantizacion == "int8" else np.float16
+    
+    def _archivo(self, nombre: str) -> Path:
+        return self._directorio / nombre
+    
+    def _filas_en_disco(self) -> int:
+        """Filas completas en el archivo de vectores cuantizados"""
+        if not self._dimension:
+            return 0
+        archivo = self._archivo("cuantizados.bin")
+        if not archivo.exists():
+            return 0
+        return archivo.stat().st_size // (self._dimension * np.dtype(self._tipo).itemsize)
+    
+    def _mapa(self, nombre: str, tipo, columnas: Optional[int]) -> np.ndarray:
+        """Vista de solo lectura de un archivo binario por memoria mapeada"""
+        if self._n == 0 or not self._archivo(nombre).exists():
+            return np.empty((0, columnas) if columnas else (0,), dtype=tipo)
+        forma = (self._n, columnas) if columnas else (self._n,)
+        return np.memmap(self._archivo(nombre), dtype=tipo, mode="r", shape=forma)
+    
+    def _mapear(self):
+        """Reabre los mapas de memoria tras cambiar el número de filas"""
+        d = self._dimension or 0
+        self._cuantizados = self._mapa("cuantizados.bin", self._tipo, d)
+        self._escalas = (
+            self._mapa("escalas.bin", np.float32, None)
+            if self._cliente.cuantizacion == "int8" else None
+        )
+        self._completos = (
+            self._mapa("completos.bin", np.float32, d)
+            if self._cliente.reescalar else None
+        )
+    
+    def _cargar(self):
+        """Lee los registros de SQLite y mapea los vectores de disco"""
+        self._n = self._filas_en_disco()
+        self._ids: List[Optional[str]] = [None] * self._n
+        self._documentos: List[Optional[str]] = [None] * self._n
+        self._metadatas: List[Optional[Dict[str, Any]]] = [None] * self._n
+        self._vivas = np.zeros(self._n, dtype=bool)
+        self._fila_por_id: Dict[str, int] = {}
+        for fila, id_chunk, documento, metadata in self._cliente._registros(self.id):
+            if fila >= self._n:
+                # Registro cuyo vector no llegó a disco: se descarta
+                continue
+            self._ids[fila] = id_chunk
+            self._documentos[fila] = documento
+            self._metadatas[fila] = json.loads(metadata) if metadata else {}
+            self._vivas[fila] = True
+            self._fila_por_id[id_chunk] = fila
+        self._columnas: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._mapear()
+        self._normas = self._calcular_normas(0, self._n)
+        self._centroides: Optional[np.ndarray] = None
+        self._listas = np.empty(0, dtype=np.int32)
+        archivo_centroides = self._archivo("centroides.npy")
+        if self._cliente.listas_ivf and archivo_centroides.exists():
+            self._centroides = np.load(archivo_centroides)
+            self._listas = self._asignar_listas(0, self._n)
+    
+    def _decuantizar(self, filas) -> np.ndarray:
+        """Vectores aproximados (float32) de unas filas"""
+        bloque = np.asarray(self._cuantizados[filas], dtype=np.float32)
+        if self._escalas is not None:
+            bloque *= np.asarray(self._escalas[filas], dtype=np.float32)[:, None]
+        return bloque
+    
+    def _productos(self, filas: np.ndarray, consulta: np.ndarray) -> np.ndarray:
+        """Productos escalares aproximados de unas filas (ordenadas) con la consulta"""
+        if len(filas) and filas[-1] - filas[0] + 1 == len(filas):
+            # Filas contiguas: se lee una vista del mapa en lugar de copiarlas
+            filas = slice(int(filas[0]), int(filas[-1]) + 1)
+        productos = np.asarray(self._cuantizados[filas], dtype=np.float32) @ consulta
+        if self._escalas is not None:
+            # La escala de cada vector se aplica al producto, no a sus d componentes
+            productos *= self._escalas[filas]
+        return productos
+    
+    def _calcular_normas(self, desde: int, hasta: int) -> np.ndarray:
+        """Normas al cuadrado de los vectores aproximados de un rango de filas"""
+        normas = np.empty(hasta - desde, dtype=np.float32)
+        for inicio in range(desde, hasta, FILAS_POR_BLOQUE):
+            fin = min(hasta, inicio + FILAS_POR_BLOQUE)
+            bloque = self._decuantizar(slice(inicio, fin))
+            normas[inicio - desde:fin - desde] = np.einsum("ij,ij->i", bloque, bloque)
+        return normas
+    
+    def _cuantizar(self, vectores: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Vectores cuantizados y, en int8, la escala simétrica de cada uno"""
+        if self._cliente.cuantizacion == "float16":
+            return vectores.astype(np.float16), None
+        escalas = np.abs(vectores).max(axis=1) / 127.0
+        escalas[escalas == 0] = 1.0
+        cuantizados = np.clip(np.rint(vectores / escalas[:, None]), -127, 127).astype(np.int8)
+        return cuantizados, escalas.astype(np.float32)
+    
+    def _vectores(self, embeddings: Any, documentos: Optional[List[str]], n: int) -> np.ndarray:
+        """Embeddings como matriz float32, calculándolos si no se dan"""
+        if embeddings is None:
+            if documentos is None:
+                raise ValueError("Se necesitan embeddings o documentos")
+            if self._embedding_function is None:
+                raise ValueError(f"La colección {self.name} no tiene función de embeddings")
+            embeddings = self._embedding_function(list(documentos))
+        vectores = np.asarray(embeddings, dtype=np.float32)
+        if vectores.ndim != 2 or len(vectores) != n:
+            raise ValueError(f"Se esperaban {n} embeddings, se recibieron {len(vectores)}")
+        if self._dimension is None:
+            self._dimension = vectores.shape[1]
+            self._cliente._guardar_dimension(self.id, self._dimension)
+            self._mapear()
+        elif vectores.shape[1] != self._dimension:
+            raise ValueError(
+                f"Dimensión {vectores.shape[1]} distinta de la de la colección {self.name} ({self._dimension})"
+            )
+        return vectores
+    
+    def _anexar(
+        self,
+        ids: List[str],
+        documentos: List[Optional[str]],
+        metadatas: List[Dict[str, Any]],
+        vectores: np.ndarray
+    ):
+        """
+        Añade filas nuevas al final; las filas anteriores de esos ids mueren.
+        
+        Los vectores se escriben antes que los registros, así que una
+        interrupción deja como mucho filas sin registro, que se ignoran.
+        """
+        cuantizados, escalas = self._cuantizar(vectores)
+        with open(self._archivo("cuantizados.bin"), "ab") as f:
+            f.write(cuantizados.tobytes())
+        if escalas is not None:
+            with open(self._archivo("escalas.bin"), "ab") as f:
+                f.write(escalas.tobytes())
+        if self._cliente.reescalar:
+            with open(self._archivo("completos.bin"), "ab") as f:
+                f.write(vectores.tobytes())
+        
+        primera = self._n
+        filas = range(primera, primera + len(ids))
+        anteriores = [self._fila_por_id[id_chunk] for id_chunk in ids if id_chunk in self._fila_por_id]
+        self._cliente._escribir_registros(
+            self.id,
+            anteriores,
+            [
+                (fila, id_chunk, documento, json.dumps(metadata, ensure_ascii=False))
+                for fila, id_chunk, documento, metadata in zip(filas, ids, documentos, metadatas)
+            ]
+        )
+        
+        self._n += len(ids)
+        self._ids.extend(ids)
+        self._documentos.extend(documentos)
+        self._metadatas.extend(metadatas)
+        vivas = np.ones(self._n, dtype=bool)
+        vivas[:primera] = self._vivas
+        vivas[anteriores] = False
+        self._vivas = vivas
+        for fila in anteriores:
+            self._ids[fila] = self._documentos[fila] = self._metadatas[fila] = None
+        self._fila_por_id.update(zip(ids, filas))
+        self._columnas = {}
+        self._mapear()
+        self._normas = np.concatenate([self._normas, self._calcular_normas(primera, self._n)])
+        if self._centroides is not None:
+            self._listas = np.concatenate([self._listas, self._asignar_listas(primera, self._n)])
+    
+    def _columna(self, campo: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Valores de un campo por fila (objeto y numérico, NaN si no es número)"""
+        columna = self._columnas.get(campo)
+        if columna is None:
+            valores = np.fromiter(
+                ((m or {}).get(campo) for m in self._metadatas), dtype=object, count=self._n
+            )
+            numericos = np.fromiter(
+                (v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in valores),
+                dtype=np.float64,
+                count=self._n
+            )
+            columna = self._columnas[campo] = (valores, numericos)
+        return columna
+    
+    def _mascara(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Filas vivas que cumplen un filtro `where` de ChromaDB"""
+        if not where:
+            return self._vivas.copy()
+        return self._evaluar(where) & self._vivas
+    
+    def _evaluar(self, where: Dict[str, Any]) -> np.ndarray:
+        mascara = np.ones(self._n, dtype=bool)
+        for clave, condicion in where.items():
+            if clave == "$and":
+                for parte in condicion:
+                    mascara &= self._evaluar(parte)
+            elif clave == "$or":
+                alguna = np.zeros(self._n, dtype=bool)
+                for parte in condicion:
+                    alguna |= self._evaluar(parte)
+                mascara &= alguna
+            elif isinstance(condicion, dict):
+                for operador, valor in condicion.items():
+                    mascara &= self._comparar(clave, operador, valor)
+            else:
+                mascara &= self._comparar(clave, "$eq", condicion)
+        return mascara
+    
+    def _comparar(self, campo: str, operador: str, valor: Any) -> np.ndarray:
+        valores, numericos = self._columna(campo)
+        if operador == "$eq":
+            return valores == valor
+        if operador == "$ne":
+            return valores != valor
+        if operador in ("$in", "$nin"):
+            conjunto = set(valor)
+            dentro = np.fromiter((v in conjunto for v in valores), dtype=bool, count=self._n)
+            return dentro if operador == "$in" else ~dentro
+        if operador in _OPERADORES_NUMERICOS:
+            if not isinstance(valor, (int, float)) or isinstance(valor, bool):
+                raise ValueError(f"{operador} solo admite números, no {valor!r}")
+            with np.errstate(invalid="ignore"):
+                return _OPERADORES_NUMERICOS[operador](numericos, valor)
+        raise ValueError(f"Operador no soportado en where: {operador}")
+    
+    def _asignar_listas(self, desde: int, hasta: int) -> np.ndarray:
+        """Lista IVF (centroide más cercano) de un rango de filas"""
+        listas = np.empty(hasta - desde, dtype=np.int32)
+        normas_centroides = np.einsum("ij,ij->i", self._centroides, self._centroides)
+        for inicio in range(desde, hasta, FILAS_POR_BLOQUE):
+            fin = min(hasta, inicio + FILAS_POR_BLOQUE)
+            bloque = self._decuantizar(slice(inicio, fin))
+            listas[inicio - desde:fin - desde] = np.argmin(
+                normas_centroides[None, :] - 2 * bloque @ self._centroides.T, axis=1
+            )
+        return listas
+    
+    def construir_ivf(self, listas: Optional[int] = None, semilla: int = 1207) -> int:
+        """
+        Entrena el índice IVF con k-means sobre una muestra de los vectores.
+        
+        Los vectores que se añaden después se asignan a su lista al
+        escribirse; conviene reentrenar si la colección crece mucho.
+        
+        Args:
+            listas: Número de listas (por defecto el del cliente)
+            semilla: Semilla de la muestra y de los centroides iniciales
+        
+        Returns:
+            Listas del índice (0 si hay pocos vectores para entrenarlo)
+        """
+        self._comprobar_escritura()
+        listas = listas or self._cliente.listas_ivf
+        with self._lock:
+            vivas = np.flatnonzero(self._vivas)
+            if not listas or len(vivas) < listas * VECTORES_POR_LISTA_IVF:
+                return 0
+            generador = np.random.default_rng(semilla)
+            muestra = generador.choice(vivas, min(len(vivas), listas * 256), replace=False)
+            datos = self._decuantizar(np.sort(muestra))
+            centroides = datos[generador.choice(len(datos), listas, replace=False)].copy()
+            for _ in range(ITERACIONES_KMEANS):
+                asignacion = np.argmin(
+                    np.einsum("ij,ij->i", centroides, centroides)[None, :] - 2 * datos @ centroides.T,
+                    axis=1
+                )
+                for lista in range(listas):
+                    miembros = datos[asignacion == lista]
+                    if len(miembros):
+                        centroides[lista] = miembros.mean(axis=0)
+            self._centroides = centroides.astype(np.float32)
+            np.save(self._archivo("centroides.npy"), self._centroides)
+            self._listas = self._asignar_listas(0, self._n)
+            return listas
+    
+    def _filas_ivf(self, consulta: np.ndarray, candidatas: np.ndarray) -> np.ndarray:
+        """Filas candidatas dentro de las `sondas` listas más cercanas a la consulta"""
+        distancias = np.einsum("ij,ij->i", self._centroides, self._centroides) - 2 * self._centroides @ consulta
+        sondas = np.argsort(distancias)[:self._cliente.sondas]
+        return candidatas[np.isin(self._listas[candidatas], sondas)]
+    
+    def _distancias(self, consulta: np.ndarray, productos: np.ndarray, normas: np.ndarray) -> np.ndarray:
+        """Distancias en la métrica de la colección a partir de productos y normas²"""
+        if self.espacio == "l2":
+            return np.maximum(normas - 2 * productos + float(consulta @ consulta), 0.0)
+        if self.espacio == "cosine":
+            denominador = np.sqrt(normas) * float(np.linalg.norm(consulta))
+            return 1.0 - productos / np.where(denominador > 0, denominador, 1.0)
+        return 1.0 - productos
+    
+    def _mejores(self, consulta: np.ndarray, filas: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Las n filas más cercanas a la consulta, ordenadas, con sus distancias"""
+        if len(filas) == 0 or n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        # Puntuación aproximada con los vectores cuantizados, por bloques
+        m = min(len(filas), n * FACTOR_REESCALADO if self._completos is not None else n)
+        mejores_filas: List[np.ndarray] = []
+        mejores_distancias: List[np.ndarray] = []
+        for inicio in range(0, len(filas), FILAS_POR_BLOQUE):
+            bloque = filas[inicio:inicio + FILAS_POR_BLOQUE]
+            distancias = self._distancias(consulta, self._productos(bloque, consulta), self._normas[bloque])
+            if len(bloque) > m:
+                parte = np.argpartition(distancias, m - 1)[:m]
+                bloque, distancias = bloque[parte], distancias[parte]
+            mejores_filas.append(bloque)
+            mejores_distancias.append(distancias)
+        filas = np.concatenate(mejores_filas)
+        distancias = np.concatenate(mejores_distancias)
+        if len(filas) > m:
+            parte = np.argpartition(distancias, m - 1)[:m]
+            filas, distancias = filas[parte], distancias[parte]
+        
+        # Reordenación de los candidatos con la distancia exacta
+        if self._completos is not None:
+            orden_filas = np.argsort(filas)
+            filas = filas[orden_filas]
+            exactos = np.asarray(self._completos[filas], dtype=np.float32)
+            distancias = self._distancias(consulta, exactos @ consulta, np.einsum("ij,ij->i", exactos, exactos))
+        
+        orden = np.argsort(distancias, kind="stable")[:n]
+        return filas[orden], distancias[orden]
+    
+    def count(self) -> int:
+        return len(self._fila_por_id)
+    
+    def modify(self, name: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        """Renombra la colección o sustituye sus metadatos"""
+        self._comprobar_escritura()
+        self._cliente._modificar(self, name, metadata)
+    
+    def add(
+        self,
+        ids: List[str],
+        embeddings: Any = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        documents: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """Añade chunks nuevos; los ids que ya existen se ignoran, como en ChromaDB"""
+        self._comprobar_escritura()
+        ids = list(ids)
+        if len(set(ids)) != len(ids):
+            raise ValueError("Ids duplicados en la misma escritura")
+        with self._lock:
+            nuevas = [i for i, id_chunk in enumerate(ids) if id_chunk not in self._fila_por_id]
+            if not nuevas:
+                return
+            vectores = self._vectores(embeddings, documents, len(ids))[nuevas]
+            self._anexar(
+                [ids[i] for i in nuevas],
+                [documents[i] if documents is not None else None for i in nuevas],
+                [_fusionar_metadata(None, metadatas[i] if metadatas else None) for i in nuevas],
+                vectores
+            )
+    
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: Any = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        documents: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """Añade los chunks nuevos y reemplaza los existentes (fusionando metadatos)"""
+        self._comprobar_escritura()
+        ids = list(ids)
+        if len(set(ids)) != len(ids):
+            raise ValueError("Ids duplicados en la misma escritura")
+        with self._lock:
+            vectores = self._vectores(embeddings, documents, len(ids))
+            self._anexar(
+                ids,
+                [
+                    documents[i] if documents is not None
+                    else self._documentos[self._fila_por_id[id_chunk]] if id_chunk in self._fila_por_id
+                    else None
+                    for i, id_chunk in enumerate(ids)
+                ],
+                [
+                    _fusionar_metadata(
+                        self._metadatas[self._fila_por_id[id_chunk]] if id_chunk in self._fila_por_id else None,
+                        metadatas[i] if metadatas else None
+                    )
+                    for i, id_chunk in enumerate(ids)
+                ],
+                vectores
+            )
+    
+    def update(
+        self,
+        ids: List[str],
+        embeddings: Any = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        documents: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """Actualiza chunks existentes (los ids que no existen se ignoran)"""
+        self._comprobar_escritura()
+        with self._lock:
+            indices = [i for i, id_chunk in enumerate(ids) if id_chunk in self._fila_por_id]
+            if not indices:
+                return
+            filas = [self._fila_por_id[ids[i]] for i in indices]
+            nuevas_metadatas = [
+                _fusionar_metadata(self._metadatas[fila], metadatas[i] if metadatas else None)
+                for i, fila in zip(indices, filas)
+            ]
+            if embeddings is None and documents is None:
+                # Solo metadatos: se reescriben en su fila, sin mover vectores
+                self._cliente._actualizar_metadatas(self.id, [
+                    (json.dumps(metadata, ensure_ascii=False), fila)
+                    for fila, metadata in zip(filas, nuevas_metadatas)
+                ])
+                for fila, metadata in zip(filas, nuevas_metadatas):
+                    self._metadatas[fila] = metadata
+                self._columnas = {}
+                return
+            
+            seleccion_documentos = [documents[i] for i in indices] if documents is not None else None
+            seleccion_embeddings = (
+                np.asarray(embeddings, dtype=np.float32)[indices] if embeddings is not None else None
+            )
+            self._anexar(
+                [ids[i] for i in indices],
+                seleccion_documentos or [self._documentos[fila] for fila in filas],
+                nuevas_metadatas,
+                self._vectores(seleccion_embeddings, seleccion_documentos, len(indices))
+            )
+    
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, **kwargs):
+        """Borra chunks por id o por filtro"""
+        self._comprobar_escritura()
+        with self._lock:
+            if ids is not None:
+                filas = [self._fila_por_id[id_chunk] for id_chunk in ids if id_chunk in self._fila_por_id]
+                if where:
+                    mascara = self._mascara(where)
+                    filas = [fila for fila in filas if mascara[fila]]
+            else:
+                filas = np.flatnonzero(self._mascara(where)).tolist()
+            if not filas:
+                return
+            self._cliente._escribir_registros(self.id, filas, [])
+            for fila in filas:
+                del self._fila_por_id[self._ids[fila]]
+                self._ids[fila] = self._documentos[fila] = self._metadatas[fila] = None
+            self._vivas[filas] = False
+            self._columnas = {}
+    
+    def _resultado(self, filas: Iterable[int], include: List[str]) -> Dict[str, Any]:
+        filas = list(filas)
+        resultado: Dict[str, Any] = {
+            "ids": [self._ids[fila] for fila in filas],
+            "documents": None,
+            "metadatas": None,
+            "embeddings": None,
+            "included": list(include)
+        }
+        if "documents" in include:
+            resultado["documents"] = [self._documentos[fila] for fila in filas]
+        if "metadatas" in include:
+            resultado["metadatas"] = [dict(self._metadatas[fila]) for fila in filas]
+        if "embeddings" in include:
+            if not filas:
+                resultado["embeddings"] = np.empty((0, self._dimension or 0), dtype=np.float32)
+            elif self._completos is not None:
+                resultado["embeddings"] = np.asarray(self._completos[filas], dtype=np.float32)
+            else:
+                resultado["embeddings"] = self._decuantizar(filas)
+        return resultado
+    
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Chunks por id y/o filtro, en orden de inserción (o en el de `ids`)"""
+        include = include if include is not None else ["documents", "metadatas"]
+        with self._lock:
+            if ids is not None:
+                filas = [self._fila_por_id[id_chunk] for id_chunk in ids if id_chunk in self._fila_por_id]
+                if where:
+                    mascara = self._mascara(where)
+                    filas = [fila for fila in filas if mascara[fila]]
+            else:
+                filas = np.flatnonzero(self._mascara(where)).tolist()
+            inicio = offset or 0
+            filas = filas[inicio:inicio + limit] if limit is not None else filas[inicio:]
+            return self._resultado(filas, include)
+    
+    def query(
+        self,
+        query_embeddings: Any = None,
+        query_texts: Optional[List[str]] = None,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Los n_results chunks más cercanos a cada consulta, con la forma de ChromaDB"""
+        if where_document:
+            raise NotImplementedError("El backend NumPy no soporta where_document; usa el modo léxico")
+        include = include if include is not None else ["documents", "metadatas", "distances"]
+        if query_embeddings is None:
+            if query_texts is None or self._embedding_function is None:
+                raise ValueError("Se necesitan query_embeddings o query_texts")
+            query_embeddings = self._embedding_function(list(query_texts))
+        consultas = np.asarray(query_embeddings, dtype=np.float32)
+        if consultas.ndim == 1:
+            consultas = consultas[None, :]
+        
+        resultados: Dict[str, Any] = {
+            "ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": [],
+            "included": list(include)
+        }
+        with self._lock:
+            candidatas = np.flatnonzero(self._mascara(where))
+            if (
+                self._cliente.listas_ivf and self._centroides is None and not self._cliente.solo_lectura
+                and len(candidatas) >= self._cliente.listas_ivf * VECTORES_POR_LISTA_IVF
+            ):
+                self.construir_ivf()
+            usar_ivf = self._centroides is not None and len(candidatas) >= MIN_CANDIDATAS_IVF
+            for consulta in consultas:
+                if self._dimension and len(consulta) != self._dimension:
+                    raise ValueError(
+                        f"Dimensión {len(consulta)} distinta de la de la colección {self.name} ({self._dimension})"
+                    )
+                filas = self._filas_ivf(consulta, candidatas) if usar_ivf else candidatas
+                filas, distancias = self._mejores(consulta, filas, n_results)
+                parte = self._resultado(filas.tolist(), include)
+                for clave in ("ids", "documents", "metadatas", "embeddings"):
+                    resultados[clave].append(parte[clave])
+                resultados["distances"].append(distancias.astype(float).tolist())
+        for clave in ("documents", "metadatas", "embeddings", "distances"):
+            if clave not in include:
+                resultados[clave] = None
+        return resultados
+    
+    def compactar(self) -> int:
+        """
+        Reescribe los archivos sin las filas borradas o reemplazadas.
+        
+        Returns:
+            Filas conservadas
+        """
+        self._comprobar_escritura()
+        with self._lock:
+            vivas = np.flatnonzero(self._vivas)
+            if len(vivas) == self._n:
+                return self._n
+            for nombre, fuente in (
+                ("cuantizados.bin", self._cuantizados),
+                ("escalas.bin", self._escalas),
+                ("completos.bin", self._completos)
+            ):
+                if fuente is None or not self._archivo(nombre).exists():
+                    continue
+                temporal = self._archivo(nombre + ".tmp")
+                with open(temporal, "wb") as f:
+                    for inicio in range(0, len(vivas), FILAS_POR_BLOQUE):
+                        f.write(np.ascontiguousarray(fuente[vivas[inicio:inicio + FILAS_POR_BLOQUE]]).tobytes())
+            self._cuantizados = self._escalas = self._completos = None
+            for nombre in ("cuantizados.bin", "escalas.bin", "completos.bin"):
+                temporal = self._archivo(nombre + ".tmp")
+                if temporal.exists():
+                    temporal.replace(self._archivo(nombre))
+            self._cliente._renumerar(self.id, {int(fila): nueva for nueva, fila in enumerate(vivas)})
+            self._cargar()
+            return self._n
+
+
+class ClienteNumpy:
+    """
+    Cliente del backend NumPy con la API del cliente persistente de ChromaDB.
+    
+    Cada colección guarda sus vectores en un directorio propio dentro de
+    `ruta`; el catálogo de colecciones y los registros (ids, documentos y
+    metadatos) se guardan en `ruta/registros.sqlite3`.
+    
+    Con `solo_lectura` abre un almacén que no va a cambiar (el de un
+    snapshot, ver `wabun_snapshots`): SQLite sin bloqueos y vectores por
+    memoria mapeada, compartidos entre procesos por la caché de páginas.
+    """
+    
+    def __init__(
+        self,
+        ruta: str,
+        cuantizacion: str = "int8",
+        reescalar: bool = True,
+        listas_ivf: int = 0,
+        sondas: int = 8,
+        solo_lectura: bool = False
+    ):
+        """
+        Abre (o crea) el almacén.
+        
+        Args:
+            ruta: Directorio del backend
+            cuantizacion: "int8" (4x menos memoria que float32) o "float16" (2x)
+            reescalar: Si guardar también los vectores en float32 (en disco,
+                por memoria mapeada) para reordenar los mejores candidatos
+            listas_ivf: Listas del índice IVF (0 para fuerza bruta); se
+                entrena solo cuando hay suficientes vectores
+            sondas: Listas IVF que se recorren en cada consulta
+            solo_lectura: Si abrir un almacén existente e inmutable
+        """
+        if cuantizacion not in CUANTIZACIONES:
+            raise ValueError(f"Cuantización no soportada: {cuantizacion} (usa una de {CUANTIZACIONES})")
+        self.ruta = Path(ruta)
+        self.cuantizacion = cuantizacion
+        self.reescalar = reescalar
+        self.listas_ivf = max(0, listas_ivf)
+        self.sondas = max(1, sondas)
+        self.solo_lectura = solo_lectura
+        self._lock = threading.RLock()
+        self._abiertas: Dict[str, ColeccionNumpy] = {}
+        if solo_lectura:
+            if not (self.ruta / "registros.sqlite3").exists():
+                raise FileNotFoundError(f"No hay un almacén de vectores en {self.ruta}")
+            self._conexion = abrir_sqlite_inmutable(str(self.ruta / "registros.sqlite3"))
+            return
+        self.ruta.mkdir(parents=True, exist_ok=True)
+        self._conexion = sqlite3.connect(str(self.ruta / "registros.sqlite3"), check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        with self._conexion:
+            self._conexion.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS colecciones (
+                    id TEXT PRIMARY KEY,
+                    nombre TEXT NOT NULL UNIQUE,
+                    metadata TEXT,
+                    dimension INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS registros (
+                    coleccion TEXT NOT NULL,
+                    fila INTEGER NOT NULL,
+                    id TEXT NOT NULL,
+                    documento TEXT,
+                    metadata TEXT,
+                    PRIMARY KEY (coleccion, fila),
+                    UNIQUE (coleccion, id)
+                );
+                """
+            )
+    
+    def _registros(self, id_coleccion: str) -> List[Tuple[int, str, Optional[str], Optional[str]]]:
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT fila, id, documento, metadata FROM registros WHERE coleccion = ? ORDER BY fila",
+                (id_coleccion,)
+            ).fetchall()
+    
+    def _escribir_registros(
+        self,
+        id_coleccion: str,
+        filas_borradas: List[int],
+        nuevos: List[Tuple[int, str, Optional[str], str]]
+    ):
+        """Borra unas filas e inserta otras en una sola transacción"""
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "DELETE FROM registros WHERE coleccion = ? AND fila = ?",
+                ((id_coleccion, fila) for fila in filas_borradas)
+            )
+            self._conexion.executemany(
+                "INSERT INTO registros (coleccion, fila, id, documento, metadata) VALUES (?, ?, ?, ?, ?)",
+                ((id_coleccion, *nuevo) for nuevo in nuevos)
+            )
+    
+    def _actualizar_metadatas(self, id_coleccion: str, cambios: List[Tuple[str, int]]):
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "UPDATE registros SET metadata = ? WHERE coleccion = ? AND fila = ?",
+                ((metadata, id_coleccion, fila) for metadata, fila in cambios)
+            )
+    
+    def _renumerar(self, id_coleccion: str, filas: Dict[int, int]):
+        """Aplica la nueva numeración de filas tras compactar"""
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "UPDATE registros SET fila = ? WHERE coleccion = ? AND fila = ?",
+                ((-1 - nueva, id_coleccion, fila) for fila, nueva in filas.items())
+            )
+            self._conexion.execute(
+                "UPDATE registros SET fila = -1 - fila WHERE coleccion = ? AND fila < 0",
+                (id_coleccion,)
+            )
+    
+    def _guardar_dimension(self, id_coleccion: str, dimension: int):
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "UPDATE colecciones SET dimension = ? WHERE id = ?", (dimension, id_coleccion)
+            )
+    
+    def _modificar(self, coleccion: ColeccionNumpy, nombre: Optional[str], metadata: Optional[Dict[str, Any]]):
+        with self._lock, self._conexion:
+            if nombre and nombre != coleccion.name:
+                if self._buscar(nombre):
+                    raise ValueError(f"Ya existe una colección llamada {nombre}")
+                self._conexion.execute(
+                    "UPDATE colecciones SET nombre = ? WHERE id = ?", (nombre, coleccion.id)
+                )
+                self._abiertas.pop(coleccion.name, None)
+                coleccion.name = nombre
+                self._abiertas[nombre] = coleccion
+            if metadata is not None:
+                self._conexion.execute(
+                    "UPDATE colecciones SET metadata = ? WHERE id = ?",
+                    (json.dumps(metadata), coleccion.id)
+                )
+                coleccion.metadata = metadata
+    
+    def _buscar(self, nombre: str) -> Optional[Tuple[str, Optional[str], Optional[int]]]:
+        return self._conexion.execute(
+            "SELECT id, metadata, dimension FROM colecciones WHERE nombre = ?", (nombre,)
+        ).fetchone()
+    
+    def get_collection(self, name: str, embedding_function: Any = None, **kwargs) -> ColeccionNumpy:
+        with self._lock:
+            coleccion = self._abiertas.get(name)
+            if coleccion is None:
+                fila = self._buscar(name)
+                if fila is None:
+                    raise ValueError(f"La colección {name} no existe")
+                id_coleccion, metadata, dimension = fila
+                coleccion = ColeccionNumpy(
+                    self, id_coleccion, name, json.loads(metadata) if metadata else None,
+                    dimension, embedding_function
+                )
+                self._abiertas[name] = coleccion
+            elif embedding_function is not None:
+                coleccion._embedding_function = embedding_function
+            return coleccion
+    
+    def create_collection(
+        self,
+        name: str,
+        embedding_function: Any = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        configuration: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> ColeccionNumpy:
+        if self.solo_lectura:
+            raise ValueError(f"Almacén de solo lectura: no se puede crear la colección {name}")
+        with self._lock:
+            if self._buscar(name):
+                raise ValueError(f"Ya existe una colección llamada {name}")
+            metadata = dict(metadata or {})
+            espacio = _espacio(metadata, configuration)
+            if espacio != "l2":
+                metadata["hnsw:space"] = espacio
+            with self._conexion:
+                self._conexion.execute(
+                    "INSERT INTO colecciones (id, nombre, metadata) VALUES (?, ?, ?)",
+                    (uuid.uuid4().hex, name, json.dumps(metadata) if metadata else None)
+                )
+            return self.get_collection(name, embedding_function)
+    
+    def get_or_create_collection(
+        self,
+        name: str,
+        embedding_function: Any = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        configuration: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> ColeccionNumpy:
+        with self._lock:
+            if self._buscar(name):
+                return self.get_collection(name, embedding_function)
+            return self.create_collection(name, embedding_function, metadata, configuration)
+    
+    def delete_collection(self, name: str):
+        if self.solo_lectura:
+            raise ValueError(f"Almacén de solo lectura: no se puede borrar la colección {name}")
+        with self._lock:
+            fila = self._buscar(name)
+            if fila is None:
+                raise ValueError(f"La colección {name} no existe")
+            id_coleccion = fila[0]
+            coleccion = self._abiertas.pop(name, None)
+            if coleccion is not None:
+                coleccion._cuantizados = coleccion._escalas = coleccion._completos = None
+            with self._conexion:
+                self._conexion.execute("DELETE FROM registros WHERE coleccion = ?", (id_coleccion,))
+                self._conexion.execute("DELETE FROM colecciones WHERE id = ?", (id_coleccion,))
+            directorio = self.ruta / id_coleccion
+            if directorio.exists():
+                for archivo in directorio.iterdir():
+                    archivo.unlink()
+                directorio.rmdir()
+    
+    def list_collections(self) -> List[ColeccionNumpy]:
+        with self._lock:
+            nombres = [nombre for (nombre,) in self._conexion.execute("SELECT nombre FROM colecciones")]
+            return [self.get_collection(nombre) for nombre in nombres]
+    
+    def get_max_batch_size(self) -> int:
+        return MAX_LOTE
+    
+    def cerrar(self):
+        """Cierra la conexión con los registros"""
+        with self._lock:
+            self._conexion.close()
+    
+    def memoria_indice(self) -> Dict[str, Dict[str, int]]:
+        """
+        Bytes de vectores por colección: los cuantizados (los que se
+        recorren en cada consulta) y los float32 de reordenación (que solo
+        se leen para los candidatos y pueden quedarse en disco)
+        """
+        memoria = {}
+        for coleccion in self.list_collections():
+            memoria[coleccion.name] = {
+                "cuantizados_bytes": int(coleccion._cuantizados.nbytes)
+                + (int(coleccion._escalas.nbytes) if coleccion._escalas is not None else 0),
+                "completos_bytes": int(coleccion._completos.nbytes) if coleccion._completos is not None else 0
+            }
+        return memoria